@@ -4,6 +4,15 @@ use ieee.std_logic_1164.all;
 use work.aes_pkg.all;
 
 entity aes_128_top_wrapper is
+generic
+(
+    SBOX_ARCHITECTURE : string := "LOOKUP"; -- LOOKUP, COMB, TTABLE
+    BUS_MODE          : string := "HANDSHAKE"; -- HANDSHAKE, STREAM
+    WORDS_PER_CYCLE   : positive := 1; -- Key schedule words derived per cycle: 1, 2 or 4
+    PERF_COUNTERS     : boolean := false; -- Performance counters, read with the reserved sequence
+    DUPLEX            : boolean := false; -- Every transaction starts with a header word that selects the direction
+    FIFO_DEPTH        : natural := 0 -- Blocks buffered on each side of the core, 0 for one block at a time
+);
 port 
 (
     -- Common
@@ -20,13 +29,20 @@ end aes_128_top_wrapper;
 
 architecture rtl of aes_128_top_wrapper is
 
-    type interface_state_type is (idle, read_iv, read_key, read_block, 
-                                  write_block,wait_output,return_datablock);
+    type interface_state_type is (idle, read_header, read_iv, read_key, read_block, 
+                                  write_block,wait_output,return_datablock,read_counters);
     signal interface_state : interface_state_type;
+    signal return_state    : interface_state_type; -- State to resume after read_counters
     
     type enc_dec_type is (encryption, decryption);
     signal enc_dec_state : enc_dec_type;
 
+    -- DUPLEX header word bits
+    constant HEADER_DEC  : integer := 0; -- Decrypt the block
+    constant HEADER_IV   : integer := 1; -- An initial vector for the direction follows
+    constant HEADER_KEY  : integer := 2; -- A key for both directions follows
+    signal header        : std_logic_vector(2 downto 0);
+
     signal init_vec      : std_logic_vector(127 downto 0);
     signal input_key     : std_logic_vector(127 downto 0);
     signal data_block_in : std_logic_vector(127 downto 0);
@@ -47,19 +63,52 @@ architecture rtl of aes_128_top_wrapper is
     signal input_valid    : std_logic;
     signal expansion_done : std_logic;
     signal first_block      : std_logic;
+    signal stream_valid     : std_logic; -- Output word on data_bus not yet accepted
+    signal send_auth_d      : std_logic;
+    signal bus_out          : std_logic_vector(31 downto 0); -- Output word, on data_bus while send_auth grants it
+
+    -- Performance counters
+    signal key_expanding    : std_logic;
+    signal bus_wait         : std_logic;
+    signal perf_events      : std_logic_vector(NUM_PERF_COUNTERS-1 downto 0);
+    signal perf_counts      : perf_count_array_type;
 
     -- enc/dec input muxing
     signal init_vec_valid_enc : std_logic;
     signal init_vec_valid_dec : std_logic;
     signal input_valid_enc    : std_logic;
     signal input_valid_dec    : std_logic;
+    signal block_valid        : std_logic; -- input_valid, delayed until the key expansion is done
     
     -- enc/dec output muxing
     signal data_block_out   : std_logic_vector(127 downto 0);
     signal output_valid     : std_logic;
     signal output_valid_enc : std_logic;
     signal output_valid_dec : std_logic;
+
+    -- FIFO_DEPTH: ingress and egress block FIFOs around the core
+    signal core_block     : std_logic_vector(127 downto 0); -- Block on the input_bus of the cores
+    signal core_valid     : std_logic; -- Pulsed, the next block leaves the ingress FIFO
+    signal core_busy      : std_logic; -- A block from the ingress FIFO is in the rounds
+    signal return_block   : std_logic_vector(127 downto 0); -- Block read out by return_datablock
+    signal in_push        : std_logic; -- Pulsed, data_block_in is a whole block
+    signal in_pop         : std_logic;
+    signal in_count       : integer range 0 to FIFO_DEPTH;
+    signal in_room        : std_logic; -- The ingress FIFO can take another block
+    signal in_fifo_block  : std_logic_vector(127 downto 0);
+    signal out_pop        : std_logic; -- Pulsed, the oldest output block has been read
+    signal out_count      : integer range 0 to FIFO_DEPTH;
+    signal blocks_queued  : integer range 0 to 2*FIFO_DEPTH; -- Read in, not yet returned
 begin
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB" or SBOX_ARCHITECTURE = "TTABLE"
+        report "Error: SBOX_ARCHITECTURE setting was invalid" severity failure;
+
+    assert BUS_MODE = "HANDSHAKE" or BUS_MODE = "STREAM"
+        report "Error: BUS_MODE setting was invalid" severity failure;
+
+    -- DUPLEX transactions each return their block before the next header
+    assert not (DUPLEX and FIFO_DEPTH > 0)
+        report "Error: FIFO_DEPTH setting was invalid" severity failure;
 
     -- Implement the interface in "doc/external_interface.md"
     mode_sel_proc : process(clk)
@@ -70,7 +119,12 @@ begin
                 mode <= '0'; -- encryption
             else
                 mode_sel_sr <= mode_sel_sr(mode_sel_sr'high-1 downto 0) & (start and send_auth);
-                if mode_sel_sr = "11111" and interface_state = read_iv then
+                if DUPLEX then
+                    -- The header selects the mode of each transaction
+                    if interface_state = read_header and start = '1' and send_auth /= '1' then
+                        mode <= data_bus(HEADER_DEC);
+                    end if;
+                elsif mode_sel_sr = "11111" and interface_state = read_iv then
                     -- don't switch modes unless we've just reset
                     mode <= '1'; -- decryption
                 end if;
@@ -86,12 +140,46 @@ begin
             input_key_valid <= '0';
             init_vec_valid  <= '0';
             input_valid     <= '0';
+            in_push         <= '0';
+            out_pop         <= '0';
+            send_auth_d <= send_auth;
             if reset = '1' then
                 shift_cnt := 0;
-                interface_state <= read_iv;
+                stream_valid <= '0';
+                key_expanding <= '0';
+                blocks_queued <= 0;
+                if DUPLEX then
+                    interface_state <= read_header;
+                else
+                    interface_state <= read_iv;
+                end if;
             else
+                if input_key_valid = '1' then
+                    key_expanding <= '1';
+                elsif expansion_done = '1' then
+                    key_expanding <= '0';
+                end if;
+
                 case interface_state is
                     -------------------------------
+                    when read_header =>
+                    -- DUPLEX: one word, then the initial vector and key it announces and the block
+                        if start = '1' and send_auth /= '1' then
+                            header <= data_bus(2 downto 0);
+                            done <= '1'; -- Pulsed
+                            if data_bus(HEADER_IV) = '1' then
+                                interface_state <= read_iv;
+                            elsif data_bus(HEADER_KEY) = '1' then
+                                interface_state <= read_key;
+                            else
+                                interface_state <= read_block;
+                            end if;
+                        elsif PERF_COUNTERS and start = '0' and send_auth = '1' and send_auth_d = '0' then
+                            -- Reserved sequence: send_auth rises without start
+                            return_state <= read_header;
+                            interface_state <= read_counters;
+                        end if;
+                    -------------------------------
                     when read_iv =>
                     -- Don't read bus if we're potentially switching enc/dec
                         first_block <= '1';
@@ -101,9 +189,17 @@ begin
                             done <= '1'; -- Pulsed
                             if shift_cnt = 4 then
                                 init_vec_valid <= '1'; -- Pulsed
-                                interface_state <= read_key;
+                                if DUPLEX and header(HEADER_KEY) = '0' then
+                                    interface_state <= read_block;
+                                else
+                                    interface_state <= read_key;
+                                end if;
                                 shift_cnt := 0;
                             end if;
+                        elsif PERF_COUNTERS and shift_cnt = 0 and start = '0' and send_auth = '1' and send_auth_d = '0' then
+                            -- Reserved sequence: send_auth rises without start
+                            return_state <= read_iv;
+                            interface_state <= read_counters;
                         end if;
                     -------------------------------
                     when read_key =>
@@ -119,15 +215,28 @@ begin
                         end if;
                     -------------------------------
                     when read_block =>
-                        if start = '1' then
+                        if FIFO_DEPTH > 0 and shift_cnt = 0 and send_auth = '1' and out_count > 0 and out_pop = '0' then
+                            -- FIFO_DEPTH: return the oldest output block, the blocks behind it keep going
+                            interface_state <= return_datablock;
+                        elsif start = '1' and (FIFO_DEPTH = 0 or (send_auth /= '1' and (shift_cnt /= 0 or in_room = '1'))) then
+                            -- FIFO_DEPTH: the first word of a block waits for room in the ingress FIFO
                             data_block_in <= data_block_in(95 downto 0) & data_bus; -- Shift left x32
                             shift_cnt := shift_cnt + 1;
                             done <= '1'; -- Pulsed
                             if shift_cnt = 4 then
-                                input_valid <= '1'; -- Pulsed
-                                interface_state <= wait_output;
+                                if FIFO_DEPTH > 0 then
+                                    in_push <= '1'; -- Pulsed
+                                    blocks_queued <= blocks_queued + 1;
+                                else
+                                    input_valid <= '1'; -- Pulsed
+                                    interface_state <= wait_output;
+                                end if;
                                 shift_cnt := 0;
                             end if;
+                        elsif PERF_COUNTERS and shift_cnt = 0 and start = '0' and send_auth = '1' and send_auth_d = '0' and blocks_queued = 0 then
+                            -- Reserved sequence: send_auth rises without start
+                            return_state <= read_block;
+                            interface_state <= read_counters;
                         end if;
                     -------------------------------
                     when wait_output =>
@@ -137,7 +246,31 @@ begin
                     -------------------------------
                     when return_datablock =>
                         first_block <= '0';
-                        if send_auth = '1' then
+                        if BUS_MODE = "STREAM" then
+                            -- done is valid and send_auth is ready: one word per clock
+                            if stream_valid = '1' and send_auth = '1' then
+                                -- user has read the data
+                                shift_cnt := shift_cnt + 1;
+                            end if;
+
+                            if shift_cnt = 4 then
+                                shift_cnt := 0;
+                                stream_valid <= '0';
+                                if FIFO_DEPTH > 0 then
+                                    out_pop <= '1'; -- Pulsed
+                                    blocks_queued <= blocks_queued - 1;
+                                end if;
+                                if DUPLEX then
+                                    interface_state <= read_header;
+                                else
+                                    interface_state <= read_block;
+                                end if;
+                            else
+                                bus_out <= return_block(127 - shift_cnt*32 downto 96 - shift_cnt*32); -- data
+                                stream_valid <= '1';
+                                done <= '1'; -- Held until the word is accepted
+                            end if;
+                        elsif send_auth = '1' then
                             -- We are cleared to drive the data bus
                             if start = '1' then
                                 -- user has read the data
@@ -146,9 +279,51 @@ begin
                             
                             if shift_cnt = 4 then
                                 shift_cnt := 0;
-                                interface_state <= read_block;
+                                stream_valid <= '0';
+                                if FIFO_DEPTH > 0 then
+                                    out_pop <= '1'; -- Pulsed
+                                    blocks_queued <= blocks_queued - 1;
+                                end if;
+                                if DUPLEX then
+                                    interface_state <= read_header;
+                                else
+                                    interface_state <= read_block;
+                                end if;
                             else
-                                data_bus <= data_block_out(127 - shift_cnt*32 downto 96 - shift_cnt*32); -- data
+                                bus_out <= return_block(127 - shift_cnt*32 downto 96 - shift_cnt*32); -- data
+                                stream_valid <= '1';
+                                done <= '1'; -- Pulsed
+                            end if;
+                        end if;
+                    -------------------------------
+                    when read_counters =>
+                        -- Same handshakes as return_datablock, one word per counter
+                        if BUS_MODE = "STREAM" then
+                            if stream_valid = '1' and send_auth = '1' then
+                                shift_cnt := shift_cnt + 1;
+                            end if;
+
+                            if shift_cnt = NUM_PERF_COUNTERS then
+                                shift_cnt := 0;
+                                stream_valid <= '0';
+                                interface_state <= return_state;
+                            else
+                                bus_out <= perf_counts(shift_cnt);
+                                stream_valid <= '1';
+                                done <= '1'; -- Held until the word is accepted
+                            end if;
+                        elsif send_auth = '1' then
+                            if start = '1' then
+                                shift_cnt := shift_cnt + 1;
+                            end if;
+
+                            if shift_cnt = NUM_PERF_COUNTERS then
+                                shift_cnt := 0;
+                                stream_valid <= '0';
+                                interface_state <= return_state;
+                            else
+                                bus_out <= perf_counts(shift_cnt);
+                                stream_valid <= '1';
                                 done <= '1'; -- Pulsed
                             end if;
                         end if;
@@ -161,6 +336,10 @@ begin
     end process;
 
     key_expansion_inst : entity work.key_expansion(rtl)
+    generic map
+    (
+        WORDS_PER_CYCLE => WORDS_PER_CYCLE
+    )
     port map
     (
         -- Common
@@ -177,23 +356,149 @@ begin
     init_vec_valid_enc <= init_vec_valid when mode = '0' else '0';
     init_vec_valid_dec <= init_vec_valid when mode = '1' else '0';
 
-    input_valid_enc    <= input_valid    when mode = '0' else '0';
-    -- Need to wait for key expansion to complete on the first block:
-    input_valid_dec    <= expansion_done when (mode = '1' and first_block = '1') else 
-                          input_valid when mode = '1' else '0'; 
+    -- The cores read the round keys straight from key_expansion, so the first block after
+    -- a key load waits for the expansion if it is still running once the block has been
+    -- read: decryption starts from the last round key, and the T-table rounds of
+    -- encryption overtake the expansion. With DUPLEX any transaction can load a key
+    block_valid        <= '1' when (input_valid = '1' and key_expanding = '0') or
+                                   (expansion_done = '1' and (first_block = '1' or DUPLEX) and interface_state = wait_output) else '0';
+
+    input_valid_enc    <= core_valid     when mode = '0' and FIFO_DEPTH > 0 else
+                          block_valid    when mode = '0' else '0';
+    input_valid_dec    <= core_valid     when mode = '1' and FIFO_DEPTH > 0 else
+                          block_valid    when mode = '1' else '0';
 
     -- enc/dec output muxing
     data_block_out     <= datablock_enc when mode = '0' else datablock_dec;
     output_valid       <= output_valid_enc when mode = '0' else output_valid_dec;
 
+    -- Ingress FIFO -> core -> egress FIFO. A block leaves the ingress FIFO on the cycle the
+    -- core outputs the previous one, if the egress FIFO has room for both. It waits for a
+    -- running key expansion, as block_valid does without FIFOs
+    fifo_gen : if FIFO_DEPTH > 0 generate
+        in_room <= '1' when in_count < FIFO_DEPTH - 1 or (in_count < FIFO_DEPTH and in_push = '0') else '0';
+
+        in_fifo_inst : entity work.block_fifo(rtl)
+        generic map
+        (
+            DEPTH => FIFO_DEPTH
+        )
+        port map
+        (
+            -- Common
+            clk      => clk,
+            reset    => reset,
+            -- Input
+            push     => in_push,
+            data_in  => data_block_in,
+            pop      => in_pop,
+            -- Output
+            data_out => in_fifo_block,
+            count    => in_count
+        );
+
+        feed_proc : process(clk)
+        begin
+            if rising_edge(clk) then
+                core_valid <= '0'; -- Clear pulses
+                in_pop     <= '0';
+                if reset = '1' then
+                    core_busy <= '0';
+                elsif (core_busy = '0' or output_valid = '1') and in_count > 0 and
+                      (out_count < FIFO_DEPTH - 1 or (out_count < FIFO_DEPTH and output_valid = '0')) and
+                      (key_expanding = '0' or expansion_done = '1') then
+                    core_block <= in_fifo_block;
+                    core_valid <= '1'; -- Pulsed
+                    in_pop     <= '1'; -- Pulsed
+                    core_busy  <= '1';
+                elsif output_valid = '1' then
+                    core_busy  <= '0';
+                end if;
+            end if; -- clk
+        end process feed_proc;
+
+        out_fifo_inst : entity work.block_fifo(rtl)
+        generic map
+        (
+            DEPTH => FIFO_DEPTH
+        )
+        port map
+        (
+            -- Common
+            clk      => clk,
+            reset    => reset,
+            -- Input
+            push     => output_valid,
+            data_in  => data_block_out,
+            pop      => out_pop,
+            -- Output
+            data_out => return_block,
+            count    => out_count
+        );
+    end generate fifo_gen;
+
+    no_fifo_gen : if FIFO_DEPTH = 0 generate
+        core_block   <= data_block_in;
+        core_valid   <= '0';
+        core_busy    <= '0';
+        return_block <= data_block_out;
+        in_room      <= '1';
+        in_count     <= 0;
+        out_count    <= 0;
+    end generate no_fifo_gen;
+
+    -- The host owns data_bus unless send_auth lets the wrapper return a block or the counters
+    data_bus <= bus_out when send_auth = '1' and (interface_state = return_datablock or
+                                                  interface_state = read_counters) else (others => 'Z');
+
+    -- Performance counters, with the interface states in place of the control_fsm states
+    -- bus_wait: an output word is on data_bus and the host has not taken it
+    bus_wait <= '1' when interface_state = return_datablock and stream_valid = '1' and
+                         ((BUS_MODE = "STREAM" and send_auth = '0') or
+                          (BUS_MODE /= "STREAM" and (send_auth and start) = '0')) else '0';
+
+    perf_gen : if PERF_COUNTERS generate
+        perf_events(PERF_BLOCKS)           <= output_valid;
+        perf_events(PERF_KEY_EXPANSIONS)   <= input_key_valid;
+        perf_events(PERF_IDLE)             <= '1' when interface_state = read_header or interface_state = read_iv or
+                                                       interface_state = read_key else '0';
+        perf_events(PERF_INITIAL_SETUP)    <= key_expanding;
+        perf_events(PERF_CACHED_SETUP)     <= '0'; -- No key cache
+        perf_events(PERF_DO_CRYPT)         <= '1' when interface_state = wait_output or core_busy = '1' else '0';
+        perf_events(PERF_WAIT_FOR_IN_DATA) <= '1' when interface_state = read_block and core_busy = '0' else '0';
+        perf_events(PERF_BUS_WAIT)         <= bus_wait;
+
+        perf_inst : entity work.perf_counters(rtl)
+        port map
+        (
+            clk    => clk,
+            reset  => reset,
+            -- Input
+            clear  => '0',
+            events => perf_events,
+            sel    => "000",
+            -- Output
+            count  => open,
+            counts => perf_counts
+        );
+    end generate perf_gen;
+
+    no_perf_gen : if not PERF_COUNTERS generate
+        perf_counts <= (others => (others => '0'));
+    end generate no_perf_gen;
+
     aes_128_top_enc_inst : entity work.aes_128_top_enc(rtl)
+    generic map
+    (
+        SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+    )
     port map
     (
         -- Common
         clk              => clk,                -- in std_logic;
         reset            => reset,              -- in std_logic;
         -- Input
-        input_bus        => data_block_in,      -- in std_logic_vector(IBW*8-1 downto 0);
+        input_bus        => core_block,         -- in std_logic_vector(IBW*8-1 downto 0);
         e_key            => e_key,              -- in exp_key_type;
         init_vec         => init_vec,           -- in std_logic_vector(127 downto 0);
         init_vec_valid   => init_vec_valid_enc, -- in std_logic;
@@ -204,13 +509,17 @@ begin
     );
 
     aes_128_top_dec_inst : entity work.aes_128_top_dec(rtl)
+    generic map
+    (
+        SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+    )
     port map
     (
         -- Common
         clk              => clk,                -- in std_logic;
         reset            => reset,              -- in std_logic;
         -- Input
-        input_bus        => data_block_in,      -- in std_logic_vector(IBW*8-1 downto 0);
+        input_bus        => core_block,         -- in std_logic_vector(IBW*8-1 downto 0);
         e_key            => e_key,              -- in exp_key_type;
         init_vec         => init_vec,           -- in std_logic_vector(127 downto 0);
         init_vec_valid   => init_vec_valid_dec, -- in std_logic;
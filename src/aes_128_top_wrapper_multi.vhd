@@ -0,0 +1,140 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: CBC encryption of up to CONTEXTS independent streams,
+--              interleaved through one round loop. Each context is set
+--              up once with its own initial vector and key, then blocks
+--              of any context can be started with a valid/ready
+--              handshake. Outputs are tagged with their context.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.aes_pkg.all;
+
+entity aes_128_top_wrapper_multi is
+generic
+(
+    SBOX_ARCHITECTURE : string := "LOOKUP"; -- LOOKUP, COMB
+    CONTEXTS          : positive := 4; -- Independent CBC streams
+    WORDS_PER_CYCLE   : positive := 1 -- Key schedule words derived per cycle: 1, 2 or 4
+);
+port
+(
+    clk       : in std_logic;
+    reset     : in std_logic;
+
+    -- Context setup
+    setup_context : in std_logic_vector(7 downto 0);
+    init_vec      : in std_logic_vector(127 downto 0);
+    key           : in std_logic_vector(127 downto 0);
+    setup         : in std_logic;
+    setup_ready   : out std_logic; -- setup is accepted this cycle
+
+    -- Data
+    context       : in std_logic_vector(7 downto 0);
+    plaintext     : in std_logic_vector(127 downto 0);
+    start         : in std_logic;
+    ready         : out std_logic; -- start is accepted this cycle
+    cipherblock   : out std_logic_vector(127 downto 0);
+    done          : out std_logic;
+    done_context  : out std_logic_vector(7 downto 0)
+);
+end aes_128_top_wrapper_multi;
+
+architecture rtl of aes_128_top_wrapper_multi is
+    signal setup_busy       : std_logic; -- Key expansion in progress
+    signal setup_index      : integer range 0 to CONTEXTS-1;
+    signal setup_init_vec   : std_logic_vector(127 downto 0);
+    signal key_valid        : std_logic;
+    signal e_key            : exp_key_type;
+    signal expansion_done   : std_logic;
+
+    signal context_index    : integer range 0 to CONTEXTS-1;
+    signal crypt_ready      : std_logic;
+    signal ready_i          : std_logic;
+    signal start_crypt      : std_logic;
+    signal output_context   : integer range 0 to CONTEXTS-1;
+begin
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB"
+        report "Error: SBOX_ARCHITECTURE setting was invalid" severity failure;
+
+    assert CONTEXTS <= 256
+        report "Error: CONTEXTS setting was invalid" severity failure;
+
+    context_index <= to_integer(unsigned(context)) mod CONTEXTS;
+
+    setup_ready <= not setup_busy;
+    key_valid   <= setup and not setup_busy;
+
+    -- Blocks of the context being set up wait for its round keys
+    ready_i <= '0' when setup_busy = '1' and setup_index = context_index else crypt_ready;
+    ready   <= ready_i;
+    start_crypt <= start and ready_i;
+
+    done_context <= std_logic_vector(to_unsigned(output_context, 8));
+
+    setup_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                setup_busy <= '0';
+            else
+                if key_valid = '1' then
+                    -- key_expansion starts on the same cycle
+                    setup_busy     <= '1';
+                    setup_index    <= to_integer(unsigned(setup_context)) mod CONTEXTS;
+                    setup_init_vec <= init_vec;
+                elsif expansion_done = '1' then
+                    setup_busy <= '0';
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process setup_proc;
+
+    key_expansion_inst : entity work.key_expansion(rtl)
+    generic map
+    (
+        WORDS_PER_CYCLE => WORDS_PER_CYCLE
+    )
+    port map
+    (
+        -- Common
+        clk             => clk,
+        reset           => reset,
+        -- Input
+        key             => key,
+        input_en        => key_valid,
+        -- Output
+        e_key           => e_key,
+        expansion_done  => expansion_done
+    );
+
+    enc_inst : entity work.aes_128_top_enc_multi(rtl)
+    generic map
+    (
+        SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+        CONTEXTS          => CONTEXTS
+    )
+    port map
+    (
+        -- Common
+        clk            => clk,
+        reset          => reset,
+        -- Context setup
+        load_context   => setup_index,
+        e_key          => e_key,
+        init_vec       => setup_init_vec,
+        load           => expansion_done,
+        -- Input
+        input_bus      => plaintext,
+        input_context  => context_index,
+        input_valid    => start_crypt,
+        input_ready    => crypt_ready,
+        -- Output
+        cipherblock    => cipherblock,
+        output_context => output_context,
+        output_valid   => done
+    );
+
+end architecture rtl;
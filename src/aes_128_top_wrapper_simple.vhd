@@ -12,8 +12,13 @@ use work.aes_pkg.all;
 entity aes_128_top_wrapper_simple is
 generic
 (
-    MODE : string; -- ENC, DEC, ENC_DEC
-    SBOX_ARCHITECTURE : string := "LOOKUP" -- LOOKUP, COMB, MASKED
+    MODE : string; -- ENC, DEC, ENC_DEC, CTR
+    SBOX_ARCHITECTURE : string := "LOOKUP"; -- LOOKUP, COMB, TTABLE, MASKED
+    KEY_SLOTS         : natural := 0; -- Expanded keys cached per interface, 0 for none
+    ROUND_ARCHITECTURE : string := "ITERATIVE"; -- ITERATIVE, PIPELINED (decryption), UNROLLED (decryption, CTR)
+    WORDS_PER_CYCLE   : positive := 1; -- Key schedule words derived per cycle: 1, 2 or 4
+    KEY_SCHEDULE      : string := "STORED"; -- STORED, ON_THE_FLY (ENC and DEC interfaces, KEY_SLOTS = 0)
+    PERF_COUNTERS     : boolean := false -- Performance counters on both interfaces
 );
 port 
 (
@@ -28,6 +33,14 @@ port
     cipherblock_enc : out std_logic_vector(127 downto 0);          
     start_enc       : in std_logic;    
     done_enc        : out std_logic;    
+    ready_enc       : out std_logic; -- CTR: start_enc is accepted this cycle
+    key_slot_enc    : in std_logic_vector(7 downto 0) := (others => '0');
+    key_load_enc    : in std_logic := '0';
+    new_session_enc : in std_logic := '0';
+    entropy_enc     : in std_logic_vector(31 downto 0) := (others => '0'); -- MASKED: random bits, sampled every cycle
+    perf_select_enc : in std_logic_vector(2 downto 0) := (others => '0'); -- PERF_* in aes_pkg
+    perf_clear_enc  : in std_logic := '0';
+    perf_count_enc  : out std_logic_vector(31 downto 0);
 
     -- Decryption Interface
     init_vec_dec    : in std_logic_vector(127 downto 0);       
@@ -35,23 +48,62 @@ port
     cipherblock_dec : in std_logic_vector(127 downto 0);        
     plaintext_dec   : out std_logic_vector(127 downto 0);          
     start_dec       : in std_logic;    
-    done_dec        : out std_logic
+    done_dec        : out std_logic;
+    ready_dec       : out std_logic;
+    key_slot_dec    : in std_logic_vector(7 downto 0) := (others => '0');
+    key_load_dec    : in std_logic := '0';
+    new_session_dec : in std_logic := '0';
+    entropy_dec     : in std_logic_vector(31 downto 0) := (others => '0');
+    perf_select_dec : in std_logic_vector(2 downto 0) := (others => '0');
+    perf_clear_dec  : in std_logic := '0';
+    perf_count_dec  : out std_logic_vector(31 downto 0)
 );
 end aes_128_top_wrapper_simple;
 
 architecture rtl of aes_128_top_wrapper_simple is
 begin
-    assert MODE = "ENC" or MODE = "DEC" or MODE = "ENC_DEC" 
+    assert MODE = "ENC" or MODE = "DEC" or MODE = "ENC_DEC" or MODE = "CTR"
         report "Error: MODE setting was invalid" severity failure;
     
-    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB" or SBOX_ARCHITECTURE = "MASKED"
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB" or SBOX_ARCHITECTURE = "TTABLE" or
+           SBOX_ARCHITECTURE = "MASKED"
         report "Error: SBOX_ARCHITECTURE setting was invalid" severity failure;
+
+    -- A T-table round has no stages for the round loop pipelines to fill
+    assert SBOX_ARCHITECTURE /= "TTABLE" or ((ROUND_ARCHITECTURE /= "PIPELINED" or MODE = "ENC") and
+                                            (MODE /= "CTR" or ROUND_ARCHITECTURE = "UNROLLED"))
+        report "Error: SBOX_ARCHITECTURE setting was invalid" severity failure;
+
+    -- The masked tables only swap banks while no block is in flight, so only the iterative
+    -- cores have them
+    assert SBOX_ARCHITECTURE /= "MASKED" or (MODE /= "CTR" and (ROUND_ARCHITECTURE = "ITERATIVE" or MODE = "ENC"))
+        report "Error: SBOX_ARCHITECTURE setting was invalid" severity failure;
+
+    assert ROUND_ARCHITECTURE = "ITERATIVE" or ROUND_ARCHITECTURE = "PIPELINED" or ROUND_ARCHITECTURE = "UNROLLED"
+        report "Error: ROUND_ARCHITECTURE setting was invalid" severity failure;
+
+    assert KEY_SLOTS <= 256
+        report "Error: KEY_SLOTS setting was invalid" severity failure;
+
+    assert WORDS_PER_CYCLE = 1 or WORDS_PER_CYCLE = 2 or WORDS_PER_CYCLE = 4
+        report "Error: WORDS_PER_CYCLE setting was invalid" severity failure;
+
+    -- Round keys are generated as the rounds use them, one block at a time and one cycle
+    -- behind the round that used the last one
+    assert KEY_SCHEDULE = "STORED" or (KEY_SCHEDULE = "ON_THE_FLY" and MODE /= "CTR" and
+                                       KEY_SLOTS = 0 and (ROUND_ARCHITECTURE = "ITERATIVE" or MODE = "ENC") and
+                                       SBOX_ARCHITECTURE /= "TTABLE")
+        report "Error: KEY_SCHEDULE setting was invalid" severity failure;
     
     mode_gen_1 : if MODE = "ENC" or MODE = "ENC_DEC" generate
         enc_inst : entity work.enc_wrapper(rtl)
         generic map
         (
-            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            KEY_SLOTS         => KEY_SLOTS,
+            WORDS_PER_CYCLE   => WORDS_PER_CYCLE,
+            KEY_SCHEDULE      => KEY_SCHEDULE,
+            PERF_COUNTERS     => PERF_COUNTERS
         )
         port map
         (
@@ -63,14 +115,64 @@ begin
             plaintext   => plaintext_enc,    
             cipherblock => cipherblock_enc,       
             start       => start_enc,
-            done        => done_enc
+            done        => done_enc,
+
+            key_slot    => key_slot_enc,
+            key_load    => key_load_enc,
+            new_session => new_session_enc,
+
+            entropy     => entropy_enc,
+
+            perf_select => perf_select_enc,
+            perf_clear  => perf_clear_enc,
+            perf_count  => perf_count_enc
         );
+
+        ready_enc <= '0'; -- Use done_enc
     end generate mode_gen_1;
+    -- Counter mode uses the encryption interface, init_vec_enc is the initial counter block
+    mode_gen_ctr : if MODE = "CTR" generate
+        ctr_inst : entity work.ctr_wrapper(rtl)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            KEY_SLOTS         => KEY_SLOTS,
+            WORDS_PER_CYCLE   => WORDS_PER_CYCLE,
+            ROUND_ARCHITECTURE => ROUND_ARCHITECTURE,
+            PERF_COUNTERS     => PERF_COUNTERS
+        )
+        port map
+        (
+            clk         => clk,
+            reset       => reset_enc,
+
+            init_vec    => init_vec_enc,
+            key         => key_enc,
+            data_in     => plaintext_enc,
+            data_out    => cipherblock_enc,
+            start       => start_enc,
+            done        => done_enc,
+            ready       => ready_enc,
+
+            key_slot    => key_slot_enc,
+            key_load    => key_load_enc,
+            new_session => new_session_enc,
+
+            perf_select => perf_select_enc,
+            perf_clear  => perf_clear_enc,
+            perf_count  => perf_count_enc
+        );
+    end generate mode_gen_ctr;
     mode_gen_2 : if MODE = "DEC" or MODE = "ENC_DEC" generate
         dec_inst : entity work.dec_wrapper(rtl)
         generic map
         (
-            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            KEY_SLOTS         => KEY_SLOTS,
+            ROUND_ARCHITECTURE => ROUND_ARCHITECTURE,
+            WORDS_PER_CYCLE   => WORDS_PER_CYCLE,
+            KEY_SCHEDULE      => KEY_SCHEDULE,
+            PERF_COUNTERS     => PERF_COUNTERS
         )
         port map
         (
@@ -82,7 +184,18 @@ begin
             cipherblock => cipherblock_dec,       
             plaintext   => plaintext_dec,    
             start       => start_dec,
-            done        => done_dec
+            done        => done_dec,
+            ready       => ready_dec,
+
+            key_slot    => key_slot_dec,
+            key_load    => key_load_dec,
+            new_session => new_session_dec,
+
+            entropy     => entropy_dec,
+
+            perf_select => perf_select_dec,
+            perf_clear  => perf_clear_dec,
+            perf_count  => perf_count_dec
         );
     end generate mode_gen_2;
 
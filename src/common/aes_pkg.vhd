@@ -14,6 +14,8 @@ package aes_pkg is
 
     type s_box_type is array (0 to 15) of std_logic_vector(127 downto 0);
     type exp_key_type is array (0 to 10) of std_logic_vector(127 downto 0); -- 11 subkeys for AES-128
+    type t_table_type is array (0 to 255) of std_logic_vector(31 downto 0); -- One column per byte value
+    type masked_table_type is array (0 to 511) of std_logic_vector(7 downto 0); -- Masked S-box of one byte, two banks of 256 entries
 
     -- TODO: Put this in BRAM
     constant S_BOX : s_box_type := (
@@ -54,6 +56,18 @@ package aes_pkg is
         (x"172B047EBA77D626E169146355210C7D")
     );
 
+    -- Performance counters (perf_counters.vhd), indexed by the counter select
+    constant NUM_PERF_COUNTERS     : natural := 8;
+    constant PERF_BLOCKS           : natural := 0; -- Blocks processed
+    constant PERF_KEY_EXPANSIONS   : natural := 1; -- Keys expanded
+    constant PERF_IDLE             : natural := 2; -- Cycles in each control FSM state, see the wrapper docs
+    constant PERF_INITIAL_SETUP    : natural := 3;
+    constant PERF_CACHED_SETUP     : natural := 4;
+    constant PERF_DO_CRYPT         : natural := 5;
+    constant PERF_WAIT_FOR_IN_DATA : natural := 6;
+    constant PERF_BUS_WAIT         : natural := 7; -- Cycles the host waited on the core or the core on the host
+    type perf_count_array_type is array (0 to NUM_PERF_COUNTERS-1) of std_logic_vector(31 downto 0);
+
     -- Function Declarations:
     -- Function to add two elements in GF(2^4) (bitwise XOR)
     function gf4_add(q1 : std_logic_vector(3 downto 0); q2 : std_logic_vector(3 downto 0)) return std_logic_vector;
@@ -99,6 +113,24 @@ package aes_pkg is
     function rot_word(word : std_logic_vector(31 downto 0)) return std_logic_vector;
     -- Checks index against a LUT
     function is_leftmost(index : integer) return std_logic;
+    -- Round key that follows round_key in the key schedule, rcon is R_CON of the current round
+    function next_round_key(round_key : std_logic_vector(127 downto 0); rcon : std_logic_vector(31 downto 0)) return std_logic_vector;
+    -- Round key that precedes round_key in the key schedule, rcon is R_CON of the previous round
+    function prev_round_key(round_key : std_logic_vector(127 downto 0); rcon : std_logic_vector(31 downto 0)) return std_logic_vector;
+    -- T-table of the encryption rounds: the mix_columns column (2, 1, 1, 3) times s_box_byte of each byte value
+    function gen_t_table return t_table_type;
+    -- T-table of the decryption rounds: the inv_mix_columns column (14, 9, 13, 11) times inv_s_box_byte of each byte value
+    function gen_inv_t_table return t_table_type;
+    -- Function to rotate a word right by n bytes
+    function ror_bytes(word : std_logic_vector(31 downto 0); n : natural) return std_logic_vector;
+    -- InvMixColumns of a round key, so the T-table decryption rounds can add it after InvMixColumns
+    function inv_mix_round_key(round_key : std_logic_vector(127 downto 0)) return std_logic_vector;
+    -- ShiftRows of a whole state, as shift_rows does it, for the masks of the masked S-box
+    function shift_rows_state(state : std_logic_vector(127 downto 0)) return std_logic_vector;
+    -- InvShiftRows of a whole state, as inv_shift_rows does it
+    function inv_shift_rows_state(state : std_logic_vector(127 downto 0)) return std_logic_vector;
+    -- MixColumns of a whole state, as mix_columns does it
+    function mix_columns_state(state : std_logic_vector(127 downto 0)) return std_logic_vector;
 
 end package aes_pkg;
 
@@ -304,5 +336,116 @@ package body aes_pkg is
         end loop;
         return '0';
     end is_leftmost;
+
+    function next_round_key(round_key : std_logic_vector(127 downto 0); rcon : std_logic_vector(31 downto 0)) return std_logic_vector is
+        variable k : std_logic_vector(127 downto 0);
+    begin
+        k(127 downto 96) := round_key(127 downto 96) xor s_box_word(rot_word(round_key(31 downto 0))) xor rcon;
+        k(95 downto 64)  := round_key(95 downto 64) xor k(127 downto 96);
+        k(63 downto 32)  := round_key(63 downto 32) xor k(95 downto 64);
+        k(31 downto 0)   := round_key(31 downto 0)  xor k(63 downto 32);
+        return k;
+    end next_round_key;
+
+    function prev_round_key(round_key : std_logic_vector(127 downto 0); rcon : std_logic_vector(31 downto 0)) return std_logic_vector is
+        variable k : std_logic_vector(127 downto 0);
+    begin
+        -- Each word is the XOR of two neighbours in the next round key
+        k(31 downto 0)   := round_key(31 downto 0)  xor round_key(63 downto 32);
+        k(63 downto 32)  := round_key(63 downto 32) xor round_key(95 downto 64);
+        k(95 downto 64)  := round_key(95 downto 64) xor round_key(127 downto 96);
+        k(127 downto 96) := round_key(127 downto 96) xor s_box_word(rot_word(k(31 downto 0))) xor rcon;
+        return k;
+    end prev_round_key;
+
+    function gen_t_table return t_table_type is
+        variable table : t_table_type;
+        variable s     : std_logic_vector(7 downto 0);
+    begin
+        for i in table'range loop
+            s := s_box_byte(std_logic_vector(to_unsigned(i, 8)));
+            table(i) := mul_g2(s) & s & s & mul_g3(s);
+        end loop;
+        return table;
+    end gen_t_table;
+
+    function gen_inv_t_table return t_table_type is
+        variable table : t_table_type;
+        variable s     : std_logic_vector(7 downto 0);
+    begin
+        for i in table'range loop
+            s := inv_s_box_byte(std_logic_vector(to_unsigned(i, 8)));
+            table(i) := mul_g14(s) & mul_g9(s) & mul_g13(s) & mul_g11(s);
+        end loop;
+        return table;
+    end gen_inv_t_table;
+
+    function ror_bytes(word : std_logic_vector(31 downto 0); n : natural) return std_logic_vector is
+    begin
+        if n mod 4 = 0 then
+            return word;
+        end if;
+        return word(8*(n mod 4)-1 downto 0) & word(31 downto 8*(n mod 4));
+    end ror_bytes;
+
+    function inv_mix_round_key(round_key : std_logic_vector(127 downto 0)) return std_logic_vector is
+        variable k : std_logic_vector(127 downto 0);
+        variable s : std_logic_vector(7 downto 0);
+        variable col : std_logic_vector(31 downto 0);
+    begin
+        for c in 0 to 3 loop
+            col := (others => '0');
+            for r in 0 to 3 loop
+                -- Row r of the column is multiplied by the inv_mix_columns column rotated by r
+                s   := round_key(127 - 32*c - 8*r downto 120 - 32*c - 8*r);
+                col := col xor ror_bytes(mul_g14(s) & mul_g9(s) & mul_g13(s) & mul_g11(s), r);
+            end loop;
+            k(127 - 32*c downto 96 - 32*c) := col;
+        end loop;
+        return k;
+    end inv_mix_round_key;
+
+    function shift_rows_state(state : std_logic_vector(127 downto 0)) return std_logic_vector is
+        variable s : std_logic_vector(127 downto 0);
+    begin
+        for c in 0 to 3 loop
+            for r in 0 to 3 loop
+                -- Row r is rotated left by r columns
+                s(127 - 32*c - 8*r downto 120 - 32*c - 8*r) :=
+                    state(127 - 32*((c + r) mod 4) - 8*r downto 120 - 32*((c + r) mod 4) - 8*r);
+            end loop;
+        end loop;
+        return s;
+    end shift_rows_state;
+
+    function inv_shift_rows_state(state : std_logic_vector(127 downto 0)) return std_logic_vector is
+        variable s : std_logic_vector(127 downto 0);
+    begin
+        for c in 0 to 3 loop
+            for r in 0 to 3 loop
+                -- Row r is rotated right by r columns
+                s(127 - 32*c - 8*r downto 120 - 32*c - 8*r) :=
+                    state(127 - 32*((c + 4 - r) mod 4) - 8*r downto 120 - 32*((c + 4 - r) mod 4) - 8*r);
+            end loop;
+        end loop;
+        return s;
+    end inv_shift_rows_state;
+
+    function mix_columns_state(state : std_logic_vector(127 downto 0)) return std_logic_vector is
+        variable m : std_logic_vector(127 downto 0);
+        variable s : std_logic_vector(7 downto 0);
+        variable col : std_logic_vector(31 downto 0);
+    begin
+        for c in 0 to 3 loop
+            col := (others => '0');
+            for r in 0 to 3 loop
+                -- Row r of the column is multiplied by the mix_columns column rotated by r
+                s   := state(127 - 32*c - 8*r downto 120 - 32*c - 8*r);
+                col := col xor ror_bytes(mul_g2(s) & s & s & mul_g3(s), r);
+            end loop;
+            m(127 - 32*c downto 96 - 32*c) := col;
+        end loop;
+        return m;
+    end mix_columns_state;
     
 end package body aes_pkg;
\ No newline at end of file
@@ -0,0 +1,72 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: First-word-fall-through FIFO of DEPTH 128-bit blocks.
+--              data_out is the oldest block whenever count is not 0,
+--              pop drops it on the next rising edge. A push while
+--              the FIFO is full and a pop while it is empty are
+--              ignored. count is registered: a push or pop shows
+--              on the edge after the one that samples it.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity block_fifo is
+generic
+(
+    DEPTH : positive := 2
+);
+port
+(
+    -- Common
+    clk      : in std_logic;
+    reset    : in std_logic;
+    -- Input
+    push     : in std_logic; -- Store data_in
+    data_in  : in std_logic_vector(127 downto 0);
+    pop      : in std_logic; -- Drop the oldest block
+    -- Output
+    data_out : out std_logic_vector(127 downto 0); -- Oldest block
+    count    : out integer range 0 to DEPTH
+);
+end block_fifo;
+
+architecture rtl of block_fifo is
+    type block_array_type is array (0 to DEPTH-1) of std_logic_vector(127 downto 0);
+    signal blocks   : block_array_type;
+    signal write_ix : integer range 0 to DEPTH-1;
+    signal read_ix  : integer range 0 to DEPTH-1;
+    signal count_i  : integer range 0 to DEPTH;
+begin
+    data_out <= blocks(read_ix);
+    count    <= count_i;
+
+    fifo_proc : process(clk)
+        variable stored  : boolean;
+        variable dropped : boolean;
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                write_ix <= 0;
+                read_ix  <= 0;
+                count_i  <= 0;
+            else
+                stored  := push = '1' and count_i < DEPTH;
+                dropped := pop = '1' and count_i > 0;
+                if stored then
+                    blocks(write_ix) <= data_in;
+                    write_ix <= (write_ix + 1) mod DEPTH;
+                end if;
+                if dropped then
+                    read_ix <= (read_ix + 1) mod DEPTH;
+                end if;
+                if stored and not dropped then
+                    count_i <= count_i + 1;
+                elsif dropped and not stored then
+                    count_i <= count_i - 1;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process fifo_proc;
+
+end architecture rtl;
@@ -19,28 +19,53 @@ port
     start              : in std_logic;  
     expansion_done     : in std_logic;       
     crypt_output_valid : in std_logic;
+    new_session        : in std_logic := '0'; -- Sampled with start: restart CBC with the IV and key
+    key_load           : in std_logic := '0'; -- Sampled with start: expand the key even if it is cached
+    key_cached         : in std_logic := '0'; -- The selected key slot is already expanded
+    crypt_ready        : in std_logic := '1'; -- The core takes blocks, '0' until a MASKED S-box has its first table
 
     -- Output
     key_valid          : out std_logic;
+    key_select         : out std_logic;
     iv_valid           : out std_logic;       
     start_crypt        : out std_logic;
-    done               : out std_logic  
+    done               : out std_logic;
+
+    -- Performance counter events
+    perf_state         : out std_logic_vector(4 downto 0); -- One-hot: idle, initial_setup, cached_setup, do_crypt, wait_for_in_data
+    stalled            : out std_logic  -- start is high but not accepted this cycle
 );
 end control_fsm;
 
 architecture rtl of control_fsm is
-    type control_state_type is (idle, initial_setup, do_crypt, wait_for_in_data);
+    type control_state_type is (idle, initial_setup, cached_setup, do_crypt, wait_for_in_data);
     signal control_state : control_state_type;
+    signal start_held    : std_logic; -- A start that arrived before crypt_ready
+    signal load_held     : std_logic; -- key_load sampled with the held start
 begin
+    perf_state(0) <= '1' when control_state = idle             else '0';
+    perf_state(1) <= '1' when control_state = initial_setup    else '0';
+    perf_state(2) <= '1' when control_state = cached_setup     else '0';
+    perf_state(3) <= '1' when control_state = do_crypt         else '0';
+    perf_state(4) <= '1' when control_state = wait_for_in_data else '0';
+
+    -- start is only accepted in idle (once the core is ready) and wait_for_in_data
+    stalled <= start when control_state = initial_setup or control_state = cached_setup or
+                          control_state = do_crypt else
+               start or start_held when control_state = idle and crypt_ready = '0' else '0';
+
     control_proc: process(clk)
     begin
         if rising_edge(clk) then
             if reset = '1' then
                 control_state <= idle;
                 done <= '0';
+                start_held <= '0';
+                load_held  <= '0';
             else
                 -- Clear pulsed signals
                 key_valid   <= '0';
+                key_select  <= '0';
                 start_crypt <= '0';
                 iv_valid    <= '0';
                 
@@ -53,6 +78,13 @@ begin
                             iv_valid    <= '1'; -- Pulsed
                             control_state <= do_crypt;
                         end if;
+
+                    ------------------------------
+                    when cached_setup =>
+                        -- The key cache has switched to the selected slot
+                        start_crypt <= '1'; -- Pulsed
+                        iv_valid    <= '1'; -- Pulsed
+                        control_state <= do_crypt;
                     
                     ------------------------------
                     when do_crypt =>
@@ -65,15 +97,33 @@ begin
                     when wait_for_in_data =>
                         if start = '1' then
                             done <= '0';
-                            start_crypt <= '1';
-                            control_state <= do_crypt;
+                            if new_session = '0' then
+                                start_crypt <= '1';
+                                control_state <= do_crypt;
+                            elsif key_cached = '1' and key_load = '0' then
+                                key_select <= '1'; -- Pulsed
+                                control_state <= cached_setup;
+                            else
+                                key_valid <= '1'; -- Pulsed
+                                control_state <= initial_setup;
+                            end if;
                         end if;
 
                     ------------------------------
                     when others => -- idle
-                        if start = '1' then
-                            key_valid <= '1'; -- Pulsed
-                            control_state <= initial_setup;
+                        -- crypt_ready stays '1' once it is set, so only the first block waits for it
+                        if start = '1' and crypt_ready = '0' then
+                            start_held <= '1';
+                            load_held  <= key_load;
+                        elsif (start = '1' or start_held = '1') and crypt_ready = '1' then
+                            start_held <= '0';
+                            if key_cached = '1' and ((start = '1' and key_load = '0') or (start = '0' and load_held = '0')) then
+                                key_select <= '1'; -- Pulsed
+                                control_state <= cached_setup;
+                            else
+                                key_valid <= '1'; -- Pulsed
+                                control_state <= initial_setup;
+                            end if;
                         end if;
                 end case;
             end if; -- reset
@@ -0,0 +1,77 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Holds KEY_SLOTS expanded keys so a session can switch
+--              to a previously loaded key without running key_expansion
+--              again. Slot IDs are taken modulo KEY_SLOTS.
+--              All slots are invalidated on reset.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.aes_pkg.all;
+
+entity key_cache is
+generic
+(
+    KEY_SLOTS : positive
+);
+port
+(
+    -- Common
+    clk            : in std_logic;
+    reset          : in std_logic;
+    -- Input
+    slot           : in std_logic_vector(7 downto 0);
+    load           : in std_logic; -- Pulsed, store the key being expanded in slot
+    use_slot       : in std_logic; -- Pulsed, switch the output to slot
+    e_key_in       : in exp_key_type;
+    expansion_done : in std_logic;
+    -- Output
+    e_key          : out exp_key_type; -- Round keys of the active slot
+    slot_valid     : out std_logic     -- slot holds an expanded key
+);
+end key_cache;
+
+architecture rtl of key_cache is
+    type slot_array_type is array (0 to KEY_SLOTS-1) of exp_key_type;
+    signal slots       : slot_array_type;
+    signal valid       : std_logic_vector(KEY_SLOTS-1 downto 0);
+    signal slot_index  : integer range 0 to KEY_SLOTS-1;
+    signal load_index  : integer range 0 to KEY_SLOTS-1;
+    signal active      : integer range 0 to KEY_SLOTS-1;
+    signal loading     : std_logic;
+begin
+    slot_index <= to_integer(unsigned(slot)) mod KEY_SLOTS;
+
+    cache_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                valid   <= (others => '0');
+                active  <= 0;
+                loading <= '0';
+            else
+                if load = '1' then
+                    -- key_expansion starts on the same cycle
+                    load_index <= slot_index;
+                    active     <= slot_index;
+                    valid(slot_index) <= '0';
+                    loading    <= '1';
+                elsif use_slot = '1' then
+                    active <= slot_index;
+                end if;
+
+                if expansion_done = '1' and loading = '1' then
+                    slots(load_index) <= e_key_in;
+                    valid(load_index) <= '1';
+                    loading <= '0';
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process cache_proc;
+
+    e_key      <= slots(active);
+    slot_valid <= valid(slot_index);
+
+end architecture rtl;
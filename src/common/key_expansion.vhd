@@ -4,6 +4,10 @@ use ieee.std_logic_1164.all;
 use work.aes_pkg.all; -- exp_key_type, s_box_word, rot_word, R_CON
 
 entity key_expansion is
+generic
+(
+    WORDS_PER_CYCLE : positive := 1 -- 1, 2 or 4: the schedule takes 40/WORDS_PER_CYCLE cycles
+);
 port 
 (
     -- Common
@@ -20,46 +24,58 @@ end key_expansion;
 
 architecture rtl of key_expansion is
     constant NUM_COLS        : integer := 4;
+    constant LAST_INDEX      : integer := 44 - WORDS_PER_CYCLE; -- First word of the last step
     signal expansion_in_prog : std_logic;
-    signal index             : integer range 4 to 43;
+    signal index             : integer range 4 to 43; -- First word of the current step
     signal e_key_i           : exp_key_type;
 begin
+    assert WORDS_PER_CYCLE = 1 or WORDS_PER_CYCLE = 2 or WORDS_PER_CYCLE = 4
+        report "Error: WORDS_PER_CYCLE setting was invalid" severity failure;
+
     ctrl_proc : process(clk)
         variable row_num : integer range 0 to 10;
         variable col_num : integer range 0 to 3;
+        variable word    : std_logic_vector(31 downto 0); -- Last word derived
     begin
         if rising_edge(clk) then
             expansion_done <= '0';
             if reset = '1' then
                 expansion_in_prog <= '0';
                 index <= 4;
-                row_num := 0;
             else
                 if input_en = '1' then
                     expansion_in_prog <= '1';
-                    e_key_i(row_num)  <= key; -- first key is just the input key
+                    e_key_i(0) <= key; -- first key is just the input key
                 end if;
                 if expansion_in_prog = '1' then
-                    if is_leftmost(index) = '1' then
-                        row_num := row_num + 1; -- assigned immediately
-                        -- the leftmost word is derived from:
-                        e_key_i(row_num)(127 downto 96) <= e_key_i(row_num-1)(127 downto 96) xor s_box_word(rot_word(e_key_i(row_num-1)(31 downto 0))) xor R_CON(row_num-1);                
+                    -- WORDS_PER_CYCLE divides a row, so every word of a step is in the same row
+                    row_num := index/NUM_COLS;
+                    col_num := index mod NUM_COLS;
+                    if col_num = 0 then
+                        word := e_key_i(row_num-1)(31 downto 0);
                     else
-                        -- the other words are derived from:
-                        col_num := index-NUM_COLS*row_num;
-                        e_key_i(row_num)(127 - col_num*32 downto 96 - col_num*32) <= e_key_i(row_num)(127 - (col_num-1)*32 downto 96 - (col_num-1)*32) xor 
-                                                                                     e_key_i(row_num - 1)(127 - col_num*32 downto 96 - col_num*32);
+                        word := e_key_i(row_num)(127 - (col_num-1)*32 downto 96 - (col_num-1)*32);
                     end if;
-                    if index = 43 then
+                    for i in 0 to WORDS_PER_CYCLE-1 loop
+                        col_num := (index + i) mod NUM_COLS;
+                        if col_num = 0 then
+                            -- the leftmost word is derived from:
+                            word := e_key_i(row_num-1)(127 downto 96) xor s_box_word(rot_word(word)) xor R_CON(row_num-1);
+                        else
+                            -- the other words are derived from:
+                            word := word xor e_key_i(row_num - 1)(127 - col_num*32 downto 96 - col_num*32);
+                        end if;
+                        e_key_i(row_num)(127 - col_num*32 downto 96 - col_num*32) <= word;
+                    end loop;
+                    if index = LAST_INDEX then
                         -- last key
                         expansion_in_prog <= '0';
-                        -- Reset the internal variables so we're ready for a new key next cc
-                        index   <= 4;
-                        row_num := 0;
+                        -- Reset the index so we're ready for a new key next cc
+                        index <= 4;
                         expansion_done <= '1'; -- Pulsed
                     else
                         -- iterate counter
-                        index <= index + 1;
+                        index <= index + WORDS_PER_CYCLE;
                     end if;
                 end if;
             end if;
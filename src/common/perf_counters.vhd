@@ -0,0 +1,57 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Free-running 32-bit event counters for the wrappers.
+--              Every cycle, each '1' in events adds one to its
+--              counter (PERF_* in aes_pkg). Counters wrap around and
+--              are cleared by reset or clear. count is the counter
+--              picked by sel, counts has all of them.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.aes_pkg.all;
+
+entity perf_counters is
+port
+(
+    clk    : in std_logic;
+    reset  : in std_logic;
+
+    -- Input
+    clear  : in std_logic;
+    events : in std_logic_vector(NUM_PERF_COUNTERS-1 downto 0);
+    sel    : in std_logic_vector(2 downto 0);
+
+    -- Output
+    count  : out std_logic_vector(31 downto 0);
+    counts : out perf_count_array_type
+);
+end perf_counters;
+
+architecture rtl of perf_counters is
+    type counter_array_type is array (0 to NUM_PERF_COUNTERS-1) of unsigned(31 downto 0);
+    signal counters : counter_array_type;
+begin
+    count <= std_logic_vector(counters(to_integer(unsigned(sel))));
+
+    counts_gen : for i in 0 to NUM_PERF_COUNTERS-1 generate
+        counts(i) <= std_logic_vector(counters(i));
+    end generate counts_gen;
+
+    count_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if reset = '1' or clear = '1' then
+                counters <= (others => (others => '0'));
+            else
+                for i in 0 to NUM_PERF_COUNTERS-1 loop
+                    if events(i) = '1' then
+                        counters(i) <= counters(i) + 1;
+                    end if;
+                end loop;
+            end if; -- reset
+        end if; -- clk
+    end process count_proc;
+
+end architecture rtl;
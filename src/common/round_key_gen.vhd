@@ -0,0 +1,95 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Generates the round keys one at a time as the rounds
+--              use them, instead of storing the whole schedule. Only
+--              the first round key of a block and the current round
+--              key are held. With INVERSE = false the keys run forward
+--              from the cipher key (encryption); with INVERSE = true
+--              they run backwards from the last round key (decryption),
+--              which is found by running the schedule forward once,
+--              one round key per cycle, after every load.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use work.aes_pkg.all; -- next_round_key, prev_round_key, R_CON
+
+entity round_key_gen is
+generic
+(
+    INVERSE : boolean := false -- Step from round key 10 down to round key 0
+);
+port
+(
+    -- Common
+    clk            : in std_logic;
+    reset          : in std_logic;
+    -- Input
+    key            : in std_logic_vector(127 downto 0);
+    input_en       : in std_logic; -- Pulsed, load key
+    next_key       : in std_logic; -- Pulsed, round_key has been used, step to the next one
+    -- Output
+    round_key      : out std_logic_vector(127 downto 0);
+    expansion_done : out std_logic -- Pulsed, round_key holds the first round key of a block
+);
+end round_key_gen;
+
+architecture rtl of round_key_gen is
+    signal first_key         : std_logic_vector(127 downto 0); -- Every block starts from this round key
+    signal round_key_i       : std_logic_vector(127 downto 0);
+    signal rnd_num           : integer range 0 to 10; -- Round of round_key_i
+    signal expansion_in_prog : std_logic;
+begin
+    ctrl_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            expansion_done <= '0';
+            if reset = '1' then
+                expansion_in_prog <= '0';
+                rnd_num <= 0;
+            else
+                if input_en = '1' then
+                    round_key_i <= key;
+                    rnd_num     <= 0;
+                    if INVERSE then
+                        expansion_in_prog <= '1';
+                    else
+                        first_key      <= key;
+                        expansion_done <= '1'; -- Pulsed
+                    end if;
+                elsif expansion_in_prog = '1' then
+                    -- Run the schedule forward once to find the last round key
+                    round_key_i <= next_round_key(round_key_i, R_CON(rnd_num));
+                    rnd_num     <= rnd_num + 1;
+                    if rnd_num = 9 then
+                        first_key         <= next_round_key(round_key_i, R_CON(rnd_num));
+                        expansion_in_prog <= '0';
+                        expansion_done    <= '1'; -- Pulsed
+                    end if;
+                elsif next_key = '1' then
+                    if not INVERSE then
+                        if rnd_num = 10 then
+                            -- Block done, rewind for the next one
+                            round_key_i <= first_key;
+                            rnd_num     <= 0;
+                        else
+                            round_key_i <= next_round_key(round_key_i, R_CON(rnd_num));
+                            rnd_num     <= rnd_num + 1;
+                        end if;
+                    else
+                        if rnd_num = 0 then
+                            round_key_i <= first_key;
+                            rnd_num     <= 10;
+                        else
+                            round_key_i <= prev_round_key(round_key_i, R_CON(rnd_num-1));
+                            rnd_num     <= rnd_num - 1;
+                        end if;
+                    end if;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    round_key <= round_key_i; -- Assign output
+
+end architecture rtl;
@@ -0,0 +1,151 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Valid/ready counterpart of control_fsm for cores that
+--              keep several blocks in flight. start is the valid
+--              signal and a block is accepted on every rising edge
+--              where start and ready are both '1'. done pulses once
+--              per output block, in order. A start seen while the key
+--              is being set up is remembered, so the start/done
+--              protocol of control_fsm keeps working.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use work.aes_pkg.all;
+
+entity stream_control is
+port
+(
+    clk       : in std_logic;
+    reset     : in std_logic;
+
+    -- Input
+    start              : in std_logic;
+    expansion_done     : in std_logic;
+    crypt_ready        : in std_logic; -- Core can accept a block this cycle
+    crypt_output_valid : in std_logic;
+    new_session        : in std_logic := '0'; -- Sampled with start: restart CBC with the IV and key
+    key_load           : in std_logic := '0'; -- Sampled with start: expand the key even if it is cached
+    key_cached         : in std_logic := '0'; -- The selected key slot is already expanded
+
+    -- Output
+    ready              : out std_logic;
+    key_valid          : out std_logic;
+    key_select         : out std_logic;
+    iv_valid           : out std_logic;
+    start_crypt        : out std_logic;
+    done               : out std_logic;
+
+    -- Performance counter events, in the states of control_fsm
+    perf_state         : out std_logic_vector(4 downto 0); -- One-hot: idle, initial_setup, cached_setup, busy, waiting for start
+    stalled            : out std_logic  -- start is high but not accepted this cycle
+);
+end stream_control;
+
+architecture rtl of stream_control is
+    type control_state_type is (idle, initial_setup, cached_setup, drain, streaming);
+    signal control_state : control_state_type;
+    signal ready_i       : std_logic;
+    signal accept        : std_logic;
+    signal pending       : std_logic; -- A start arrived while not ready
+    signal session_start : std_logic; -- The next accepted block opens the session
+    signal in_flight     : integer range 0 to 63; -- More than the pipeline length of any core
+begin
+    ready_i <= '1' when control_state = streaming and crypt_ready = '1' and
+                        (new_session = '0' or session_start = '1') else '0';
+    accept  <= (start or pending) and ready_i;
+
+    ready       <= ready_i;
+    start_crypt <= accept;
+    done        <= crypt_output_valid;
+
+    -- drain and streaming with blocks in flight count as do_crypt, streaming with none as wait_for_in_data
+    perf_state(0) <= '1' when control_state = idle          else '0';
+    perf_state(1) <= '1' when control_state = initial_setup else '0';
+    perf_state(2) <= '1' when control_state = cached_setup  else '0';
+    perf_state(3) <= '1' when control_state = drain or
+                              (control_state = streaming and (in_flight /= 0 or accept = '1')) else '0';
+    perf_state(4) <= '1' when control_state = streaming and in_flight = 0 and accept = '0' else '0';
+
+    -- A start in idle opens the session like in control_fsm
+    stalled <= start and not accept when control_state /= idle else '0';
+
+    control_proc: process(clk)
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                control_state <= idle;
+                pending       <= '0';
+                session_start <= '0';
+                in_flight     <= 0;
+            else
+                -- Clear pulsed signals
+                key_valid  <= '0';
+                key_select <= '0';
+                iv_valid   <= '0';
+
+                -- Blocks between the core input and output
+                if accept = '1' and crypt_output_valid = '0' then
+                    in_flight <= in_flight + 1;
+                elsif accept = '0' and crypt_output_valid = '1' then
+                    in_flight <= in_flight - 1;
+                end if;
+
+                -- Controller FSM
+                case control_state is
+                    ------------------------------
+                    when initial_setup =>
+                        if expansion_done = '1' then
+                            iv_valid      <= '1'; -- Pulsed
+                            session_start <= '1';
+                            control_state <= streaming;
+                        end if;
+
+                    ------------------------------
+                    when cached_setup =>
+                        -- The key cache has switched to the selected slot
+                        iv_valid      <= '1'; -- Pulsed
+                        session_start <= '1';
+                        control_state <= streaming;
+
+                    ------------------------------
+                    when drain =>
+                        -- Wait for the blocks of the previous session before changing key and IV
+                        if in_flight = 0 then
+                            if key_cached = '1' and key_load = '0' then
+                                key_select <= '1'; -- Pulsed
+                                control_state <= cached_setup;
+                            else
+                                key_valid <= '1'; -- Pulsed
+                                control_state <= initial_setup;
+                            end if;
+                        end if;
+
+                    ------------------------------
+                    when streaming =>
+                        if accept = '1' then
+                            pending       <= '0';
+                            session_start <= '0';
+                        elsif start = '1' and new_session = '1' and session_start = '0' then
+                            pending       <= '1';
+                            control_state <= drain;
+                        end if;
+
+                    ------------------------------
+                    when others => -- idle
+                        if start = '1' then
+                            pending <= '1';
+                            if key_cached = '1' and key_load = '0' then
+                                key_select <= '1'; -- Pulsed
+                                control_state <= cached_setup;
+                            else
+                                key_valid <= '1'; -- Pulsed
+                                control_state <= initial_setup;
+                            end if;
+                        end if;
+                end case;
+            end if; -- reset
+        end if; -- clk
+    end process control_proc;
+
+end architecture rtl;
@@ -0,0 +1,308 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: AES-128 in counter mode. Counter blocks do not depend
+--              on earlier outputs, so a new one enters the round loop
+--              on every cycle that no block is coming back from
+--              mix_columns. Each block takes the same number of
+--              cycles, so outputs leave in the order the inputs
+--              entered. The round number and input block travel in
+--              two FIFOs, one per in-order section of the loop.
+--              Encryption and decryption are the same operation.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.aes_pkg.all;
+
+entity aes_128_top_ctr is
+generic
+(
+    SBOX_ARCHITECTURE : string -- LOOKUP, COMB, TTABLE (unrolled only)
+);
+port
+(
+    -- Common
+    clk            : in std_logic;
+    reset          : in std_logic;
+    -- Input
+    input_bus      : in std_logic_vector(127 downto 0); -- Plaintext or cipherblock
+    e_key          : in exp_key_type;
+    init_vec       : in std_logic_vector(127 downto 0); -- Initial counter block
+    init_vec_valid : in std_logic;
+    input_valid    : in std_logic;
+    -- Output
+    output_bus     : out std_logic_vector(127 downto 0);
+    output_valid   : out std_logic;
+    input_ready    : out std_logic  -- input_valid is accepted this cycle
+);
+end aes_128_top_ctr;
+
+architecture rtl of aes_128_top_ctr is
+    constant FIFO_DEPTH : integer := 16; -- More than the loop length of any S-box architecture
+
+    type block_info_type is record
+        rnd_num : integer range 0 to 9;
+        data    : std_logic_vector(127 downto 0); -- Input block to XOR with the key stream
+    end record;
+    type block_info_fifo_type is array (0 to FIFO_DEPTH-1) of block_info_type;
+
+    signal s_box_bus_in              : std_logic_vector(127 downto 0);
+    signal s_box_bus_in_valid        : std_logic;
+    signal s_box_bus_out             : std_logic_vector(127 downto 0);
+    signal s_box_bus_out_valid       : std_logic;
+
+    signal shift_rows_bus_out        : std_logic_vector(127 downto 0);
+    signal shift_rows_bus_out_valid  : std_logic;
+
+    signal mix_columns_bus_in_valid  : std_logic;
+    signal mix_columns_bus_out       : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_out_valid : std_logic;
+
+    -- Blocks between the loop input and the end of shift_rows
+    signal round_fifo    : block_info_fifo_type;
+    signal round_fifo_rd : integer range 0 to FIFO_DEPTH-1;
+    signal round_fifo_wr : integer range 0 to FIFO_DEPTH-1;
+    -- Blocks between the end of shift_rows and the end of mix_columns
+    signal mix_fifo      : block_info_fifo_type;
+    signal mix_fifo_rd   : integer range 0 to FIFO_DEPTH-1;
+    signal mix_fifo_wr   : integer range 0 to FIFO_DEPTH-1;
+
+    signal counter       : unsigned(127 downto 0);
+    signal load_counter  : std_logic;
+begin
+    -- A T-table round has no stages to keep other blocks in, and the masked tables only
+    -- swap banks while no block is in flight
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB"
+        report "Error: the round loop needs a LOOKUP or COMB S-box, use the unrolled architecture" severity failure;
+
+    -- A block coming back from mix_columns has priority over a new one
+    input_ready <= not mix_columns_bus_out_valid;
+
+    -- The final round skips mix_columns
+    mix_columns_bus_in_valid <= '1' when shift_rows_bus_out_valid = '1' and round_fifo(round_fifo_rd).rnd_num /= 9 else '0';
+
+    add_round_key : process(clk)
+        variable info        : block_info_type;
+        variable counter_blk : unsigned(127 downto 0);
+    begin
+        if rising_edge(clk) then
+            -- Reset pulses
+            output_valid <= '0';
+            s_box_bus_in_valid <= '0';
+            if reset = '1' then
+                round_fifo_rd <= 0;
+                round_fifo_wr <= 0;
+                mix_fifo_rd   <= 0;
+                mix_fifo_wr   <= 0;
+                load_counter  <= '0';
+            else
+                if init_vec_valid = '1' then
+                    load_counter <= '1';
+                end if;
+
+                -- Loop input
+                if mix_columns_bus_out_valid = '1' then
+                    info := mix_fifo(mix_fifo_rd);
+                    mix_fifo_rd <= (mix_fifo_rd + 1) mod FIFO_DEPTH;
+                    info.rnd_num := info.rnd_num + 1;
+                    s_box_bus_in       <= mix_columns_bus_out xor e_key(info.rnd_num);
+                    s_box_bus_in_valid <= '1'; -- Pulsed
+                    round_fifo(round_fifo_wr) <= info;
+                    round_fifo_wr <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                elsif input_valid = '1' then
+                    if load_counter = '1' or init_vec_valid = '1' then
+                        counter_blk := unsigned(init_vec);
+                        load_counter <= '0';
+                    else
+                        counter_blk := counter;
+                    end if;
+                    counter <= counter_blk + 1; -- Wraps modulo 2**128
+                    s_box_bus_in       <= std_logic_vector(counter_blk) xor e_key(0);
+                    s_box_bus_in_valid <= '1'; -- Pulsed
+                    info.rnd_num := 0;
+                    info.data    := input_bus;
+                    round_fifo(round_fifo_wr) <= info;
+                    round_fifo_wr <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                end if;
+
+                -- End of shift_rows
+                if shift_rows_bus_out_valid = '1' then
+                    info := round_fifo(round_fifo_rd);
+                    round_fifo_rd <= (round_fifo_rd + 1) mod FIFO_DEPTH;
+                    if info.rnd_num = 9 then
+                        output_bus   <= shift_rows_bus_out xor e_key(10) xor info.data;
+                        output_valid <= '1'; -- Pulsed
+                    else
+                        mix_fifo(mix_fifo_wr) <= info;
+                        mix_fifo_wr <= (mix_fifo_wr + 1) mod FIFO_DEPTH;
+                    end if;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process;
+
+    sbox_lookup_gen : if SBOX_ARCHITECTURE = "LOOKUP" generate
+        s_box_inst : entity work.s_box(lookup)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => s_box_bus_in,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => s_box_bus_in_valid,   -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid   -- out std_logic
+        );
+    end generate sbox_lookup_gen;
+
+    sbox_comb_gen : if SBOX_ARCHITECTURE = "COMB" generate
+        s_box_inst : entity work.s_box(combinational)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => s_box_bus_in,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => s_box_bus_in_valid,   -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid   -- out std_logic
+        );
+    end generate sbox_comb_gen;
+
+    shift_rows_inst : entity work.shift_rows(rtl)
+    port map
+    (
+        -- Common
+        clk          => clk,                      -- in std_logic;
+        reset        => reset,                    -- in std_logic;
+        -- Input
+        input_bus    => s_box_bus_out,            -- in std_logic_vector(127 downto 0);
+        input_en     => s_box_bus_out_valid,      -- in std_logic;
+        -- Output
+        output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0);
+        output_en    => shift_rows_bus_out_valid  -- out std_logic
+    );
+
+    mix_columns_inst : entity work.mix_columns(rtl)
+    port map
+    (
+        -- Common
+        clk          => clk,                      -- in std_logic;
+        reset        => reset,                    -- in std_logic;
+        -- Input
+        input_bus    => shift_rows_bus_out,       -- in std_logic_vector(127 downto 0);
+        input_en     => mix_columns_bus_in_valid, -- in std_logic;
+        -- Output
+        output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
+        output_en    => mix_columns_bus_out_valid -- out std_logic
+    );
+
+end architecture rtl;
+
+---------------------------------------------------------------------
+-- Builds all ten rounds as a pipeline of enc_round stages, which
+-- accepts a new counter block on every clock cycle. The input block
+-- of each counter block travels in a FIFO alongside the pipeline.
+---------------------------------------------------------------------
+architecture unrolled of aes_128_top_ctr is
+    constant FIFO_DEPTH : integer := 64; -- More than the pipeline length of any S-box architecture
+
+    type data_fifo_type is array (0 to FIFO_DEPTH-1) of std_logic_vector(127 downto 0);
+    type round_bus_type is array (0 to 10) of std_logic_vector(127 downto 0);
+
+    -- Input of each round, round_bus(10) is the output of the last one
+    signal round_bus         : round_bus_type;
+    signal round_bus_valid   : std_logic_vector(0 to 10);
+    signal pipeline_in       : std_logic_vector(127 downto 0);
+    signal pipeline_in_valid : std_logic;
+
+    -- Input blocks to XOR with the key stream
+    signal data_fifo    : data_fifo_type;
+    signal data_fifo_rd : integer range 0 to FIFO_DEPTH-1;
+    signal data_fifo_wr : integer range 0 to FIFO_DEPTH-1;
+
+    signal counter       : unsigned(127 downto 0);
+    signal load_counter  : std_logic;
+begin
+    input_ready <= '1';
+
+    add_round_key : process(clk)
+        variable counter_blk : unsigned(127 downto 0);
+    begin
+        if rising_edge(clk) then
+            -- Reset pulses
+            output_valid <= '0';
+            pipeline_in_valid <= '0';
+            if reset = '1' then
+                data_fifo_rd <= 0;
+                data_fifo_wr <= 0;
+                load_counter <= '0';
+            else
+                if init_vec_valid = '1' then
+                    load_counter <= '1';
+                end if;
+
+                -- Pipeline input
+                if input_valid = '1' then
+                    if load_counter = '1' or init_vec_valid = '1' then
+                        counter_blk := unsigned(init_vec);
+                        load_counter <= '0';
+                    else
+                        counter_blk := counter;
+                    end if;
+                    counter <= counter_blk + 1; -- Wraps modulo 2**128
+                    pipeline_in       <= std_logic_vector(counter_blk) xor e_key(0);
+                    pipeline_in_valid <= '1'; -- Pulsed
+                    data_fifo(data_fifo_wr) <= input_bus;
+                    data_fifo_wr <= (data_fifo_wr + 1) mod FIFO_DEPTH;
+                end if;
+
+                -- Pipeline output
+                if round_bus_valid(10) = '1' then
+                    output_bus   <= round_bus(10) xor data_fifo(data_fifo_rd);
+                    output_valid <= '1'; -- Pulsed
+                    data_fifo_rd <= (data_fifo_rd + 1) mod FIFO_DEPTH;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process;
+
+    round_bus(0)       <= pipeline_in;
+    round_bus_valid(0) <= pipeline_in_valid;
+
+    round_gen : for i in 1 to 10 generate
+        round_inst : entity work.enc_round(rtl)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            FINAL_ROUND       => i = 10
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => round_bus(i-1),       -- in std_logic_vector(127 downto 0);
+            input_en    => round_bus_valid(i-1), -- in std_logic;
+            round_key   => e_key(i),             -- in std_logic_vector(127 downto 0);
+            -- Output
+            output_bus  => round_bus(i),         -- out std_logic_vector(127 downto 0);
+            output_en   => round_bus_valid(i)    -- out std_logic
+        );
+    end generate round_gen;
+
+end architecture unrolled;
@@ -6,7 +6,8 @@ use work.aes_pkg.all;
 entity aes_128_top_dec is
 generic
 (
-    SBOX_ARCHITECTURE : string -- LOOKUP, COMB, MASKED
+    SBOX_ARCHITECTURE : string; -- LOOKUP, COMB, TTABLE (rtl and unrolled only), MASKED (rtl only)
+    KEY_SCHEDULE      : string := "STORED" -- STORED (e_key), ON_THE_FLY (round_key from round_key_gen, rtl only)
 );
 port 
 (
@@ -15,13 +16,17 @@ port
     reset          : in std_logic;
     -- Input
     input_bus      : in std_logic_vector(127 downto 0);
-    e_key          : in exp_key_type;
+    e_key          : in exp_key_type := (others => (others => '0'));
+    round_key      : in std_logic_vector(127 downto 0) := (others => '0'); -- ON_THE_FLY: round key to use next
     init_vec       : in std_logic_vector(127 downto 0); -- initial vector to XOR with the cipherblock
     init_vec_valid : in std_logic; 
     input_valid    : in std_logic;
+    entropy        : in std_logic_vector(31 downto 0) := (others => '0'); -- MASKED: random bits for the S-box masks
     -- Output
 	plaintext      : out std_logic_vector(127 downto 0);
-    output_valid   : out std_logic
+    output_valid   : out std_logic;
+    input_ready    : out std_logic; -- input_valid is accepted this cycle (rtl, MASKED: once the first S-box table is built)
+    round_key_next : out std_logic  -- Pulsed, round_key has been used
 );
 end aes_128_top_dec;
 
@@ -48,8 +53,35 @@ architecture rtl of aes_128_top_dec is
 
     signal plaintext_i : std_logic_vector(127 downto 0);
     signal current_cipherblock : std_logic_vector(127 downto 0);
+    signal round_keys : exp_key_type;
+    signal t_table_keys : exp_key_type; -- TTABLE: round keys moved after inv_mix_columns
+
+    signal entry_mask : std_logic_vector(127 downto 0); -- MASKED: added to the input block
+    signal exit_mask  : std_logic_vector(127 downto 0); -- MASKED: removed after the final key addition
+    signal mask_in    : std_logic_vector(127 downto 0);
+    signal mask_out   : std_logic_vector(127 downto 0);
+    signal mask_ready : std_logic;
+    signal core_idle  : std_logic;
 
 begin
+    assert KEY_SCHEDULE = "STORED" or KEY_SCHEDULE = "ON_THE_FLY"
+        report "Error: KEY_SCHEDULE setting was invalid" severity failure;
+
+    -- The T-table rounds are only built with the stored key schedule
+    assert not (KEY_SCHEDULE = "ON_THE_FLY" and SBOX_ARCHITECTURE = "TTABLE")
+        report "Error: KEY_SCHEDULE setting was invalid" severity failure;
+
+    stored_keys_gen : if KEY_SCHEDULE = "STORED" generate
+        round_keys <= e_key;
+    end generate stored_keys_gen;
+
+    -- round_key_gen steps to the previous round key whenever one is used, so every
+    -- round reads the same port
+    on_the_fly_keys_gen : if KEY_SCHEDULE = "ON_THE_FLY" generate
+        round_keys <= (others => round_key);
+    end generate on_the_fly_keys_gen;
+
+    input_ready <= '1' when rnd_key_state = idle and mask_ready = '1' else '0';
  
     -- Process to add round key
     add_round_key : process(clk)
@@ -61,6 +93,7 @@ begin
             shift_rows_bus_in_valid <= '0';
             mix_columns_bus_in_valid <= '0';
             xor_init_vec_done <= '0';
+            round_key_next <= '0';
             if reset = '1' then
                 rnd_key_state <= idle;
                 rnd_num := 0;
@@ -76,8 +109,9 @@ begin
                     -- This initiates the decryption round
                     rnd_key_state           <= dec_in_prog;
                     current_cipherblock     <= input_bus;
-                    shift_rows_bus_in       <= input_bus xor e_key(10);
+                    shift_rows_bus_in       <= input_bus xor entry_mask xor round_keys(10);
                     shift_rows_bus_in_valid <= '1'; -- Pulsed
+                    round_key_next          <= '1'; -- Pulsed
                     rnd_key_state           <= dec_in_prog;
                     rnd_num := 0;
                 end if;
@@ -93,21 +127,27 @@ begin
                         if s_box_bus_out_valid = '1' then
                             if rnd_num = 9 then
                                 rnd_key_state <= end_dec;
-                                plaintext_i <= s_box_bus_out xor e_key(0);
+                                plaintext_i <= s_box_bus_out xor round_keys(0); -- Still masked
+                            elsif SBOX_ARCHITECTURE = "TTABLE" then
+                                rnd_num := rnd_num + 1;
+                                -- The T-table has already mixed the columns, add the mixed round key
+                                shift_rows_bus_in <= mix_columns_bus_out xor t_table_keys(10 - rnd_num);
+                                shift_rows_bus_in_valid <= '1'; -- Pulsed
                             else
                                 rnd_num := rnd_num + 1;
                                 -- Add round key
-                                mix_columns_bus_in <= s_box_bus_out xor e_key(10 - rnd_num);
+                                mix_columns_bus_in <= s_box_bus_out xor round_keys(10 - rnd_num);
                                 mix_columns_bus_in_valid <= '1'; -- Pulsed
                             end if;
+                            round_key_next <= '1'; -- Pulsed
                         end if;
                     --------------------------
                     when end_dec =>
                         if xor_init_vec = '1' or init_vec_valid = '1' then
-                            plaintext <= plaintext_i xor init_vec;
+                            plaintext <= plaintext_i xor init_vec xor exit_mask;
                             xor_init_vec_done <= '1'; -- Pulsed
                         else
-                            plaintext <= plaintext_i xor prev_cipherblock;
+                            plaintext <= plaintext_i xor prev_cipherblock xor exit_mask;
                         end if;
                         prev_cipherblock        <= current_cipherblock;
                         output_valid <= '1'; -- Pulsed
@@ -121,19 +161,62 @@ begin
     end process;
     
 
-    inv_shift_rows_inst : entity work.inv_shift_rows(rtl)
-    port map
-    (
-        -- Common
-        clk          => clk,                      -- in std_logic;
-        reset        => reset,                    -- in std_logic;
-        -- Input
-        input_bus    => shift_rows_bus_in,            -- in std_logic_vector(NUM_INPUT_BYTES*8 - 1 downto 0);
-        input_en     => shift_rows_bus_in_valid,      -- in std_logic;
-        -- Output
-        output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0); -- output is always 16*16 bytes
-        output_en    => shift_rows_bus_out_valid  --out std_logic
-    );
+    round_steps_gen : if SBOX_ARCHITECTURE /= "TTABLE" generate
+        inv_shift_rows_inst : entity work.inv_shift_rows(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => shift_rows_bus_in,            -- in std_logic_vector(NUM_INPUT_BYTES*8 - 1 downto 0);
+            input_en     => shift_rows_bus_in_valid,      -- in std_logic;
+            -- Output
+            output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0); -- output is always 16*16 bytes
+            output_en    => shift_rows_bus_out_valid  --out std_logic
+        );
+
+        inv_mix_columns_inst : entity work.inv_mix_columns(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => mix_columns_bus_in,       -- in std_logic_vector(127 downto 0);
+            input_en     => mix_columns_bus_in_valid, -- in std_logic;
+            -- Output
+            output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0); -- output is always 4*4 bytes
+            output_en    => mix_columns_bus_out_valid -- out std_logic
+        );
+    end generate round_steps_gen;
+
+    -- The T-table does the whole round in two clock cycles, with shift_rows_bus_in as the
+    -- address register of its synchronous reads. Its final_bus takes the place of the
+    -- inverse S-box output, and its output_bus is added to the round key and fed straight
+    -- back with s_box_bus_out_valid, so mix_columns_bus_out_valid stays '0'.
+    ttable_gen : if SBOX_ARCHITECTURE = "TTABLE" generate
+        inv_t_table_inst : entity work.inv_t_table(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => shift_rows_bus_in,        -- in std_logic_vector(127 downto 0);
+            input_en     => shift_rows_bus_in_valid,  -- in std_logic;
+            -- Output
+            output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
+            final_bus    => s_box_bus_out,            -- out std_logic_vector(127 downto 0);
+            output_en    => s_box_bus_out_valid       -- out std_logic
+        );
+
+        mix_columns_bus_out_valid <= '0';
+
+        t_table_keys_gen : for i in 0 to 10 generate
+            t_table_keys(i) <= inv_mix_round_key(round_keys(i));
+        end generate t_table_keys_gen;
+    end generate ttable_gen;
 
     -- Conditional inverse S-box architecture instantiation
     inv_sbox_lookup_gen : if SBOX_ARCHITECTURE = "LOOKUP" generate
@@ -175,14 +258,218 @@ begin
             output_en   => s_box_bus_out_valid   -- out std_logic
         );
     end generate inv_sbox_comb_gen;
-    
-    -- Future: masked inverse S-box architecture
-    -- inv_sbox_masked_gen : if SBOX_ARCHITECTURE = "MASKED" generate
-    --     inv_s_box_inst : entity work.inv_s_box(masked)
-    --     ...
-    -- end generate inv_sbox_masked_gen;
 
+    -- The state stays masked from the input block to the CBC chaining: shift_rows_bus_in
+    -- carries ShiftRows(mask_in), which inv_shift_rows turns into mask_in for the table,
+    -- and the table output carries mask_out, which inv_mix_columns turns back into
+    -- ShiftRows(mask_in) for the next round. A session start builds new masks.
+    inv_sbox_masked_gen : if SBOX_ARCHITECTURE = "MASKED" generate
+        inv_s_box_inst : entity work.inv_s_box(masked)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => shift_rows_bus_out,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => shift_rows_bus_out_valid,   -- in std_logic;
+            entropy     => entropy,              -- in std_logic_vector(31 downto 0);
+            remask      => init_vec_valid,       -- in std_logic;
+            core_idle   => core_idle,            -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid,  -- out std_logic
+            mask_in     => mask_in,              -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            mask_out    => mask_out,             -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            mask_ready  => mask_ready            -- out std_logic
+        );
+
+        core_idle  <= '1' when rnd_key_state = idle and input_valid = '0' else '0';
+        entry_mask <= shift_rows_state(mask_in);
+        exit_mask  <= mask_out;
+    end generate inv_sbox_masked_gen;
+
+    unmasked_gen : if SBOX_ARCHITECTURE /= "MASKED" generate
+        entry_mask <= (others => '0');
+        exit_mask  <= (others => '0');
+        mask_ready <= '1';
+    end generate unmasked_gen;
+
+
+end architecture rtl;
+
+---------------------------------------------------------------------
+-- Keeps up to one block per stage of the round loop in flight. A new
+-- cipherblock enters the loop on every cycle that no block is coming
+-- back from inv_mix_columns. Each block takes the same number of
+-- cycles, so plaintexts leave in the order the cipherblocks entered.
+-- The round number and CBC chaining value of each block travel in
+-- two FIFOs, one per in-order section of the loop.
+---------------------------------------------------------------------
+architecture pipelined of aes_128_top_dec is
+    constant FIFO_DEPTH : integer := 16; -- More than the loop length of any S-box architecture
+
+    type block_info_type is record
+        rnd_num : integer range 0 to 9;
+        chain   : std_logic_vector(127 downto 0); -- Previous cipherblock or initial vector
+    end record;
+    type block_info_fifo_type is array (0 to FIFO_DEPTH-1) of block_info_type;
+
+    signal shift_rows_bus_in         : std_logic_vector(127 downto 0);
+    signal shift_rows_bus_in_valid   : std_logic;
+    signal shift_rows_bus_out        : std_logic_vector(127 downto 0);
+    signal shift_rows_bus_out_valid  : std_logic;
+
+    signal s_box_bus_out             : std_logic_vector(127 downto 0);
+    signal s_box_bus_out_valid       : std_logic;
 
+    signal mix_columns_bus_in        : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_in_valid  : std_logic;
+    signal mix_columns_bus_out       : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_out_valid : std_logic;
+
+    -- Blocks between the loop input and add round key
+    signal round_fifo    : block_info_fifo_type;
+    signal round_fifo_rd : integer range 0 to FIFO_DEPTH-1;
+    signal round_fifo_wr : integer range 0 to FIFO_DEPTH-1;
+    -- Blocks between add round key and the end of inv_mix_columns
+    signal mix_fifo      : block_info_fifo_type;
+    signal mix_fifo_rd   : integer range 0 to FIFO_DEPTH-1;
+    signal mix_fifo_wr   : integer range 0 to FIFO_DEPTH-1;
+
+    signal prev_cipherblock : std_logic_vector(127 downto 0);
+    signal xor_init_vec     : std_logic;
+begin
+    -- Blocks in different rounds use different round keys on the same cycle
+    assert KEY_SCHEDULE = "STORED"
+        report "Error: the pipelined round loop needs KEY_SCHEDULE = STORED" severity failure;
+    round_key_next <= '0';
+
+    -- A T-table round has no stages to keep other blocks in, and the masked tables only
+    -- swap banks while no block is in flight
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB"
+        report "Error: the pipelined round loop needs a LOOKUP or COMB S-box" severity failure;
+
+    -- A block coming back from inv_mix_columns has priority over a new one
+    input_ready <= not mix_columns_bus_out_valid;
+
+    add_round_key : process(clk)
+        variable info : block_info_type;
+    begin
+        if rising_edge(clk) then
+            -- Reset pulses
+            output_valid <= '0';
+            shift_rows_bus_in_valid <= '0';
+            mix_columns_bus_in_valid <= '0';
+            if reset = '1' then
+                round_fifo_rd <= 0;
+                round_fifo_wr <= 0;
+                mix_fifo_rd   <= 0;
+                mix_fifo_wr   <= 0;
+                xor_init_vec  <= '0';
+            else
+                if init_vec_valid = '1' then
+                    xor_init_vec <= '1';
+                end if;
+
+                -- Loop input
+                if mix_columns_bus_out_valid = '1' then
+                    shift_rows_bus_in       <= mix_columns_bus_out;
+                    shift_rows_bus_in_valid <= '1'; -- Pulsed
+                    round_fifo(round_fifo_wr) <= mix_fifo(mix_fifo_rd);
+                    round_fifo_wr <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                    mix_fifo_rd   <= (mix_fifo_rd + 1) mod FIFO_DEPTH;
+                elsif input_valid = '1' then
+                    shift_rows_bus_in       <= input_bus xor e_key(10);
+                    shift_rows_bus_in_valid <= '1'; -- Pulsed
+                    info.rnd_num := 0;
+                    if xor_init_vec = '1' or init_vec_valid = '1' then
+                        info.chain := init_vec;
+                        xor_init_vec <= '0';
+                    else
+                        info.chain := prev_cipherblock;
+                    end if;
+                    round_fifo(round_fifo_wr) <= info;
+                    round_fifo_wr    <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                    prev_cipherblock <= input_bus;
+                end if;
+
+                -- Add round key
+                if s_box_bus_out_valid = '1' then
+                    info := round_fifo(round_fifo_rd);
+                    round_fifo_rd <= (round_fifo_rd + 1) mod FIFO_DEPTH;
+                    if info.rnd_num = 9 then
+                        plaintext    <= s_box_bus_out xor e_key(0) xor info.chain;
+                        output_valid <= '1'; -- Pulsed
+                    else
+                        mix_columns_bus_in       <= s_box_bus_out xor e_key(9 - info.rnd_num);
+                        mix_columns_bus_in_valid <= '1'; -- Pulsed
+                        info.rnd_num := info.rnd_num + 1;
+                        mix_fifo(mix_fifo_wr) <= info;
+                        mix_fifo_wr <= (mix_fifo_wr + 1) mod FIFO_DEPTH;
+                    end if;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process;
+
+    inv_shift_rows_inst : entity work.inv_shift_rows(rtl)
+    port map
+    (
+        -- Common
+        clk          => clk,                      -- in std_logic;
+        reset        => reset,                    -- in std_logic;
+        -- Input
+        input_bus    => shift_rows_bus_in,        -- in std_logic_vector(127 downto 0);
+        input_en     => shift_rows_bus_in_valid,  -- in std_logic;
+        -- Output
+        output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0);
+        output_en    => shift_rows_bus_out_valid  -- out std_logic
+    );
+
+    inv_sbox_lookup_gen : if SBOX_ARCHITECTURE = "LOOKUP" generate
+        inv_s_box_inst : entity work.inv_s_box(lookup)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                      -- in std_logic;
+            reset       => reset,                    -- in std_logic;
+            -- Input
+            input_bus   => shift_rows_bus_out,       -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => shift_rows_bus_out_valid, -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,            -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid       -- out std_logic
+        );
+    end generate inv_sbox_lookup_gen;
+
+    inv_sbox_comb_gen : if SBOX_ARCHITECTURE = "COMB" generate
+        inv_s_box_inst : entity work.inv_s_box(combinational)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                      -- in std_logic;
+            reset       => reset,                    -- in std_logic;
+            -- Input
+            input_bus   => shift_rows_bus_out,       -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => shift_rows_bus_out_valid, -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,            -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid       -- out std_logic
+        );
+    end generate inv_sbox_comb_gen;
 
     inv_mix_columns_inst : entity work.inv_mix_columns(rtl)
     port map
@@ -194,8 +481,107 @@ begin
         input_bus    => mix_columns_bus_in,       -- in std_logic_vector(127 downto 0);
         input_en     => mix_columns_bus_in_valid, -- in std_logic;
         -- Output
-        output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0); -- output is always 4*4 bytes
+        output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
         output_en    => mix_columns_bus_out_valid -- out std_logic
     );
 
-end architecture rtl;
\ No newline at end of file
+end architecture pipelined;
+
+---------------------------------------------------------------------
+-- Builds all ten rounds as a pipeline of dec_round stages, which
+-- accepts a new cipherblock on every clock cycle. Each block takes
+-- the same number of cycles, so plaintexts leave in the order the
+-- cipherblocks entered, and the CBC chaining value of each block
+-- travels in a FIFO alongside the pipeline.
+---------------------------------------------------------------------
+architecture unrolled of aes_128_top_dec is
+    constant FIFO_DEPTH : integer := 64; -- More than the pipeline length of any S-box architecture
+
+    type chain_fifo_type is array (0 to FIFO_DEPTH-1) of std_logic_vector(127 downto 0);
+    type round_bus_type is array (0 to 10) of std_logic_vector(127 downto 0);
+
+    -- Input of each round, round_bus(10) is the output of the last one
+    signal round_bus        : round_bus_type;
+    signal round_bus_valid  : std_logic_vector(0 to 10);
+    signal pipeline_in       : std_logic_vector(127 downto 0);
+    signal pipeline_in_valid : std_logic;
+
+    signal chain_fifo    : chain_fifo_type;
+    signal chain_fifo_rd : integer range 0 to FIFO_DEPTH-1;
+    signal chain_fifo_wr : integer range 0 to FIFO_DEPTH-1;
+
+    signal prev_cipherblock : std_logic_vector(127 downto 0);
+    signal xor_init_vec     : std_logic;
+begin
+    -- Every round uses its own round key on every cycle
+    assert KEY_SCHEDULE = "STORED"
+        report "Error: the unrolled rounds need KEY_SCHEDULE = STORED" severity failure;
+    round_key_next <= '0';
+
+    input_ready <= '1';
+
+    add_round_key : process(clk)
+    begin
+        if rising_edge(clk) then
+            -- Reset pulses
+            output_valid <= '0';
+            pipeline_in_valid <= '0';
+            if reset = '1' then
+                chain_fifo_rd <= 0;
+                chain_fifo_wr <= 0;
+                xor_init_vec  <= '0';
+            else
+                if init_vec_valid = '1' then
+                    xor_init_vec <= '1';
+                end if;
+
+                -- Pipeline input
+                if input_valid = '1' then
+                    pipeline_in       <= input_bus xor e_key(10);
+                    pipeline_in_valid <= '1'; -- Pulsed
+                    if xor_init_vec = '1' or init_vec_valid = '1' then
+                        chain_fifo(chain_fifo_wr) <= init_vec;
+                        xor_init_vec <= '0';
+                    else
+                        chain_fifo(chain_fifo_wr) <= prev_cipherblock;
+                    end if;
+                    chain_fifo_wr    <= (chain_fifo_wr + 1) mod FIFO_DEPTH;
+                    prev_cipherblock <= input_bus;
+                end if;
+
+                -- Pipeline output
+                if round_bus_valid(10) = '1' then
+                    plaintext     <= round_bus(10) xor chain_fifo(chain_fifo_rd);
+                    output_valid  <= '1'; -- Pulsed
+                    chain_fifo_rd <= (chain_fifo_rd + 1) mod FIFO_DEPTH;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process;
+
+    round_bus(0)       <= pipeline_in;
+    round_bus_valid(0) <= pipeline_in_valid;
+
+    round_gen : for i in 1 to 10 generate
+        round_inst : entity work.dec_round(rtl)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            FINAL_ROUND       => i = 10
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => round_bus(i-1),       -- in std_logic_vector(127 downto 0);
+            input_en    => round_bus_valid(i-1), -- in std_logic;
+            round_key   => e_key(10-i),          -- in std_logic_vector(127 downto 0);
+            -- Output
+            output_bus  => round_bus(i),         -- out std_logic_vector(127 downto 0);
+            output_en   => round_bus_valid(i)    -- out std_logic
+        );
+    end generate round_gen;
+
+end architecture unrolled;
@@ -0,0 +1,161 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: One decryption round with its own inv_shift_rows,
+--              inverse S-box and inv_mix_columns, for the unrolled
+--              round pipeline. Accepts a new state on every clock
+--              cycle. The round key is added after the inverse S-box.
+--              With TTABLE the round is one inv_t_table lookup,
+--              whose synchronous reads are the only register of the
+--              round, and inv_mix_round_key of the round key is
+--              added behind them.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use work.aes_pkg.all;
+
+entity dec_round is
+generic
+(
+    SBOX_ARCHITECTURE : string;          -- LOOKUP, COMB, TTABLE
+    FINAL_ROUND       : boolean := false -- Skip inv_mix_columns
+);
+port
+(
+    -- Common
+    clk         : in std_logic;
+    reset       : in std_logic;
+    -- Input
+    input_bus   : in std_logic_vector(127 downto 0);
+    input_en    : in std_logic;
+    round_key   : in std_logic_vector(127 downto 0);
+    -- Output
+    output_bus  : out std_logic_vector(127 downto 0);
+    output_en   : out std_logic
+);
+end dec_round;
+
+architecture rtl of dec_round is
+    signal shift_rows_bus_out        : std_logic_vector(127 downto 0);
+    signal shift_rows_bus_out_valid  : std_logic;
+
+    signal s_box_bus_out             : std_logic_vector(127 downto 0);
+    signal s_box_bus_out_valid       : std_logic;
+
+    signal mix_columns_bus_in        : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_out       : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_out_valid : std_logic;
+
+    signal t_table_bus_out           : std_logic_vector(127 downto 0);
+    signal t_table_final_bus         : std_logic_vector(127 downto 0);
+    signal t_table_bus_out_valid     : std_logic;
+begin
+    -- The masked tables only swap banks while no block is in flight, which the pipeline never waits for
+    assert SBOX_ARCHITECTURE /= "MASKED"
+        report "Error: the unrolled rounds need a LOOKUP, COMB or TTABLE S-box" severity failure;
+
+    round_steps_gen : if SBOX_ARCHITECTURE /= "TTABLE" generate
+        inv_shift_rows_inst : entity work.inv_shift_rows(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => input_bus,                -- in std_logic_vector(127 downto 0);
+            input_en     => input_en,                 -- in std_logic;
+            -- Output
+            output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0);
+            output_en    => shift_rows_bus_out_valid  -- out std_logic
+        );
+
+        inv_sbox_lookup_gen : if SBOX_ARCHITECTURE = "LOOKUP" generate
+            inv_s_box_inst : entity work.inv_s_box(lookup)
+            generic map
+            (
+                BUS_WIDTH => 16
+            )
+            port map
+            (
+                -- Common
+                clk         => clk,                      -- in std_logic;
+                reset       => reset,                    -- in std_logic;
+                -- Input
+                input_bus   => shift_rows_bus_out,       -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+                input_en    => shift_rows_bus_out_valid, -- in std_logic;
+                -- Output
+                output_bus  => s_box_bus_out,            -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+                output_en   => s_box_bus_out_valid       -- out std_logic
+            );
+        end generate inv_sbox_lookup_gen;
+
+        inv_sbox_comb_gen : if SBOX_ARCHITECTURE = "COMB" generate
+            inv_s_box_inst : entity work.inv_s_box(combinational)
+            generic map
+            (
+                BUS_WIDTH => 16
+            )
+            port map
+            (
+                -- Common
+                clk         => clk,                      -- in std_logic;
+                reset       => reset,                    -- in std_logic;
+                -- Input
+                input_bus   => shift_rows_bus_out,       -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+                input_en    => shift_rows_bus_out_valid, -- in std_logic;
+                -- Output
+                output_bus  => s_box_bus_out,            -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+                output_en   => s_box_bus_out_valid       -- out std_logic
+            );
+        end generate inv_sbox_comb_gen;
+
+        mix_gen : if not FINAL_ROUND generate
+            mix_columns_bus_in <= s_box_bus_out xor round_key;
+
+            inv_mix_columns_inst : entity work.inv_mix_columns(rtl)
+            port map
+            (
+                -- Common
+                clk          => clk,                      -- in std_logic;
+                reset        => reset,                    -- in std_logic;
+                -- Input
+                input_bus    => mix_columns_bus_in,       -- in std_logic_vector(127 downto 0);
+                input_en     => s_box_bus_out_valid,      -- in std_logic;
+                -- Output
+                output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
+                output_en    => mix_columns_bus_out_valid -- out std_logic
+            );
+
+            output_bus <= mix_columns_bus_out;
+            output_en  <= mix_columns_bus_out_valid;
+        end generate mix_gen;
+
+        final_gen : if FINAL_ROUND generate
+            output_bus <= s_box_bus_out xor round_key;
+            output_en  <= s_box_bus_out_valid;
+        end generate final_gen;
+    end generate round_steps_gen;
+
+    -- One register per round, the synchronous T-table reads. The round key is added to
+    -- their output combinationally, which addresses the tables of the next round
+    ttable_gen : if SBOX_ARCHITECTURE = "TTABLE" generate
+        inv_t_table_inst : entity work.inv_t_table(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                  -- in std_logic;
+            reset        => reset,                -- in std_logic;
+            -- Input
+            input_bus    => input_bus,            -- in std_logic_vector(127 downto 0);
+            input_en     => input_en,             -- in std_logic;
+            -- Output
+            output_bus   => t_table_bus_out,      -- out std_logic_vector(127 downto 0);
+            final_bus    => t_table_final_bus,    -- out std_logic_vector(127 downto 0);
+            output_en    => t_table_bus_out_valid -- out std_logic
+        );
+
+        output_bus <= t_table_final_bus xor round_key when FINAL_ROUND else t_table_bus_out xor inv_mix_round_key(round_key);
+        output_en  <= t_table_bus_out_valid;
+    end generate ttable_gen;
+
+end architecture rtl;
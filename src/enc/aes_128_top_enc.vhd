@@ -6,7 +6,8 @@ use work.aes_pkg.all;
 entity aes_128_top_enc is
 generic
 (
-    SBOX_ARCHITECTURE : string -- LOOKUP, COMB, MASKED
+    SBOX_ARCHITECTURE : string; -- LOOKUP, COMB, TTABLE, MASKED
+    KEY_SCHEDULE      : string := "STORED" -- STORED (e_key), ON_THE_FLY (round_key from round_key_gen)
 );
 port 
 (
@@ -15,14 +16,18 @@ port
     reset             : in std_logic;
     -- Input
     input_bus         : in std_logic_vector(127 downto 0);
-    e_key             : in exp_key_type;
+    e_key             : in exp_key_type := (others => (others => '0'));
+    round_key         : in std_logic_vector(127 downto 0) := (others => '0'); -- ON_THE_FLY: round key to use next
     init_vec          : in std_logic_vector(127 downto 0); -- initial vector to XOR with the plaintext
     init_vec_valid    : in std_logic; 
     -- all inputs must remain valid whenever input_valid is pulsed, even if they're from previous rounds
     input_valid       : in std_logic;                      -- Inlcudes everything: bus, key, init_vec, session_start
+    entropy           : in std_logic_vector(31 downto 0) := (others => '0'); -- MASKED: random bits for the S-box masks
     -- Output
 	cipherblock       : out std_logic_vector(127 downto 0);
-    output_valid      : out std_logic
+    output_valid      : out std_logic;
+    input_ready       : out std_logic; -- Idle, and with MASKED the first S-box table is built
+    round_key_next    : out std_logic -- Pulsed, round_key has been used
 );
 end aes_128_top_enc;
 
@@ -48,7 +53,33 @@ architecture rtl of aes_128_top_enc is
     signal rnd_key_state             : key_proc_state_type;
     signal xor_init_vec : std_logic;
     signal xor_init_vec_done : std_logic;
+    signal round_keys : exp_key_type;
+
+    signal entry_mask : std_logic_vector(127 downto 0); -- MASKED: added to the input block
+    signal exit_mask  : std_logic_vector(127 downto 0); -- MASKED: removed after the final key addition
+    signal mask_in    : std_logic_vector(127 downto 0);
+    signal mask_out   : std_logic_vector(127 downto 0);
+    signal mask_ready : std_logic;
+    signal core_idle  : std_logic;
 begin
+    assert KEY_SCHEDULE = "STORED" or KEY_SCHEDULE = "ON_THE_FLY"
+        report "Error: KEY_SCHEDULE setting was invalid" severity failure;
+
+    -- The T-table rounds are only built with the stored key schedule
+    assert not (KEY_SCHEDULE = "ON_THE_FLY" and SBOX_ARCHITECTURE = "TTABLE")
+        report "Error: KEY_SCHEDULE setting was invalid" severity failure;
+
+    stored_keys_gen : if KEY_SCHEDULE = "STORED" generate
+        round_keys <= e_key;
+    end generate stored_keys_gen;
+
+    -- round_key_gen steps to the next round key whenever one is used, so every
+    -- round reads the same port
+    on_the_fly_keys_gen : if KEY_SCHEDULE = "ON_THE_FLY" generate
+        round_keys <= (others => round_key);
+    end generate on_the_fly_keys_gen;
+
+    input_ready <= '1' when rnd_key_state = idle and mask_ready = '1' else '0';
     
     -- Process to add round key
     add_round_key : process(clk)
@@ -60,6 +91,7 @@ begin
             output_valid <= '0';
             input_block_ready <= '0';
             xor_init_vec_done <= '0';
+            round_key_next <= '0';
             if reset = '1' then
                 rnd_key_state <= idle;
                 rnd_num := 0;
@@ -75,16 +107,17 @@ begin
                 if input_valid = '1' then
                     if xor_init_vec = '1' or init_vec_valid = '1' then
                         -- this will override the previous cipherblock
-                        s_box_bus_in <= input_bus xor init_vec xor e_key(0); -- xor with initial vector
+                        s_box_bus_in <= input_bus xor entry_mask xor init_vec xor round_keys(0); -- xor with initial vector
                         xor_init_vec_done <= '1'; -- Pulsed
                     elsif prev_cipherblock_valid = '1' then
                         -- xor with prev cipherblock
-                        s_box_bus_in <= input_bus xor prev_cipherblock xor e_key(0);
+                        s_box_bus_in <= input_bus xor entry_mask xor prev_cipherblock xor round_keys(0);
                     end if;
                     -- This initiates the encryption round
                     input_block_ready <= '1'; -- Pulsed
                     prev_cipherblock_valid <= '0';
                     s_box_bus_in_valid <= '1'; -- Pulsed
+                    round_key_next <= '1'; -- Pulsed
                     rnd_key_state <= enc_in_prog;
                     rnd_num := 0;
                 end if;
@@ -98,17 +131,19 @@ begin
                                 rnd_key_state <= end_enc;
                             end if;
                             rnd_num := rnd_num + 1;
-                            s_box_bus_in <= mix_columns_bus_out xor e_key(rnd_num);
+                            s_box_bus_in <= mix_columns_bus_out xor round_keys(rnd_num);
                             s_box_bus_in_valid <= '1'; -- Pulsed
+                            round_key_next <= '1'; -- Pulsed
                         end if;
                     --------------------------
                     when end_enc =>
                         -- Grab the output from shift_rows and xor with final round key
                         if shift_rows_bus_out_valid = '1' then
-                            cipherblock <= shift_rows_bus_out xor e_key(10);
-                            prev_cipherblock <= shift_rows_bus_out xor e_key(10);
+                            cipherblock <= shift_rows_bus_out xor round_keys(10) xor exit_mask;
+                            prev_cipherblock <= shift_rows_bus_out xor round_keys(10) xor exit_mask;
                             output_valid <= '1'; -- Pulsed -- TODO: compile w/ 2008, u can read output ports (cipherblock) instead of using prev_ciph..
                             prev_cipherblock_valid <= '1';
+                            round_key_next <= '1'; -- Pulsed
                             rnd_key_state <= idle;
                         end if;
                     ---------------------------
@@ -162,38 +197,97 @@ begin
             output_en   => s_box_bus_out_valid   -- out std_logic
         );
     end generate sbox_comb_gen;
-    
-    -- Future: masked S-box architecture
-    -- sbox_masked_gen : if SBOX_ARCHITECTURE = "MASKED" generate
-    --     s_box_inst : entity work.s_box(masked)
-    --     ...
-    -- end generate sbox_masked_gen;
-    shift_rows_inst : entity work.shift_rows(rtl)
-    port map
-    (
-        -- Common
-        clk          => clk,                      -- in std_logic;
-        reset        => reset,                    -- in std_logic;
-        -- Input
-        input_bus    => s_box_bus_out,            -- in std_logic_vector(NUM_INPUT_BYTES*8 - 1 downto 0);
-        input_en     => s_box_bus_out_valid,      -- in std_logic;
-        -- Output
-        output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0); -- output is always 16*16 bytes
-        output_en    => shift_rows_bus_out_valid  --out std_logic
-    );
-
-    mix_columns_inst : entity work.mix_columns(rtl)
-    port map
-    (
-        -- Common
-        clk          => clk,                      -- in std_logic;
-        reset        => reset,                    -- in std_logic;
-        -- Input
-        input_bus    => shift_rows_bus_out,       -- in std_logic_vector(127 downto 0);
-        input_en     => shift_rows_bus_out_valid, -- in std_logic;
-        -- Output
-        output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0); -- output is always 4*4 bytes
-        output_en    => mix_columns_bus_out_valid -- out std_logic
-    );
+
+    -- The state stays masked from the input block to the final key addition: s_box_bus_in
+    -- carries mask_in and the table output mask_out, which shift_rows and mix_columns turn
+    -- back into mask_in for the next round. A session start builds new masks.
+    sbox_masked_gen : if SBOX_ARCHITECTURE = "MASKED" generate
+        s_box_inst : entity work.s_box(masked)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => s_box_bus_in,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => s_box_bus_in_valid,   -- in std_logic;
+            entropy     => entropy,              -- in std_logic_vector(31 downto 0);
+            remask      => init_vec_valid,       -- in std_logic;
+            core_idle   => core_idle,            -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid,  -- out std_logic
+            mask_in     => mask_in,              -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            mask_out    => mask_out,             -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            mask_ready  => mask_ready            -- out std_logic
+        );
+
+        core_idle  <= '1' when rnd_key_state = idle and input_valid = '0' else '0';
+        entry_mask <= mask_in;
+        exit_mask  <= shift_rows_state(mask_out);
+    end generate sbox_masked_gen;
+
+    unmasked_gen : if SBOX_ARCHITECTURE /= "MASKED" generate
+        entry_mask <= (others => '0');
+        exit_mask  <= (others => '0');
+        mask_ready <= '1';
+    end generate unmasked_gen;
+
+    round_steps_gen : if SBOX_ARCHITECTURE /= "TTABLE" generate
+        shift_rows_inst : entity work.shift_rows(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => s_box_bus_out,            -- in std_logic_vector(NUM_INPUT_BYTES*8 - 1 downto 0);
+            input_en     => s_box_bus_out_valid,      -- in std_logic;
+            -- Output
+            output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0); -- output is always 16*16 bytes
+            output_en    => shift_rows_bus_out_valid  --out std_logic
+        );
+
+        mix_columns_inst : entity work.mix_columns(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => shift_rows_bus_out,       -- in std_logic_vector(127 downto 0);
+            input_en     => shift_rows_bus_out_valid, -- in std_logic;
+            -- Output
+            output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0); -- output is always 4*4 bytes
+            output_en    => mix_columns_bus_out_valid -- out std_logic
+        );
+    end generate round_steps_gen;
+
+    -- The T-table does the whole round in two clock cycles: s_box_bus_in is the address
+    -- register of its synchronous reads, and its output is added to the next round key
+    -- back into s_box_bus_in. Its final_bus takes the place of the shift_rows output in
+    -- the final round.
+    ttable_gen : if SBOX_ARCHITECTURE = "TTABLE" generate
+        t_table_inst : entity work.t_table(rtl)
+        port map
+        (
+            -- Common
+            clk          => clk,                      -- in std_logic;
+            reset        => reset,                    -- in std_logic;
+            -- Input
+            input_bus    => s_box_bus_in,             -- in std_logic_vector(127 downto 0);
+            input_en     => s_box_bus_in_valid,       -- in std_logic;
+            -- Output
+            output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
+            final_bus    => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0);
+            output_en    => mix_columns_bus_out_valid -- out std_logic
+        );
+
+        shift_rows_bus_out_valid <= mix_columns_bus_out_valid;
+    end generate ttable_gen;
 
 end architecture rtl;
\ No newline at end of file
@@ -0,0 +1,221 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: CBC encryption of CONTEXTS independent streams through
+--              one round loop. Each context has its own round keys
+--              and chaining register and at most one block in flight,
+--              so blocks of different contexts fill the stages of the
+--              loop that a single CBC chain leaves idle. A new block
+--              enters the loop on every cycle that no block is coming
+--              back from mix_columns and its context is not busy.
+--              The round number and context of each block travel in
+--              two FIFOs, one per in-order section of the loop.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use work.aes_pkg.all;
+
+entity aes_128_top_enc_multi is
+generic
+(
+    SBOX_ARCHITECTURE : string; -- LOOKUP, COMB
+    CONTEXTS          : positive
+);
+port
+(
+    -- Common
+    clk            : in std_logic;
+    reset          : in std_logic;
+    -- Context setup
+    load_context   : in integer range 0 to CONTEXTS-1;
+    e_key          : in exp_key_type;
+    init_vec       : in std_logic_vector(127 downto 0);
+    load           : in std_logic; -- Pulsed, store e_key and init_vec for load_context
+    -- Input
+    input_bus      : in std_logic_vector(127 downto 0);
+    input_context  : in integer range 0 to CONTEXTS-1;
+    input_valid    : in std_logic;
+    input_ready    : out std_logic; -- input_valid is accepted this cycle
+    -- Output
+    cipherblock    : out std_logic_vector(127 downto 0);
+    output_context : out integer range 0 to CONTEXTS-1;
+    output_valid   : out std_logic
+);
+end aes_128_top_enc_multi;
+
+architecture rtl of aes_128_top_enc_multi is
+    constant FIFO_DEPTH : integer := 16; -- More than the loop length of any S-box architecture
+
+    type block_info_type is record
+        rnd_num : integer range 0 to 9;
+        context : integer range 0 to CONTEXTS-1;
+    end record;
+    type block_info_fifo_type is array (0 to FIFO_DEPTH-1) of block_info_type;
+
+    type round_keys_type is array (0 to CONTEXTS-1) of exp_key_type;
+    type chain_type is array (0 to CONTEXTS-1) of std_logic_vector(127 downto 0);
+
+    signal s_box_bus_in              : std_logic_vector(127 downto 0);
+    signal s_box_bus_in_valid        : std_logic;
+    signal s_box_bus_out             : std_logic_vector(127 downto 0);
+    signal s_box_bus_out_valid       : std_logic;
+
+    signal shift_rows_bus_out        : std_logic_vector(127 downto 0);
+    signal shift_rows_bus_out_valid  : std_logic;
+
+    signal mix_columns_bus_in_valid  : std_logic;
+    signal mix_columns_bus_out       : std_logic_vector(127 downto 0);
+    signal mix_columns_bus_out_valid : std_logic;
+
+    -- Blocks between the loop input and the end of shift_rows
+    signal round_fifo    : block_info_fifo_type;
+    signal round_fifo_rd : integer range 0 to FIFO_DEPTH-1;
+    signal round_fifo_wr : integer range 0 to FIFO_DEPTH-1;
+    -- Blocks between the end of shift_rows and the end of mix_columns
+    signal mix_fifo      : block_info_fifo_type;
+    signal mix_fifo_rd   : integer range 0 to FIFO_DEPTH-1;
+    signal mix_fifo_wr   : integer range 0 to FIFO_DEPTH-1;
+
+    signal round_keys    : round_keys_type;
+    signal chain         : chain_type; -- Initial vector or previous cipherblock of each context
+    signal busy          : std_logic_vector(CONTEXTS-1 downto 0); -- Context has a block in flight
+begin
+    -- A T-table round has no stages to keep other contexts in, and the masked tables only
+    -- swap banks while no block is in flight
+    assert SBOX_ARCHITECTURE = "LOOKUP" or SBOX_ARCHITECTURE = "COMB"
+        report "Error: the round loop needs a LOOKUP or COMB S-box" severity failure;
+
+    -- A block coming back from mix_columns has priority over a new one
+    input_ready <= '1' when mix_columns_bus_out_valid = '0' and busy(input_context) = '0' else '0';
+
+    -- The final round skips mix_columns
+    mix_columns_bus_in_valid <= '1' when shift_rows_bus_out_valid = '1' and round_fifo(round_fifo_rd).rnd_num /= 9 else '0';
+
+    add_round_key : process(clk)
+        variable info      : block_info_type;
+        variable block_out : std_logic_vector(127 downto 0);
+    begin
+        if rising_edge(clk) then
+            -- Reset pulses
+            output_valid <= '0';
+            s_box_bus_in_valid <= '0';
+            if reset = '1' then
+                round_fifo_rd <= 0;
+                round_fifo_wr <= 0;
+                mix_fifo_rd   <= 0;
+                mix_fifo_wr   <= 0;
+                busy          <= (others => '0');
+            else
+                if load = '1' then
+                    round_keys(load_context) <= e_key;
+                    chain(load_context)      <= init_vec;
+                end if;
+
+                -- Loop input
+                if mix_columns_bus_out_valid = '1' then
+                    info := mix_fifo(mix_fifo_rd);
+                    mix_fifo_rd <= (mix_fifo_rd + 1) mod FIFO_DEPTH;
+                    info.rnd_num := info.rnd_num + 1;
+                    s_box_bus_in       <= mix_columns_bus_out xor round_keys(info.context)(info.rnd_num);
+                    s_box_bus_in_valid <= '1'; -- Pulsed
+                    round_fifo(round_fifo_wr) <= info;
+                    round_fifo_wr <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                elsif input_valid = '1' and busy(input_context) = '0' then
+                    s_box_bus_in       <= input_bus xor chain(input_context) xor round_keys(input_context)(0);
+                    s_box_bus_in_valid <= '1'; -- Pulsed
+                    busy(input_context) <= '1';
+                    info.rnd_num := 0;
+                    info.context := input_context;
+                    round_fifo(round_fifo_wr) <= info;
+                    round_fifo_wr <= (round_fifo_wr + 1) mod FIFO_DEPTH;
+                end if;
+
+                -- End of shift_rows
+                if shift_rows_bus_out_valid = '1' then
+                    info := round_fifo(round_fifo_rd);
+                    round_fifo_rd <= (round_fifo_rd + 1) mod FIFO_DEPTH;
+                    if info.rnd_num = 9 then
+                        block_out := shift_rows_bus_out xor round_keys(info.context)(10);
+                        cipherblock    <= block_out;
+                        output_context <= info.context;
+                        output_valid   <= '1'; -- Pulsed
+                        chain(info.context) <= block_out;
+                        busy(info.context)  <= '0';
+                    else
+                        mix_fifo(mix_fifo_wr) <= info;
+                        mix_fifo_wr <= (mix_fifo_wr + 1) mod FIFO_DEPTH;
+                    end if;
+                end if;
+            end if; -- reset
+        end if; -- clk
+    end process;
+
+    sbox_lookup_gen : if SBOX_ARCHITECTURE = "LOOKUP" generate
+        s_box_inst : entity work.s_box(lookup)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => s_box_bus_in,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => s_box_bus_in_valid,   -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid   -- out std_logic
+        );
+    end generate sbox_lookup_gen;
+
+    sbox_comb_gen : if SBOX_ARCHITECTURE = "COMB" generate
+        s_box_inst : entity work.s_box(combinational)
+        generic map
+        (
+            BUS_WIDTH => 16
+        )
+        port map
+        (
+            -- Common
+            clk         => clk,                  -- in std_logic;
+            reset       => reset,                -- in std_logic;
+            -- Input
+            input_bus   => s_box_bus_in,         -- in std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            input_en    => s_box_bus_in_valid,   -- in std_logic;
+            -- Output
+            output_bus  => s_box_bus_out,        -- out std_logic_vector(BUS_WIDTH*8-1 downto 0);
+            output_en   => s_box_bus_out_valid   -- out std_logic
+        );
+    end generate sbox_comb_gen;
+
+    shift_rows_inst : entity work.shift_rows(rtl)
+    port map
+    (
+        -- Common
+        clk          => clk,                      -- in std_logic;
+        reset        => reset,                    -- in std_logic;
+        -- Input
+        input_bus    => s_box_bus_out,            -- in std_logic_vector(127 downto 0);
+        input_en     => s_box_bus_out_valid,      -- in std_logic;
+        -- Output
+        output_bus   => shift_rows_bus_out,       -- out std_logic_vector(127 downto 0);
+        output_en    => shift_rows_bus_out_valid  -- out std_logic
+    );
+
+    mix_columns_inst : entity work.mix_columns(rtl)
+    port map
+    (
+        -- Common
+        clk          => clk,                      -- in std_logic;
+        reset        => reset,                    -- in std_logic;
+        -- Input
+        input_bus    => shift_rows_bus_out,       -- in std_logic_vector(127 downto 0);
+        input_en     => mix_columns_bus_in_valid, -- in std_logic;
+        -- Output
+        output_bus   => mix_columns_bus_out,      -- out std_logic_vector(127 downto 0);
+        output_en    => mix_columns_bus_out_valid -- out std_logic
+    );
+
+end architecture rtl;
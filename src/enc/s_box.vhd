@@ -1,7 +1,8 @@
 -- © 2025 Ilya Cable <ilya.cable1@gmail.com>
 library ieee;
 use ieee.std_logic_1164.all;
-use work.aes_pkg.all; -- s_box_byte
+use ieee.numeric_std.all;
+use work.aes_pkg.all; -- s_box_byte, shift_rows_state, mix_columns_state
 
 entity s_box is
 generic
@@ -16,9 +17,17 @@ port
     -- Input
     input_bus   : in std_logic_vector(BUS_WIDTH*8-1 downto 0);
     input_en    : in std_logic;
+    -- MASKED only, see architecture masked
+    entropy     : in std_logic_vector(31 downto 0) := (others => '0'); -- Random bits for the masks, sampled every cycle
+    remask      : in std_logic := '0'; -- Pulsed: build a table with new masks in the background
+    core_idle   : in std_logic := '1'; -- No block is in flight, the table banks may swap
     -- Output
 	output_bus  : out std_logic_vector(BUS_WIDTH*8-1 downto 0);
-    output_en   : out std_logic
+    output_en   : out std_logic;
+    -- MASKED only
+    mask_in     : out std_logic_vector(BUS_WIDTH*8-1 downto 0); -- Mask of each input byte
+    mask_out    : out std_logic_vector(BUS_WIDTH*8-1 downto 0); -- Mask of each output byte
+    mask_ready  : out std_logic -- A masked table has been built since power on
 );
 end s_box;
 
@@ -89,4 +98,129 @@ gen_sbox : for i in 1 to BUS_WIDTH generate
     output_bus(i*8-1 downto i*8-8) <= affine_transform(mult_inv_outputs(i));
 end generate gen_sbox;
 
-end architecture combinational;
\ No newline at end of file
+end architecture combinational;
+
+---------------------------------------------------------------------
+-- Masked look-up table in block RAM, 1 clock cycle latency. Byte j
+-- of the bus has its own table T_j(a) = S(a xor mask_in_j) xor
+-- mask_out_j, so a lookup takes the byte masked with mask_in_j to
+-- its S-box output masked with mask_out_j, and neither the address
+-- nor the data is ever the unmasked byte.
+-- mask_in = MixColumns(ShiftRows(mask_out)), which is what shift_rows
+-- and mix_columns make of mask_out. The round key addition leaves
+-- the mask alone, so every round of a block meets the table with
+-- mask_in. The core adds mask_in to the input block and removes
+-- ShiftRows(mask_out) after the final key addition.
+-- Every table is a 512 x 8 RAM with two banks. The lookups read the
+-- active bank synchronously. Reset and remask build the other bank
+-- through the second port with a new mask_out taken from entropy
+-- (after reset, once 4 words have been sampled into the pool),
+-- one entry of every table per clock cycle (256 cycles), and the
+-- banks swap on the first cycle after that with core_idle = '1', so
+-- a block uses one set of masks from input to output and traffic
+-- never waits for a build. A remask during a build starts the next
+-- build after the swap. mask_ready rises with the first swap after
+-- power on; no block may start before it.
+---------------------------------------------------------------------
+architecture masked of s_box is
+    type mask_array_type is array (0 to 1) of std_logic_vector(BUS_WIDTH*8-1 downto 0);
+    type build_state_type is (idle, building, built);
+
+    signal pool          : std_logic_vector(127 downto 0) := (others => '0'); -- Last 128 bits of entropy
+    signal bank_mask_in  : mask_array_type := (others => (others => '0'));
+    signal bank_mask_out : mask_array_type := (others => (others => '0'));
+    signal active        : integer range 0 to 1 := 0; -- Bank read by the lookups
+    signal build_state   : build_state_type := idle;
+    signal pending       : std_logic := '0'; -- remask during a build, or reset
+    signal fill          : integer range 0 to 4 := 0; -- Entropy words in pool since reset
+    signal build_addr    : unsigned(7 downto 0) := (others => '0'); -- Unmasked S-box input written next
+    signal build_data    : std_logic_vector(7 downto 0);
+    signal ready         : std_logic := '0';
+
+    attribute ram_style : string;
+begin
+    -- The masks follow the bytes through the rows and columns of the state
+    assert BUS_WIDTH = 16
+        report "Error: BUS_WIDTH setting was invalid" severity failure;
+
+    mask_in    <= bank_mask_in(active);
+    mask_out   <= bank_mask_out(active);
+    mask_ready <= ready;
+
+    build_data <= s_box_byte(std_logic_vector(build_addr));
+
+build_proc : process(clk)
+begin
+    if rising_edge(clk) then
+        pool <= pool(95 downto 0) & entropy; -- All 128 bits are new every 4 cycles
+        if fill < 4 then
+            fill <= fill + 1;
+        end if;
+        if reset = '1' then
+            -- Keeps the active bank, its masks are still unknown outside the core. The build
+            -- waits for a pool of new entropy, the one at power on is all zeros
+            fill        <= 0;
+            pending     <= '1';
+            build_state <= idle;
+        elsif build_state = idle and (remask = '1' or pending = '1') and fill = 4 then
+            bank_mask_out(1 - active) <= pool;
+            bank_mask_in(1 - active)  <= mix_columns_state(shift_rows_state(pool));
+            build_addr  <= (others => '0');
+            build_state <= building;
+            pending     <= '0';
+        else
+            if remask = '1' then
+                pending <= '1';
+            end if;
+            case build_state is
+                ------------------------------
+                when building =>
+                    if build_addr = 255 then
+                        build_state <= built;
+                    end if;
+                    build_addr <= build_addr + 1;
+                ------------------------------
+                when built =>
+                    if core_idle = '1' then
+                        active      <= 1 - active; -- Swap, the next block reads the new bank
+                        ready       <= '1';
+                        build_state <= idle;
+                    end if;
+                ------------------------------
+                when others => null; -- Idle
+                ------------------------------
+            end case;
+        end if;
+    end if;
+end process;
+
+ctrl_proc : process(clk)
+begin
+    if rising_edge(clk) then
+        output_en <= '0'; -- Reset pulse
+        if input_en = '1' then
+            output_en <= '1'; -- Pulsed
+        end if;
+    end if;
+end process;
+
+gen_sbox : for i in 1 to BUS_WIDTH generate
+    signal table : masked_table_type;
+    attribute ram_style of table : signal is "block";
+begin
+    -- Simple dual port RAM: the build writes the inactive bank, the lookups read the active one
+    ram_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if build_state = building then
+                table(256*(1 - active) + to_integer(build_addr xor unsigned(bank_mask_in(1 - active)(i*8-1 downto i*8-8)))) <=
+                    build_data xor bank_mask_out(1 - active)(i*8-1 downto i*8-8);
+            end if;
+            if input_en = '1' then
+                output_bus(i*8-1 downto i*8-8) <= table(256*active + to_integer(unsigned(input_bus(i*8-1 downto i*8-8))));
+            end if;
+        end if;
+    end process;
+end generate gen_sbox;
+
+end architecture masked;
\ No newline at end of file
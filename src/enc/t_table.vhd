@@ -0,0 +1,71 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: SubBytes, ShiftRows and MixColumns of one round as
+--              16 lookups into a 256 x 32-bit T-table (gen_t_table
+--              in aes_pkg), one per state byte, XORed four per
+--              column. The lookups are synchronous reads, registered
+--              on the clock edge after input_bus, so the state
+--              register that drives input_bus is the address register
+--              and the table maps to block RAM (two lookups per dual
+--              port block). The outputs follow one cycle after
+--              input_bus. The final round skips MixColumns and takes
+--              the S-box byte out of the same table entries
+--              (final_bus).
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.aes_pkg.all; -- gen_t_table, ror_bytes
+
+entity t_table is
+port
+(
+    -- Common
+    clk         : in std_logic;
+    reset       : in std_logic;
+    -- Input
+    input_bus   : in std_logic_vector(127 downto 0);
+    input_en    : in std_logic;
+    -- Output, one clock cycle after input_bus
+    output_bus  : out std_logic_vector(127 downto 0); -- mix_columns(shift_rows(s_box(input_bus)))
+    final_bus   : out std_logic_vector(127 downto 0); -- shift_rows(s_box(input_bus)), final round
+    output_en   : out std_logic
+);
+end t_table;
+
+architecture rtl of t_table is
+    constant TABLE : t_table_type := gen_t_table;
+
+    type entry_array is array (0 to 15) of std_logic_vector(31 downto 0);
+    signal entries : entry_array; -- Table entry of each output byte
+begin
+
+    -- Output byte (row r, column c) comes from input row r, column c + r (shift_rows)
+    lookup_gen : for i in 0 to 15 generate
+        constant SRC : integer := 4*((i/4 + i mod 4) mod 4) + i mod 4;
+    begin
+        lookup_proc : process(clk)
+        begin
+            if rising_edge(clk) then
+                entries(i) <= TABLE(to_integer(unsigned(input_bus(127 - 8*SRC downto 120 - 8*SRC))));
+            end if;
+        end process;
+
+        final_bus(127 - 8*i downto 120 - 8*i) <= entries(i)(23 downto 16); -- 1 x s_box_byte
+    end generate lookup_gen;
+
+    -- Row r of every column uses the table rotated by r bytes
+    column_gen : for c in 0 to 3 generate
+        output_bus(127 - 32*c downto 96 - 32*c) <= entries(4*c)               xor ror_bytes(entries(4*c + 1), 1) xor
+                                                   ror_bytes(entries(4*c + 2), 2) xor ror_bytes(entries(4*c + 3), 3);
+    end generate column_gen;
+
+    ctrl_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            output_en <= input_en; -- Pulsed with input_en
+        end if;
+    end process;
+
+end architecture rtl;
@@ -0,0 +1,197 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Simulation-only harness around aes_128_top_wrapper. A
+--              rising run reads STIMULUS_FILE, drives every command on
+--              the 32-bit bus with the handshakes of BUS_MODE and its
+--              own clock and writes RESPONSE_FILE. finished is then
+--              held until run falls, so a testbench crosses into the
+--              simulator once per file, not once per cycle.
+--
+--              Stimulus, one command per line:
+--                R          Reset
+--                S          Reset and switch to decryption mode
+--                W <word>   Transmit a word (8 hex digits)
+--                T <block>  Transmit a block as 4 words (32 hex digits)
+--                O          Receive a block
+--              Response, one line per O:
+--                <block> <cycle>   cycle: rising edges since run
+--              start stays high across consecutive W and T commands,
+--              so they form one burst. A word is held until done
+--              follows it (FIFO_DEPTH, ingress FIFO full).
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.std_logic_textio.all;
+use std.textio.all;
+
+entity aes_128_top_wrapper_harness is
+generic
+(
+    STIMULUS_FILE     : string; -- Read on every rising run
+    RESPONSE_FILE     : string; -- Rewritten on every rising run
+    CLK_PERIOD        : time := 8 ns;
+    TIMEOUT_CYCLES    : positive := 1000; -- Cycles a word may wait before the run fails
+    SBOX_ARCHITECTURE : string := "LOOKUP";
+    BUS_MODE          : string := "HANDSHAKE";
+    WORDS_PER_CYCLE   : positive := 1;
+    DUPLEX            : boolean := false;
+    FIFO_DEPTH        : natural := 0
+);
+port
+(
+    run      : in std_logic;  -- Rising: run the stimulus file
+    finished : out std_logic  -- The response file is complete, held until run falls
+);
+end aes_128_top_wrapper_harness;
+
+architecture sim of aes_128_top_wrapper_harness is
+    signal clk       : std_logic := '0';
+    signal reset     : std_logic := '0';
+    signal running   : std_logic := '0';
+    signal cycle     : natural := 0;
+
+    signal start     : std_logic := '0';
+    signal send_auth : std_logic := '0';
+    signal done      : std_logic;
+    signal data_bus  : std_logic_vector(31 downto 0) := (others => 'Z');
+begin
+    clk <= not clk after CLK_PERIOD/2;
+
+    cycle_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if running = '0' then
+                cycle <= 0;
+            else
+                cycle <= cycle + 1;
+            end if;
+        end if; -- clk
+    end process cycle_proc;
+
+    sequencer_proc : process
+        file stimulus     : text;
+        file response     : text;
+        variable line_in  : line;
+        variable line_out : line;
+        variable command  : character;
+        variable word     : std_logic_vector(31 downto 0);
+        variable value    : std_logic_vector(127 downto 0);
+        variable waited   : natural;
+
+        -- Drives bus_word from this falling edge until a falling edge sees done
+        procedure transmit(bus_word : in std_logic_vector(31 downto 0)) is
+        begin
+            data_bus <= bus_word;
+            start    <= '1';
+            waited   := 0;
+            loop
+                wait until falling_edge(clk);
+                exit when done = '1';
+                waited := waited + 1;
+                assert waited < TIMEOUT_CYCLES
+                    report "Error: word not taken within TIMEOUT_CYCLES" severity failure;
+            end loop;
+        end procedure transmit;
+    begin
+        finished <= '0';
+        wait until run = '1';
+        file_open(stimulus, STIMULUS_FILE, read_mode);
+        file_open(response, RESPONSE_FILE, write_mode);
+        running <= '1';
+        wait until falling_edge(clk);
+
+        while not endfile(stimulus) loop
+            readline(stimulus, line_in);
+            next when line_in'length = 0;
+            read(line_in, command);
+            if command /= 'W' and command /= 'T' then
+                -- End of a burst
+                start    <= '0';
+                data_bus <= (others => 'Z');
+            end if;
+            case command is
+                when 'R' | 'S' =>
+                    reset <= '1';
+                    wait until falling_edge(clk);
+                    reset <= '0';
+                    wait until falling_edge(clk);
+                    if command = 'S' then
+                        -- start and send_auth for 5 clock cycles
+                        start     <= '1';
+                        send_auth <= '1';
+                        for i in 1 to 5 loop
+                            wait until falling_edge(clk);
+                        end loop;
+                        start     <= '0';
+                        send_auth <= '0';
+                        wait until falling_edge(clk);
+                    end if;
+                when 'W' =>
+                    hread(line_in, word);
+                    transmit(word);
+                when 'T' =>
+                    hread(line_in, value);
+                    for i in 3 downto 0 loop
+                        transmit(value(32*i+31 downto 32*i));
+                    end loop;
+                when 'O' =>
+                    -- A word with done at a falling edge is taken on the next rising
+                    -- edge: with send_auth in STREAM mode, with start and send_auth in
+                    -- HANDSHAKE mode, where the wrapper then presents the next word
+                    send_auth <= '1';
+                    waited := 0;
+                    for i in 3 downto 0 loop
+                        loop
+                            wait until falling_edge(clk);
+                            exit when done = '1';
+                            waited := waited + 1;
+                            assert waited < TIMEOUT_CYCLES
+                                report "Error: no output within TIMEOUT_CYCLES" severity failure;
+                        end loop;
+                        value(32*i+31 downto 32*i) := data_bus;
+                        if BUS_MODE /= "STREAM" then
+                            start <= '1';
+                        end if;
+                    end loop;
+                    wait until falling_edge(clk);
+                    start     <= '0';
+                    send_auth <= '0';
+                    hwrite(line_out, value);
+                    write(line_out, ' ');
+                    write(line_out, cycle);
+                    writeline(response, line_out);
+                when others =>
+                    report "Error: unknown stimulus command " & command severity failure;
+            end case;
+        end loop;
+
+        file_close(stimulus);
+        file_close(response);
+        start    <= '0';
+        data_bus <= (others => 'Z');
+        running  <= '0';
+        finished <= '1';
+        wait until run = '0';
+    end process sequencer_proc;
+
+    dut_inst : entity work.aes_128_top_wrapper(rtl)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            BUS_MODE          => BUS_MODE,
+            WORDS_PER_CYCLE   => WORDS_PER_CYCLE,
+            DUPLEX            => DUPLEX,
+            FIFO_DEPTH        => FIFO_DEPTH
+        )
+        port map
+        (
+            clk       => clk,
+            reset     => reset,
+            start     => start,
+            send_auth => send_auth,
+            done      => done,
+            data_bus  => data_bus
+        );
+
+end architecture sim;
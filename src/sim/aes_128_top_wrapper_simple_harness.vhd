@@ -0,0 +1,181 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Simulation-only harness around aes_128_top_wrapper_simple
+--              (MODE = "ENC_DEC"). A rising run reads STIMULUS_FILE,
+--              drives every command through the start/done interfaces
+--              with its own clock and writes RESPONSE_FILE. finished
+--              is then held until run falls, so a testbench crosses
+--              into the simulator once per file, not once per cycle.
+--
+--              Stimulus, one command per line:
+--                R                           Reset both interfaces
+--                E|D <s> <iv> <key> <data>   One block on the enc or dec
+--                                            interface. s = 1 starts a
+--                                            session (new_session and
+--                                            key_load) with iv and key
+--              Response, one line per block:
+--                <output> <cycle>            cycle: rising edges since run
+--              Values are 32 hex digits. A block starts on the falling
+--              edge after done_* of the one before.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.std_logic_textio.all;
+use std.textio.all;
+
+entity aes_128_top_wrapper_simple_harness is
+generic
+(
+    STIMULUS_FILE     : string; -- Read on every rising run
+    RESPONSE_FILE     : string; -- Rewritten on every rising run
+    CLK_PERIOD        : time := 8 ns;
+    TIMEOUT_CYCLES    : positive := 1000; -- Cycles a block may take before the run fails
+    SBOX_ARCHITECTURE : string := "LOOKUP";
+    KEY_SLOTS         : natural := 0;
+    WORDS_PER_CYCLE   : positive := 1;
+    KEY_SCHEDULE      : string := "STORED"
+);
+port
+(
+    run      : in std_logic;  -- Rising: run the stimulus file
+    finished : out std_logic  -- The response file is complete, held until run falls
+);
+end aes_128_top_wrapper_simple_harness;
+
+architecture sim of aes_128_top_wrapper_simple_harness is
+    -- Index 0 is the encryption interface, 1 the decryption interface
+    type block_pair_type is array (0 to 1) of std_logic_vector(127 downto 0);
+
+    signal clk         : std_logic := '0';
+    signal reset       : std_logic := '0';
+    signal running     : std_logic := '0';
+    signal cycle       : natural := 0;
+
+    signal init_vec    : block_pair_type := (others => (others => '0'));
+    signal key         : block_pair_type := (others => (others => '0'));
+    signal data_in     : block_pair_type := (others => (others => '0'));
+    signal data_out    : block_pair_type;
+    signal start       : std_logic_vector(0 to 1) := (others => '0');
+    signal done        : std_logic_vector(0 to 1);
+    signal new_session : std_logic_vector(0 to 1) := (others => '0');
+    signal key_load    : std_logic_vector(0 to 1) := (others => '0');
+begin
+    clk <= not clk after CLK_PERIOD/2;
+
+    cycle_proc : process(clk)
+    begin
+        if rising_edge(clk) then
+            if running = '0' then
+                cycle <= 0;
+            else
+                cycle <= cycle + 1;
+            end if;
+        end if; -- clk
+    end process cycle_proc;
+
+    sequencer_proc : process
+        file stimulus     : text;
+        file response     : text;
+        variable line_in  : line;
+        variable line_out : line;
+        variable command  : character;
+        variable session  : integer;
+        variable ix       : integer range 0 to 1;
+        variable value    : std_logic_vector(127 downto 0);
+    begin
+        finished <= '0';
+        wait until run = '1';
+        file_open(stimulus, STIMULUS_FILE, read_mode);
+        file_open(response, RESPONSE_FILE, write_mode);
+        running <= '1';
+        wait until falling_edge(clk);
+
+        while not endfile(stimulus) loop
+            readline(stimulus, line_in);
+            next when line_in'length = 0;
+            read(line_in, command);
+            case command is
+                when 'R' =>
+                    reset <= '1';
+                    wait until falling_edge(clk);
+                    reset <= '0';
+                    wait until falling_edge(clk);
+                when 'E' | 'D' =>
+                    if command = 'E' then
+                        ix := 0;
+                    else
+                        ix := 1;
+                    end if;
+                    read(line_in, session);
+                    hread(line_in, value);
+                    init_vec(ix) <= value;
+                    hread(line_in, value);
+                    key(ix) <= value;
+                    hread(line_in, value);
+                    data_in(ix) <= value;
+                    if session = 1 then
+                        new_session(ix) <= '1';
+                        key_load(ix)    <= '1';
+                    end if;
+                    start(ix) <= '1';
+                    wait until rising_edge(clk);
+                    start(ix)       <= '0';
+                    new_session(ix) <= '0';
+                    key_load(ix)    <= '0';
+                    -- done_* falls on the edge that takes start and rises with the output
+                    wait until done(ix) = '1' for TIMEOUT_CYCLES*CLK_PERIOD;
+                    assert done(ix) = '1'
+                        report "Error: no done_* within TIMEOUT_CYCLES of start" severity failure;
+                    wait until falling_edge(clk);
+                    hwrite(line_out, data_out(ix));
+                    write(line_out, ' ');
+                    write(line_out, cycle);
+                    writeline(response, line_out);
+                when others =>
+                    report "Error: unknown stimulus command " & command severity failure;
+            end case;
+        end loop;
+
+        file_close(stimulus);
+        file_close(response);
+        running  <= '0';
+        finished <= '1';
+        wait until run = '0';
+    end process sequencer_proc;
+
+    dut_inst : entity work.aes_128_top_wrapper_simple(rtl)
+        generic map
+        (
+            MODE              => "ENC_DEC",
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+            KEY_SLOTS         => KEY_SLOTS,
+            WORDS_PER_CYCLE   => WORDS_PER_CYCLE,
+            KEY_SCHEDULE      => KEY_SCHEDULE
+        )
+        port map
+        (
+            clk             => clk,
+            reset_enc       => reset,
+            reset_dec       => reset,
+
+            init_vec_enc    => init_vec(0),
+            key_enc         => key(0),
+            plaintext_enc   => data_in(0),
+            cipherblock_enc => data_out(0),
+            start_enc       => start(0),
+            done_enc        => done(0),
+            key_load_enc    => key_load(0),
+            new_session_enc => new_session(0),
+
+            init_vec_dec    => init_vec(1),
+            key_dec         => key(1),
+            cipherblock_dec => data_in(1),
+            plaintext_dec   => data_out(1),
+            start_dec       => start(1),
+            done_dec        => done(1),
+            key_load_dec    => key_load(1),
+            new_session_dec => new_session(1)
+        );
+
+end architecture sim;
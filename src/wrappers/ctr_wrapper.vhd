@@ -0,0 +1,207 @@
+---------------------------------------------------------------------
+-- © 2025 Ilya Cable <ilya.cable1@gmail.com>
+--
+-- Description: Wraps counter mode encryption/control logic.
+---------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use work.aes_pkg.all;
+
+entity ctr_wrapper is
+generic
+(
+    SBOX_ARCHITECTURE : string; -- LOOKUP, COMB, TTABLE (UNROLLED only)
+    KEY_SLOTS         : natural := 0; -- Expanded keys to cache, 0 for none
+    WORDS_PER_CYCLE   : positive := 1; -- Key schedule words derived per cycle: 1, 2 or 4
+    ROUND_ARCHITECTURE : string := "ITERATIVE"; -- ITERATIVE (round loop), UNROLLED
+    PERF_COUNTERS     : boolean := false -- Count blocks, key expansions, FSM state and stall cycles
+);
+port
+(
+    clk       : in std_logic;
+    reset     : in std_logic;
+
+    init_vec    : in std_logic_vector(127 downto 0); -- Initial counter block
+    key         : in std_logic_vector(127 downto 0);
+    data_in     : in std_logic_vector(127 downto 0);
+    data_out    : out std_logic_vector(127 downto 0);
+    start       : in std_logic;
+    done        : out std_logic;
+    ready       : out std_logic; -- start is accepted this cycle
+
+    -- Key cache, sampled with start
+    key_slot    : in std_logic_vector(7 downto 0) := (others => '0');
+    key_load    : in std_logic := '0';
+    new_session : in std_logic := '0';
+
+    -- Performance counters (PERF_COUNTERS = true), PERF_* in aes_pkg
+    perf_select : in std_logic_vector(2 downto 0) := (others => '0');
+    perf_clear  : in std_logic := '0';
+    perf_count  : out std_logic_vector(31 downto 0) -- Counter perf_select
+);
+end ctr_wrapper;
+
+architecture rtl of ctr_wrapper is
+    signal expansion_done     : std_logic;
+    signal crypt_output_valid : std_logic;
+    signal key_valid          : std_logic;
+    signal iv_valid           : std_logic;
+    signal start_crypt        : std_logic;
+    signal e_key              : exp_key_type;
+    signal e_key_expanded     : exp_key_type;
+    signal key_cached         : std_logic;
+    signal key_select         : std_logic;
+    signal perf_state         : std_logic_vector(4 downto 0);
+    signal stalled            : std_logic;
+    signal perf_events        : std_logic_vector(NUM_PERF_COUNTERS-1 downto 0);
+    signal crypt_ready        : std_logic;
+
+begin
+    control_inst : entity work.stream_control(rtl)
+    port map
+    (
+        clk   => clk,
+        reset => reset,
+
+        -- Input
+        start              => start,
+        expansion_done     => expansion_done,
+        crypt_ready        => crypt_ready,
+        crypt_output_valid => crypt_output_valid,
+        new_session        => new_session,
+        key_load           => key_load,
+        key_cached         => key_cached,
+
+        -- Output
+        ready              => ready,
+        key_valid          => key_valid,
+        key_select         => key_select,
+        start_crypt        => start_crypt,
+        iv_valid           => iv_valid,
+        done               => done,
+
+        -- Performance counter events
+        perf_state         => perf_state,
+        stalled            => stalled
+    );
+
+    loop_gen : if ROUND_ARCHITECTURE /= "UNROLLED" generate
+        ctr_inst : entity work.aes_128_top_ctr(rtl)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+        )
+        port map
+        (
+            -- Common
+            clk              => clk,
+            reset            => reset,
+            -- Input
+            input_bus        => data_in,
+            e_key            => e_key,
+            init_vec         => init_vec,
+            init_vec_valid   => iv_valid,
+            input_valid      => start_crypt,
+            -- Output
+            output_bus       => data_out,
+            output_valid     => crypt_output_valid,
+            input_ready      => crypt_ready
+        );
+    end generate loop_gen;
+
+    unrolled_gen : if ROUND_ARCHITECTURE = "UNROLLED" generate
+        ctr_inst : entity work.aes_128_top_ctr(unrolled)
+        generic map
+        (
+            SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+        )
+        port map
+        (
+            -- Common
+            clk              => clk,
+            reset            => reset,
+            -- Input
+            input_bus        => data_in,
+            e_key            => e_key,
+            init_vec         => init_vec,
+            init_vec_valid   => iv_valid,
+            input_valid      => start_crypt,
+            -- Output
+            output_bus       => data_out,
+            output_valid     => crypt_output_valid,
+            input_ready      => crypt_ready
+        );
+    end generate unrolled_gen;
+
+    key_expansion_inst : entity work.key_expansion(rtl)
+    generic map
+    (
+        WORDS_PER_CYCLE => WORDS_PER_CYCLE
+    )
+    port map
+    (
+        -- Common
+        clk             => clk,
+        reset           => reset,
+        -- Input
+        key             => key,
+        input_en        => key_valid,
+        -- Output
+        e_key           => e_key_expanded,
+        expansion_done  => expansion_done
+    );
+
+    key_cache_gen : if KEY_SLOTS > 0 generate
+        key_cache_inst : entity work.key_cache(rtl)
+        generic map
+        (
+            KEY_SLOTS => KEY_SLOTS
+        )
+        port map
+        (
+            -- Common
+            clk            => clk,
+            reset          => reset,
+            -- Input
+            slot           => key_slot,
+            load           => key_valid,
+            use_slot       => key_select,
+            e_key_in       => e_key_expanded,
+            expansion_done => expansion_done,
+            -- Output
+            e_key          => e_key,
+            slot_valid     => key_cached
+        );
+    end generate key_cache_gen;
+
+    no_key_cache_gen : if KEY_SLOTS = 0 generate
+        e_key      <= e_key_expanded;
+        key_cached <= '0';
+    end generate no_key_cache_gen;
+
+    perf_gen : if PERF_COUNTERS generate
+        perf_events(PERF_BLOCKS)         <= crypt_output_valid;
+        perf_events(PERF_KEY_EXPANSIONS) <= key_valid;
+        perf_events(PERF_WAIT_FOR_IN_DATA downto PERF_IDLE) <= perf_state;
+        perf_events(PERF_BUS_WAIT)       <= stalled;
+
+        perf_inst : entity work.perf_counters(rtl)
+        port map
+        (
+            clk    => clk,
+            reset  => reset,
+            -- Input
+            clear  => perf_clear,
+            events => perf_events,
+            sel    => perf_select,
+            -- Output
+            count  => perf_count,
+            counts => open
+        );
+    end generate perf_gen;
+
+    no_perf_gen : if not PERF_COUNTERS generate
+        perf_count <= (others => '0');
+    end generate no_perf_gen;
+
+end architecture rtl;
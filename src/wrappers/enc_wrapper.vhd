@@ -10,7 +10,11 @@ use work.aes_pkg.all;
 entity enc_wrapper is
 generic
 (
-    SBOX_ARCHITECTURE : string -- LOOKUP, COMB, MASKED
+    SBOX_ARCHITECTURE : string; -- LOOKUP, COMB, TTABLE, MASKED
+    KEY_SLOTS         : natural := 0; -- Expanded keys to cache, 0 for none
+    WORDS_PER_CYCLE   : positive := 1; -- Key schedule words derived per cycle: 1, 2 or 4
+    KEY_SCHEDULE      : string := "STORED"; -- STORED, ON_THE_FLY (KEY_SLOTS = 0 only)
+    PERF_COUNTERS     : boolean := false -- Count blocks, key expansions, FSM state and stall cycles
 );
 port 
 (
@@ -22,7 +26,20 @@ port
     plaintext   : in std_logic_vector(127 downto 0);        
     cipherblock : out std_logic_vector(127 downto 0);          
     start       : in std_logic;    
-    done        : out std_logic
+    done        : out std_logic;
+
+    -- Key cache, sampled with start
+    key_slot    : in std_logic_vector(7 downto 0) := (others => '0');
+    key_load    : in std_logic := '0';
+    new_session : in std_logic := '0';
+
+    -- MASKED: random bits for the S-box masks, sampled every cycle
+    entropy     : in std_logic_vector(31 downto 0) := (others => '0');
+
+    -- Performance counters (PERF_COUNTERS = true), PERF_* in aes_pkg
+    perf_select : in std_logic_vector(2 downto 0) := (others => '0');
+    perf_clear  : in std_logic := '0';
+    perf_count  : out std_logic_vector(31 downto 0) -- Counter perf_select
 );
 end enc_wrapper;
 
@@ -33,6 +50,15 @@ architecture rtl of enc_wrapper is
     signal iv_valid           : std_logic;
     signal start_crypt        : std_logic;
     signal e_key              : exp_key_type;
+    signal e_key_expanded     : exp_key_type;
+    signal key_cached         : std_logic;
+    signal round_key          : std_logic_vector(127 downto 0);
+    signal round_key_next     : std_logic;
+    signal key_select         : std_logic;
+    signal perf_state         : std_logic_vector(4 downto 0);
+    signal stalled            : std_logic;
+    signal perf_events        : std_logic_vector(NUM_PERF_COUNTERS-1 downto 0);
+    signal crypt_ready        : std_logic;
 
 begin
     control_inst : entity work.control_fsm(rtl)
@@ -45,32 +71,101 @@ begin
         start              => start,  
         expansion_done     => expansion_done,       
         crypt_output_valid => crypt_output_valid,
+        new_session        => new_session,
+        key_load           => key_load,
+        key_cached         => key_cached,
+        crypt_ready        => crypt_ready,
 
         -- Output
         key_valid          => key_valid,       
+        key_select         => key_select,
         start_crypt        => start_crypt,
         iv_valid           => iv_valid,
-        done               => done 
-    );
+        done               => done,
 
-    key_expansion_inst : entity work.key_expansion(rtl)
-    port map
-    (
-        -- Common
-        clk             => clk,              
-        reset           => reset,            
-        -- Input
-        key             => key,        
-        input_en        => key_valid,  
-        -- Output
-        e_key           => e_key,            
-        expansion_done  => expansion_done    
+        -- Performance counter events
+        perf_state         => perf_state,
+        stalled            => stalled
     );
 
+    stored_schedule_gen : if KEY_SCHEDULE = "STORED" generate
+        key_expansion_inst : entity work.key_expansion(rtl)
+        generic map
+        (
+            WORDS_PER_CYCLE => WORDS_PER_CYCLE
+        )
+        port map
+        (
+            -- Common
+            clk             => clk,              
+            reset           => reset,            
+            -- Input
+            key             => key,        
+            input_en        => key_valid,  
+            -- Output
+            e_key           => e_key_expanded,            
+            expansion_done  => expansion_done    
+        );
+
+        round_key <= (others => '0'); -- Unused
+    end generate stored_schedule_gen;
+
+    on_the_fly_schedule_gen : if KEY_SCHEDULE = "ON_THE_FLY" generate
+        round_key_gen_inst : entity work.round_key_gen(rtl)
+        generic map
+        (
+            INVERSE => false
+        )
+        port map
+        (
+            -- Common
+            clk             => clk,
+            reset           => reset,
+            -- Input
+            key             => key,
+            input_en        => key_valid,
+            next_key        => round_key_next,
+            -- Output
+            round_key       => round_key,
+            expansion_done  => expansion_done
+        );
+
+        e_key_expanded <= (others => (others => '0')); -- Unused
+    end generate on_the_fly_schedule_gen;
+
+    key_cache_gen : if KEY_SLOTS > 0 generate
+        key_cache_inst : entity work.key_cache(rtl)
+        generic map
+        (
+            KEY_SLOTS => KEY_SLOTS
+        )
+        port map
+        (
+            -- Common
+            clk            => clk,
+            reset          => reset,
+            -- Input
+            slot           => key_slot,
+            load           => key_valid,
+            use_slot       => key_select,
+            e_key_in       => e_key_expanded,
+            expansion_done => expansion_done,
+            -- Output
+            e_key          => e_key,
+            slot_valid     => key_cached
+        );
+    end generate key_cache_gen;
+
+    no_key_cache_gen : if KEY_SLOTS = 0 generate
+        e_key      <= e_key_expanded;
+        key_cached <= '0';
+    end generate no_key_cache_gen;
+
     encryption_core : entity work.aes_128_top_enc(rtl)
     generic map
     (
-        SBOX_ARCHITECTURE => SBOX_ARCHITECTURE
+        SBOX_ARCHITECTURE => SBOX_ARCHITECTURE,
+        KEY_SCHEDULE      => KEY_SCHEDULE
     )
     port map
     (
@@ -80,12 +175,41 @@ begin
         -- Input
         input_bus        => plaintext,      
         e_key            => e_key,              
+        round_key        => round_key,
         init_vec         => init_vec,           
         init_vec_valid   => iv_valid, 
         input_valid      => start_crypt,    
+        entropy          => entropy,
         -- Output
         cipherblock      => cipherblock,      
-        output_valid     => crypt_output_valid    
+        output_valid     => crypt_output_valid,
+        input_ready      => crypt_ready,
+        round_key_next   => round_key_next
     );
 
+    perf_gen : if PERF_COUNTERS generate
+        perf_events(PERF_BLOCKS)         <= crypt_output_valid;
+        perf_events(PERF_KEY_EXPANSIONS) <= key_valid;
+        perf_events(PERF_WAIT_FOR_IN_DATA downto PERF_IDLE) <= perf_state;
+        perf_events(PERF_BUS_WAIT)       <= stalled;
+
+        perf_inst : entity work.perf_counters(rtl)
+        port map
+        (
+            clk    => clk,
+            reset  => reset,
+            -- Input
+            clear  => perf_clear,
+            events => perf_events,
+            sel    => perf_select,
+            -- Output
+            count  => perf_count,
+            counts => open
+        );
+    end generate perf_gen;
+
+    no_perf_gen : if not PERF_COUNTERS generate
+        perf_count <= (others => '0');
+    end generate no_perf_gen;
+
 end architecture rtl;
\ No newline at end of file
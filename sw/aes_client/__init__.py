@@ -0,0 +1,17 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Host-side streaming client for the AES-128 engine.
+
+    client = AESClient(LoopbackTransport())
+    async for chunk in client.encrypt(open("data.bin", "rb"), init_vec, key):
+        ...
+
+The cocotb transport is in aes_client.cocotb_transport, so the package does not
+depend on cocotb.
+"""
+from .client import AESClient
+from .loopback import LoopbackTransport
+from .service import ServiceClient
+from .stream import BLOCK_SIZE, iter_blocks, unpad_block
+from .tlm import BusTLM, SimpleTLM, VirtualTransport
+from .transport import Transport
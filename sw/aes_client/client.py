@@ -0,0 +1,95 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Streaming encryption/decryption on top of a Transport.
+
+Input is framed into blocks without copying, up to transport.depth blocks are kept in
+flight, and output is collected into one reused buffer of chunk_size bytes that is
+yielded whenever it is full. Memory use does not depend on the length of the payload.
+"""
+from .stream import BLOCK_SIZE, iter_blocks, unpad_block
+from .transport import DIRECTIONS
+
+class AESClient():
+    def __init__(self, transport, chunk_size:int = 64*1024):
+        if chunk_size < 2*BLOCK_SIZE or chunk_size % BLOCK_SIZE:
+            raise ValueError("chunk_size must be a multiple of 16 bytes and at least 32 bytes")
+        self.transport  = transport
+        self.chunk_size = chunk_size
+
+    def encrypt(self, source, init_vec:int, key:int, padding:bool = True):
+        """
+        Async iterator over the ciphertext of source (a binary file object or an iterable
+        of bytes-like chunks). With padding=True PKCS7 padding is added. Every yielded
+        memoryview is only valid until the next one is requested.
+        """
+        return self.process("enc", source, init_vec, key, padding)
+
+    def decrypt(self, source, init_vec:int, key:int, padding:bool = True):
+        """
+        Async iterator over the plaintext of source. With padding=True the PKCS7 padding
+        of the last block is checked and removed.
+        """
+        return self.process("dec", source, init_vec, key, padding)
+
+    async def encrypt_file(self, source, destination, init_vec:int, key:int, padding:bool = True) -> int:
+        """
+        Encrypts source into the binary file object destination. Returns the bytes written.
+        """
+        return await self._write(self.encrypt(source, init_vec, key, padding), destination)
+
+    async def decrypt_file(self, source, destination, init_vec:int, key:int, padding:bool = True) -> int:
+        """
+        Decrypts source into the binary file object destination. Returns the bytes written.
+        """
+        return await self._write(self.decrypt(source, init_vec, key, padding), destination)
+
+    async def _write(self, chunks, destination) -> int:
+        written = 0
+        async for chunk in chunks:
+            destination.write(chunk)
+            written += len(chunk)
+        return written
+
+    async def process(self, direction:str, source, init_vec:int, key:int, padding:bool = True):
+        """
+        Streams source through the "enc" or "dec" interface. See encrypt() and decrypt().
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        transport = self.transport
+        # The last decrypted block is held back until the end of the input is known
+        unpad = padding and direction == "dec"
+        output = bytearray(self.chunk_size)
+        view = memoryview(output)
+        filled = 0
+        in_flight = 0
+
+        await transport.open(direction, init_vec, key)
+        blocks = iter_blocks(source, self.chunk_size, pad=padding and direction == "enc")
+        while True:
+            block = next(blocks, None)
+            if block is None and in_flight == 0:
+                break
+            if block is None or in_flight == transport.depth:
+                await transport.receive(view[filled:filled+BLOCK_SIZE])
+                filled += BLOCK_SIZE
+                in_flight -= 1
+                if filled == len(output):
+                    if unpad:
+                        yield view[:filled-BLOCK_SIZE]
+                        output[:BLOCK_SIZE] = view[filled-BLOCK_SIZE:filled]
+                        filled = BLOCK_SIZE
+                    else:
+                        yield view
+                        filled = 0
+            if block is not None:
+                await transport.send(block)
+                in_flight += 1
+
+        if unpad:
+            if filled == 0:
+                raise ValueError("Padded data must not be empty")
+            yield view[:filled-BLOCK_SIZE]
+            yield unpad_block(view[filled-BLOCK_SIZE:filled])
+        elif filled:
+            yield view[:filled]
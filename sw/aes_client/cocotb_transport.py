@@ -0,0 +1,81 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Transport for one interface of aes_128_top_wrapper_simple in a cocotb simulation. Use
+it from a cocotb test; it is not imported by the package.
+"""
+import cocotb
+from cocotb.queue import Queue
+from cocotb.triggers import FallingEdge, ReadOnly, RisingEdge
+
+from .transport import DIRECTIONS, Transport
+
+class CocotbTransport(Transport):
+    """
+    With pipelined=False the start/done protocol is used, one block at a time. With
+    pipelined=True (ROUND_ARCHITECTURE = "PIPELINED" or "UNROLLED" on the decryption
+    interface, or MODE = "CTR") start is held until ready accepts it and up to depth blocks are kept
+    in flight. Every session starts with new_session and key_load set, so the key is
+    always expanded and the counter or CBC chain restarts without a reset.
+    """
+    def __init__(self, dut, pipelined:bool = False, depth:int = 32):
+        self.dut       = dut
+        self.pipelined = pipelined
+        self.depth     = depth if pipelined else 1
+        self.monitor   = None
+
+    async def open(self, direction:str, init_vec:int, key:int):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        dut = self.dut
+        await self.close()
+        getattr(dut, f"init_vec_{direction}").value = init_vec
+        getattr(dut, f"key_{direction}").value      = key
+        self.data        = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        self.output      = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+        self.start       = getattr(dut, f"start_{direction}")
+        self.done        = getattr(dut, f"done_{direction}")
+        self.ready       = getattr(dut, f"ready_{direction}")
+        self.new_session = getattr(dut, f"new_session_{direction}")
+        self.key_load    = getattr(dut, f"key_load_{direction}")
+        self.outputs     = Queue()
+        self.first       = True
+        self.monitor     = cocotb.start_soon(self._monitor())
+
+    async def send(self, block:memoryview):
+        # Drive mid-cycle so start is sampled on the next rising edge
+        await FallingEdge(self.dut.clk)
+        self.data.value        = int.from_bytes(block, 'big')
+        self.new_session.value = int(self.first)
+        self.key_load.value    = int(self.first)
+        self.start.value       = 1
+        if self.pipelined:
+            # ready depends on new_session, so wait for it to settle
+            await ReadOnly()
+            while self.ready.value != 1:
+                await FallingEdge(self.dut.clk)
+                await ReadOnly()
+        await RisingEdge(self.dut.clk)
+        self.start.value       = 0
+        self.new_session.value = 0
+        self.key_load.value    = 0
+        self.first = False
+
+    async def receive(self, out:memoryview):
+        out[:] = (await self.outputs.get()).to_bytes(16, 'big')
+
+    async def close(self):
+        if self.monitor is not None:
+            self.monitor.cancel()
+            self.monitor = None
+
+    async def _monitor(self):
+        # done_* is held until the next start with the start/done protocol, and pulses
+        # once per block (possibly on consecutive cycles) when pipelined
+        prev_done = self.done.value == 1
+        while True:
+            await RisingEdge(self.dut.clk)
+            await ReadOnly()
+            done = self.done.value == 1
+            if done and (self.pipelined or not prev_done):
+                self.outputs.put_nowait(int(self.output.value))
+            prev_done = done
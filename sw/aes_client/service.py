@@ -0,0 +1,206 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Co-simulation service: a simulation that stays up and runs CBC jobs (direction, initial
+vector, key, data) sent by host clients over a local socket, so a batch of jobs pays the
+simulator start-up and elaboration once.
+
+    async with await ServiceClient.connect("127.0.0.1:5750") as service:
+        outputs = await service.batch([("enc", init_vec, key, data), ...])
+
+The simulation side is tests/aes_128_top_wrapper_simple_service.py, which uses
+ServiceServer. An address is "host:port" or the path of a Unix domain socket.
+
+Every message is a fixed header and the data:
+- request:  op, direction (0 enc, 1 dec), key, initial vector, data length, data
+- response: status (0 ok, 1 error), clock cycles of the job, data length, data (the
+            output, or the error message)
+Responses come back in the order of the requests.
+"""
+import asyncio
+import socket
+import struct
+import time
+from pathlib import Path
+
+from .transport import DIRECTIONS
+
+DEFAULT_ADDRESS = "127.0.0.1:5750"
+
+REQUEST  = struct.Struct(">BB16s16sI")
+RESPONSE = struct.Struct(">BQI")
+OP_JOB, OP_STOP = 1, 2
+STATUS_OK, STATUS_ERROR = 0, 1
+
+def parse_address(address:str) -> tuple:
+    """
+    Returns (socket family, address) of "host:port" or a Unix socket path.
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(f"{address} is not host:port and there are no Unix sockets here")
+    return socket.AF_UNIX, address
+
+def encode_job(direction:str, init_vec:int, key:int, data:bytes) -> bytes:
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}")
+    if len(data) % 16:
+        raise ValueError("Job data must be a multiple of 16 bytes")
+    return REQUEST.pack(OP_JOB, DIRECTIONS.index(direction), key.to_bytes(16, 'big'),
+                        init_vec.to_bytes(16, 'big'), len(data)) + bytes(data)
+
+class ServiceServer():
+    """
+    Blocking end of the protocol for the simulation. The simulator does not advance while
+    next_job() waits, so an idle service costs no simulation time. Clients are served one
+    at a time; when one disconnects the next is accepted.
+    """
+    def __init__(self, address:str = DEFAULT_ADDRESS):
+        family, self.address = parse_address(address)
+        if family != socket.AF_INET and Path(self.address).exists():
+            Path(self.address).unlink() # Left over from a service that was killed
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.conn = None
+
+    def _read(self, size:int) -> bytes|None:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+
+    def next_job(self) -> tuple|None:
+        """
+        Waits for the next job and returns (direction, init_vec, key, data), or None when a
+        client asked the service to stop. Malformed jobs are answered with an error.
+        """
+        while True:
+            if self.conn is None:
+                self.conn, _ = self.listener.accept()
+            header = self._read(REQUEST.size)
+            if header is None:
+                self._disconnect()
+                continue
+            op, direction, key, init_vec, length = REQUEST.unpack(header)
+            data = self._read(length) if length else b""
+            if data is None:
+                self._disconnect()
+                continue
+            if op == OP_STOP:
+                self.reply(b"")
+                return None
+            if op != OP_JOB or direction >= len(DIRECTIONS) or length % 16:
+                self.error(f"Malformed job: op {op}, direction {direction}, {length} bytes")
+                continue
+            return DIRECTIONS[direction], int.from_bytes(init_vec, 'big'), int.from_bytes(key, 'big'), data
+
+    def reply(self, output:bytes, cycles:int = 0):
+        self.conn.sendall(RESPONSE.pack(STATUS_OK, cycles, len(output)) + output)
+
+    def error(self, message:str):
+        message = message.encode()
+        self.conn.sendall(RESPONSE.pack(STATUS_ERROR, 0, len(message)) + message)
+
+    def _disconnect(self):
+        self.conn.close()
+        self.conn = None
+
+    def close(self):
+        if self.conn is not None:
+            self._disconnect()
+        self.listener.close()
+        if self.listener.family != socket.AF_INET:
+            Path(self.address).unlink(missing_ok=True)
+
+class ServiceClient():
+    """
+    asyncio client of the service. batch() writes all requests while the responses are
+    read, so the service never waits for the client between jobs.
+    """
+    def __init__(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.cycles = 0 # Clock cycles of the jobs run by this client
+
+    @classmethod
+    async def connect(cls, address:str = DEFAULT_ADDRESS, timeout:float = 300):
+        """
+        Connects to the service, retrying for up to timeout seconds while the simulator
+        starts and elaborates the design.
+        """
+        family, target = parse_address(address)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if family == socket.AF_INET:
+                    streams = await asyncio.open_connection(*target)
+                else:
+                    streams = await asyncio.open_unix_connection(target)
+                return cls(*streams)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _response(self) -> tuple:
+        status, cycles, length = RESPONSE.unpack(await self.reader.readexactly(RESPONSE.size))
+        self.cycles += cycles
+        return status, await self.reader.readexactly(length)
+
+    async def run(self, direction:str, init_vec:int, key:int, data:bytes) -> bytes:
+        """
+        Runs one CBC job (a multiple of 16 bytes, no padding) and returns the output.
+        """
+        return (await self.batch([(direction, init_vec, key, data)]))[0]
+
+    async def batch(self, jobs) -> list:
+        """
+        Runs (direction, init_vec, key, data) jobs and returns their outputs in order. If
+        the service rejects a job, RuntimeError is raised once every response is in.
+        """
+        jobs = [encode_job(*job) for job in jobs]
+
+        async def send():
+            for job in jobs:
+                self.writer.write(job)
+                await self.writer.drain()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            responses = [await self._response() for job in jobs]
+        finally:
+            sender.cancel()
+        errors = [f"job {i}: {data.decode()}" for i, (status, data) in enumerate(responses) if status != STATUS_OK]
+        if errors:
+            raise RuntimeError("Service error, " + "; ".join(errors))
+        return [data for status, data in responses]
+
+    async def stop(self):
+        """
+        Ends the simulation once the jobs sent before have run.
+        """
+        self.writer.write(REQUEST.pack(OP_STOP, 0, bytes(16), bytes(16), 0))
+        await self.writer.drain()
+        await self._response()
+        await self.close()
+
+    async def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
@@ -0,0 +1,64 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Block framing of streamed input. Sources are file objects (anything with readinto) or
+iterables of bytes-like chunks of any size. Blocks are returned as memoryviews into the
+chunks wherever a block does not straddle two chunks, so no data is copied.
+"""
+BLOCK_SIZE = 16
+
+def read_chunks(file, chunk_size:int):
+    """
+    Reads a binary file object into one reused buffer. Each chunk is only valid until
+    the next one is read.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        size = file.readinto(buffer)
+        if not size:
+            return
+        yield view[:size]
+
+def iter_blocks(source, chunk_size:int, pad:bool):
+    """
+    Yields the 16-byte blocks of source. With pad=True PKCS7 padding is appended,
+    otherwise the length of source must be a multiple of 16 bytes. Each block is only
+    valid until the next one is requested.
+    """
+    chunks = read_chunks(source, chunk_size) if hasattr(source, "readinto") else source
+    carry = bytearray(BLOCK_SIZE) # Block that straddles two chunks
+    carry_view = memoryview(carry)
+    filled = 0
+    for chunk in chunks:
+        view = memoryview(chunk).cast('B')
+        if filled:
+            take = min(BLOCK_SIZE - filled, len(view))
+            carry[filled:filled+take] = view[:take]
+            filled += take
+            view = view[take:]
+            if filled < BLOCK_SIZE:
+                continue
+            yield carry_view
+            filled = 0
+        end = len(view) - len(view) % BLOCK_SIZE
+        for offset in range(0, end, BLOCK_SIZE):
+            yield view[offset:offset+BLOCK_SIZE]
+        filled = len(view) - end
+        carry[:filled] = view[end:]
+
+    if pad:
+        padding = BLOCK_SIZE - filled
+        carry[filled:] = bytes([padding]) * padding
+        yield carry_view
+    elif filled:
+        raise ValueError("Data must be a multiple of 16 bytes without padding")
+
+def unpad_block(block) -> memoryview:
+    """
+    Returns the data part of a PKCS7 padded last block.
+    """
+    block = memoryview(block)
+    padding = block[-1]
+    if not 1 <= padding <= BLOCK_SIZE or block[-padding:] != bytes([padding]) * padding:
+        raise ValueError("Padding is incorrect")
+    return block[:BLOCK_SIZE - padding]
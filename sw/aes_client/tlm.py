@@ -0,0 +1,316 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Transaction-level models of aes_128_top_wrapper_simple and aes_128_top_wrapper, a
+"virtual FPGA" for host software.
+
+Each model returns the same blocks as the engine and counts clock cycles the way the RTL
+does, from the documented handshakes and the latency of the cores, without simulating
+them. Cycles are indices of rising clock edges, as counted by CycleCounter in the
+testbenches.
+
+    interface = SimpleTLM("LOOKUP").interface("enc")
+    ciphertext = interface.process_blocks(data, init_vec, key)
+    print(interface.cycle)
+
+Only the iterative start/done interfaces of aes_128_top_wrapper_simple are modelled (not
+ROUND_ARCHITECTURE = "PIPELINED"/"UNROLLED" or MODE = "CTR"). tests/aes_tlm_test.py
+checks the cycle counts against the RTL benchmarks.
+"""
+from collections import deque
+
+from Crypto.Cipher import AES
+
+from .transport import DIRECTIONS, Transport
+
+# Cycles from the first round to the output of the iterative cores, per SBOX_ARCHITECTURE
+ROUND_LOOP_CYCLES = {"enc" : {"LOOKUP" : 39, "COMB" : 59, "TTABLE" : 20, "MASKED" : 39},
+                     "dec" : {"LOOKUP" : 49, "COMB" : 69, "TTABLE" : 21, "MASKED" : 49}}
+
+def key_setup_cycles(direction:str, words_per_cycle:int = 1, key_schedule:str = "STORED") -> int:
+    """
+    Cycles of key_expansion (or round_key_gen with "ON_THE_FLY") after a key load.
+    """
+    if key_schedule == "ON_THE_FLY":
+        return 0 if direction == "enc" else 10
+    return 40 // words_per_cycle
+
+def _crypt(direction:str, key:int, chain:int, data:bytes) -> tuple:
+    """
+    CBC over whole blocks from chain. Returns the output and the chain after the last block.
+    """
+    cipher = AES.new(key.to_bytes(16, 'big'), AES.MODE_CBC, chain.to_bytes(16, 'big'))
+    if direction == "enc":
+        output = cipher.encrypt(data)
+        return output, int.from_bytes(output[-16:], 'big')
+    return cipher.decrypt(data), int.from_bytes(data[-16:], 'big')
+
+class SimpleInterface():
+    """
+    One start/done interface of SimpleTLM. process() models a block whose start_* is sampled
+    on the edge start_cycle, by default the edge after done_* of the previous block, which
+    is the earliest a host that reacts to done_* can start it.
+    """
+    def __init__(self, model, direction:str):
+        self.model     = model
+        self.direction = direction
+        self.cycle     = 0      # Edge on which done_* rose for the last block
+        self.blocks    = 0
+        self.reset()
+
+    def reset(self):
+        self.slots = {}         # Expanded keys of the key cache, by slot
+        self.key   = None
+        self.chain = None
+        self.first = True       # The first block after reset starts a new session
+
+    @property
+    def block_cycles(self) -> int:
+        """
+        start_* to done_* of a block that does not load a key: the round loop, plus one cycle
+        for control_fsm to start the block and one for done_*.
+        """
+        return ROUND_LOOP_CYCLES[self.direction][self.model.sbox_architecture] + 2
+
+    def _session(self, init_vec, key, key_slot, key_load, new_session) -> int:
+        """
+        Starts a new session if there is one and returns the cycles it adds to the block: the
+        key schedule and two control_fsm cycles for a key load, one cycle (cached_setup) for
+        a cached key. A cached slot is used even if key is different, as in the RTL.
+        """
+        if not (new_session or self.first):
+            return 0
+        model = self.model
+        self.chain, self.first = init_vec, False
+        slot = key_slot % model.key_slots if model.key_slots else None
+        if slot in self.slots and not key_load:
+            self.key = self.slots[slot]
+            return 1
+        if slot is not None:
+            self.slots[slot] = key
+        self.key = key
+        return key_setup_cycles(self.direction, model.words_per_cycle, model.key_schedule) + 2
+
+    def process(self, block:int, init_vec:int = 0, key:int = 0, new_session:bool = False,
+                key_load:bool = False, key_slot:int = 0, start_cycle:int|None = None) -> int:
+        """
+        Processes one block and returns the output. init_vec, key and key_slot are only used
+        by a session start. self.cycle is then the edge on which done_* rises.
+        """
+        extra = self._session(init_vec, key, key_slot, key_load, new_session)
+        if start_cycle is None:
+            start_cycle = self.cycle + 1
+        output, self.chain = _crypt(self.direction, self.key, self.chain, block.to_bytes(16, 'big'))
+        self.cycle = start_cycle + extra + self.block_cycles
+        self.blocks += 1
+        return int.from_bytes(output, 'big')
+
+    def process_blocks(self, data:bytes, init_vec:int = 0, key:int = 0, new_session:bool = False,
+                       key_load:bool = False, key_slot:int = 0) -> bytes:
+        """
+        Processes a multiple of 16 bytes back to back, each block started on the edge after
+        the previous done_*. The whole buffer goes through pycryptodome in one call, so
+        millions of blocks take seconds.
+        """
+        if not data:
+            return b""
+        blocks = len(data) // 16
+        extra  = self._session(init_vec, key, key_slot, key_load, new_session)
+        output, self.chain = _crypt(self.direction, self.key, self.chain, data)
+        self.cycle += extra + blocks*(self.block_cycles + 1)
+        self.blocks += blocks
+        return output
+
+class SimpleTLM():
+    """
+    aes_128_top_wrapper_simple with ROUND_ARCHITECTURE = "ITERATIVE". The generics have the
+    names and defaults of the VHDL. With "MASKED" the model starts after the first S-box tables
+    are built (262 cycles after reset), and the rebuilds run beside the blocks.
+    """
+    def __init__(self, sbox_architecture:str = "LOOKUP", words_per_cycle:int = 1,
+                 key_schedule:str = "STORED", key_slots:int = 0):
+        if sbox_architecture not in ROUND_LOOP_CYCLES["enc"]:
+            raise ValueError("Error: SBOX_ARCHITECTURE setting was invalid")
+        if words_per_cycle not in (1, 2, 4):
+            raise ValueError("Error: WORDS_PER_CYCLE setting was invalid")
+        if key_schedule not in ("STORED", "ON_THE_FLY"):
+            raise ValueError("Error: KEY_SCHEDULE setting was invalid")
+        self.sbox_architecture = sbox_architecture
+        self.words_per_cycle   = words_per_cycle
+        self.key_schedule      = key_schedule
+        self.key_slots         = key_slots
+        self.interfaces = {direction : SimpleInterface(self, direction) for direction in DIRECTIONS}
+
+    def interface(self, direction:str) -> SimpleInterface:
+        return self.interfaces[direction]
+
+    def reset(self):
+        """
+        reset_enc and reset_dec: empties the key caches, the next blocks start new sessions.
+        """
+        for interface in self.interfaces.values():
+            interface.reset()
+
+class BusTLM():
+    """
+    aes_128_top_wrapper driven by BusTransactor (tests/common/wrapper_utils.py): the methods
+    have the same names and take the same number of cycles. self.cycle is the last rising
+    edge, and self.falling is set between a falling edge and the next rising edge, where
+    the transactor returns in BUS_MODE = "STREAM".
+
+    With fifo_depth the host may transmit blocks ahead of receive_block(), up to fifo_depth
+    blocks in flight. More would fill the FIFOs and stall the core on the host, which the
+    model does not follow.
+    """
+    def __init__(self, sbox_architecture:str = "LOOKUP", bus_mode:str = "HANDSHAKE",
+                 words_per_cycle:int = 1, duplex:bool = False, fifo_depth:int = 0):
+        if sbox_architecture not in ROUND_LOOP_CYCLES["enc"] or sbox_architecture == "MASKED":
+            raise ValueError("Error: SBOX_ARCHITECTURE setting was invalid")
+        if bus_mode not in ("HANDSHAKE", "STREAM"):
+            raise ValueError("Error: BUS_MODE setting was invalid")
+        if fifo_depth < 0 or (fifo_depth and duplex):
+            raise ValueError("Error: FIFO_DEPTH setting was invalid")
+        self.sbox_architecture = sbox_architecture
+        self.stream            = bus_mode == "STREAM"
+        self.setup             = key_setup_cycles("enc", words_per_cycle)
+        self.duplex            = duplex
+        self.fifo_depth        = fifo_depth
+        self.cycle   = 0
+        self.falling = False
+        self.blocks  = 0
+        self._reset_state()
+
+    def _reset_state(self):
+        self.mode     = "enc"
+        self.key      = None
+        self.chain    = {}
+        self.key_done = -1   # Edge of expansion_done
+        self.output   = None
+        self.output_edge = None # Edge on which the first output word is driven
+        # FIFO_DEPTH: (block, edge from which return_datablock can start) of every block in
+        # flight, the first edge the core can take the next block and return_datablock start
+        self.outputs     = deque()
+        self.core_free   = -1
+        self.return_free = -1
+
+    def _transmit(self, words:int) -> tuple:
+        """
+        Moves the input words and returns the edges that sample the first and last one.
+        """
+        first = self.cycle + (2 if self.stream and self.falling else 1)
+        last  = first + words - 1
+        # The stream transactor returns on the falling edge after the last word
+        self.cycle, self.falling = last, self.stream
+        return first, last
+
+    def _start_block(self, last:int, data:int):
+        direction = self.mode
+        output, self.chain[direction] = _crypt(direction, self.key, self.chain[direction], data.to_bytes(16, 'big'))
+        if self.fifo_depth:
+            if len(self.outputs) >= self.fifo_depth:
+                raise RuntimeError(f"BusTLM models up to FIFO_DEPTH = {self.fifo_depth} blocks in flight")
+            # The ingress FIFO counts the block one edge after the last word and feed_proc
+            # moves it to the core on the next, after the output of the previous block
+            # (output_valid) or a running key expansion (expansion_done)
+            feed = max(last + 2, self.core_free, self.key_done + 1)
+            output_valid = feed + 1 + ROUND_LOOP_CYCLES[direction][self.sbox_architecture]
+            self.core_free = output_valid + 1
+            # The egress FIFO counts it one edge after output_valid
+            self.outputs.append((int.from_bytes(output, 'big'), output_valid + 2))
+            return
+        # input_valid is set on the edge of the last word and sampled one edge later.
+        # Both directions wait for a running key expansion.
+        start = max(last + 1, self.key_done + 1)
+        self.output = int.from_bytes(output, 'big')
+        # output_valid, then return_datablock, then the first word on data_bus
+        self.output_edge = start + ROUND_LOOP_CYCLES[direction][self.sbox_architecture] + 2
+
+    def _load_key(self, key:int, last:int):
+        # key_expansion samples input_key_valid one edge after the last key word
+        self.key = key
+        self.key_done = last + 1 + self.setup
+
+    async def reset(self):
+        self.cycle += 3
+        self.falling = False
+        self._reset_state()
+
+    async def switch_dec(self):
+        await self.reset()
+        self.cycle += 5
+        self.mode = "dec"
+
+    async def transmit_init_sequence(self, init_vec:int, key:int, data:int):
+        _, last = self._transmit(12)
+        self.chain[self.mode] = init_vec
+        self._load_key(key, last - 4)
+        self._start_block(last, data)
+
+    async def transmit_block(self, block:int):
+        _, last = self._transmit(4)
+        self._start_block(last, block)
+
+    async def transmit_transaction(self, direction:str, data:int, init_vec:int|None = None, key:int|None = None):
+        if not self.duplex:
+            raise RuntimeError("transmit_transaction needs DUPLEX")
+        words = 5 + 4*(init_vec is not None) + 4*(key is not None)
+        _, last = self._transmit(words)
+        self.mode = direction
+        if init_vec is not None:
+            self.chain[direction] = init_vec
+        if key is not None:
+            self._load_key(key, last - 4)
+        self._start_block(last, data)
+
+    async def receive_block(self) -> int:
+        if self.fifo_depth:
+            return self._receive_fifo()
+        if self.stream:
+            # send_auth is raised on the next falling edge, long before the first word,
+            # and the transactor returns on the falling edge after the 4th word
+            self.cycle, self.falling = self.output_edge + 4, True
+        else:
+            # The first word waits for send_auth, then one word per start pulse
+            self.cycle, self.falling = max(self.output_edge, self.cycle + 1) + 4, False
+        self.blocks += 1
+        return self.output
+
+    def _receive_fifo(self) -> int:
+        output, ready = self.outputs.popleft()
+        # send_auth is raised right away (HANDSHAKE) or on the next falling edge (STREAM).
+        # read_block starts return_datablock once it sees send_auth and a block in the
+        # egress FIFO, but not on the edge after the previous block was popped
+        send_auth = self.cycle + (2 if self.stream and self.falling else 1)
+        first = max(ready, send_auth, self.return_free) + 1
+        self.cycle, self.falling = first + 4, self.stream
+        self.return_free = self.cycle + 2
+        self.blocks += 1
+        return output
+
+class VirtualTransport(Transport):
+    """
+    AESClient transport on one interface of SimpleTLM, for soak-testing host software
+    without hardware or a simulator. Every session starts with new_session and key_load
+    set, like CocotbTransport. The model's cycle count is in model.interface(direction).cycle.
+    """
+    def __init__(self, model:SimpleTLM|None = None):
+        self.model     = model if model is not None else SimpleTLM()
+        self.interface = None
+        self.outputs   = deque()
+
+    async def open(self, direction:str, init_vec:int, key:int):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        self.interface = self.model.interface(direction)
+        self.session   = (init_vec, key)
+
+    async def send(self, block:memoryview):
+        if self.session is not None:
+            init_vec, key = self.session
+            output = self.interface.process_blocks(bytes(block), init_vec, key, new_session=True, key_load=True)
+            self.session = None
+        else:
+            output = self.interface.process_blocks(bytes(block))
+        self.outputs.append(output)
+
+    async def receive(self, out:memoryview):
+        out[:] = self.outputs.popleft()
@@ -0,0 +1,38 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Transport interface between AESClient and an AES engine.
+
+A transport moves single 16-byte blocks to and from one interface of the engine. It
+may keep up to `depth` blocks in flight: the client sends that many blocks before it
+waits for the first output, and outputs must come back in the order they were sent.
+"""
+from abc import ABC, abstractmethod
+
+DIRECTIONS = ("enc", "dec")
+
+class Transport(ABC):
+    depth = 1 # Blocks that can be in flight
+
+    @abstractmethod
+    async def open(self, direction:str, init_vec:int, key:int):
+        """
+        Starts a new session on the "enc" or "dec" interface with a new initial vector
+        (or initial counter block) and key. No blocks of an earlier session are in flight.
+        """
+
+    @abstractmethod
+    async def send(self, block:memoryview):
+        """
+        Sends one 16-byte input block. The block is only valid during the call.
+        """
+
+    @abstractmethod
+    async def receive(self, out:memoryview):
+        """
+        Writes the next 16-byte output block into out.
+        """
+
+    async def close(self):
+        """
+        Releases the transport. The default does nothing.
+        """
@@ -0,0 +1,123 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import sys
+import time
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.wrapper_utils import *
+from common.aesavs import KAT, MCT_INNER, MCT_OUTER, open_store, run_kat, run_mct
+from common.runner_utils import BUS_MODES, HDL_TOPLEVEL_LANG, SOURCES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "model"))
+
+TOPLEVEL = "aes_128_top_wrapper"
+STREAM   = os.getenv("BUS_MODE", "HANDSHAKE") == "STREAM"
+# Outer Monte Carlo iterations, 100 for the full AESAVS test
+MCT_ITERATIONS = int(os.getenv("AESAVS_MCT_ITERATIONS", str(MCT_OUTER)))
+
+class BusInterface():
+    """
+    session() and block() of the bus for the AESAVS loops. A session resets the wrapper
+    (or switches it to decryption mode) and transmits the initial sequence.
+    """
+    def __init__(self, dut, direction, stream:bool):
+        self.dut       = dut
+        self.direction = direction
+        self.bus       = BusTransactor(dut, stream)
+        self.blocks    = 0
+
+    async def session(self, iv, key, data) -> int:
+        if self.direction == "enc":
+            await reset(self.dut)
+        else:
+            await switch_dec(self.dut)
+        await self.bus.transmit_init_sequence(iv, key, data)
+        self.blocks += 1
+        return await self.bus.receive_block()
+
+    async def block(self, data) -> int:
+        await self.bus.transmit_block(data)
+        self.blocks += 1
+        return await self.bus.receive_block()
+
+@cocotb.test(timeout_time=50, timeout_unit='ms')
+async def test_1(dut):
+    """
+    Runs the AESAVS known-answer tests (GFSbox, KeySbox, VarKey, VarTxt) through the bus,
+    one session per vector.
+    """
+    store = open_store()
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start(start_high=False))
+
+    for direction in ["enc", "dec"]:
+        interface = BusInterface(dut, direction, STREAM)
+        for section in KAT:
+            failed = await run_kat(store, section, direction, interface.session)
+            assert not failed, f"{direction}: {section} vectors {failed} did not match."
+        dut._log.info(f"{direction}: {interface.blocks} known-answer vectors passed")
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=2000, timeout_unit='ms', skip=MCT_ITERATIONS == 0)
+async def test_2(dut):
+    """
+    Runs the AESAVS CBC Monte Carlo test (MCT_ITERATIONS x 1000 chained blocks) through
+    the bus in both directions.
+    """
+    store = open_store()
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start(start_high=False))
+
+    for direction in ["enc", "dec"]:
+        interface = BusInterface(dut, direction, STREAM)
+        start_ns, start_wall = get_sim_time("ns"), time.perf_counter()
+        await run_mct(store, direction, interface.session, interface.block, MCT_ITERATIONS)
+        cycles = (get_sim_time("ns") - start_ns) / 8
+        dut._log.info(f"{direction}: {MCT_ITERATIONS} x {MCT_INNER} Monte Carlo blocks passed, "
+                      f"{cycles/interface.blocks:.1f} cycles/block, {time.perf_counter() - start_wall:.1f} s")
+
+    await sync(dut, 1)
+
+def test_aes_128_top_wrapper_aesavs_runner():
+    profile = get_profile()
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, f"{TOPLEVEL}_aesavs")
+    open_store() # Build the vectors once, before the simulator starts
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        for bus_mode in BUS_MODES:
+            runner.test(
+                hdl_toplevel=TOPLEVEL,
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{TOPLEVEL}_aesavs_test",
+                test_args=profile["test_args"],
+                parameters = {"BUS_MODE" : bus_mode},
+                extra_env = {"BUS_MODE" : bus_mode,
+                             "AESAVS_MCT_ITERATIONS" : str(MCT_ITERATIONS)},
+            )
+    wall_clock.record()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_aesavs_runner()
@@ -0,0 +1,241 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import random
+import sys
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from Crypto.Cipher import AES
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.wrapper_utils import *
+from common.bench_utils import *
+from common.runner_utils import BUS_MODES, HDL_TOPLEVEL_LANG, SOURCES, SBOX_ARCHITECTURES, WORDS_PER_CYCLE, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "model"))
+
+ONES_128   = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+CLK_PERIOD = 8 # ns
+CBC_BLOCKS = 16
+
+TOPLEVEL = "aes_128_top_wrapper"
+CONFIG   = {"SBOX_ARCHITECTURE" : os.getenv("SBOX_ARCHITECTURE", "LOOKUP"),
+            "BUS_MODE"          : os.getenv("BUS_MODE", "HANDSHAKE"),
+            "WORDS_PER_CYCLE"   : os.getenv("WORDS_PER_CYCLE", "1"),
+            "DUPLEX"            : os.getenv("DUPLEX", "False"),
+            "FIFO_DEPTH"        : os.getenv("FIFO_DEPTH", "0")}
+DUPLEX     = CONFIG["DUPLEX"] == "True"
+FIFO_DEPTH = int(CONFIG["FIFO_DEPTH"])
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=DUPLEX)
+async def bench_bus(dut):
+    """
+    Cycle counts of the bus protocol: initial sequence, first block, steady-state CBC round
+    trip (transmit + receive), the mean and max transmit of a block and the switch to
+    decryption mode.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    data = random.randbytes(16*CBC_BLOCKS)
+    expected = encrypt_string(iv, key, data)
+
+    bus = BusTransactor(dut, CONFIG["BUS_MODE"] == "STREAM")
+    await reset(dut)
+    counter = CycleCounter(dut.clk, CLK_PERIOD)
+
+    # Initial sequence and first block
+    start_cycle = counter.cycles
+    await bus.transmit_init_sequence(iv, key, int_f_b(data[0:16]))
+    init_sequence_cycles = counter.cycles - start_cycle
+    output = byte(await bus.receive_block())
+    first_block_latency = counter.cycles - start_cycle
+
+    # Steady-state CBC stream
+    stream_start = counter.cycles
+    transmit_cycles = []
+    for i in range(1, CBC_BLOCKS):
+        block_start = counter.cycles
+        await bus.transmit_block(int_f_b(data[i*16:(i+1)*16]))
+        transmit_cycles.append(counter.cycles - block_start)
+        output += byte(await bus.receive_block())
+    block_round_trip_cycles = (counter.cycles - stream_start) / (CBC_BLOCKS - 1)
+    assert output == expected, "Encrypted bytes did not match expected value."
+
+    # Mode switch and first decrypted block
+    switch_start = counter.cycles
+    await switch_dec(dut)
+    dec_switch_cycles = counter.cycles - switch_start
+    dec_start = counter.cycles
+    await bus.transmit_init_sequence(iv, key, int_f_b(expected[0:16]))
+    plaintext = await bus.receive_block()
+    dec_first_block_latency = counter.cycles - dec_start
+    assert byte(plaintext) == data[0:16], "Decrypted block did not match expected value."
+
+    metrics = {
+        "init_sequence_cycles"      : init_sequence_cycles,
+        "first_block_latency"       : first_block_latency,
+        "block_transmit_cycles"     : sum(transmit_cycles) / len(transmit_cycles),
+        "block_transmit_cycles_max" : max(transmit_cycles),
+        "block_round_trip_cycles"   : block_round_trip_cycles,
+        "dec_switch_cycles"         : dec_switch_cycles,
+        "dec_first_block_latency"   : dec_first_block_latency,
+    }
+    dut._log.info(f"Bus [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+@cocotb.test(timeout_time=400000, timeout_unit='ns')
+async def bench_interleaved(dut):
+    """
+    Cycles per block of one encryption and one decryption CBC chain with the same key,
+    alternating block by block. Without DUPLEX every block resets (or switches to
+    decryption) and resends the chain value as the initial vector and the key, with DUPLEX
+    every block is one transaction without reset.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+
+    iv_enc = random.randint(0,ONES_128)
+    iv_dec = random.randint(0,ONES_128)
+    key    = random.randint(0,ONES_128)
+    plaintext  = random.randbytes(16*CBC_BLOCKS)
+    ciphertext = random.randbytes(16*CBC_BLOCKS)
+    expected_enc = encrypt_string(iv_enc, key, plaintext)
+    expected_dec = AES.new(byte(key), AES.MODE_CBC, byte(iv_dec)).decrypt(ciphertext)
+
+    bus = BusTransactor(dut, CONFIG["BUS_MODE"] == "STREAM")
+    await reset(dut)
+    counter = CycleCounter(dut.clk, CLK_PERIOD)
+
+    output_enc, output_dec = b"", b""
+    chain_enc, chain_dec = iv_enc, iv_dec
+    start_cycle = counter.cycles
+    for i in range(CBC_BLOCKS):
+        block_enc = int_f_b(plaintext[i*16:(i+1)*16])
+        block_dec = int_f_b(ciphertext[i*16:(i+1)*16])
+        if DUPLEX:
+            await bus.transmit_transaction("enc", block_enc, iv_enc if i == 0 else None, key if i == 0 else None)
+            output_enc += byte(await bus.receive_block())
+            await bus.transmit_transaction("dec", block_dec, iv_dec if i == 0 else None)
+            output_dec += byte(await bus.receive_block())
+        else:
+            await reset(dut)
+            await bus.transmit_init_sequence(chain_enc, key, block_enc)
+            chain_enc = await bus.receive_block()
+            output_enc += byte(chain_enc)
+            await switch_dec(dut)
+            await bus.transmit_init_sequence(chain_dec, key, block_dec)
+            output_dec += byte(await bus.receive_block())
+            chain_dec = block_dec
+    interleaved_block_cycles = (counter.cycles - start_cycle) / (2*CBC_BLOCKS)
+    assert output_enc == expected_enc, "Encrypted bytes did not match expected value."
+    assert output_dec == expected_dec, "Decrypted bytes did not match expected value."
+
+    metrics = {"interleaved_block_cycles" : interleaved_block_cycles}
+    dut._log.info(f"Interleaved [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=FIFO_DEPTH == 0)
+async def bench_fifo(dut):
+    """
+    Steady-state cycles per block of a CBC stream in each direction with FIFO_DEPTH blocks
+    in flight: the host transmits the next blocks while the core works and receives each
+    output once that many are outstanding. Compare with block_round_trip_cycles (one
+    block at a time) and the round loop of the core.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    plaintext  = random.randbytes(16*CBC_BLOCKS)
+    ciphertext = encrypt_string(iv, key, plaintext)
+
+    bus = BusTransactor(dut, CONFIG["BUS_MODE"] == "STREAM")
+    await reset(dut)
+    counter = CycleCounter(dut.clk, CLK_PERIOD)
+
+    metrics = {}
+    for direction, data, expected in [("enc", plaintext, ciphertext), ("dec", ciphertext, plaintext)]:
+        if direction == "dec":
+            await switch_dec(dut)
+        output = b""
+        done_cycles = []
+        await bus.transmit_init_sequence(iv, key, int_f_b(data[0:16]))
+        sent = 1
+        while len(done_cycles) < CBC_BLOCKS:
+            if sent < CBC_BLOCKS and sent - len(done_cycles) < FIFO_DEPTH:
+                await bus.transmit_block(int_f_b(data[sent*16:(sent+1)*16]))
+                sent += 1
+            else:
+                output += byte(await bus.receive_block())
+                done_cycles.append(counter.cycles)
+        assert output == expected, f"{direction}: output bytes did not match expected value."
+        # From the first output, so the key expansion and the first block are not counted
+        prefix = "" if direction == "enc" else "dec_"
+        metrics[f"{prefix}fifo_block_cycles"] = (done_cycles[-1] - done_cycles[0]) / (CBC_BLOCKS - 1)
+
+    dut._log.info(f"FIFO [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+def test_aes_128_top_wrapper_bench_runner():
+    profile = get_profile() # Only the simulator is used, benchmarks never dump waves
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, f"{TOPLEVEL}_bench")
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        for sbox_architecture in SBOX_ARCHITECTURES:
+            for bus_mode in BUS_MODES:
+                for words_per_cycle in WORDS_PER_CYCLE:
+                    config = {"SBOX_ARCHITECTURE" : sbox_architecture, "BUS_MODE" : bus_mode,
+                              "WORDS_PER_CYCLE" : str(words_per_cycle)}
+                    runner.test(
+                        hdl_toplevel=TOPLEVEL,
+                        hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                        test_module=f"{TOPLEVEL}_bench_test",
+                        parameters = {**config, "WORDS_PER_CYCLE" : words_per_cycle},
+                        extra_env = config,
+                    )
+        # Tagged transactions against the reset/switch_dec runs above
+        for bus_mode in BUS_MODES:
+            config = {"SBOX_ARCHITECTURE" : "LOOKUP", "BUS_MODE" : bus_mode, "WORDS_PER_CYCLE" : "1",
+                      "DUPLEX" : "True"}
+            runner.test(
+                hdl_toplevel=TOPLEVEL,
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{TOPLEVEL}_bench_test",
+                parameters = {**config, "WORDS_PER_CYCLE" : 1, "DUPLEX" : True},
+                extra_env = config,
+            )
+        # Double-buffered bus I/O against the one-block-at-a-time runs above
+        for sbox_architecture in SBOX_ARCHITECTURES:
+            for bus_mode in BUS_MODES:
+                config = {"SBOX_ARCHITECTURE" : sbox_architecture, "BUS_MODE" : bus_mode, "WORDS_PER_CYCLE" : "1",
+                          "FIFO_DEPTH" : "2"}
+                runner.test(
+                    hdl_toplevel=TOPLEVEL,
+                    hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                    test_module=f"{TOPLEVEL}_bench_test",
+                    parameters = {**config, "WORDS_PER_CYCLE" : 1, "FIFO_DEPTH" : 2},
+                    extra_env = config,
+                )
+    wall_clock.record()
+    check_baseline()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_bench_runner()
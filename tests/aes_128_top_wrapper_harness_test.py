@@ -0,0 +1,105 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import cocotb
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.harness import BusStimulus, join_blocks, run_harness
+from common.runner_utils import BUS_MODES, HDL_TOPLEVEL_LANG, RESULTS_DIR, SOURCES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+
+TOPLEVEL     = "aes_128_top_wrapper_harness"
+HARNESS_JOBS = int(os.getenv("HARNESS_JOBS", "1000")) # CBC jobs of test 1
+FIFO_DEPTH   = int(os.getenv("FIFO_DEPTH", "0"))
+CONFIG       = {"BUS_MODE" : os.getenv("BUS_MODE", "HANDSHAKE"), "FIFO_DEPTH" : FIFO_DEPTH}
+
+# FIPS 197 Appendix B
+FIPS_KEY    = 0x2B7E151628AED2A6ABF7158809CF4F3C
+FIPS_INPUT  = 0x3243F6A8885A308D313198A2E0370734
+FIPS_OUTPUT = 0x3925841D02DC09FBDC118597196A0B32
+
+@cocotb.test()
+async def test_1(dut):
+    """
+    Runs HARNESS_JOBS random CBC jobs of up to 8 blocks in random directions as one
+    stimulus file, each after a reset or the switch to decryption mode. With FIFO_DEPTH
+    set, FIFO_DEPTH blocks are kept in flight. Every output is checked against
+    pycryptodome and the cycles per block and wall time are logged.
+    """
+    jobs = [(random.choice(["enc", "dec"]), random.randint(0,ONES_128), random.randint(0,ONES_128),
+             random.randbytes(16*random.randint(1, 8))) for i in range(HARNESS_JOBS)]
+    stimulus = BusStimulus()
+    for job in jobs:
+        stimulus.job(*job, in_flight=max(FIFO_DEPTH, 1))
+
+    start_wall = time.perf_counter()
+    responses = await run_harness(dut, stimulus)
+    wall_time = time.perf_counter() - start_wall
+
+    outputs = join_blocks(responses)
+    position = 0
+    for i, (direction, iv, key, data) in enumerate(jobs):
+        cipher = AES.new(byte(key), AES.MODE_CBC, byte(iv))
+        expected = cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+        assert outputs[position:position+len(data)] == expected, f"Job {i} ({direction}) did not match expected value."
+        position += len(data)
+    cycles = [cycle for value, cycle in responses]
+    assert cycles == sorted(cycles), "Response cycles are not in order."
+
+    dut._log.info(f"[{CONFIG}] {HARNESS_JOBS} jobs, {len(responses)} blocks, {cycles[-1]/len(responses):.1f} "
+                  f"cycles/block in {wall_time:.2f} s ({len(responses)/wall_time:.0f} blocks/s)")
+
+@cocotb.test()
+async def test_2(dut):
+    """
+    Runs the FIPS-197 Appendix B block in both directions in a second run, which rereads
+    the stimulus file and restarts the cycle count.
+    """
+    for direction, data, expected in [("enc", FIPS_INPUT, FIPS_OUTPUT), ("dec", FIPS_OUTPUT, FIPS_INPUT)]:
+        stimulus = BusStimulus()
+        stimulus.job(direction, ZEROES_128, FIPS_KEY, byte(data))
+        [(value, cycle)] = await run_harness(dut, stimulus)
+        assert value == expected, f"Error: {direction} block [{to_hex(value)}] did not match expected value [{to_hex(expected)}]."
+        assert cycle < 250, f"The cycle count of the run did not restart ({cycle})."
+
+def test_aes_128_top_wrapper_harness_runner():
+    profile = get_profile()
+    harness_dir = RESULTS_DIR / "harness"
+    harness_dir.mkdir(parents=True, exist_ok=True)
+    files = {"STIMULUS_FILE" : str(harness_dir / f"{TOPLEVEL}.stim"),
+             "RESPONSE_FILE" : str(harness_dir / f"{TOPLEVEL}.resp")}
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, TOPLEVEL)
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        for bus_mode in BUS_MODES:
+            for fifo_depth in [0, 2]:
+                runner.test(
+                    hdl_toplevel=TOPLEVEL,
+                    hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                    test_module=f"{TOPLEVEL}_test",
+                    test_args=profile["test_args"],
+                    parameters = {**files, "BUS_MODE" : bus_mode, "FIFO_DEPTH" : fifo_depth},
+                    extra_env = {**files, "BUS_MODE" : bus_mode, "FIFO_DEPTH" : str(fifo_depth),
+                                 "HARNESS_JOBS" : str(HARNESS_JOBS)},
+                )
+    wall_clock.record()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_harness_runner()
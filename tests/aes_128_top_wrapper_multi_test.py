@@ -0,0 +1,146 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import random
+import sys
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.wrapper_multi_utils import *
+from common.runner_utils import CONTEXTS, HDL_TOPLEVEL_LANG, SOURCES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "model"))
+
+ZEROES_128 = 0x00000000000000000000000000000000
+ONES_128   = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+# FIPS 197 Appendix B
+FIPS_KEY    = 0x2B7E151628AED2A6ABF7158809CF4F3C
+FIPS_INPUT  = 0x3243F6A8885A308D313198A2E0370734
+FIPS_OUTPUT = 0x3925841D02DC09FBDC118597196A0B32
+
+# Set by the runner, which runs every CONTEXTS setting
+NUM_CONTEXTS = int(os.getenv("CONTEXTS", "4"))
+
+@cocotb.test(timeout_time=10000, timeout_unit='ns')
+async def test_1(dut):
+    """
+    This tests the DUT based on FIPS-197 Appendix B, on the last context.
+    """
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start(start_high=False))
+    tb = MultiTB(dut)
+
+    # Reset
+    await tb.reset()
+
+    scoreboards = await tb.streams([ZEROES_128]*NUM_CONTEXTS, [FIPS_KEY]*NUM_CONTEXTS,
+                                   [b""]*(NUM_CONTEXTS-1) + [byte(FIPS_INPUT)], [b""]*(NUM_CONTEXTS-1) + [byte(FIPS_OUTPUT)])
+    assert not scoreboards[-1].errors, f"Error: Encrypted block [{scoreboards[-1].received.hex()}] did not match expected value [{to_hex(FIPS_OUTPUT)}]."
+
+    await sync(dut, 10)
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns')
+async def test_2(dut):
+    """
+    Encrypts one CBC stream of a different length per context concurrently, with a
+    separate initial vector and key each, and checks every stream against pycryptodome.
+    """
+    # Generate data
+    iv   = [random.randint(0,ONES_128) for _ in range(NUM_CONTEXTS)]
+    key  = [random.randint(0,ONES_128) for _ in range(NUM_CONTEXTS)]
+    data = [random.randbytes(16*random.randint(16, 48)) for _ in range(NUM_CONTEXTS)]
+    expected = [encrypt_string(iv[i], key[i], data[i]) for i in range(NUM_CONTEXTS)]
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = MultiTB(dut)
+
+    # Reset
+    await tb.reset()
+
+    scoreboards = await tb.streams(iv, key, data, expected)
+    for context, scoreboard in enumerate(scoreboards):
+        assert not scoreboard.errors, f"Context {context}: encrypted blocks {scoreboard.errors} did not match expected value."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=400000, timeout_unit='ns', skip=NUM_CONTEXTS < 4)
+async def test_3(dut):
+    """
+    Encrypts the same amount of data as one stream and split over every context, and
+    reports the aggregate throughput gained by interleaving.
+    """
+    num_blocks = 32*NUM_CONTEXTS
+
+    # Generate data
+    iv   = [random.randint(0,ONES_128) for _ in range(NUM_CONTEXTS)]
+    key  = random.randint(0,ONES_128)
+    data = random.randbytes(16*num_blocks)
+    chunk = len(data)//NUM_CONTEXTS
+    split = [data[i*chunk:(i+1)*chunk] for i in range(NUM_CONTEXTS)]
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = MultiTB(dut)
+
+    cycles = {}
+    for name, streams in [("interleaved", split), ("single context", [data])]:
+        await tb.reset()
+        expected = [encrypt_string(iv[i], key, stream) for i, stream in enumerate(streams)]
+        start_time = get_sim_time("ns")
+        scoreboards = await tb.streams(iv, [key]*len(streams), streams, expected)
+        cycles[name] = (get_sim_time("ns") - start_time) / 8
+        for context, scoreboard in enumerate(scoreboards):
+            assert not scoreboard.errors, f"Context {context}: encrypted blocks {scoreboard.errors} did not match expected value ({name})."
+
+    speedup = cycles["single context"] / cycles["interleaved"]
+    dut._log.info(f"{num_blocks} blocks: {cycles['interleaved']/num_blocks:.1f} cycles/block over {NUM_CONTEXTS} contexts, "
+                  f"{cycles['single context']/num_blocks:.1f} cycles/block on one context ({speedup:.1f}x)")
+    assert speedup > 2, "Interleaved contexts should keep several blocks in flight."
+
+    await sync(dut, 1)
+
+def test_aes_128_top_wrapper_multi_runner():
+    src = "aes_128_top_wrapper_multi"
+    profile = get_profile() # PROFILE=debug (default) or fast
+
+    sources = SOURCES[src]
+
+    build_args = profile["build_args"]
+    test_args = profile["test_args"]
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, src)
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=sources,
+            hdl_toplevel=f"{src}",
+            build_args=build_args,
+        )
+    with wall_clock.phase("test"):
+        for contexts in CONTEXTS:
+            runner.test(
+                hdl_toplevel=f"{src}",
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test",
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"SBOX_ARCHITECTURE" : "COMB", "CONTEXTS" : contexts},
+                extra_env = {"CONTEXTS" : str(contexts)},
+            )
+    wall_clock.record()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_multi_runner()
@@ -0,0 +1,143 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import sys
+import time
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge, RisingEdge
+from cocotb.utils import get_sim_time
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.wrapper_simple_utils import *
+from common.aesavs import KAT, MCT_INNER, MCT_OUTER, open_store, run_kat, run_mct
+from common.runner_utils import HDL_TOPLEVEL_LANG, ITERATIVE_SBOX_ARCHITECTURES, SOURCES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "model"))
+
+TOPLEVEL = "aes_128_top_wrapper_simple"
+# Outer Monte Carlo iterations, 100 for the full AESAVS test
+MCT_ITERATIONS = int(os.getenv("AESAVS_MCT_ITERATIONS", str(MCT_OUTER)))
+
+class SimpleInterface():
+    """
+    session() and block() of one start/done interface for the AESAVS loops. The next start
+    is driven on the falling edge after done, so blocks run back to back.
+    """
+    def __init__(self, dut, direction):
+        self.clk         = dut.clk
+        self.start       = getattr(dut, f"start_{direction}")
+        self.done        = getattr(dut, f"done_{direction}")
+        self.init_vec    = getattr(dut, f"init_vec_{direction}")
+        self.key         = getattr(dut, f"key_{direction}")
+        self.key_load    = getattr(dut, f"key_load_{direction}")
+        self.new_session = getattr(dut, f"new_session_{direction}")
+        self.data_in     = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        self.data_out    = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+        self.blocks      = 0
+
+    async def session(self, iv, key, data) -> int:
+        self.init_vec.value    = iv
+        self.key.value         = key
+        self.key_load.value    = 1
+        self.new_session.value = 1
+        return await self.block(data)
+
+    async def block(self, data) -> int:
+        await FallingEdge(self.clk)
+        self.data_in.value = data
+        self.start.value = 1
+        await FallingEdge(self.clk)
+        self.start.value = 0
+        self.key_load.value    = 0
+        self.new_session.value = 0
+        # done fell when start was accepted
+        await RisingEdge(self.done)
+        self.blocks += 1
+        return int(self.data_out.value)
+
+@cocotb.test(timeout_time=10, timeout_unit='ms')
+async def test_1(dut):
+    """
+    Runs the AESAVS known-answer tests (GFSbox, KeySbox, VarKey, VarTxt) through the
+    encryption and decryption interfaces, one session per vector.
+    """
+    store = open_store()
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    # Reset
+    await tb.reset()
+
+    for direction in ["enc", "dec"]:
+        interface = SimpleInterface(dut, direction)
+        for section in KAT:
+            failed = await run_kat(store, section, direction, interface.session)
+            assert not failed, f"{direction}: {section} vectors {failed} did not match."
+        dut._log.info(f"{direction}: {interface.blocks} known-answer vectors passed")
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=1000, timeout_unit='ms', skip=MCT_ITERATIONS == 0)
+async def test_2(dut):
+    """
+    Runs the AESAVS CBC Monte Carlo test (MCT_ITERATIONS x 1000 chained blocks) through
+    the encryption and decryption interfaces.
+    """
+    store = open_store()
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    # Reset
+    await tb.reset()
+
+    for direction in ["enc", "dec"]:
+        interface = SimpleInterface(dut, direction)
+        start_ns, start_wall = get_sim_time("ns"), time.perf_counter()
+        await run_mct(store, direction, interface.session, interface.block, MCT_ITERATIONS)
+        cycles = (get_sim_time("ns") - start_ns) / 8
+        dut._log.info(f"{direction}: {MCT_ITERATIONS} x {MCT_INNER} Monte Carlo blocks passed, "
+                      f"{cycles/interface.blocks:.1f} cycles/block, {time.perf_counter() - start_wall:.1f} s")
+
+    await sync(dut, 1)
+
+def test_aes_128_top_wrapper_simple_aesavs_runner():
+    profile = get_profile()
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, f"{TOPLEVEL}_aesavs")
+    open_store() # Build the vectors once, before the simulator starts
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        for sbox_architecture in ITERATIVE_SBOX_ARCHITECTURES:
+            runner.test(
+                hdl_toplevel=TOPLEVEL,
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{TOPLEVEL}_aesavs_test",
+                test_args=profile["test_args"],
+                parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : sbox_architecture},
+                extra_env = {"SBOX_ARCHITECTURE" : sbox_architecture,
+                             "AESAVS_MCT_ITERATIONS" : str(MCT_ITERATIONS)},
+            )
+    wall_clock.record()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_simple_aesavs_runner()
@@ -0,0 +1,191 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import random
+import sys
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge
+
+from cocotb_tools.runner import get_runner
+from common.common import *
+from common.wrapper_simple_utils import *
+from common.bench_utils import *
+from common.runner_utils import HDL_TOPLEVEL_LANG, SOURCES, SBOX_ARCHITECTURES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "model"))
+
+ONES_128   = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+CLK_PERIOD = 8 # ns
+CBC_BLOCKS = 32
+STREAM_BLOCKS = 256
+
+TOPLEVEL = "aes_128_top_wrapper_simple"
+CONFIG   = {"SBOX_ARCHITECTURE" : os.getenv("SBOX_ARCHITECTURE", "LOOKUP"),
+            "WORDS_PER_CYCLE"   : os.getenv("WORDS_PER_CYCLE", "1"),
+            "KEY_SCHEDULE"      : os.getenv("KEY_SCHEDULE", "STORED"),
+            "ROUND_ARCHITECTURE" : os.getenv("ROUND_ARCHITECTURE", "ITERATIVE")}
+
+# (WORDS_PER_CYCLE, KEY_SCHEDULE) settings compared by the key load metrics
+KEY_SCHEDULE_SETTINGS = [(1, "STORED"), (2, "STORED"), (4, "STORED"), (1, "ON_THE_FLY")]
+
+async def issue_block(dut, counter, direction, block) -> int:
+    """
+    Pulses start_* with block on the input and returns the index of the edge that samples it.
+    """
+    start = getattr(dut, f"start_{direction}")
+    await FallingEdge(dut.clk)
+    (dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec).value = block
+    start.value = 1
+    start_cycle = counter.cycles + 1
+    await FallingEdge(dut.clk)
+    start.value = 0
+    return start_cycle
+
+async def run_block(dut, counter, direction, block):
+    """
+    Processes one block and returns (start cycle, done cycle, output block).
+    """
+    start_cycle = await issue_block(dut, counter, direction, block)
+    done_cycle  = await wait_high(counter, getattr(dut, f"done_{direction}"))
+    output = dut.cipherblock_enc.value if direction == "enc" else dut.plaintext_dec.value
+    return start_cycle, done_cycle, int(output)
+
+async def bench_direction(dut, direction):
+    """
+    Measures first-block latency, steady-state latency, CBC block rate and key change
+    overhead of one interface, checking every output block against pycryptodome.
+    """
+    tb = TB(dut)
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    data = random.randbytes(16*CBC_BLOCKS)
+    if direction == "enc":
+        expected = encrypt_string(iv, key, data)
+    else:
+        expected = AES.new(byte(key), AES.MODE_CBC, byte(iv)).decrypt(data)
+
+    await tb.reset()
+    counter = CycleCounter(dut.clk, CLK_PERIOD)
+    getattr(dut, f"init_vec_{direction}").value = iv
+    getattr(dut, f"key_{direction}").value = key
+
+    # Back-to-back CBC stream, each block issued on the first cycle after done
+    done_cycles = []
+    for i in range(CBC_BLOCKS):
+        start_cycle, done_cycle, output = await run_block(dut, counter, direction, int_f_b(data[i*16:(i+1)*16]))
+        assert byte(output) == expected[i*16:(i+1)*16], f"{direction} block {i} did not match expected value."
+        if i == 0:
+            first_block_latency = done_cycle - start_cycle
+        elif i == 1:
+            block_latency = done_cycle - start_cycle
+        done_cycles.append(done_cycle)
+
+    # Key change: reset, new key, first block. tb.reset() drives reset after the next
+    # edge, so it is sampled on the edge after that.
+    reset_cycle = counter.cycles + 2
+    await tb.reset()
+    getattr(dut, f"key_{direction}").value = random.randint(0,ONES_128)
+    _, done_cycle, _ = await run_block(dut, counter, direction, random.randint(0,ONES_128))
+
+    return {
+        f"{direction}_first_block_latency"  : first_block_latency,
+        f"{direction}_block_latency"        : block_latency,
+        f"{direction}_key_expansion_cycles" : first_block_latency - block_latency,
+        f"{direction}_cbc_cycles_per_block" : (done_cycles[-1] - done_cycles[0]) / (CBC_BLOCKS - 1),
+        f"{direction}_key_change_cycles"    : done_cycle - reset_cycle - block_latency,
+    }
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns')
+async def bench_enc(dut):
+    """
+    Cycle counts of the encryption interface.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+    metrics = await bench_direction(dut, "enc")
+    dut._log.info(f"Encryption [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns')
+async def bench_dec(dut):
+    """
+    Cycle counts of the decryption interface.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+    metrics = await bench_direction(dut, "dec")
+    dut._log.info(f"Decryption [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=CONFIG["ROUND_ARCHITECTURE"] == "ITERATIVE")
+async def bench_dec_stream(dut):
+    """
+    Streaming CBC decryption rate of the valid/ready decryption interface, including the
+    key expansion and the pipeline latency of one stream.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    data = random.randbytes(16*STREAM_BLOCKS)
+    expected = AES.new(byte(key), AES.MODE_CBC, byte(iv)).decrypt(data)
+
+    await tb.reset()
+    counter = CycleCounter(dut.clk, CLK_PERIOD)
+    scoreboard = await tb.stream_pipelined("dec", iv, key, data, expected)
+    assert not scoreboard.errors, f"Decrypted blocks {scoreboard.errors} did not match expected value."
+
+    metrics = {"dec_stream_cycles_per_block" : counter.cycles / STREAM_BLOCKS}
+    dut._log.info(f"Decryption stream [{CONFIG}]: {metrics}")
+    record_results(TOPLEVEL, CONFIG, metrics)
+
+def test_aes_128_top_wrapper_simple_bench_runner():
+    profile = get_profile() # Only the simulator is used, benchmarks never dump waves
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, f"{TOPLEVEL}_bench")
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        for sbox_architecture in SBOX_ARCHITECTURES:
+            for words_per_cycle, key_schedule in KEY_SCHEDULE_SETTINGS:
+                if sbox_architecture == "TTABLE" and key_schedule == "ON_THE_FLY":
+                    continue # T-table rounds use the stored key schedule
+                runner.test(
+                    hdl_toplevel=TOPLEVEL,
+                    hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                    test_module=f"{TOPLEVEL}_bench_test",
+                    parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : sbox_architecture,
+                                  "WORDS_PER_CYCLE" : words_per_cycle, "KEY_SCHEDULE" : key_schedule},
+                    extra_env = {"SBOX_ARCHITECTURE" : sbox_architecture, "WORDS_PER_CYCLE" : str(words_per_cycle),
+                                 "KEY_SCHEDULE" : key_schedule},
+                )
+            # Streaming decryption through the round loop and the unrolled rounds
+            for round_architecture in ["PIPELINED", "UNROLLED"]:
+                if sbox_architecture == "TTABLE" and round_architecture == "PIPELINED":
+                    continue # No stages in the round loop to pipeline
+                runner.test(
+                    hdl_toplevel=TOPLEVEL,
+                    hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                    test_module=f"{TOPLEVEL}_bench_test",
+                    parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : sbox_architecture,
+                                  "ROUND_ARCHITECTURE" : round_architecture},
+                    extra_env = {"SBOX_ARCHITECTURE" : sbox_architecture, "ROUND_ARCHITECTURE" : round_architecture},
+                )
+    wall_clock.record()
+    check_baseline()
+
+if __name__ == "__main__":
+    test_aes_128_top_wrapper_simple_bench_runner()
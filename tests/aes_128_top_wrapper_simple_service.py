@@ -0,0 +1,113 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Co-simulation service on aes_128_top_wrapper_simple: one simulation that runs CBC jobs from
+aes_client.service.ServiceClient until a client stops it.
+
+    python3 aes_128_top_wrapper_simple_service.py   # AES_SERVICE=host:port or a socket path
+
+The DUT is reset before every job, so jobs are independent, but the design is only built
+and elaborated once.
+"""
+import os
+import sys
+import threading
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
+
+from cocotb_tools.runner import get_runner
+from common.wrapper_simple_utils import TB
+from common.runner_utils import HDL_TOPLEVEL_LANG, SOURCES, WallClock, cached_build, get_profile
+
+proj_path = Path(__file__).resolve().parent.parent
+
+# equivalent to setting the PYTHONPATH environment variable
+sys.path.append(str(proj_path / "tests"))
+sys.path.append(str(proj_path / "sw"))
+
+from aes_client.cocotb_transport import CocotbTransport
+from aes_client.service import DEFAULT_ADDRESS, ServiceServer
+
+TOPLEVEL   = "aes_128_top_wrapper_simple"
+CLK_PERIOD = 8 # ns
+ADDRESS    = os.getenv("AES_SERVICE", DEFAULT_ADDRESS)
+
+@cocotb.test()
+async def serve(dut):
+    """
+    Runs jobs until a client sends stop. Each job resets both interfaces and runs its
+    blocks one at a time through CocotbTransport.
+    """
+    clock = Clock(dut.clk, CLK_PERIOD, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+    transport = CocotbTransport(dut)
+    block = bytearray(16)
+
+    server = ServiceServer(ADDRESS)
+    dut._log.info(f"Serving on {ADDRESS}")
+    jobs = 0
+    try:
+        while (job := server.next_job()) is not None:
+            direction, init_vec, key, data = job
+            start_ns = get_sim_time("ns")
+            await tb.reset()
+            await transport.open(direction, init_vec, key)
+            output = bytearray(len(data))
+            view = memoryview(data)
+            for i in range(0, len(data), 16):
+                await transport.send(view[i:i+16])
+                await transport.receive(memoryview(block))
+                output[i:i+16] = block
+            await transport.close()
+            server.reply(bytes(output), int(get_sim_time("ns") - start_ns) // CLK_PERIOD)
+            jobs += 1
+    finally:
+        server.close()
+    dut._log.info(f"Stopped after {jobs} jobs")
+
+def run_service():
+    """
+    Builds aes_128_top_wrapper_simple if needed and runs the service until it is stopped.
+    """
+    profile = get_profile()
+
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, f"{TOPLEVEL}_service")
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=SOURCES[TOPLEVEL],
+            hdl_toplevel=TOPLEVEL,
+            build_args=profile["build_args"],
+        )
+    with wall_clock.phase("test"):
+        runner.test(
+            hdl_toplevel=TOPLEVEL,
+            hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+            test_module=f"{TOPLEVEL}_service",
+            test_args=profile["test_args"],
+            parameters = {"MODE" : "ENC_DEC"},
+            extra_env = {"AES_SERVICE" : ADDRESS},
+        )
+    wall_clock.record()
+
+class ServiceThread(threading.Thread):
+    """
+    run_service() in a thread, for a client in the same process. error is the exception
+    that ended it, if any.
+    """
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.error = None
+
+    def run(self):
+        try:
+            run_service()
+        except BaseException as error:
+            self.error = error
+
+if __name__ == "__main__":
+    run_service()
@@ -1,4 +1,5 @@
 # © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import io
 import os
 import random
 import sys
@@ -6,16 +7,25 @@ from pathlib import Path
 
 import cocotb
 from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
 
 from cocotb_tools.runner import get_runner
 from common.common import *
 from common.wrapper_simple_utils import *
+from common.perf_counters import COUNTER_NAMES, counter_deltas, format_counters, read_simple_counters
+from common.latency import SimpleLatencyMonitor, env_config, record_latency
+from common.bench_utils import CycleCounter, wait_high
+from common.runner_utils import HDL_TOPLEVEL_LANG, ROUND_ARCHITECTURES, SOURCES, WallClock, cached_build, get_profile
 
 proj_path = Path(__file__).resolve().parent.parent
 
 # equivalent to setting the PYTHONPATH environment variable
 sys.path.append(str(proj_path / "tests"))
 sys.path.append(str(proj_path / "model"))
+sys.path.append(str(proj_path / "sw"))
+
+from aes_client import AESClient
+from aes_client.cocotb_transport import CocotbTransport
 
 ZEROES_128 = 0x00000000000000000000000000000000
 ONES_128   = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
@@ -24,7 +34,58 @@ FIPS_KEY    = 0x2B7E151628AED2A6ABF7158809CF4F3C
 FIPS_INPUT  = 0x3243F6A8885A308D313198A2E0370734
 FIPS_OUTPUT = 0x3925841D02DC09FBDC118597196A0B32
 
-@cocotb.test(timeout_time=2000, timeout_unit='ns')
+# Set by the regression runner, which runs every MODE
+MODE = os.getenv("MODE", "ENC_DEC")
+ENC  = MODE in ("ENC", "ENC_DEC")
+DEC  = MODE in ("DEC", "ENC_DEC")
+CTR  = MODE == "CTR" # Counter mode on the encryption interface
+KEY_SLOTS = int(os.getenv("KEY_SLOTS", "0"))
+SBOX_ARCHITECTURE = os.getenv("SBOX_ARCHITECTURE", "LOOKUP")
+UNROLLED  = os.getenv("ROUND_ARCHITECTURE", "ITERATIVE") == "UNROLLED"
+PIPELINED = os.getenv("ROUND_ARCHITECTURE", "ITERATIVE") == "PIPELINED" or UNROLLED
+PERF_COUNTERS = os.getenv("PERF_COUNTERS", "False") == "True"
+WORDS_PER_CYCLE = int(os.getenv("WORDS_PER_CYCLE", "1"))
+ON_THE_FLY = os.getenv("KEY_SCHEDULE", "STORED") == "ON_THE_FLY"
+DIRECTIONS = (["enc"] if ENC or CTR else []) + (["dec"] if DEC else []) # Active interfaces
+PIPELINED_DIRECTIONS = (["enc"] if CTR else []) + (["dec"] if PIPELINED and DEC else []) # Valid/ready handshake
+
+# Latency histograms of every test, per generic setting
+LATENCY = record_latency("aes_128_top_wrapper_simple",
+                         env_config(["MODE", "SBOX_ARCHITECTURE", "KEY_SLOTS", "ROUND_ARCHITECTURE",
+                                     "WORDS_PER_CYCLE", "KEY_SCHEDULE"]),
+                         lambda dut, trace_path: SimpleLatencyMonitor(dut, DIRECTIONS, PIPELINED_DIRECTIONS,
+                                                                      trace_path=trace_path))
+
+def key_setup_cycles(direction) -> int:
+    """
+    Cycles the key schedule takes after a key load: 40 words at WORDS_PER_CYCLE words per
+    cycle, or with round keys generated on the fly none for encryption and one forward
+    pass over the ten round keys for decryption.
+    """
+    if ON_THE_FLY:
+        return 0 if direction == "enc" else 10
+    return 40 // WORDS_PER_CYCLE
+
+# Cycles from the first round to the output of the iterative cores. An encryption round takes
+# the S-box stages, shift_rows, mix_columns and the add_round_key register, a decryption round
+# one more register to add the key before inv_mix_columns. A T-table round takes two cycles,
+# the synchronous table read and the key addition. The masked S-box is a one cycle table read
+# like LOOKUP.
+ROUND_LOOP_CYCLES = {"enc" : {"LOOKUP" : 39, "COMB" : 59, "TTABLE" : 20, "MASKED" : 39},
+                     "dec" : {"LOOKUP" : 49, "COMB" : 69, "TTABLE" : 21, "MASKED" : 49}}
+
+# The first block after power on waits for the masked S-box tables
+POWER_ON_NS = 8*MASK_BUILD_CYCLES if SBOX_ARCHITECTURE == "MASKED" else 0
+
+def block_cycles(direction) -> int:
+    """
+    Cycles from start to done of a block that does not load a key on a start/done interface:
+    the round loop, plus one cycle for the control FSM to start the block and one for done.
+    """
+    return ROUND_LOOP_CYCLES[direction][SBOX_ARCHITECTURE] + 2
+
+@cocotb.test(timeout_time=2000 + POWER_ON_NS, timeout_unit='ns')
+@LATENCY
 async def test_1(dut):
     """
     This tests the DUT based on FIPS-197 Appendix B, with one round of encryption and one round of decryption.
@@ -39,31 +100,43 @@ async def test_1(dut):
     # Reset
     await tb.reset()
 
-    # Encrypt a block
-    # Place initial vector on init_vec_enc
-    await tb.init_encryption(ZEROES_128, FIPS_KEY, FIPS_INPUT)
+    if ENC:
+        # Encrypt a block
+        # Place initial vector on init_vec_enc
+        await tb.init_encryption(ZEROES_128, FIPS_KEY, FIPS_INPUT)
 
-    # Pulse start_enc
-    await tb.start_encryption()
+        # Pulse start_enc
+        await tb.start_encryption()
 
-    return_block_enc = await tb.get_cipherblock()
+        return_block_enc = await tb.get_cipherblock()
 
-    assert return_block_enc == FIPS_OUTPUT, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(FIPS_OUTPUT)}]."
+        assert return_block_enc == FIPS_OUTPUT, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(FIPS_OUTPUT)}]."
     
-    # Try the decryption interface
-    await tb.init_decryption(ZEROES_128, FIPS_KEY, return_block_enc)
+    if DEC:
+        # Try the decryption interface
+        await tb.init_decryption(ZEROES_128, FIPS_KEY, FIPS_OUTPUT)
+
+        # Pulse start_dec
+        await tb.start_decryption()
+
+        # Receive the plaintext
+        return_block_dec = await tb.get_plaintext()
 
-    # Pulse start_dec
-    await tb.start_decryption()
+        assert return_block_dec == FIPS_INPUT, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(FIPS_INPUT)}]."
 
-    # Receive the plaintext
-    return_block_dec = await tb.get_plaintext()
+    if CTR:
+        # With the FIPS input as the counter block, a zero plaintext gives the key stream
+        await tb.init_encryption(FIPS_INPUT, FIPS_KEY, ZEROES_128)
+        await tb.start_encryption()
 
-    assert return_block_dec == FIPS_INPUT, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(FIPS_INPUT)}]."
+        return_block_ctr = await tb.get_cipherblock()
+
+        assert return_block_ctr == FIPS_OUTPUT, f"Error: CTR block [{to_hex(return_block_ctr)}] did not match expected value [{to_hex(FIPS_OUTPUT)}]."
 
     await sync(dut, 10)
 
-@cocotb.test(timeout_time=2000, timeout_unit='ns')
+@cocotb.test(timeout_time=2000 + POWER_ON_NS, timeout_unit='ns')
+@LATENCY
 async def test_2(dut):
     """
     Tests one round of AES-128 enc/dec, this time utilizing random numbers and the initial vector.
@@ -87,25 +160,28 @@ async def test_2(dut):
     # Get the expected cipherblock
     expected_enc = encrypt_int_128(init_vec, key, plaintext)
 
-    # Encrypt a block
-    await tb.init_encryption(init_vec, key, plaintext)
-    await tb.start_encryption()
+    if ENC:
+        # Encrypt a block
+        await tb.init_encryption(init_vec, key, plaintext)
+        await tb.start_encryption()
 
-    # Receive the cipherblock
-    return_block_enc = await tb.get_cipherblock()
-    assert return_block_enc == expected_enc, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(expected_enc)}]."
+        # Receive the cipherblock
+        return_block_enc = await tb.get_cipherblock()
+        assert return_block_enc == expected_enc, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(expected_enc)}]."
     
-    # Decrypt the return value
-    await tb.init_decryption(init_vec, key, return_block_enc)
-    await tb.start_decryption()
+    if DEC:
+        # Decrypt the expected cipherblock
+        await tb.init_decryption(init_vec, key, expected_enc)
+        await tb.start_decryption()
 
-    # Receive the plaintext
-    return_block_dec = await tb.get_plaintext()
-    assert return_block_dec == plaintext, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(plaintext)}]."
+        # Receive the plaintext
+        return_block_dec = await tb.get_plaintext()
+        assert return_block_dec == plaintext, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(plaintext)}]."
 
     await sync(dut, 10)
 
 @cocotb.test(timeout_time=10000, timeout_unit='ns')
+@LATENCY
 async def test_3(dut):
     """
     Tests multiple rounds of AES-128 enc/dec.
@@ -126,60 +202,493 @@ async def test_3(dut):
     # Reset
     await tb.reset()
 
-    plaintext, encoded_bytes = await tb.dut_encode(iv, key, data)
-    # exp_enc_bytes = encrypt_string(iv, key, plaintext)
+    if ENC:
+        _, encoded_bytes = await tb.dut_encode(iv, key, data)
+        # exp_enc_bytes = encrypt_string(iv, key, plaintext)
 
-    assert encoded_bytes == exp_enc_bytes, \
-        f"Encrypted bytes did not match expected value.\nExpected:{exp_enc_bytes}\n Actual:{encoded_bytes}"
+        assert encoded_bytes == exp_enc_bytes, \
+            f"Encrypted bytes did not match expected value.\nExpected:{exp_enc_bytes}\n Actual:{encoded_bytes}"
 
-    _, decoded_bytes = await tb.dut_decode(iv, key, encoded_bytes)
-    assert decoded_bytes == plaintext, "Decrypted bytes did not match expected value."
+    if DEC:
+        _, decoded_bytes = await tb.dut_decode(iv, key, exp_enc_bytes)
+        assert decoded_bytes == padded_plaintext, "Decrypted bytes did not match expected value."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns', skip=CTR)
+@LATENCY
+async def test_4(dut):
+    """
+    Streams a long CBC message through the encryption and decryption interfaces at the same time.
+    """
+    num_blocks = 128
+
+    # Generate data
+    iv_enc  = random.randint(0,ONES_128)
+    iv_dec  = random.randint(0,ONES_128)
+    key_enc = random.randint(0,ONES_128)
+    key_dec = random.randint(0,ONES_128)
+    plaintext  = random.randbytes(16*num_blocks)
+    ciphertext = random.randbytes(16*num_blocks)
+    exp_enc_bytes = encrypt_string(iv_enc, key_enc, plaintext)
+    exp_dec_bytes = AES.new(byte(key_dec), AES.MODE_CBC, byte(iv_dec)).decrypt(ciphertext)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    # Reset
+    await tb.reset()
+
+    enc = cocotb.start_soon(tb.stream("enc", iv_enc, key_enc, plaintext, exp_enc_bytes)) if ENC else None
+    dec = cocotb.start_soon(tb.stream("dec", iv_dec, key_dec, ciphertext, exp_dec_bytes)) if DEC else None
+
+    if enc is not None:
+        scoreboard_enc = await enc
+        assert not scoreboard_enc.errors, f"Encrypted blocks {scoreboard_enc.errors} did not match expected value."
+    if dec is not None:
+        scoreboard_dec = await dec
+        assert not scoreboard_dec.errors, f"Decrypted blocks {scoreboard_dec.errors} did not match expected value."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=20000, timeout_unit='ns', skip=KEY_SLOTS < 2 or CTR)
+@LATENCY
+async def test_5(dut):
+    """
+    Switches between cached keys with new sessions and no reset, and measures the cycles a
+    cached key saves over loading (expanding) it.
+    """
+    iv  = [random.randint(0,ONES_128) for _ in range(3)]
+    key = [random.randint(0,ONES_128) for _ in range(2)]
+    data = random.randbytes(16*3)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    # Reset
+    await tb.reset()
+
+    for direction in ["enc", "dec"] if ENC and DEC else ["enc"] if ENC else ["dec"]:
+        def expected(iv, key):
+            cipher = AES.new(byte(key), AES.MODE_CBC, byte(iv))
+            return cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+
+        # Load both keys, then switch back to the first one from the cache
+        output, load_cycles = await tb.session(direction, 0, iv[0], data, key[0])
+        assert output == expected(iv[0], key[0]), f"{direction}: output with the key loaded into slot 0 did not match expected value."
+        output, _ = await tb.session(direction, KEY_SLOTS-1, iv[1], data, key[1])
+        assert output == expected(iv[1], key[1]), f"{direction}: output with the key loaded into slot {KEY_SLOTS-1} did not match expected value."
+        output, cached_cycles = await tb.session(direction, 0, iv[2], data)
+        assert output == expected(iv[2], key[0]), f"{direction}: output with the cached key in slot 0 did not match expected value."
+
+        dut._log.info(f"{direction}: first block {load_cycles} cycles with key load, {cached_cycles} cycles "
+                      f"with a cached key ({load_cycles - cached_cycles} cycles saved)")
+        assert load_cycles - cached_cycles >= key_setup_cycles(direction), "Switching to a cached key should skip the key expansion."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=not (PIPELINED and DEC))
+@LATENCY
+async def test_6(dut):
+    """
+    Streams a long ciphertext through the pipelined decryption core, once with blocks in
+    flight and once block by block, and reports the speed-up. The unrolled rounds should
+    accept a block on every cycle.
+    """
+    num_blocks = 256
+
+    # Generate data
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    ciphertext = random.randbytes(16*num_blocks)
+    exp_dec_bytes = AES.new(byte(key), AES.MODE_CBC, byte(iv)).decrypt(ciphertext)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    cycles = {}
+    for name, stream in [("pipelined", tb.stream_pipelined), ("block by block", tb.stream)]:
+        await tb.reset()
+        start_time = get_sim_time("ns")
+        scoreboard = await stream("dec", iv, key, ciphertext, exp_dec_bytes)
+        cycles[name] = (get_sim_time("ns") - start_time) / 8
+        assert not scoreboard.errors, f"Decrypted blocks {scoreboard.errors} did not match expected value ({name})."
+
+    speedup = cycles["block by block"] / cycles["pipelined"]
+    dut._log.info(f"{num_blocks} blocks: {cycles['pipelined']/num_blocks:.1f} cycles/block pipelined, "
+                  f"{cycles['block by block']/num_blocks:.1f} cycles/block block by block ({speedup:.1f}x)")
+    assert speedup > 3, "Pipelined decryption should keep several blocks in flight."
+    if UNROLLED:
+        # Key expansion and pipeline latency are paid once per stream
+        assert cycles["pipelined"] < num_blocks + 150, "Unrolled decryption should accept a block on every cycle."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=not CTR)
+@LATENCY
+async def test_7(dut):
+    """
+    Streams a long message through the counter mode engine, once with blocks in flight and
+    once block by block, checks both against pycryptodome's MODE_CTR and reports the speed-up.
+    The initial counter is close to 2^128 so the counter wraps around during the stream.
+    """
+    num_blocks = 256
+
+    # Generate data
+    counter = ONES_128 - random.randint(0, num_blocks)
+    key     = random.randint(0,ONES_128)
+    plaintext = random.randbytes(16*num_blocks)
+    exp_enc_bytes = AES.new(byte(key), AES.MODE_CTR, nonce=b'', initial_value=counter).encrypt(plaintext)
+    assert encrypt_ctr(counter, key, plaintext) == exp_enc_bytes, "Python CTR model did not match pycryptodome."
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    cycles = {}
+    for name, stream in [("pipelined", tb.stream_pipelined), ("block by block", tb.stream)]:
+        await tb.reset()
+        start_time = get_sim_time("ns")
+        scoreboard = await stream("enc", counter, key, plaintext, exp_enc_bytes)
+        cycles[name] = (get_sim_time("ns") - start_time) / 8
+        assert not scoreboard.errors, f"CTR blocks {scoreboard.errors} did not match expected value ({name})."
+
+    # Decryption is the same operation
+    await tb.reset()
+    scoreboard = await tb.stream_pipelined("enc", counter, key, exp_enc_bytes, plaintext)
+    assert not scoreboard.errors, f"CTR decrypted blocks {scoreboard.errors} did not match expected value."
+
+    speedup = cycles["block by block"] / cycles["pipelined"]
+    dut._log.info(f"{num_blocks} blocks: {cycles['pipelined']/num_blocks:.1f} cycles/block pipelined, "
+                  f"{cycles['block by block']/num_blocks:.1f} cycles/block block by block ({speedup:.1f}x)")
+    assert speedup > 3, "Counter mode should keep several blocks in flight."
+    if UNROLLED:
+        # Key expansion and pipeline latency are paid once per stream
+        assert cycles["pipelined"] < num_blocks + 150, "Unrolled counter mode should accept a block on every cycle."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns')
+@LATENCY
+async def test_8(dut):
+    """
+    Streams a file object through the host client library with the cocotb transport,
+    on every active interface, and checks the output against pycryptodome.
+    """
+    # Generate data
+    iv   = random.randint(0,ONES_128)
+    key  = random.randint(0,ONES_128)
+    data = random.randbytes(16*24 + 9)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+
+    # Reset
+    await TB(dut).reset()
+
+    if ENC or CTR:
+        # The engine works on whole blocks, so CTR data is not padded
+        plaintext = data[:16*24] if CTR else data
+        client = AESClient(CocotbTransport(dut, pipelined=CTR), chunk_size=64)
+        output = io.BytesIO()
+        await client.encrypt_file(io.BytesIO(plaintext), output, iv, key, padding=not CTR)
+        if CTR:
+            expected = AES.new(byte(key), AES.MODE_CTR, nonce=b'', initial_value=iv).encrypt(plaintext)
+        else:
+            expected = encrypt_string(iv, key, pad(data, AES.block_size))
+        assert output.getvalue() == expected, "Encrypted bytes did not match expected value."
+        await client.transport.close()
+
+    if DEC:
+        ciphertext = encrypt_string(iv, key, pad(data, AES.block_size))
+        client = AESClient(CocotbTransport(dut, pipelined=PIPELINED), chunk_size=64)
+        output = io.BytesIO()
+        await client.decrypt_file(io.BytesIO(ciphertext), output, iv, key)
+        assert output.getvalue() == data, "Decrypted bytes did not match expected value."
+        await client.transport.close()
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns', skip=not PERF_COUNTERS)
+@LATENCY
+async def test_9(dut):
+    """
+    Checks the performance counters of every active interface: only idle cycles after
+    reset, one key expansion and one count per block after a stream, one cached_setup
+    cycle per session on a cached key, and perf_clear.
+    """
+    num_blocks = 8
+
+    # Generate data
+    iv   = random.randint(0,ONES_128)
+    key  = random.randint(0,ONES_128)
+    data = random.randbytes(16*num_blocks)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+
+    # Reset
+    await tb.wait_for_tables()
+    await tb.reset()
+
+    for direction in DIRECTIONS:
+        pipelined = direction in PIPELINED_DIRECTIONS
+        if CTR:
+            expected = encrypt_ctr(iv, key, data)
+        else:
+            cipher = AES.new(byte(key), AES.MODE_CBC, byte(iv))
+            expected = cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+
+        counters = await read_simple_counters(dut, direction)
+        assert counters["idle"] > 0, f"{direction}: cycles waiting for the first start were not counted."
+        for name in COUNTER_NAMES[:2] + COUNTER_NAMES[3:]:
+            assert counters[name] == 0, f"{direction}: counter {name} was {counters[name]} after reset."
+
+        stream = tb.stream_pipelined if pipelined else tb.stream
+        scoreboard = await stream(direction, iv, key, data, expected)
+        assert not scoreboard.errors, f"{direction}: blocks {scoreboard.errors} did not match expected value."
+
+        counters = await read_simple_counters(dut, direction)
+        dut._log.info(f"{direction}: counters after {num_blocks} blocks:\n{format_counters(counters)}")
+        assert counters["blocks"] == num_blocks
+        assert counters["key_expansions"] == 1
+        assert counters["initial_setup"] >= key_setup_cycles(direction), f"The key expansion takes {key_setup_cycles(direction)} cycles."
+        assert counters["cached_setup"] == 0
+        assert counters["do_crypt"] >= 10, "The blocks take at least one cycle per round."
+        if not pipelined:
+            # start is only driven once done_* has asserted
+            assert counters["bus_wait"] == 0, f"{direction}: start/done stalled for {counters['bus_wait']} cycles."
+
+        if KEY_SLOTS and not CTR:
+            # Load the key into slot 0, then reuse it
+            before = counters
+            await tb.session(direction, 0, iv, data, key)
+            await tb.session(direction, 0, iv, data)
+            delta = counter_deltas(before, await read_simple_counters(dut, direction))
+            assert delta["blocks"] == 2*num_blocks
+            assert delta["key_expansions"] == 1, "Only the loaded session should expand the key."
+            assert delta["cached_setup"] == 1, "A cached key takes one setup cycle."
+
+        # Clear the counters without a reset
+        perf_clear = getattr(dut, f"perf_clear_{direction}")
+        perf_clear.value = 1
+        await FallingEdge(dut.clk)
+        perf_clear.value = 0
+        counters = await read_simple_counters(dut, direction)
+        assert counters["blocks"] == 0 and counters["key_expansions"] == 0, f"{direction}: perf_clear did not clear the counters."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=20000, timeout_unit='ns')
+@LATENCY
+async def test_10(dut):
+    """
+    Measures the key load latency of every start/done interface: the block that loads the
+    key takes key_setup_cycles() longer than the next block, plus one cycle for the control
+    FSM to start the key schedule and one to start the block once it is done. The next block
+    takes block_cycles(), which compares the round latency of the SBOX_ARCHITECTURE settings.
+    """
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+    await tb.wait_for_tables()
+
+    for direction in DIRECTIONS:
+        if direction in PIPELINED_DIRECTIONS:
+            continue
+        iv   = random.randint(0,ONES_128)
+        key  = random.randint(0,ONES_128)
+        data = random.randbytes(16*2)
+        cipher = AES.new(byte(key), AES.MODE_CBC, byte(iv))
+        expected = cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+
+        # Reset
+        await tb.reset()
+        counter = CycleCounter(dut.clk, 8)
+        getattr(dut, f"init_vec_{direction}").value = iv
+        getattr(dut, f"key_{direction}").value = key
+        start  = getattr(dut, f"start_{direction}")
+        done   = getattr(dut, f"done_{direction}")
+        data_in  = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        data_out = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+
+        latency = []
+        for i in range(2):
+            await FallingEdge(dut.clk)
+            data_in.value = int_f_b(data[i*16:(i+1)*16])
+            start.value = 1
+            start_cycle = counter.cycles + 1
+            await FallingEdge(dut.clk)
+            start.value = 0
+            latency.append(await wait_high(counter, done) - start_cycle)
+            assert byte(int(data_out.value)) == expected[i*16:(i+1)*16], f"{direction}: block {i} did not match expected value."
+
+        dut._log.info(f"{direction}: {latency[0]} cycles with key load, {latency[1]} cycles without")
+        assert latency[0] - latency[1] == key_setup_cycles(direction) + 2, \
+            f"{direction}: loading the key took {latency[0] - latency[1]} cycles, expected {key_setup_cycles(direction) + 2}."
+        assert latency[1] == block_cycles(direction), \
+            f"{direction}: a block took {latency[1]} cycles, expected {block_cycles(direction)} with {SBOX_ARCHITECTURE}."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=100000, timeout_unit='ns', skip=SBOX_ARCHITECTURE != "MASKED")
+@LATENCY
+async def test_11(dut):
+    """
+    Runs back to back CBC sessions on every start/done interface with the masked S-box. Each
+    session start builds new tables in the background and the core swaps to them between two
+    blocks of the session. Checks the output, that every block takes the LOOKUP latency while
+    the tables are built, and counts the blocks that started during a build and after a swap.
+    """
+    sessions, num_blocks = 4, 8
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    tb = TB(dut)
+    await tb.wait_for_tables()
+
+    for direction in DIRECTIONS:
+        start  = getattr(dut, f"start_{direction}")
+        done   = getattr(dut, f"done_{direction}")
+        new_session = getattr(dut, f"new_session_{direction}")
+        data_in  = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        data_out = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+
+        counter = CycleCounter(dut.clk, 8)
+        during_build, after_swap = 0, 0
+        for session in range(sessions):
+            iv   = random.randint(0,ONES_128)
+            key  = random.randint(0,ONES_128)
+            data = random.randbytes(16*num_blocks)
+            cipher = AES.new(byte(key), AES.MODE_CBC, byte(iv))
+            expected = cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+            getattr(dut, f"init_vec_{direction}").value = iv
+            getattr(dut, f"key_{direction}").value = key
+
+            for i in range(num_blocks):
+                await FallingEdge(dut.clk)
+                data_in.value = int_f_b(data[i*16:(i+1)*16])
+                new_session.value = int(i == 0)
+                start.value = 1
+                start_cycle = counter.cycles + 1
+                await FallingEdge(dut.clk)
+                start.value = 0
+                new_session.value = 0
+                if i == 0:
+                    # The session start reaches the S-box with the first round, after the key expansion
+                    build_end = start_cycle + key_setup_cycles(direction) + 2 + MASK_BUILD_CYCLES
+                latency = await wait_high(counter, done) - start_cycle
+                assert byte(int(data_out.value)) == expected[i*16:(i+1)*16], \
+                    f"{direction}: session {session} block {i} did not match expected value."
+                expected_latency = block_cycles(direction) + (key_setup_cycles(direction) + 2 if i == 0 else 0)
+                assert latency == expected_latency, \
+                    f"{direction}: session {session} block {i} took {latency} cycles, expected {expected_latency}."
+                during_build += i > 0 and start_cycle < build_end
+                after_swap   += start_cycle > build_end
+
+        dut._log.info(f"{direction}: {during_build} of {sessions*num_blocks} blocks started during a table build, "
+                      f"{after_swap} after the swap in their session")
+        assert during_build >= 2*sessions, f"{direction}: blocks should run while the tables are built."
+        assert after_swap >= sessions, f"{direction}: every session should continue on its new tables."
 
     await sync(dut, 1)
 
 def test_aes_128_top_wrapper_simple_runner():
     src = "aes_128_top_wrapper_simple"
-    sim = os.getenv("SIM", "questa")
-
-    sources = [
-        proj_path/"src"/"common"/"aes_pkg.vhd",
-        proj_path/"src"/"common"/"mult_inv.vhd",
-        proj_path/"src"/"common"/"key_expansion.vhd",
-        proj_path/"src"/"common"/"control_fsm.vhd",
-        proj_path/"src"/"common"/"mult_inv.vhd",
-        proj_path/"src"/"enc"/"mix_columns.vhd",
-        proj_path/"src"/"enc"/"s_box.vhd",
-        proj_path/"src"/"enc"/"shift_rows.vhd",
-        proj_path/"src"/"enc"/"aes_128_top_enc.vhd",
-        proj_path/"src"/"wrappers"/"enc_wrapper.vhd",
-        proj_path/"src"/"dec"/"inv_mix_columns.vhd",
-        proj_path/"src"/"dec"/"inv_s_box.vhd",
-        proj_path/"src"/"dec"/"inv_shift_rows.vhd",
-        proj_path/"src"/"dec"/"aes_128_top_dec.vhd",
-        proj_path/"src"/"wrappers"/"dec_wrapper.vhd",
-        proj_path/"src"/f"{src}.vhd"
-    ]
+    profile = get_profile() # PROFILE=debug (default) or fast
+
+    sources = SOURCES[src]
     
     build_arg_im = (f'-wlf {proj_path}/tests/test.wlf')
     
-    build_args = []
-    test_args = ['-no_autoacc', "-voptargs=+acc=rnb"] # Don't optimize away signals
+    build_args = profile["build_args"]
+    test_args = profile["test_args"]
     
-    runner = get_runner(sim)
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, src)
     print(sources)
-    runner.build(
-        sources=sources,
-        hdl_toplevel=f"{src}",
-        always=True,
-        build_args=build_args,
-    )
-    runner.test(
-        hdl_toplevel=f"{src}", 
-        test_module=f"{src}_test", 
-        test_args=test_args,
-        waves = True,
-        parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "COMB"},
-    )
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=sources,
+            hdl_toplevel=f"{src}",
+            build_args=build_args,
+        )
+    with wall_clock.phase("test"):
+        for round_architecture in ROUND_ARCHITECTURES:
+            runner.test(
+                hdl_toplevel=f"{src}", 
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test", 
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "COMB", "KEY_SLOTS" : 4,
+                              "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : True},
+                extra_env = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "COMB", "KEY_SLOTS" : "4",
+                             "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : "True"},
+            )
+        # Counter mode round loop and unrolled rounds
+        for round_architecture in ["ITERATIVE", "UNROLLED"]:
+            runner.test(
+                hdl_toplevel=f"{src}",
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test",
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"MODE" : "CTR", "SBOX_ARCHITECTURE" : "COMB", "KEY_SLOTS" : 4,
+                              "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : True},
+                extra_env = {"MODE" : "CTR", "SBOX_ARCHITECTURE" : "COMB", "KEY_SLOTS" : "4",
+                             "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : "True"},
+            )
+        # Faster key schedules, without the key cache
+        for words_per_cycle, key_schedule in [(4, "STORED"), (1, "ON_THE_FLY")]:
+            runner.test(
+                hdl_toplevel=f"{src}",
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test",
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "COMB", "WORDS_PER_CYCLE" : words_per_cycle,
+                              "KEY_SCHEDULE" : key_schedule, "PERF_COUNTERS" : True},
+                extra_env = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "COMB", "WORDS_PER_CYCLE" : str(words_per_cycle),
+                             "KEY_SCHEDULE" : key_schedule, "PERF_COUNTERS" : "True"},
+            )
+        # T-table rounds, in the round loop and unrolled
+        for round_architecture in ["ITERATIVE", "UNROLLED"]:
+            runner.test(
+                hdl_toplevel=f"{src}",
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test",
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "TTABLE",
+                              "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : True},
+                extra_env = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "TTABLE",
+                             "ROUND_ARCHITECTURE" : round_architecture, "PERF_COUNTERS" : "True"},
+            )
+        # Masked S-box, iterative cores only
+        runner.test(
+            hdl_toplevel=f"{src}",
+            hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+            test_module=f"{src}_test",
+            test_args=test_args,
+            waves = profile["waves"],
+            parameters = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "MASKED", "PERF_COUNTERS" : True},
+            extra_env = {"MODE" : "ENC_DEC", "SBOX_ARCHITECTURE" : "MASKED", "PERF_COUNTERS" : "True"},
+        )
+    wall_clock.record()
 
 if __name__ == "__main__":
     test_aes_128_top_wrapper_simple_runner()
\ No newline at end of file
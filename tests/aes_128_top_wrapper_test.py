@@ -1,4 +1,5 @@
 # © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import itertools
 import os
 import random
 import sys
@@ -6,12 +7,18 @@ from pathlib import Path
 
 import cocotb
 from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
 
-from Crypto.Util.Padding import pad
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
 
 from cocotb_tools.runner import get_runner
 from common.common import *
 from common.wrapper_utils import *
+from common.perf_counters import COUNTER_NAMES, format_counters, read_bus_counters
+from common.latency import BusLatencyMonitor, env_config, record_latency
+from common.runner_utils import BUS_MODES, HDL_TOPLEVEL_LANG, SOURCES, WallClock, cached_build, get_profile
+from common.runner_utils import WORDS_PER_CYCLE as WORDS_PER_CYCLE_SETTINGS
 
 proj_path = Path(__file__).resolve().parent.parent
 
@@ -26,7 +33,21 @@ FIPS_KEY    = 0x2B7E151628AED2A6ABF7158809CF4F3C
 FIPS_INPUT  = 0x3243F6A8885A308D313198A2E0370734
 FIPS_OUTPUT = 0x3925841D02DC09FBDC118597196A0B32
 
-@cocotb.test()
+# Set by the runner, which runs every BUS_MODE
+STREAM = os.getenv("BUS_MODE", "HANDSHAKE") == "STREAM"
+PERF_COUNTERS = os.getenv("PERF_COUNTERS", "False") == "True"
+WORDS_PER_CYCLE = int(os.getenv("WORDS_PER_CYCLE", "1"))
+# DUPLEX replaces the reset/switch_dec protocol of tests 1-5 with tagged transactions
+DUPLEX = os.getenv("DUPLEX", "False") == "True"
+# Blocks in each FIFO around the core; tests 1-5 run on it unchanged
+FIFO_DEPTH = int(os.getenv("FIFO_DEPTH", "0"))
+
+# Latency histograms of every test, per generic setting
+LATENCY = record_latency("aes_128_top_wrapper", env_config(["SBOX_ARCHITECTURE", "BUS_MODE", "WORDS_PER_CYCLE", "FIFO_DEPTH"]),
+                         lambda dut, trace_path: BusLatencyMonitor(dut, STREAM, trace_path=trace_path))
+
+@cocotb.test(skip=DUPLEX)
+@LATENCY
 async def test_1(dut):
     """
     This tests the DUT based on FIPS-197 Appendix B, with one round of encryption and one round of decryption.
@@ -35,29 +56,32 @@ async def test_1(dut):
     clock = Clock(dut.clk, 8, units="ns")
     cocotb.start_soon(clock.start(start_high=False))
 
+    bus = BusTransactor(dut, STREAM)
+
     # Reset
     await reset(dut)
 
     # Encrypt a block
-    await transmit_init_sequence(dut, ZEROES_128, FIPS_KEY, FIPS_INPUT)
+    await bus.transmit_init_sequence(ZEROES_128, FIPS_KEY, FIPS_INPUT)
 
     # Receive the cipherblock
-    return_block_enc = await receive_block(dut)
+    return_block_enc = await bus.receive_block()
     assert return_block_enc == FIPS_OUTPUT, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(FIPS_OUTPUT)}]."
     
     # Switch to decryption mode
     await switch_dec(dut)
     
     # Decrypt the return value
-    await transmit_init_sequence(dut, ZEROES_128, FIPS_KEY, return_block_enc)
+    await bus.transmit_init_sequence(ZEROES_128, FIPS_KEY, return_block_enc)
 
     # Receive the plaintext
-    return_block_dec = await receive_block(dut)
+    return_block_dec = await bus.receive_block()
     assert return_block_dec == FIPS_INPUT, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(FIPS_INPUT)}]."
 
     await sync(dut, 10)
 
-@cocotb.test()
+@cocotb.test(skip=DUPLEX)
+@LATENCY
 async def test_2(dut):
     """
     Tests one round of AES-128 enc/dec, this time utilizing random numbers and the initial vector.
@@ -72,6 +96,8 @@ async def test_2(dut):
     clock = Clock(dut.clk, 8, units="ns")
     cocotb.start_soon(clock.start())
 
+    bus = BusTransactor(dut, STREAM)
+
     # Reset
     await reset(dut)
 
@@ -79,25 +105,26 @@ async def test_2(dut):
     expected_enc = encrypt_int_128 (init_vec, key, plaintext)
 
     # Encrypt a block
-    await transmit_init_sequence(dut, init_vec, key, plaintext)
+    await bus.transmit_init_sequence(init_vec, key, plaintext)
 
     # Receive the cipherblock
-    return_block_enc = await receive_block(dut)
+    return_block_enc = await bus.receive_block()
     assert return_block_enc == expected_enc, f"Error: Encrypted block [{to_hex(return_block_enc)}] did not match expected value [{to_hex(expected_enc)}]."
     
     # Switch to decryption mode
     await switch_dec(dut)
     
     # Decrypt the return value
-    await transmit_init_sequence(dut, init_vec, key, return_block_enc)
+    await bus.transmit_init_sequence(init_vec, key, return_block_enc)
 
     # Receive the plaintext
-    return_block_dec = await receive_block(dut)
+    return_block_dec = await bus.receive_block()
     assert return_block_dec == plaintext, f"Error: Decrypted block [{to_hex(return_block_dec)}] did not match expected value [{to_hex(plaintext)}]."
 
     await sync(dut, 10)
 
-@cocotb.test()
+@cocotb.test(skip=DUPLEX)
+@LATENCY
 async def test_3(dut):
     """
     Tests multiple rounds of AES-128 enc/dec.
@@ -119,56 +146,307 @@ async def test_3(dut):
     # Reset
     await reset(dut)
 
-    encoded_bytes = await dut_encode_bytes(dut, iv, key, padded_plaintext)
+    if STREAM:
+        bus = BusTransactor(dut, STREAM)
+        encoded_bytes = await bus.process_bytes(iv, key, padded_plaintext)
+    else:
+        encoded_bytes = await dut_encode_bytes(dut, iv, key, padded_plaintext)
     assert encoded_bytes == exp_enc_bytes, "Encrypted bytes did not match expected value."
 
-    decoded_bytes = await dut_decode_bytes(dut, iv, key, encoded_bytes)
+    if STREAM:
+        await switch_dec(dut)
+        decoded_bytes = unpad(await bus.process_bytes(iv, key, encoded_bytes), AES.block_size)
+    else:
+        decoded_bytes = await dut_decode_bytes(dut, iv, key, encoded_bytes)
     assert decoded_bytes == raw_data, "Decrypted bytes did not match expected value."
 
     await sync(dut, 1)
 
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=DUPLEX)
+@LATENCY
+async def test_4(dut):
+    """
+    Streams a long CBC buffer through encryption and then decryption with the bus transactor.
+    """
+    num_blocks = 64
+
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    plaintext = random.randbytes(16*num_blocks)
+    exp_enc_bytes = encrypt_string(iv, key, plaintext)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    bus = BusTransactor(dut, STREAM)
+
+    # Reset
+    await reset(dut)
+
+    encoded_bytes = await bus.process_bytes(iv, key, plaintext)
+    assert encoded_bytes == exp_enc_bytes, "Encrypted bytes did not match expected value."
+
+    await switch_dec(dut)
+    decoded_bytes = await bus.process_bytes(iv, key, encoded_bytes)
+    assert decoded_bytes == plaintext, "Decrypted bytes did not match expected value."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=50000, timeout_unit='ns', skip=not PERF_COUNTERS or DUPLEX)
+@LATENCY
+async def test_5(dut):
+    """
+    Reads the performance counters with the reserved sequence after reset and between
+    blocks, and checks that reading them does not disturb the CBC chain.
+    """
+    num_blocks = 4
+
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    plaintext = random.randbytes(16*num_blocks)
+    exp_enc_bytes = encrypt_string(iv, key, plaintext)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    bus = BusTransactor(dut, STREAM)
+
+    # Reset
+    await reset(dut)
+
+    # Only the wait for the initial vector has been counted
+    counters = await read_bus_counters(bus)
+    assert counters["idle"] > 0, "Cycles waiting for the initial vector were not counted."
+    for name in COUNTER_NAMES[:2] + COUNTER_NAMES[3:]:
+        assert counters[name] == 0, f"Counter {name} was {counters[name]} after reset."
+
+    # Read the counters after the first block, then finish the chain
+    await bus.transmit_init_sequence(iv, key, int_f_b(plaintext[0:16]))
+    output = byte(await bus.receive_block())
+    counters = await read_bus_counters(bus)
+    assert counters["blocks"] == 1
+    assert counters["key_expansions"] == 1
+    assert counters["initial_setup"] >= 40 // WORDS_PER_CYCLE, f"The key expansion takes {40 // WORDS_PER_CYCLE} cycles."
+
+    for i in range(1, num_blocks):
+        await bus.transmit_block(int_f_b(plaintext[i*16:(i+1)*16]))
+        output += byte(await bus.receive_block())
+    assert output == exp_enc_bytes, "Encrypted bytes did not match expected value."
+
+    counters = await read_bus_counters(bus)
+    dut._log.info(f"Counters after {num_blocks} blocks:\n{format_counters(counters)}")
+    assert counters["blocks"] == num_blocks
+    assert counters["key_expansions"] == 1
+    assert counters["cached_setup"] == 0
+    assert counters["do_crypt"] >= 10*num_blocks, "Every block takes at least one cycle per round."
+    assert counters["bus_wait"] == 0, "The transactor takes every output word as soon as it is presented."
+
+    # Reset (by the mode switch) clears the counters
+    await switch_dec(dut)
+    counters = await read_bus_counters(bus)
+    assert counters["blocks"] == 0 and counters["key_expansions"] == 0, "Reset did not clear the counters."
+
+    await sync(dut, 1)
+
+class DuplexModel():
+    """
+    CBC chain of each direction, with one key shared by both, as kept by the DUPLEX wrapper.
+    """
+    def __init__(self):
+        self.chain = {}
+        self.key   = None
+
+    def transaction(self, direction, data, init_vec=None, key=None) -> int:
+        if key is not None:
+            self.key = key
+        if init_vec is not None:
+            self.chain[direction] = init_vec
+        cipher = AES.new(byte(self.key), AES.MODE_ECB)
+        if direction == "enc":
+            output = int_f_b(cipher.encrypt(byte(data ^ self.chain["enc"])))
+            self.chain["enc"] = output
+        else:
+            output = int_f_b(cipher.decrypt(byte(data))) ^ self.chain["dec"]
+            self.chain["dec"] = data
+        return output
+
+@cocotb.test(timeout_time=200000, timeout_unit='ns', skip=not DUPLEX)
+@LATENCY
+async def test_6(dut):
+    """
+    DUPLEX: interleaves encryption and decryption transactions in a random order, with
+    occasional new initial vectors and keys, without reset. Every output block is checked
+    against a model of both CBC chains.
+    """
+    num_transactions = 64
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    bus = BusTransactor(dut, STREAM)
+    model = DuplexModel()
+
+    # Reset
+    await reset(dut)
+
+    # The first transaction loads the key, the first of each direction its initial vector
+    key_loads = 0
+    switches  = 0
+    previous  = None
+    for i in range(num_transactions):
+        direction = "enc" if i == 0 else "dec" if i == 1 else random.choice(["enc", "dec"])
+        init_vec  = random.randint(0,ONES_128) if i < 2 or random.randrange(8) == 0 else None
+        key       = random.randint(0,ONES_128) if i == 0 or random.randrange(16) == 0 else None
+        data      = random.randint(0,ONES_128)
+        key_loads += key is not None
+        switches  += previous is not None and direction != previous
+        previous  = direction
+
+        expected = model.transaction(direction, data, init_vec, key)
+        await bus.transmit_transaction(direction, data, init_vec, key)
+        output = await bus.receive_block()
+        assert output == expected, f"Transaction {i} ({direction}): [{to_hex(output)}] did not match expected value [{to_hex(expected)}]."
+
+    dut._log.info(f"{num_transactions} transactions, {switches} direction changes, {key_loads} keys")
+
+    if PERF_COUNTERS:
+        counters = await read_bus_counters(bus)
+        assert counters["blocks"] == num_transactions
+        assert counters["key_expansions"] == key_loads, "Only the transactions with a key expand it."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=400000, timeout_unit='ns', skip=FIFO_DEPTH == 0)
+@LATENCY
+async def test_7(dut):
+    """
+    FIFO_DEPTH: streams CBC buffers through encryption and decryption with 1 up to
+    2*FIFO_DEPTH blocks in flight. The most blocks in flight fill the ingress FIFO, which
+    holds off the host, and must still finish the stream in fewer cycles than one at a time.
+    """
+    num_blocks = 32
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    bus = BusTransactor(dut, STREAM)
+
+    cycles = {}
+    for in_flight in sorted({1, FIFO_DEPTH, 2*FIFO_DEPTH}):
+        iv  = random.randint(0,ONES_128)
+        key = random.randint(0,ONES_128)
+        plaintext = random.randbytes(16*num_blocks)
+        exp_enc_bytes = encrypt_string(iv, key, plaintext)
+
+        await reset(dut)
+        start_ns = get_sim_time("ns")
+        encoded_bytes = await bus.process_bytes_ahead(iv, key, plaintext, in_flight)
+        cycles[in_flight] = (get_sim_time("ns") - start_ns) / 8
+        assert encoded_bytes == exp_enc_bytes, f"{in_flight} in flight: encrypted bytes did not match expected value."
+
+        await switch_dec(dut)
+        decoded_bytes = await bus.process_bytes_ahead(iv, key, encoded_bytes, in_flight)
+        assert decoded_bytes == plaintext, f"{in_flight} in flight: decrypted bytes did not match expected value."
+
+        if PERF_COUNTERS:
+            counters = await read_bus_counters(bus)
+            assert counters["blocks"] == num_blocks
+            assert counters["do_crypt"] >= 10*num_blocks, "Every block takes at least one cycle per round."
+
+    dut._log.info(f"Encryption cycles per block by blocks in flight: "
+                  f"{ {in_flight : total / num_blocks for in_flight, total in cycles.items()} }")
+    assert cycles[2*FIFO_DEPTH] < cycles[1], "Transmitting ahead did not overlap the bus with the rounds."
+
+    await sync(dut, 1)
+
+@cocotb.test(timeout_time=50000, timeout_unit='ns', skip=not PERF_COUNTERS or DUPLEX)
+@LATENCY
+async def test_8(dut):
+    """
+    PERF_COUNTERS: switches to decryption straight after reset, when start and send_auth
+    rise together, and decrypts a CBC buffer. Only send_auth rising alone may start the
+    counter read sequence, so the switch must still select decryption.
+    """
+    num_blocks = 4
+
+    iv  = random.randint(0,ONES_128)
+    key = random.randint(0,ONES_128)
+    plaintext = random.randbytes(16*num_blocks)
+    encoded_bytes = encrypt_string(iv, key, plaintext)
+
+    # Create clock
+    clock = Clock(dut.clk, 8, units="ns")
+    cocotb.start_soon(clock.start())
+    bus = BusTransactor(dut, STREAM)
+
+    # Reset and switch to decryption
+    await reset(dut)
+    await switch_dec(dut)
+
+    decoded_bytes = await bus.process_bytes(iv, key, encoded_bytes)
+    assert decoded_bytes == plaintext, "Decrypted bytes did not match expected value."
+
+    counters = await read_bus_counters(bus)
+    assert counters["blocks"] == num_blocks
+    assert counters["key_expansions"] == 1
+
+    await sync(dut, 1)
+
 def test_aes_128_top_wrapper_runner():
     src = "aes_128_top_wrapper"
-    sim = os.getenv("SIM", "questa")
-
-    aes_pkg_path    = proj_path / "src" / "common" /"aes_pkg.vhd"
-    key_exp_path    = proj_path / "src" / "common" /"key_expansion.vhd"
-    top_enc_path    = proj_path / "src" / "enc" /"aes_128_top_enc.vhd"
-    mix_cols_path   = proj_path / "src" / "enc" /"mix_columns.vhd"
-    s_box_path      = proj_path / "src" / "enc" /"s_box.vhd"
-    shift_rows_path = proj_path / "src" / "enc" /"shift_rows.vhd"
-    
-    top_dec_path  = proj_path / "src" / "dec" /"aes_128_top_dec.vhd"
-    inv_mix_cols_path = proj_path / "src" / "dec" /"inv_mix_columns.vhd"
-    inv_s_box_path = proj_path / "src" / "dec" /"inv_s_box.vhd"
-    inv_shift_rows_path = proj_path / "src" / "dec" /"inv_shift_rows.vhd"
-    
-    top_wrapper_path = proj_path / "src" / f"{src}.vhd"
+    profile = get_profile() # PROFILE=debug (default) or fast
 
-    sources = [aes_pkg_path, key_exp_path, mix_cols_path,
-               s_box_path, shift_rows_path, top_enc_path,
-               inv_mix_cols_path, inv_s_box_path, inv_shift_rows_path,
-               top_dec_path, top_wrapper_path]
+    sources = SOURCES[src]
     
     build_arg_im = (f'-wlf {proj_path}/tests/test.wlf')
     
-    build_args = []
-    test_args = []
+    build_args = profile["build_args"]
+    test_args = profile["test_args"]
     
-    runner = get_runner(sim)
+    runner = get_runner(profile["sim"])
+    wall_clock = WallClock(profile, src)
     print(sources)
-    runner.build(
-        sources=sources,
-        hdl_toplevel=f"{src}",
-        always=True,
-        build_args=build_args
-    )
-    runner.test(
-        hdl_toplevel=f"{src}", 
-        test_module=f"{src}_test", 
-        test_args=test_args,
-        waves = True
-    )
+    with wall_clock.phase("build"):
+        cached_build(
+            runner,
+            sources=sources,
+            hdl_toplevel=f"{src}",
+            build_args=build_args
+        )
+    with wall_clock.phase("test"):
+        for bus_mode in BUS_MODES:
+            # Every key expansion speed, in the default build and with the counters
+            for words_per_cycle, perf_counters in itertools.product(WORDS_PER_CYCLE_SETTINGS, [False, True]):
+                runner.test(
+                    hdl_toplevel=f"{src}", 
+                    hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                    test_module=f"{src}_test", 
+                    test_args=test_args,
+                    waves = profile["waves"],
+                    parameters = {"BUS_MODE" : bus_mode, "WORDS_PER_CYCLE" : words_per_cycle,
+                                  "PERF_COUNTERS" : perf_counters},
+                    extra_env = {"BUS_MODE" : bus_mode, "WORDS_PER_CYCLE" : str(words_per_cycle),
+                                 "PERF_COUNTERS" : str(perf_counters)},
+                )
+            runner.test(
+                hdl_toplevel=f"{src}", 
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test", 
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"BUS_MODE" : bus_mode, "PERF_COUNTERS" : True, "DUPLEX" : True},
+                extra_env = {"BUS_MODE" : bus_mode, "PERF_COUNTERS" : "True", "DUPLEX" : "True"},
+            )
+            runner.test(
+                hdl_toplevel=f"{src}", 
+                hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+                test_module=f"{src}_test", 
+                test_args=test_args,
+                waves = profile["waves"],
+                parameters = {"BUS_MODE" : bus_mode, "PERF_COUNTERS" : True, "FIFO_DEPTH" : 2},
+                extra_env = {"BUS_MODE" : bus_mode, "PERF_COUNTERS" : "True", "FIFO_DEPTH" : "2"},
+            )
+    wall_clock.record()
 
 if __name__ == "__main__":
-    test_aes_128_top_wrapper_runner()
\ No newline at end of file
+    test_aes_128_top_wrapper_runner()
\ No newline at end of file
@@ -0,0 +1,116 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import asyncio
+import io
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sw"))
+
+from aes_client import AESClient, LoopbackTransport, iter_blocks
+
+ONES_128 = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+
+def random_chunks(data:bytes):
+    """
+    Splits data into memoryviews of random sizes, most of them not a multiple of 16 bytes.
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        size = random.randint(1, 100)
+        yield view[offset:offset+size]
+        offset += size
+
+def collect(chunks) -> tuple:
+    """
+    Joins the output of an AESClient iterator and returns it with the largest chunk size.
+    """
+    async def run():
+        output, largest = bytearray(), 0
+        async for chunk in chunks:
+            output += chunk
+            largest = max(largest, len(chunk))
+        return bytes(output), largest
+    return asyncio.run(run())
+
+def test_iter_blocks():
+    """
+    Checks that blocks straddling chunks are reassembled and that aligned blocks are
+    views into the source rather than copies.
+    """
+    data = random.randbytes(16*40 + 5)
+    blocks = [bytes(block) for block in iter_blocks(random_chunks(data), 256, pad=True)]
+    assert b"".join(blocks) == pad(data, 16)
+
+    source = bytearray(64)
+    block = next(iter_blocks([source], 256, pad=False))
+    source[0] = 0xFF
+    assert block[0] == 0xFF
+
+    with pytest.raises(ValueError):
+        list(iter_blocks([b"x"*17], 256, pad=False))
+
+@pytest.mark.parametrize("depth", [1, 8])
+def test_cbc_round_trip(depth):
+    """
+    Encrypts and decrypts unaligned chunks and a file object through the loopback
+    transport, and compares against pycryptodome.
+    """
+    iv   = random.randint(0, ONES_128)
+    key  = random.randint(0, ONES_128)
+    data = random.randbytes(random.randint(1000, 5000))
+    expected = AES.new(key.to_bytes(16, 'big'), AES.MODE_CBC, iv.to_bytes(16, 'big')).encrypt(pad(data, 16))
+    client = AESClient(LoopbackTransport(depth=depth), chunk_size=256)
+
+    ciphertext, largest = collect(client.encrypt(random_chunks(data), iv, key))
+    assert ciphertext == expected
+    assert largest <= 256, "Output should be yielded in chunks of at most chunk_size bytes."
+
+    plaintext, _ = collect(client.decrypt(io.BytesIO(ciphertext), iv, key))
+    assert plaintext == data
+
+    raw, _ = collect(client.decrypt([ciphertext], iv, key, padding=False))
+    assert raw == pad(data, 16)
+
+def test_file_to_file():
+    """
+    Streams a file object into another through encrypt_file/decrypt_file, with the length
+    a multiple of chunk_size so the held-back last block crosses a chunk boundary.
+    """
+    iv   = random.randint(0, ONES_128)
+    key  = random.randint(0, ONES_128)
+    data = random.randbytes(1024 - 1)
+    client = AESClient(LoopbackTransport(depth=4), chunk_size=64)
+
+    encrypted = io.BytesIO()
+    written = asyncio.run(client.encrypt_file(io.BytesIO(data), encrypted, iv, key))
+    assert written == 1024
+
+    decrypted = io.BytesIO()
+    written = asyncio.run(client.decrypt_file(io.BytesIO(encrypted.getvalue()), decrypted, iv, key))
+    assert written == len(data)
+    assert decrypted.getvalue() == data
+
+    # Zero bytes are not valid PKCS7 padding
+    unpadded, _ = collect(client.encrypt([bytes(64)], iv, key, padding=False))
+    with pytest.raises(ValueError):
+        collect(client.decrypt([unpadded], iv, key))
+
+def test_ctr():
+    """
+    Checks the CTR mode of the loopback transport against pycryptodome's MODE_CTR.
+    """
+    counter = random.randint(0, ONES_128)
+    key     = random.randint(0, ONES_128)
+    data    = random.randbytes(16*50)
+    expected = AES.new(key.to_bytes(16, 'big'), AES.MODE_CTR, nonce=b'', initial_value=counter).encrypt(data)
+    client = AESClient(LoopbackTransport("CTR", depth=16), chunk_size=128)
+
+    ciphertext, _ = collect(client.encrypt(random_chunks(data), counter, key, padding=False))
+    assert ciphertext == expected
@@ -0,0 +1,96 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import random
+
+import numpy as np
+from Crypto.Cipher import AES
+
+from common.aes_model import *
+from common.common import encrypt_ctr
+
+ONES_128 = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+# FIPS 197 Appendix B
+FIPS_KEY    = 0x2B7E151628AED2A6ABF7158809CF4F3C
+FIPS_INPUT  = 0x3243F6A8885A308D313198A2E0370734
+FIPS_OUTPUT = 0x3925841D02DC09FBDC118597196A0B32
+
+def rand_bytes(rng, n):
+    return rng.integers(0, 256, size=n, dtype=np.uint8)
+
+def test_fips_197_appendix_b():
+    """
+    Checks the round keys and the round 1 states against FIPS-197 Appendix B.
+    """
+    e_key = expand_keys(FIPS_KEY)
+    assert to_int(e_key[1])  == 0xA0FAFE1788542CB123A339392A6C7605
+    assert to_int(e_key[10]) == 0xD014F9A8C9EE2589E13F0CC8B6630CA6
+
+    cipherblock, trace = encrypt_blocks(FIPS_KEY, FIPS_INPUT, trace=True)
+    assert to_int(cipherblock) == FIPS_OUTPUT
+    assert to_int(trace["add_round_key"][0]) == 0x193DE3BEA0F4E22B9AC68D2AE9F84808
+    assert to_int(trace["s_box"][0])         == 0xD42711AEE0BF98F1B8B45DE51E415230
+    assert to_int(trace["shift_rows"][0])    == 0xD4BF5D30E0B452AEB84111F11E2798E5
+    assert to_int(trace["mix_columns"][0])   == 0x046681E5E0CB199A48F8D37A2806264C
+
+    plaintext, trace = decrypt_blocks(FIPS_KEY, FIPS_OUTPUT, trace=True)
+    assert to_int(plaintext) == FIPS_INPUT
+    assert to_int(trace["inv_s_box"][-1]) == to_int(to_blocks(FIPS_INPUT) ^ e_key[0])
+
+def test_cbc_many_streams():
+    """
+    Compares multi-stream CBC encryption/decryption against pycryptodome.
+    """
+    rng = np.random.default_rng(random.randint(0, ONES_128))
+    streams, blocks = 8, 33
+    keys = rand_bytes(rng, (streams, 16))
+    ivs = rand_bytes(rng, (streams, 16))
+    plaintext = rand_bytes(rng, (streams, blocks, 16))
+
+    ciphertext = cbc_encrypt(keys, ivs, plaintext)
+    for s in range(streams):
+        cipher = AES.new(keys[s].tobytes(), AES.MODE_CBC, ivs[s].tobytes())
+        assert to_bytes(ciphertext[s]) == cipher.encrypt(plaintext[s].tobytes())
+
+    assert np.array_equal(cbc_decrypt(keys, ivs, ciphertext), plaintext)
+
+def test_cbc_trace_shapes():
+    """
+    Checks that traced CBC runs return one set of round states per block.
+    """
+    ciphertext, trace = cbc_encrypt(FIPS_KEY, 0, np.zeros((3, 16), dtype=np.uint8), trace=True)
+    assert trace["add_round_key"].shape == (3, 11, 16)
+    assert trace["mix_columns"].shape == (3, 9, 16)
+    assert np.array_equal(trace["add_round_key"][:, 10], ciphertext)
+
+    _, trace = cbc_decrypt(FIPS_KEY, 0, ciphertext, trace=True)
+    assert trace["inv_s_box"].shape == (3, 10, 16)
+    assert trace["inv_mix_columns"].shape == (3, 9, 16)
+
+def test_ctr_against_pycryptodome():
+    """
+    Compares multi-stream CTR against pycryptodome's MODE_CTR, including counters that
+    wrap around 2^64 and 2^128.
+    """
+    rng = np.random.default_rng(random.randint(0, ONES_128))
+    blocks = 21
+    counters = [random.randint(0, ONES_128), 2**64 - 3, ONES_128 - 5, ONES_128]
+    keys = rand_bytes(rng, (len(counters), 16))
+    plaintext = rand_bytes(rng, (len(counters), blocks, 16))
+
+    ciphertext = ctr_crypt(keys, counters, plaintext)
+    for s, counter in enumerate(counters):
+        cipher = AES.new(keys[s].tobytes(), AES.MODE_CTR, nonce=b'', initial_value=counter)
+        assert to_bytes(ciphertext[s]) == cipher.encrypt(plaintext[s].tobytes())
+
+    assert np.array_equal(ctr_crypt(keys, counters, ciphertext), plaintext)
+    assert to_int(ctr_blocks(ONES_128, 2)) == [ONES_128, 0]
+
+def test_encrypt_ctr():
+    """
+    Checks the testbench helper, which also handles a partial last block.
+    """
+    counter = random.randint(0, ONES_128)
+    key     = random.randint(0, ONES_128)
+    data    = random.randbytes(16*5 + 7)
+    expected = AES.new(key.to_bytes(16, 'big'), AES.MODE_CTR, nonce=b'', initial_value=counter).encrypt(data)
+    assert encrypt_ctr(counter, key, data) == expected
+    assert encrypt_ctr(counter, key, expected) == data
@@ -0,0 +1,112 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import asyncio
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from Crypto.Cipher import AES
+
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sw"))
+
+from aes_client.service import OP_JOB, REQUEST, ServiceClient, ServiceServer
+from aes_128_top_wrapper_simple_service import ADDRESS, ServiceThread
+
+ONES_128 = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+
+def cbc(direction, init_vec, key, data) -> bytes:
+    cipher = AES.new(key.to_bytes(16, 'big'), AES.MODE_CBC, init_vec.to_bytes(16, 'big'))
+    return cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+
+def random_jobs(num_jobs, max_blocks) -> list:
+    return [(random.choice(["enc", "dec"]), random.randint(0,ONES_128), random.randint(0,ONES_128),
+             random.randbytes(16*random.randint(0, max_blocks))) for i in range(num_jobs)]
+
+@pytest.fixture
+def software_service():
+    """
+    ServiceServer on a free local port with pycryptodome in place of the simulation. Every
+    block counts as one cycle. Yields the address.
+    """
+    server = ServiceServer("127.0.0.1:0")
+
+    def serve():
+        while (job := server.next_job()) is not None:
+            server.reply(cbc(*job), len(job[3]) // 16)
+        server.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{server.listener.getsockname()[1]}"
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "The service did not stop."
+
+def test_protocol(software_service):
+    """
+    Runs a batch of jobs, a malformed job, a second client and the stop request against
+    the software service.
+    """
+    jobs = random_jobs(200, 8)
+
+    async def session():
+        async with await ServiceClient.connect(software_service) as service:
+            outputs = await service.batch(jobs)
+            assert outputs == [cbc(*job) for job in jobs]
+            assert service.cycles == sum(len(job[3]) for job in jobs) // 16
+
+            # A malformed request is answered with an error and the next job still runs
+            service.writer.write(REQUEST.pack(OP_JOB, 7, bytes(16), bytes(16), 0))
+            status, message = await service._response()
+            assert status != 0 and b"Malformed job" in message
+            assert await service.run(*jobs[0]) == cbc(*jobs[0])
+
+        # The service accepts the next client once the first has gone
+        service = await ServiceClient.connect(software_service)
+        assert await service.run(*jobs[1]) == cbc(*jobs[1])
+        await service.stop()
+
+    asyncio.run(session())
+
+def test_job_validation():
+    """
+    Jobs are checked before they are sent.
+    """
+    async def session():
+        service = ServiceClient(None, None)
+        with pytest.raises(ValueError):
+            await service.batch([("ctr", 0, 0, bytes(16))])
+        with pytest.raises(ValueError):
+            await service.batch([("enc", 0, 0, bytes(15))])
+
+    asyncio.run(session())
+
+def test_aes_128_top_wrapper_simple_service_runner():
+    """
+    Starts the co-simulation service, runs a thousand small jobs in one batch through
+    the simulation and stops it.
+    """
+    thread = ServiceThread()
+    thread.start()
+    jobs = random_jobs(1000, 4)
+
+    async def session():
+        while True:
+            assert thread.error is None, f"The service did not start: {thread.error}"
+            try:
+                service = await ServiceClient.connect(ADDRESS, timeout=1)
+                break
+            except OSError:
+                pass
+        wall_start = time.perf_counter()
+        outputs = await service.batch(jobs)
+        wall_time = time.perf_counter() - wall_start
+        print(f"{len(jobs)} jobs, {service.cycles} cycles in {wall_time:.1f} s")
+        assert outputs == [cbc(*job) for job in jobs]
+        await service.stop()
+
+    asyncio.run(session())
+    thread.join()
+    assert thread.error is None
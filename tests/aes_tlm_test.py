@@ -0,0 +1,297 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sw"))
+
+from aes_client import AESClient
+from aes_client.tlm import ROUND_LOOP_CYCLES, BusTLM, SimpleTLM, VirtualTransport, key_setup_cycles
+from common.bench_utils import BENCH_FILE
+
+ONES_128 = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+# Cycles the model may differ from a benchmark by
+TOLERANCE = int(os.getenv("TLM_TOLERANCE", "2"))
+# Blocks of the benchmark CBC streams, see the *_bench_test.py modules
+SIMPLE_CBC_BLOCKS = 32
+BUS_CBC_BLOCKS    = 16
+
+def cbc(direction, key, iv, data) -> bytes:
+    cipher = AES.new(key.to_bytes(16, 'big'), AES.MODE_CBC, iv.to_bytes(16, 'big'))
+    return cipher.encrypt(data) if direction == "enc" else cipher.decrypt(data)
+
+def simple_bench_metrics(config:dict) -> dict:
+    """
+    Replays bench_direction of aes_128_top_wrapper_simple_bench_test.py on SimpleTLM.
+    Decryption is only modelled with ROUND_ARCHITECTURE = "ITERATIVE".
+    """
+    model = SimpleTLM(config["SBOX_ARCHITECTURE"], int(config.get("WORDS_PER_CYCLE", "1")),
+                      config.get("KEY_SCHEDULE", "STORED"))
+    metrics = {}
+    for direction in ["enc", "dec"]:
+        if direction == "dec" and config.get("ROUND_ARCHITECTURE", "ITERATIVE") != "ITERATIVE":
+            continue
+        interface = model.interface(direction)
+        latency, done_cycles = [], []
+        for i in range(SIMPLE_CBC_BLOCKS):
+            start_cycle = interface.cycle + 1
+            interface.process(random.randint(0,ONES_128), 0, 0)
+            latency.append(interface.cycle - start_cycle)
+            done_cycles.append(interface.cycle)
+        metrics.update({
+            f"{direction}_first_block_latency"  : latency[0],
+            f"{direction}_block_latency"        : latency[1],
+            f"{direction}_key_expansion_cycles" : latency[0] - latency[1],
+            f"{direction}_cbc_cycles_per_block" : (done_cycles[-1] - done_cycles[0]) / (SIMPLE_CBC_BLOCKS - 1),
+        })
+    return metrics
+
+async def bus_bench(bus:BusTLM, duplex:bool) -> dict:
+    """
+    Replays bench_bus, bench_interleaved and bench_fifo of aes_128_top_wrapper_bench_test.py
+    on BusTLM.
+    """
+    key = random.randint(0,ONES_128)
+    metrics = {}
+    if not duplex:
+        await bus.reset()
+        start_cycle = bus.cycle
+        await bus.transmit_init_sequence(0, key, 0)
+        metrics["init_sequence_cycles"] = bus.cycle - start_cycle
+        await bus.receive_block()
+        metrics["first_block_latency"] = bus.cycle - start_cycle
+
+        stream_start = bus.cycle
+        transmit_cycles = []
+        for i in range(1, BUS_CBC_BLOCKS):
+            block_start = bus.cycle
+            await bus.transmit_block(0)
+            transmit_cycles.append(bus.cycle - block_start)
+            await bus.receive_block()
+        metrics["block_transmit_cycles"] = sum(transmit_cycles) / len(transmit_cycles)
+        metrics["block_transmit_cycles_max"] = max(transmit_cycles)
+        metrics["block_round_trip_cycles"] = (bus.cycle - stream_start) / (BUS_CBC_BLOCKS - 1)
+
+        switch_start = bus.cycle
+        await bus.switch_dec()
+        metrics["dec_switch_cycles"] = bus.cycle - switch_start
+        dec_start = bus.cycle
+        await bus.transmit_init_sequence(0, key, 0)
+        await bus.receive_block()
+        metrics["dec_first_block_latency"] = bus.cycle - dec_start
+
+    await bus.reset()
+    start_cycle = bus.cycle
+    chain_enc, chain_dec = 0, 0
+    for i in range(BUS_CBC_BLOCKS):
+        if duplex:
+            await bus.transmit_transaction("enc", 0, 0 if i == 0 else None, key if i == 0 else None)
+            await bus.receive_block()
+            await bus.transmit_transaction("dec", 0, 0 if i == 0 else None)
+            await bus.receive_block()
+        else:
+            await bus.reset()
+            await bus.transmit_init_sequence(chain_enc, key, 0)
+            chain_enc = await bus.receive_block()
+            await bus.switch_dec()
+            await bus.transmit_init_sequence(chain_dec, key, 0)
+            await bus.receive_block()
+    metrics["interleaved_block_cycles"] = (bus.cycle - start_cycle) / (2*BUS_CBC_BLOCKS)
+
+    if bus.fifo_depth:
+        await bus.reset()
+        for direction in ["enc", "dec"]:
+            if direction == "dec":
+                await bus.switch_dec()
+            done_cycles = await bus_stream(bus, [0]*BUS_CBC_BLOCKS, bus.fifo_depth)
+            prefix = "" if direction == "enc" else "dec_"
+            metrics[f"{prefix}fifo_block_cycles"] = (done_cycles[-1] - done_cycles[0]) / (BUS_CBC_BLOCKS - 1)
+    return metrics
+
+async def bus_stream(bus:BusTLM, blocks:list, in_flight:int, outputs:list|None = None) -> list:
+    """
+    An initial sequence and blocks transmitted up to in_flight ahead of the receives, as in
+    bench_fifo. Returns the cycle of every receive and appends the blocks to outputs.
+    """
+    done_cycles = []
+    await bus.transmit_init_sequence(0, 0, blocks[0])
+    sent = 1
+    while len(done_cycles) < len(blocks):
+        if sent < len(blocks) and sent - len(done_cycles) < in_flight:
+            await bus.transmit_block(blocks[sent])
+            sent += 1
+        else:
+            output = await bus.receive_block()
+            if outputs is not None:
+                outputs.append(output)
+            done_cycles.append(bus.cycle)
+    return done_cycles
+
+def bus_bench_metrics(config:dict) -> dict:
+    duplex = config.get("DUPLEX", "False") == "True"
+    bus = BusTLM(config["SBOX_ARCHITECTURE"], config.get("BUS_MODE", "HANDSHAKE"), int(config.get("WORDS_PER_CYCLE", "1")), duplex,
+                 int(config.get("FIFO_DEPTH", "0")))
+    return asyncio.run(bus_bench(bus, duplex))
+
+@pytest.mark.parametrize("sbox_architecture", list(ROUND_LOOP_CYCLES["enc"]))
+def test_simple_sessions(sbox_architecture):
+    """
+    Runs sessions with and without cached keys through both interfaces of SimpleTLM and
+    checks the output against pycryptodome and the latency of each kind of block.
+    """
+    model = SimpleTLM(sbox_architecture, key_slots=2)
+    for direction in ["enc", "dec"]:
+        interface = model.interface(direction)
+        block_cycles = ROUND_LOOP_CYCLES[direction][sbox_architecture] + 2
+        keys = [random.randint(0,ONES_128) for slot in range(2)]
+        for session in range(6):
+            slot = session % 2
+            iv   = random.randint(0,ONES_128)
+            data = random.randbytes(16*3)
+            expected = cbc(direction, keys[slot], iv, data)
+
+            start_cycle = interface.cycle + 1
+            output = interface.process(int.from_bytes(data[:16], 'big'), iv, keys[slot] if session < 2 else 0,
+                                       new_session=True, key_slot=slot)
+            # Only the first two sessions expand their key, the others use the cache
+            expected_cycles = block_cycles + (key_setup_cycles(direction) + 2 if session < 2 else 1)
+            assert interface.cycle - start_cycle == expected_cycles
+            output = output.to_bytes(16, 'big') + interface.process_blocks(data[16:])
+            assert output == expected, f"{direction}: session {session} did not match."
+
+        # A key load replaces the cached key
+        start_cycle = interface.cycle + 1
+        interface.process(0, 0, keys[1], new_session=True, key_load=True, key_slot=0)
+        assert interface.cycle - start_cycle == block_cycles + key_setup_cycles(direction) + 2
+
+@pytest.mark.parametrize("bus_mode", ["HANDSHAKE", "STREAM"])
+def test_bus_protocol(bus_mode):
+    """
+    Runs CBC chains through BusTLM with reset/switch_dec and with DUPLEX transactions, and
+    checks the outputs against pycryptodome.
+    """
+    iv, key = random.randint(0,ONES_128), random.randint(0,ONES_128)
+    data = random.randbytes(16*8)
+
+    async def run(bus, direction):
+        blocks = [int.from_bytes(data[i:i+16], 'big') for i in range(0, len(data), 16)]
+        if bus.duplex:
+            await bus.reset()
+            outputs = []
+            for i, block in enumerate(blocks):
+                await bus.transmit_transaction(direction, block, iv if i == 0 else None, key if i == 0 else None)
+                outputs.append(await bus.receive_block())
+            return outputs
+        await (bus.reset() if direction == "enc" else bus.switch_dec())
+        await bus.transmit_init_sequence(iv, key, blocks[0])
+        outputs = [await bus.receive_block()]
+        for block in blocks[1:]:
+            await bus.transmit_block(block)
+            outputs.append(await bus.receive_block())
+        return outputs
+
+    for duplex in [False, True]:
+        for direction in ["enc", "dec"]:
+            bus = BusTLM(bus_mode=bus_mode, duplex=duplex)
+            outputs = asyncio.run(run(bus, direction))
+            assert b"".join(output.to_bytes(16, 'big') for output in outputs) == cbc(direction, key, iv, data)
+
+    # A reset or mode switch, the initial sequence and (decryption) the key expansion per
+    # block against one header word
+    config = {"SBOX_ARCHITECTURE" : "LOOKUP", "BUS_MODE" : bus_mode, "WORDS_PER_CYCLE" : "1"}
+    legacy = bus_bench_metrics(config)["interleaved_block_cycles"]
+    duplex = bus_bench_metrics({**config, "DUPLEX" : "True"})["interleaved_block_cycles"]
+    print(f"{bus_mode}: {legacy} cycles per interleaved block, {duplex} with DUPLEX")
+    assert duplex + key_setup_cycles("dec")/2 < legacy
+
+@pytest.mark.parametrize("bus_mode", ["HANDSHAKE", "STREAM"])
+def test_bus_fifo(bus_mode):
+    """
+    Streams CBC blocks through BusTLM with FIFO_DEPTH = 2, one and two blocks in flight,
+    checks the outputs against pycryptodome and that two in flight bring the cycles per
+    block down to the round loop of the core.
+    """
+    blocks = [random.randint(0,ONES_128) for i in range(16)]
+    data = b"".join(block.to_bytes(16, 'big') for block in blocks)
+    rates = {}
+    for in_flight in [1, 2]:
+        bus = BusTLM("LOOKUP", bus_mode, fifo_depth=2)
+        outputs = []
+        asyncio.run(bus.reset())
+        done_cycles = asyncio.run(bus_stream(bus, blocks, in_flight, outputs))
+        assert b"".join(output.to_bytes(16, 'big') for output in outputs) == cbc("enc", 0, 0, data)
+        rates[in_flight] = (done_cycles[-1] - done_cycles[0]) / (len(blocks) - 1)
+
+    legacy = bus_bench_metrics({"SBOX_ARCHITECTURE" : "LOOKUP", "BUS_MODE" : bus_mode})["block_round_trip_cycles"]
+    print(f"{bus_mode}: {legacy} cycles per block one at a time, {rates} with FIFO_DEPTH = 2")
+    assert rates[1] >= legacy
+    assert rates[2] == ROUND_LOOP_CYCLES["enc"]["LOOKUP"] + 2
+
+    # More blocks in flight than the model follows
+    bus = BusTLM(fifo_depth=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(bus_stream(bus, blocks, 2))
+
+def test_virtual_transport():
+    """
+    Streams a buffer through AESClient on VirtualTransport and checks the output and the
+    cycle count of the interface.
+    """
+    iv, key = random.randint(0,ONES_128), random.randint(0,ONES_128)
+    data = random.randbytes(16*100 + 7)
+    transport = VirtualTransport(SimpleTLM("TTABLE"))
+    client = AESClient(transport, chunk_size=256)
+
+    async def collect(chunks):
+        return b"".join([bytes(chunk) async for chunk in chunks])
+
+    ciphertext = asyncio.run(collect(client.encrypt([data], iv, key)))
+    assert ciphertext == cbc("enc", key, iv, pad(data, 16))
+    assert asyncio.run(collect(client.decrypt([ciphertext], iv, key))) == data
+
+    interface = transport.model.interface("enc")
+    assert interface.blocks == 101
+    assert interface.cycle == key_setup_cycles("enc") + 2 + 101*(ROUND_LOOP_CYCLES["enc"]["TTABLE"] + 3)
+
+def test_throughput():
+    """
+    Runs a million blocks through one interface, which an RTL simulation cannot do in
+    reasonable time, and checks the cycle count.
+    """
+    blocks = 1000000
+    model  = SimpleTLM("LOOKUP")
+    interface = model.interface("enc")
+    data = bytes(16*blocks)
+
+    wall_start = time.perf_counter()
+    output = interface.process_blocks(data, 0, 0)
+    wall_time = time.perf_counter() - wall_start
+    print(f"{blocks} blocks, {interface.cycle} cycles in {wall_time:.2f} s")
+    assert output[-16:] == cbc("enc", 0, 0, data)[-16:]
+    assert interface.cycle == key_setup_cycles("enc") + 2 + blocks*(ROUND_LOOP_CYCLES["enc"]["LOOKUP"] + 3)
+
+@pytest.mark.skipif(not BENCH_FILE.exists(), reason="No benchmark results, run the *_bench_test.py runners first")
+def test_bench_alignment():
+    """
+    Compares the cycle counts of the models with every RTL benchmark in benchmarks.json,
+    within TLM_TOLERANCE cycles. Metrics the models do not predict are ignored.
+    """
+    results = json.loads(BENCH_FILE.read_text())
+    models  = {"aes_128_top_wrapper_simple" : simple_bench_metrics, "aes_128_top_wrapper" : bus_bench_metrics}
+    mismatches = []
+    for toplevel, bench_metrics in models.items():
+        for config, entry in results.get(toplevel, {}).items():
+            predicted = bench_metrics(entry["generics"])
+            for metric, cycles in entry["metrics"].items():
+                if metric in predicted and abs(predicted[metric] - cycles) > TOLERANCE:
+                    mismatches.append(f"{toplevel} [{config}] {metric}: RTL {cycles}, model {predicted[metric]}")
+    assert not mismatches, "Model cycle counts differ from the RTL:\n" + "\n".join(mismatches)
@@ -0,0 +1,98 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import asyncio
+from pathlib import Path
+
+import pytest
+from Crypto.Cipher import AES
+
+from common.aesavs import *
+
+ONES_128 = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
+
+def ecb_encrypt(key, block) -> int:
+    return int.from_bytes(AES.new(key.to_bytes(16, 'big'), AES.MODE_ECB).encrypt(block.to_bytes(16, 'big')), 'big')
+
+class CBCModel():
+    """
+    Software stand-in for a DUT interface: session() and block() of one CBC direction.
+    """
+    def __init__(self, direction):
+        self.direction = direction
+        self.blocks = 0
+
+    async def session(self, iv, key, data) -> int:
+        self.cipher = AES.new(key.to_bytes(16, 'big'), AES.MODE_CBC, iv.to_bytes(16, 'big'))
+        return await self.block(data)
+
+    async def block(self, data) -> int:
+        self.blocks += 1
+        crypt = self.cipher.encrypt if self.direction == "enc" else self.cipher.decrypt
+        return int.from_bytes(crypt(data.to_bytes(16, 'big')), 'big')
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = tmp_path_factory.mktemp("aesavs") / "aesavs.bin"
+    return open_store(path)
+
+def test_store_layout(store):
+    """
+    Checks the section sizes, the record size on disk and that a bad file is rebuilt.
+    """
+    counts = {section : len(store.sections[section]) for section in SECTIONS}
+    assert counts == {"gfsbox" : 7, "keysbox" : 21, "varkey" : 128, "vartxt" : 128, "mct_enc" : 100, "mct_dec" : 100}
+    assert RECORD.itemsize == 64
+    assert store.records.filename and Path(store.records.filename).stat().st_size == HEADER.itemsize + 64*len(store)
+
+    bad = Path(store.records.filename).with_name("bad.bin")
+    bad.write_bytes(b"not a store")
+    assert len(open_store(bad)) == len(store)
+
+def test_known_answers(store):
+    """
+    Checks every known-answer record against pycryptodome, and the first and last VarKey
+    and VarTxt vectors against AESAVS.
+    """
+    for section in KAT:
+        for key, iv, plaintext, ciphertext in store.stream(section):
+            assert iv == 0
+            assert ecb_encrypt(key, plaintext) == ciphertext, f"{section}: key {key:032X} did not match."
+
+    varkey, vartxt = list(store.stream("varkey")), list(store.stream("vartxt"))
+    assert varkey[0][0] == 0x80000000000000000000000000000000 and varkey[0][3] == 0x0EDD33D3C621E546455BD8BA1418BEC8
+    assert varkey[-1][0] == ONES_128 and varkey[-1][3] == 0xA1F6258C877D5FCD8964484538BFC92C
+    assert vartxt[0][2] == 0x80000000000000000000000000000000 and vartxt[0][3] == 0x3AD78E726C1EC02B7EBFE92B23D9EC34
+    assert vartxt[-1][2] == ONES_128 and vartxt[-1][3] == 0x3F5B8CC9EA855A0AFA7347D23E8D664E
+
+@pytest.mark.parametrize("direction, output, last", [
+    ("enc", 0xB127A5B4C4692D87483DB0C3B0D11E64, (0xD8E549E9DD3E957D00253FC428A9C724, 0x7BED7671C8913AA1330F193761523E67)),
+    ("dec", 0x2805D10B127FCD1DA528FAAD4EB2E10B, (0x53DA9AC7BA9C16D65D7BDBAD0B63F045, 0x4769317B0562C45949C18B3855F8BF4A)),
+])
+def test_mct_reference(store, direction, output, last):
+    """
+    Checks the first iteration, the chaining into the second one and the key and output of
+    the last one against CBCMCT128.rsp. test_drivers checks both directions against
+    pycryptodome's CBC mode.
+    """
+    records = list(store.stream(f"mct_{direction}"))
+    (key0, iv0, first0, last0), (key1, iv1, _, _) = records[:2]
+    assert (key0, iv0, first0) == tuple(MCT_SEED[direction].values())
+    assert last0 == output
+    assert (key1, iv1) == (key0 ^ last0, last0)
+    assert (records[-1][0], records[-1][3]) == last
+
+@pytest.mark.parametrize("direction", ["enc", "dec"])
+def test_drivers(store, direction):
+    """
+    Runs the KAT and MCT loops against a software CBC model of a DUT interface.
+    """
+    model = CBCModel(direction)
+    for section in KAT:
+        assert asyncio.run(run_kat(store, section, direction, model.session)) == []
+    asyncio.run(run_mct(store, direction, model.session, model.block, iterations=3))
+    assert model.blocks == 7 + 21 + 128 + 128 + 3*MCT_INNER
+
+    # Only the records with a wrong output are reported
+    async def broken(iv, key, data):
+        return (await model.session(iv, key, data)) ^ (key == 0)
+    assert asyncio.run(run_kat(store, "keysbox", direction, broken)) == []
+    assert len(asyncio.run(run_kat(store, "gfsbox", direction, broken))) == 7
@@ -0,0 +1,262 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Vectorized NumPy reference model of AES-128 (FIPS-197).
+
+Blocks, keys and initial vectors are handled as uint8 arrays whose last axis
+holds the 16 bytes of a block in FIPS-197 order, i.e. byte 0 is bits 127..120
+of the 128-bit integers used throughout the testbenches. Every function
+broadcasts over the leading axes, so many keys, initial vectors and blocks
+can be processed in a single call.
+
+The optional round trace follows the order of operations in the RTL, so a
+mismatch can be traced to a single stage of aes_128_top_enc/aes_128_top_dec:
+
+    Encryption (trace keys, last axis is the state):
+        "add_round_key" (..., 11, 16) - state after adding e_key(r), r = 0..10
+        "s_box"         (..., 10, 16) - state after s_box in round r = 1..10
+        "shift_rows"    (..., 10, 16) - state after shift_rows in round r = 1..10
+        "mix_columns"   (..., 9, 16)  - state after mix_columns in round r = 1..9
+
+    Decryption:
+        "add_round_key"   (..., 11, 16) - state after adding e_key(10 - r), r = 0..10
+        "inv_shift_rows"  (..., 10, 16) - state after inv_shift_rows in round r = 1..10
+        "inv_s_box"       (..., 10, 16) - state after inv_s_box in round r = 1..10
+        "inv_mix_columns" (..., 9, 16)  - state after inv_mix_columns in round r = 1..9
+
+For CBC, round 0 of encryption includes the XOR with the initial vector or
+previous cipherblock, and the last decryption stage excludes it, matching the
+add_round_key processes in the RTL. CTR traces are those of the counter blocks.
+"""
+import numpy as np
+
+def _xtime(a):
+    a = (a << 1) ^ (0x1B if a & 0x80 else 0)
+    return a & 0xFF
+
+def _gf_mul(a, b):
+    p = 0
+    while b:
+        if b & 1:
+            p ^= a
+        a = _xtime(a)
+        b >>= 1
+    return p
+
+def _build_s_box():
+    s_box = np.zeros(256, dtype=np.uint8)
+    for x in range(256):
+        # Multiplicative inverse in GF(2^8) (0 maps to 0), then the affine transformation
+        inv = next((y for y in range(1, 256) if _gf_mul(x, y) == 1), 0)
+        s = inv
+        for shift in range(1, 5):
+            s ^= ((inv << shift) | (inv >> (8 - shift))) & 0xFF
+        s_box[x] = s ^ 0x63
+    return s_box
+
+S_BOX = _build_s_box()
+INV_S_BOX = np.argsort(S_BOX).astype(np.uint8)
+
+MUL = {k: np.array([_gf_mul(x, k) for x in range(256)], dtype=np.uint8) for k in (2, 3, 9, 11, 13, 14)}
+
+R_CON = np.array([0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36], dtype=np.uint8)
+
+# State byte i sits in column i//4, row i%4
+SHIFT_ROWS     = np.array([4*((c + r) % 4) + r for c in range(4) for r in range(4)])
+INV_SHIFT_ROWS = np.array([4*((c - r) % 4) + r for c in range(4) for r in range(4)])
+# Rows 1, 2 and 3 below the current row of the same column
+_ROW_ROT = [np.array([4*c + (r + k) % 4 for c in range(4) for r in range(4)]) for k in range(4)]
+
+### CONVERSIONS ###
+def to_blocks(data) -> np.ndarray:
+    """
+    Converts a 128-bit integer, a sequence of integers, bytes-like data (a multiple
+    of 16 bytes) or an existing uint8 array to a uint8 array of shape (..., 16).
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype != np.uint8 or data.shape[-1] != 16:
+            raise ValueError("Block arrays must be uint8 with a last axis of 16")
+        return data
+    if isinstance(data, int):
+        return np.frombuffer(data.to_bytes(16, 'big'), dtype=np.uint8).copy()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if len(data) % 16 != 0:
+            raise ValueError("Data must be a multiple of 16 bytes")
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, 16).copy()
+    return np.stack([to_blocks(d) for d in data])
+
+def to_int(block) -> int | list:
+    """
+    Converts a (..., 16) uint8 array back to 128-bit integers (nested lists for
+    more than one leading axis).
+    """
+    block = np.asarray(block, dtype=np.uint8)
+    if block.ndim == 1:
+        return int.from_bytes(block.tobytes(), 'big')
+    return [to_int(b) for b in block]
+
+def to_bytes(blocks) -> bytes:
+    return np.ascontiguousarray(blocks, dtype=np.uint8).tobytes()
+
+### ROUND FUNCTIONS ###
+def sub_bytes(state):
+    return S_BOX[state]
+
+def inv_sub_bytes(state):
+    return INV_S_BOX[state]
+
+def shift_rows(state):
+    return state[..., SHIFT_ROWS]
+
+def inv_shift_rows(state):
+    return state[..., INV_SHIFT_ROWS]
+
+def mix_columns(state):
+    r1, r2, r3 = (state[..., idx] for idx in _ROW_ROT[1:])
+    return MUL[2][state] ^ MUL[3][r1] ^ r2 ^ r3
+
+def inv_mix_columns(state):
+    r1, r2, r3 = (state[..., idx] for idx in _ROW_ROT[1:])
+    return MUL[14][state] ^ MUL[11][r1] ^ MUL[13][r2] ^ MUL[9][r3]
+
+### KEY EXPANSION ###
+def expand_keys(keys) -> np.ndarray:
+    """
+    Expands one or more keys into the 11 round keys produced by key_expansion.
+    Returns an array of shape (..., 11, 16), where [..., r, :] is e_key(r).
+    """
+    keys = to_blocks(keys)
+    words = np.empty(keys.shape[:-1] + (44, 4), dtype=np.uint8)
+    words[..., 0:4, :] = keys.reshape(keys.shape[:-1] + (4, 4))
+    for i in range(4, 44):
+        temp = words[..., i-1, :]
+        if i % 4 == 0:
+            temp = S_BOX[np.roll(temp, -1, axis=-1)]
+            temp[..., 0] ^= R_CON[i//4 - 1]
+        words[..., i, :] = words[..., i-4, :] ^ temp
+    return words.reshape(keys.shape[:-1] + (11, 16))
+
+def _round_keys(keys, round_keys):
+    if round_keys is not None:
+        return round_keys
+    return expand_keys(keys)
+
+### BLOCK CIPHER ###
+def encrypt_blocks(keys, blocks, round_keys=None, trace=False):
+    """
+    Encrypts blocks (ECB). keys and blocks broadcast against each other, e.g. a
+    (K, 1, 16) array of keys with a (K, N, 16) array of blocks. Pass round_keys
+    from expand_keys() to skip re-expanding the keys.
+    Returns the cipherblocks, or (cipherblocks, trace) if trace is set.
+    """
+    e_key = _round_keys(keys, round_keys)
+    state = to_blocks(blocks) ^ e_key[..., 0, :]
+    if trace:
+        stages = {name: [] for name in ("add_round_key", "s_box", "shift_rows", "mix_columns")}
+        stages["add_round_key"].append(state)
+    for rnd in range(1, 11):
+        state = sub_bytes(state)
+        if trace: stages["s_box"].append(state)
+        state = shift_rows(state)
+        if trace: stages["shift_rows"].append(state)
+        if rnd != 10:
+            state = mix_columns(state)
+            if trace: stages["mix_columns"].append(state)
+        state = state ^ e_key[..., rnd, :]
+        if trace: stages["add_round_key"].append(state)
+    if trace:
+        return state, {name: np.stack(np.broadcast_arrays(*s), axis=-2) for name, s in stages.items()}
+    return state
+
+def decrypt_blocks(keys, blocks, round_keys=None, trace=False):
+    """
+    Decrypts blocks (ECB) in the order used by aes_128_top_dec. Arguments and
+    return values are the same as for encrypt_blocks().
+    """
+    e_key = _round_keys(keys, round_keys)
+    state = to_blocks(blocks) ^ e_key[..., 10, :]
+    if trace:
+        stages = {name: [] for name in ("add_round_key", "inv_shift_rows", "inv_s_box", "inv_mix_columns")}
+        stages["add_round_key"].append(state)
+    for rnd in range(1, 11):
+        state = inv_shift_rows(state)
+        if trace: stages["inv_shift_rows"].append(state)
+        state = inv_sub_bytes(state)
+        if trace: stages["inv_s_box"].append(state)
+        state = state ^ e_key[..., 10 - rnd, :]
+        if trace: stages["add_round_key"].append(state)
+        if rnd != 10:
+            state = inv_mix_columns(state)
+            if trace: stages["inv_mix_columns"].append(state)
+    if trace:
+        return state, {name: np.stack(np.broadcast_arrays(*s), axis=-2) for name, s in stages.items()}
+    return state
+
+### CBC MODE ###
+def cbc_encrypt(keys, init_vecs, blocks, round_keys=None, trace=False):
+    """
+    CBC encryption of one or more streams. blocks has shape (..., N, 16); keys and
+    init_vecs broadcast against (..., 16). The chain is serial along N, so all
+    streams are advanced together, one block per step.
+    Returns the cipherblocks, or (cipherblocks, trace) where every trace array
+    has an extra block axis: (..., N, rounds, 16).
+    """
+    e_key = _round_keys(keys, round_keys)
+    blocks = to_blocks(blocks)
+    prev = to_blocks(init_vecs)
+    lead = np.broadcast_shapes(blocks.shape[:-2], prev.shape[:-1], e_key.shape[:-2])
+    out = np.empty(lead + blocks.shape[-2:], dtype=np.uint8)
+    traces = []
+    for n in range(blocks.shape[-2]):
+        result = encrypt_blocks(None, blocks[..., n, :] ^ prev, round_keys=e_key, trace=trace)
+        if trace:
+            result, block_trace = result
+            traces.append(block_trace)
+        out[..., n, :] = result
+        prev = result
+    if trace:
+        return out, {name: np.stack([t[name] for t in traces], axis=-3) for name in traces[0]}
+    return out
+
+def cbc_decrypt(keys, init_vecs, blocks, round_keys=None, trace=False):
+    """
+    CBC decryption of one or more streams. Arguments and return values are the same
+    as for cbc_encrypt(). All blocks of all streams are decrypted in one call.
+    """
+    e_key = _round_keys(keys, round_keys)
+    blocks = to_blocks(blocks)
+    init_vecs = to_blocks(init_vecs)[..., None, :]
+    lead = np.broadcast_shapes(blocks.shape[:-2], init_vecs.shape[:-2], e_key.shape[:-2])
+    blocks = np.broadcast_to(blocks, lead + blocks.shape[-2:])
+    prev = np.concatenate([np.broadcast_to(init_vecs, lead + (1, 16)), blocks[..., :-1, :]], axis=-2)
+    result = decrypt_blocks(None, blocks, round_keys=e_key[..., None, :, :], trace=trace)
+    if trace:
+        result, block_trace = result
+        return result ^ prev, block_trace
+    return result ^ prev
+
+def ctr_blocks(counters, num_blocks) -> np.ndarray:
+    """
+    Returns the counter blocks counter + i (mod 2^128), i = 0..num_blocks-1, of one or
+    more initial counters, as an array of shape (..., num_blocks, 16).
+    """
+    halves = np.ascontiguousarray(to_blocks(counters)).view('>u8').astype(np.uint64)
+    step = np.arange(num_blocks, dtype=np.uint64)
+    low  = halves[..., 1, None] + step # Wraps modulo 2^64
+    high = halves[..., 0, None] + (low < halves[..., 1, None])
+    return np.stack([high, low], axis=-1).astype('>u8').view(np.uint8)
+
+def ctr_crypt(keys, counters, blocks, round_keys=None, trace=False):
+    """
+    CTR encryption or decryption (the same operation) of one or more streams. blocks has
+    shape (..., N, 16); keys and counters broadcast against (..., 16). Unlike CBC the
+    key stream has no serial dependency, so all blocks are encrypted in one call.
+    Returns the output blocks, or (blocks, trace) for the counter blocks.
+    """
+    e_key = _round_keys(keys, round_keys)
+    blocks = to_blocks(blocks)
+    key_stream = encrypt_blocks(None, ctr_blocks(counters, blocks.shape[-2]),
+                                round_keys=e_key[..., None, :, :], trace=trace)
+    if trace:
+        key_stream, block_trace = key_stream
+        return key_stream ^ blocks, block_trace
+    return key_stream ^ blocks
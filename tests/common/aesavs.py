@@ -0,0 +1,231 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+NIST AESAVS conformance vectors for AES-128 and a memory-mapped store to stream them from.
+
+The known-answer tests (GFSbox, KeySbox, VarKey and VarTxt) and the CBC Monte Carlo test
+follow "The Advanced Encryption Standard Algorithm Validation Suite (AESAVS)". The known
+answers of GFSbox and KeySbox are the published ones; VarKey and VarTxt are generated with
+the NumPy model, which is checked against the published first and last vectors. Each Monte
+Carlo direction starts from its published CBCMCT128.rsp seed.
+
+The store is a 32-byte header (MAGIC and the record count of each section in SECTIONS as
+little-endian uint32) followed by the records of each section in SECTIONS order. A record is
+64 bytes: key, iv, input and output, 16 bytes each in testbench (big-endian) order.
+- Known-answer records have a zero iv, the plaintext as input and the ciphertext as output.
+  Decryption runs them from output to input.
+- Monte Carlo records hold Key[i], IV[i], the first input and the last output (CT[999] or
+  PT[999]) of outer iteration i.
+
+run_kat() and run_mct() drive any DUT through two coroutines: session(iv, key, data) starts
+a new CBC session with its first block and returns the output, block(data) runs the next
+block of the session. Records are converted to integers one at a time as they are
+streamed, and the Monte Carlo loop only moves integers between blocks.
+"""
+import os
+
+import numpy as np
+from Crypto.Cipher import AES
+
+from common.aes_model import encrypt_blocks, to_blocks
+from common.runner_utils import RESULTS_DIR
+
+MAGIC      = b"AESAVS02"
+SECTIONS   = ("gfsbox", "keysbox", "varkey", "vartxt", "mct_enc", "mct_dec")
+KAT        = SECTIONS[:4]
+RECORD     = np.dtype([("key", "u1", (16,)), ("iv", "u1", (16,)), ("input", "u1", (16,)), ("output", "u1", (16,))])
+HEADER     = np.dtype([("magic", "S8"), ("counts", "<u4", (len(SECTIONS),))])
+STORE_FILE = RESULTS_DIR / "aesavs.bin"
+
+MCT_OUTER = 100  # Outer iterations, one record each
+MCT_INNER = 1000 # Chained blocks per outer iteration
+
+# AESAVS Appendix B, GFSbox with a zero key: (plaintext, ciphertext)
+GFSBOX = [
+    (0xF34481EC3CC627BACD5DC3FB08F273E6, 0x0336763E966D92595A567CC9CE537F5E),
+    (0x9798C4640BAD75C7C3227DB910174E72, 0xA9A1631BF4996954EBC093957B234589),
+    (0x96AB5C2FF612D9DFAAE8C31F30C42168, 0xFF4F8391A6A40CA5B25D23BEDD44A597),
+    (0x6A118A874519E64E9963798A503F1D35, 0xDC43BE40BE0E53712F7E2BF5CA707209),
+    (0xCB9FCEEC81286CA3E989BD979B0CB284, 0x92BEEDAB1895A94FAA69B632E5CC47CE),
+    (0xB26AEB1874E47CA8358FF22378F09144, 0x459264F4798F6A78BACB89C15ED3D601),
+    (0x58C8E00B2631686D54EAB84B91F0ACA1, 0x08A4E2EFEC8A8E3312CA7460B9040BBF),
+]
+
+# AESAVS Appendix C, KeySbox with a zero plaintext: (key, ciphertext)
+KEYSBOX = [
+    (0x10A58869D74BE5A374CF867CFB473859, 0x6D251E6944B051E04EAA6FB4DBF78465),
+    (0xCAEA65CDBB75E9169ECD22EBE6E54675, 0x6E29201190152DF4EE058139DEF610BB),
+    (0xA2E2FA9BAF7D20822CA9F0542F764A41, 0xC3B44B95D9D2F25670EEE9A0DE099FA3),
+    (0xB6364AC4E1DE1E285EAF144A2415F7A0, 0x5D9B05578FC944B3CF1CCF0E746CD581),
+    (0x64CF9C7ABC50B888AF65F49D521944B2, 0xF7EFC89D5DBA578104016CE5AD659C05),
+    (0x47D6742EEFCC0465DC96355E851B64D9, 0x0306194F666D183624AA230A8B264AE7),
+    (0x3EB39790678C56BEE34BBCDECCF6CDB5, 0x858075D536D79CCEE571F7D7204B1F67),
+    (0x64110A924F0743D500CCADAE72C13427, 0x35870C6A57E9E92314BCB8087CDE72CE),
+    (0x18D8126516F8A12AB1A36D9F04D68E51, 0x6C68E9BE5EC41E22C825B7C7AFFB4363),
+    (0xF530357968578480B398A3C251CD1093, 0xF5DF39990FC688F1B07224CC03E86CEA),
+    (0xDA84367F325D42D601B4326964802E8E, 0xBBA071BCB470F8F6586E5D3ADD18BC66),
+    (0xE37B1C6AA2846F6FDB413F238B089F23, 0x43C9F7E62F5D288BB27AA40EF8FE1EA8),
+    (0x6C002B682483E0CABCC731C253BE5674, 0x3580D19CFF44F1014A7C966A69059DE5),
+    (0x143AE8ED6555ABA96110AB58893A8AE1, 0x806DA864DD29D48DEAFBE764F8202AEF),
+    (0xB69418A85332240DC82492353956AE0C, 0xA303D940DED8F0BAFF6F75414CAC5243),
+    (0x71B5C08A1993E1362E4D0CE9B22B78D5, 0xC2DABD117F8A3ECABFBB11D12194D9D0),
+    (0xE234CDCA2606B81F29408D5F6DA21206, 0xFFF60A4740086B3B9C56195B98D91A7B),
+    (0x13237C49074A3DA078DC1D828BB78C6F, 0x8146A08E2357F0CAA30CA8C94D1A0544),
+    (0x3071A2A48FE6CBD04F1A129098E308F8, 0x4B98E06D356DEB07EBB824E5713F7BE3),
+    (0x90F42EC0F68385F2FFC5DFC03A654DCE, 0x7A20A53D460FC9CE0423A7A0764C6CF2),
+    (0xFEBD9A24D8B65C1C787D50A4ED3619A9, 0xF4A70D8AF877F9B02B4C40DF57D45B17),
+]
+
+# Seeds of the CBC Monte Carlo test (CBCMCT128.rsp, ENCRYPT and DECRYPT COUNT = 0)
+MCT_SEED = {
+    "enc" : {"key" : 0x8809E7DD3A959EE5D8DBB13F501F2274, "iv" : 0xE5C0BB535D7D54572AD06D170A0E58AE,
+             "input" : 0x1FD4EE65603E6130CFC2A82AB3D56C24},
+    "dec" : {"key" : 0x287B07C78F8E3E1BE7C41B3D96C04E6E, "iv" : 0x41B461F9464FD515D25413B4241002B8,
+             "input" : 0x7C54923B0490A9D4DE4EC1CE6790AA4D},
+}
+
+def leading_ones(n) -> int:
+    """
+    Returns the 128-bit value with the n most significant bits set.
+    """
+    return ((1 << n) - 1) << (128 - n)
+
+def _records(keys, inputs, outputs, ivs=None) -> np.ndarray:
+    records = np.zeros(len(keys), dtype=RECORD)
+    records["key"]    = to_blocks(keys)
+    records["input"]  = to_blocks(inputs)
+    records["output"] = to_blocks(outputs)
+    if ivs is not None:
+        records["iv"] = to_blocks(ivs)
+    return records
+
+def kat_records(section) -> np.ndarray:
+    """
+    Returns the records of one known-answer section.
+    """
+    if section == "gfsbox":
+        return _records([0]*len(GFSBOX), *zip(*GFSBOX))
+    if section == "keysbox":
+        keys, outputs = zip(*KEYSBOX)
+        return _records(keys, [0]*len(KEYSBOX), outputs)
+    values = to_blocks([leading_ones(n) for n in range(1, 129)])
+    zeros  = np.zeros_like(values)
+    if section == "varkey":
+        keys, inputs = values, zeros
+    elif section == "vartxt":
+        keys, inputs = zeros, values
+    else:
+        raise ValueError(f"Unknown known-answer section {section}")
+    records = np.zeros(128, dtype=RECORD)
+    records["key"], records["input"] = keys, inputs
+    records["output"] = encrypt_blocks(keys, inputs)
+    return records
+
+def mct_records(direction, outer=MCT_OUTER) -> np.ndarray:
+    """
+    Returns one record per outer iteration of the CBC Monte Carlo test, following the AESAVS
+    pseudocode with pycryptodome as the block cipher.
+    """
+    key, iv, first = MCT_SEED[direction]["key"], MCT_SEED[direction]["iv"], MCT_SEED[direction]["input"]
+    rows = []
+    for _ in range(outer):
+        cipher = AES.new(key.to_bytes(16, 'big'), AES.MODE_ECB)
+        inputs, outputs = [first], []
+        for j in range(MCT_INNER):
+            chain = iv if j == 0 else (outputs[j-1] if direction == "enc" else inputs[j-1])
+            if direction == "enc":
+                block = cipher.encrypt((inputs[j] ^ chain).to_bytes(16, 'big'))
+                outputs.append(int.from_bytes(block, 'big'))
+            else:
+                block = cipher.decrypt(inputs[j].to_bytes(16, 'big'))
+                outputs.append(int.from_bytes(block, 'big') ^ chain)
+            inputs.append(iv if j == 0 else outputs[j-1])
+        rows.append((key, iv, first, outputs[-1]))
+        key, iv, first = key ^ outputs[-1], outputs[-1], outputs[-2]
+    keys, ivs, inputs, outputs = zip(*rows)
+    return _records(keys, inputs, outputs, ivs)
+
+def build_store(path=STORE_FILE):
+    """
+    Generates every section and writes the store. The file is written under a temporary
+    name and renamed, so parallel jobs never read a partial store.
+    """
+    sections = [kat_records(section) for section in KAT] + [mct_records("enc"), mct_records("dec")]
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"]  = MAGIC
+    header["counts"] = [len(records) for records in sections]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header.tobytes())
+        for records in sections:
+            f.write(records.tobytes())
+    os.replace(tmp_path, path)
+
+class VectorStore():
+    """
+    Read-only view of a vector store. The records stay in the memory-mapped file and each
+    section is a slice of it.
+    """
+    def __init__(self, path=STORE_FILE):
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not an AESAVS vector store")
+        self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize)
+        self.sections = {}
+        offset = 0
+        for section, count in zip(SECTIONS, header["counts"][0]):
+            self.sections[section] = self.records[offset:offset+int(count)]
+            offset += int(count)
+
+    def __len__(self):
+        return len(self.records)
+
+    def stream(self, section, count=None):
+        """
+        Yields (key, iv, input, output) integers for the first count records of a section.
+        """
+        for record in self.sections[section][:count]:
+            yield tuple(int.from_bytes(record[field].tobytes(), 'big') for field in RECORD.names)
+
+def open_store(path=STORE_FILE) -> VectorStore:
+    """
+    Opens the store, building it first if it is missing or has another format.
+    """
+    try:
+        return VectorStore(path)
+    except (FileNotFoundError, ValueError):
+        build_store(path)
+        return VectorStore(path)
+
+async def run_kat(store, section, direction, session) -> list:
+    """
+    Runs every record of a known-answer section through session(iv, key, data) and returns
+    the indices of the records whose output did not match.
+    """
+    failed = []
+    for index, (key, iv, plaintext, ciphertext) in enumerate(store.stream(section)):
+        data, expected = (plaintext, ciphertext) if direction == "enc" else (ciphertext, plaintext)
+        if await session(iv, key, data) != expected:
+            failed.append(index)
+    return failed
+
+async def run_mct(store, direction, session, block, iterations=MCT_OUTER):
+    """
+    Runs the first iterations outer iterations of the CBC Monte Carlo test. The key, iv and
+    first input of each iteration are derived from the outputs of the DUT and checked
+    against the store, as is the last output. Raises AssertionError at the first mismatch.
+    """
+    key = iv = first = None
+    for i, (exp_key, exp_iv, exp_first, exp_last) in enumerate(store.stream(f"mct_{direction}", iterations)):
+        if i == 0:
+            key, iv, first = exp_key, exp_iv, exp_first
+        assert (key, iv, first) == (exp_key, exp_iv, exp_first), f"MCT {direction}: iteration {i} did not start from the expected key, iv and input."
+
+        # Inputs are the first input, iv, then the output two blocks back
+        prev, last = None, await session(iv, key, first)
+        next_input = iv
+        for _ in range(MCT_INNER - 1):
+            prev, last = last, await block(next_input)
+            next_input = prev
+        assert last == exp_last, f"MCT {direction}: iteration {i} ended with {last:032X}, expected {exp_last:032X}."
+        key, iv, first = key ^ last, last, prev
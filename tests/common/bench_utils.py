@@ -0,0 +1,82 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import json
+import os
+import subprocess
+import time
+
+from cocotb.triggers import ReadOnly, RisingEdge
+from cocotb.utils import get_sim_time
+from common.runner_utils import RESULTS_DIR, proj_path
+
+BENCH_FILE = RESULTS_DIR / "benchmarks.json"
+
+class CycleCounter():
+    """
+    Converts simulation time into clock cycles. Create it right after a rising edge of clk;
+    cycles is then the index of the last rising edge, at any point within the cycle.
+    """
+    def __init__(self, clk, period_ns):
+        self.clk    = clk
+        self.period = period_ns
+        self.origin = get_sim_time("ns")
+
+    @property
+    def cycles(self) -> int:
+        return int((get_sim_time("ns") - self.origin) // self.period)
+
+async def wait_high(counter, signal):
+    """
+    Waits until signal is '1' after a rising edge and returns the index of that edge.
+    """
+    while True:
+        await RisingEdge(counter.clk)
+        await ReadOnly()
+        if signal.value == 1:
+            return counter.cycles
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=proj_path, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def record_results(toplevel, config:dict, metrics:dict, path=BENCH_FILE):
+    """
+    Merges a set of cycle counts into the JSON benchmark file, keyed by top level and
+    generic settings, e.g. results["aes_128_top_wrapper_simple"]["SBOX_ARCHITECTURE=COMB"].
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    results = json.loads(path.read_text()) if path.exists() else {}
+    key = ",".join(f"{name}={value}" for name, value in sorted(config.items()))
+    entry = results.setdefault(toplevel, {}).setdefault(key, {"metrics" : {}})
+    entry["generics"]  = config
+    entry["revision"]  = git_revision()
+    entry["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    entry["metrics"].update(metrics)
+    path.write_text(json.dumps(results, indent=4, sort_keys=True))
+
+def check_regressions(results:dict, baseline:dict, tolerance:int = 0) -> list:
+    """
+    Compares two benchmark files and returns a description of every metric whose cycle
+    count grew by more than tolerance cycles. Metrics missing from either side are ignored.
+    """
+    regressions = []
+    for toplevel, configs in baseline.items():
+        for config, entry in configs.items():
+            current = results.get(toplevel, {}).get(config, {}).get("metrics", {})
+            for metric, cycles in entry["metrics"].items():
+                if metric in current and current[metric] > cycles + tolerance:
+                    regressions.append(f"{toplevel} [{config}] {metric}: {cycles} -> {current[metric]} cycles")
+    return regressions
+
+def check_baseline(path=BENCH_FILE):
+    """
+    Fails if the results regressed against the file named by BENCH_BASELINE (if set).
+    """
+    baseline = os.getenv("BENCH_BASELINE")
+    if baseline is None:
+        return
+    regressions = check_regressions(json.loads(path.read_text()), json.loads(open(baseline).read()),
+                                    int(os.getenv("BENCH_TOLERANCE", "0")))
+    assert not regressions, "Cycle count regressions:\n" + "\n".join(regressions)
@@ -2,6 +2,7 @@
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 from cocotb.triggers import RisingEdge
+from common import aes_model
 
 def byte(dat : int):
     return dat.to_bytes(16, byteorder='big')
@@ -48,6 +49,15 @@ def decrypt_string(iv : int, key : int, block: str, ) -> bytes:
 
     return decrypted_plaintext.decode('utf-8')
 
+def encrypt_ctr(counter : int, key : int, data : bytes) -> bytes:
+    """
+    CTR encryption/decryption with the NumPy model, counting from the 128-bit initial
+    counter block like aes_128_top_ctr. data can be any length, the last key stream
+    block is truncated.
+    """
+    padded = bytes(data) + bytes(-len(data) % 16)
+    return aes_model.to_bytes(aes_model.ctr_crypt(key, counter, padded))[:len(data)]
+
 async def sync(dut, ccs):
     for _ in range(ccs): await RisingEdge(dut.clk)
 
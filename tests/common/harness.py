@@ -0,0 +1,116 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Stimulus and response files of the simulation harnesses in src/sim. A test builds every
+command of a run, writes them with one call, pulses run and reads all responses back,
+so Python is woken once per run instead of on every clock edge.
+
+    stimulus = SimpleStimulus()
+    stimulus.job("enc", init_vec, key, data)
+    outputs = join_blocks(await run_harness(dut, stimulus))
+"""
+import os
+from pathlib import Path
+
+from cocotb.triggers import FallingEdge, RisingEdge
+
+class Stimulus():
+    """
+    Command lines of a stimulus file. blocks is the number of responses to expect.
+    """
+    def __init__(self):
+        self.lines  = []
+        self.blocks = 0
+
+    def reset(self):
+        self.lines.append("R")
+
+    def write(self, path):
+        Path(path).write_text("\n".join(self.lines) + "\n")
+
+class SimpleStimulus(Stimulus):
+    """
+    Stimulus of aes_128_top_wrapper_simple_harness.
+    """
+    def block(self, direction:str, data:int, init_vec:int|None = None, key:int|None = None):
+        """
+        One block on the "enc" or "dec" interface. Giving init_vec and key starts a session.
+        """
+        session = init_vec is not None
+        self.lines.append(f"{'E' if direction == 'enc' else 'D'} {int(session)} {init_vec or 0:032X} "
+                          f"{key or 0:032X} {data:032X}")
+        self.blocks += 1
+
+    def job(self, direction:str, init_vec:int, key:int, data:bytes):
+        """
+        A CBC session over a multiple of 16 bytes.
+        """
+        for i in range(0, len(data), 16):
+            block = int.from_bytes(data[i:i+16], 'big')
+            if i == 0:
+                self.block(direction, block, init_vec, key)
+            else:
+                self.block(direction, block)
+
+class BusStimulus(Stimulus):
+    """
+    Stimulus of aes_128_top_wrapper_harness.
+    """
+    def switch_dec(self):
+        self.lines.append("S")
+
+    def transmit_word(self, word:int):
+        self.lines.append(f"W {word:08X}")
+
+    def transmit_block(self, block:int):
+        self.lines.append(f"T {block:032X}")
+
+    def receive_block(self):
+        self.lines.append("O")
+        self.blocks += 1
+
+    def job(self, direction:str, init_vec:int, key:int, data:bytes, in_flight:int = 1):
+        """
+        Resets (or switches to decryption mode) and runs a CBC buffer with up to in_flight
+        blocks transmitted and not yet received (FIFO_DEPTH).
+        """
+        if direction == "enc":
+            self.reset()
+        else:
+            self.switch_dec()
+        blocks = [int.from_bytes(data[i:i+16], 'big') for i in range(0, len(data), 16)]
+        self.transmit_block(init_vec)
+        self.transmit_block(key)
+        self.transmit_block(blocks[0])
+        sent, received = 1, 0
+        while received < len(blocks):
+            if sent < len(blocks) and sent - received < in_flight:
+                self.transmit_block(blocks[sent])
+                sent += 1
+            else:
+                self.receive_block()
+                received += 1
+
+def read_responses(path) -> list:
+    """
+    Returns the (value, cycle) pairs of a response file.
+    """
+    fields = Path(path).read_text().split()
+    return [(int(fields[i], 16), int(fields[i+1])) for i in range(0, len(fields), 2)]
+
+def join_blocks(responses) -> bytes:
+    return b"".join(value.to_bytes(16, 'big') for value, cycle in responses)
+
+async def run_harness(dut, stimulus:Stimulus) -> list:
+    """
+    Runs the stimulus through the harness and returns its (value, cycle) responses. The
+    file names are the STIMULUS_FILE and RESPONSE_FILE generics, which the runner also
+    passes in the environment.
+    """
+    stimulus.write(os.environ["STIMULUS_FILE"])
+    dut.run.value = 1
+    await RisingEdge(dut.finished)
+    dut.run.value = 0
+    await FallingEdge(dut.finished)
+    responses = read_responses(os.environ["RESPONSE_FILE"])
+    assert len(responses) == stimulus.blocks, f"{len(responses)} responses to {stimulus.blocks} blocks"
+    return responses
@@ -0,0 +1,350 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Passive latency monitors for the wrappers. Every rising edge of clk the handshake signals
+are sampled (the values the DUT saw at that edge), transactions are timestamped in clock
+cycles, and the latencies are collected into histograms per test and generic setting.
+Results are exported to LATENCY_DIR as JSON (with histograms) and CSV (percentiles).
+With TRACE=1 the sampled handshake signals are also written to a compact binary trace.
+"""
+import csv
+import functools
+import json
+import os
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+
+import cocotb
+from cocotb.triggers import RisingEdge
+from common.runner_utils import RESULTS_DIR
+
+LATENCY_DIR = Path(os.getenv("LATENCY_DIR", RESULTS_DIR / "latency"))
+PERCENTILES = [50, 90, 99]
+CSV_FIELDS  = ["config", "test", "metric", "count", "min", "mean"] + [f"p{p}" for p in PERCENTILES] + ["max"]
+
+TRACE_MAGIC = b"AESTRC1\n"
+
+class LatencyHistogram():
+    """
+    Counts how often each latency (in clock cycles) occurred.
+    """
+    def __init__(self):
+        self.counts = Counter()
+
+    @classmethod
+    def from_summary(cls, summary:dict):
+        histogram = cls()
+        histogram.counts.update({int(cycles) : n for cycles, n in summary["histogram"].items()})
+        return histogram
+
+    def add(self, cycles:int):
+        self.counts[cycles] += 1
+
+    def percentile(self, p) -> int:
+        """
+        Nearest-rank percentile: the smallest latency with at least p% of the samples at or below it.
+        """
+        total = sum(self.counts.values())
+        rank = max(1, -(-p*total // 100)) # ceil
+        seen = 0
+        for cycles in sorted(self.counts):
+            seen += self.counts[cycles]
+            if seen >= rank:
+                return cycles
+        raise ValueError("Histogram is empty")
+
+    def summary(self) -> dict:
+        total = sum(self.counts.values())
+        summary = {
+            "count" : total,
+            "min"   : min(self.counts),
+            "mean"  : round(sum(cycles*n for cycles, n in self.counts.items()) / total, 2),
+            "max"   : max(self.counts),
+        }
+        for p in PERCENTILES:
+            summary[f"p{p}"] = self.percentile(p)
+        summary["histogram"] = {str(cycles) : self.counts[cycles] for cycles in sorted(self.counts)}
+        return summary
+
+### TRACE ###
+def _varint(value:int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+class TraceWriter():
+    """
+    Writes up to 8 one-bit signals as a change-only trace: a header line (magic and JSON
+    with the signal names and clock period), then one record per change of any signal,
+    made of the cycles since the previous record as a varint and one byte holding the
+    signals (bit i = signal i). Long idle or steady stretches cost nothing.
+    """
+    def __init__(self, path, signals:list, period_ns:float):
+        if len(signals) > 8:
+            raise ValueError("A trace holds at most 8 signals")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "wb")
+        self.file.write(TRACE_MAGIC + json.dumps({"signals" : signals, "period_ns" : period_ns}).encode() + b"\n")
+        self.buffer = bytearray()
+        self.last_cycle = 0
+        self.last_bits  = None
+
+    def sample(self, cycle:int, bits:int):
+        if bits == self.last_bits:
+            return
+        self.buffer += _varint(cycle - self.last_cycle)
+        self.buffer.append(bits)
+        self.last_cycle, self.last_bits = cycle, bits
+        if len(self.buffer) >= 1 << 16:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        self.file.write(self.buffer)
+        self.file.close()
+
+def read_trace(path) -> tuple:
+    """
+    Returns the header of a trace and a list of (cycle, {signal : 0/1}) changes.
+    """
+    data = Path(path).read_bytes()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} is not a trace file")
+    end = data.index(b"\n", len(TRACE_MAGIC))
+    header = json.loads(data[len(TRACE_MAGIC):end])
+    changes, cycle, shift, delta = [], 0, 0, 0
+    position = end + 1
+    while position < len(data):
+        byte = data[position]
+        position += 1
+        delta |= (byte & 0x7F) << shift
+        shift += 7
+        if byte & 0x80:
+            continue
+        cycle += delta
+        bits = data[position]
+        position += 1
+        changes.append((cycle, {name : (bits >> i) & 1 for i, name in enumerate(header["signals"])}))
+        shift, delta = 0, 0
+    return header, changes
+
+### MONITORS ###
+class EdgeMonitor():
+    """
+    Base class: samples a set of one-bit signals at every rising edge of clk and passes
+    them to on_edge() with the index of the edge. Subclasses fill self.histograms.
+    """
+    def __init__(self, dut, signals:dict, trace_path=None, period_ns:float = 8):
+        self.clk        = dut.clk
+        self.signals    = signals
+        self.histograms = defaultdict(LatencyHistogram)
+        self.trace      = TraceWriter(trace_path, list(signals)[:8], period_ns) if trace_path else None
+        self.task       = None
+
+    def start(self):
+        self.task = cocotb.start_soon(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def summary(self) -> dict:
+        return {metric : histogram.summary() for metric, histogram in sorted(self.histograms.items())}
+
+    async def _run(self):
+        cycle = 0
+        while True:
+            await RisingEdge(self.clk)
+            cycle += 1
+            # Read before the DUT updates its outputs and before any write of this time step
+            values = {name : handle.value == 1 for name, handle in self.signals.items()}
+            if self.trace is not None:
+                self.trace.sample(cycle, sum(int(value) << i for i, value in enumerate(list(values.values())[:8])))
+            self.on_edge(cycle, values)
+
+    def on_edge(self, cycle:int, values:dict):
+        raise NotImplementedError
+
+class SimpleLatencyMonitor(EdgeMonitor):
+    """
+    Timestamps every accepted start_* and every done_* of aes_128_top_wrapper_simple and
+    records, per interface, the cycles from start to done ("<direction>_latency") and
+    between consecutive outputs ("<direction>_interval"). Interfaces in pipelined are
+    matched in order with the valid/ready handshake (start and ready, one output per
+    cycle of done); the others with the start/done protocol (rising edges).
+    """
+    def __init__(self, dut, directions=("enc", "dec"), pipelined=(), **kwargs):
+        signals = {}
+        for direction in directions:
+            for name in ("start", "ready", "done", "reset"):
+                signals[f"{name}_{direction}"] = getattr(dut, f"{name}_{direction}")
+        super().__init__(dut, signals, **kwargs)
+        self.directions = directions
+        self.pipelined  = set(pipelined)
+        self.starts     = {direction : deque() for direction in directions}
+        self.last_done  = dict.fromkeys(directions)
+        self.previous   = {}
+
+    def on_edge(self, cycle, values):
+        for direction in self.directions:
+            start, ready, done, reset = (values[f"{name}_{direction}"] for name in ("start", "ready", "done", "reset"))
+            prev_start = self.previous.get(f"start_{direction}", False)
+            prev_done  = self.previous.get(f"done_{direction}", False)
+            if reset:
+                self.starts[direction].clear()
+                self.last_done[direction] = None
+                continue
+
+            if direction in self.pipelined:
+                accepted, output = start and ready, done
+            else:
+                accepted, output = start and not prev_start, done and not prev_done
+
+            if accepted:
+                self.starts[direction].append(cycle)
+            if output and self.starts[direction]:
+                # done was registered on the previous edge
+                finished = cycle - 1
+                self.histograms[f"{direction}_latency"].add(finished - self.starts[direction].popleft())
+                if self.last_done[direction] is not None:
+                    self.histograms[f"{direction}_interval"].add(finished - self.last_done[direction])
+                self.last_done[direction] = finished
+        self.previous = values
+
+class BusLatencyMonitor(EdgeMonitor):
+    """
+    Timestamps every word handshake on the bus of aes_128_top_wrapper and records the
+    cycles between input words ("input_interval") and output words ("output_interval"),
+    from a rising send_auth to the first output word ("send_auth_turnaround") and from
+    the last input word to the first output word of a block ("block_latency").
+    """
+    def __init__(self, dut, stream:bool, **kwargs):
+        signals = {name : getattr(dut, name) for name in ("start", "send_auth", "done", "reset")}
+        super().__init__(dut, signals, **kwargs)
+        self.stream = stream
+        self.reset_state()
+
+    def reset_state(self):
+        self.previous        = dict.fromkeys(self.signals, False)
+        self.last_input      = None
+        self.last_output     = None
+        self.send_auth_start = None
+
+    def add(self, metric, cycles):
+        self.histograms[metric].add(cycles)
+
+    def on_edge(self, cycle, values):
+        if values["reset"]:
+            self.reset_state()
+            return
+        previous = self.previous
+        # An input word was read on the previous edge if start was high without send_auth
+        # and done rose with it
+        if previous["start"] and not previous["send_auth"] and values["done"]:
+            if self.last_input is not None and self.last_output is None:
+                self.add("input_interval", cycle - 1 - self.last_input)
+            self.last_input  = cycle - 1
+            self.last_output = None # No output since the last input word
+        if values["send_auth"] and not previous["send_auth"]:
+            self.send_auth_start = cycle
+        # An output word is taken on this edge
+        if values["done"] and values["send_auth"] and (self.stream or values["start"]):
+            if self.send_auth_start is not None:
+                self.add("send_auth_turnaround", cycle - self.send_auth_start)
+                self.send_auth_start = None
+            if self.last_output is not None:
+                self.add("output_interval", cycle - self.last_output)
+            elif self.last_input is not None:
+                self.add("block_latency", cycle - self.last_input)
+            self.last_output = cycle
+        self.previous = values
+
+### EXPORT ###
+def env_config(names) -> dict:
+    """
+    Returns the generics set through the environment (by the runners) out of names.
+    """
+    return {name : os.environ[name] for name in names if name in os.environ}
+
+def config_key(config:dict) -> str:
+    return ",".join(f"{name}={value}" for name, value in sorted(config.items())) or "default"
+
+def read_latency(toplevel, directory=None) -> dict:
+    path = Path(directory or LATENCY_DIR) / f"{toplevel}.json"
+    return json.loads(path.read_text()) if path.exists() else {}
+
+def write_latency(toplevel, results:dict, directory=None):
+    """
+    Writes <toplevel>.json (summaries with histograms, keyed by generic setting and test)
+    and <toplevel>.csv with one row of percentiles per setting, test and metric.
+    """
+    directory = Path(directory or LATENCY_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{toplevel}.json").write_text(json.dumps(results, indent=4, sort_keys=True))
+
+    with open(directory / f"{toplevel}.csv", "w", newline="") as file:
+        writer = csv.DictWriter(file, CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for key, tests in sorted(results.items()):
+            for name, metrics in sorted(tests.items()):
+                for metric, values in sorted(metrics.items()):
+                    writer.writerow({"config" : key, "test" : name, "metric" : metric, **values})
+
+def export_latency(toplevel, config:dict, test, summary:dict, directory=None):
+    """
+    Replaces the summaries of one test under its generic setting.
+    """
+    results = read_latency(toplevel, directory)
+    results.setdefault(config_key(config), {})[test] = summary
+    write_latency(toplevel, results, directory)
+
+def merge_latency(toplevel, directories, directory=None) -> dict:
+    """
+    Adds up the histograms of the same setting, test and metric from several result
+    directories (e.g. the seeds of a regression) and writes the merged results.
+    """
+    histograms = defaultdict(LatencyHistogram)
+    for source in directories:
+        for key, tests in read_latency(toplevel, source).items():
+            for test, metrics in tests.items():
+                for metric, summary in metrics.items():
+                    histograms[key, test, metric].counts.update(LatencyHistogram.from_summary(summary).counts)
+    results = {}
+    for (key, test, metric), histogram in sorted(histograms.items()):
+        results.setdefault(key, {}).setdefault(test, {})[metric] = histogram.summary()
+    if results:
+        write_latency(toplevel, results, directory)
+    return results
+
+def record_latency(toplevel, config:dict, make_monitor):
+    """
+    Decorator for cocotb tests: runs the monitor returned by make_monitor(dut, trace_path)
+    for the whole test and exports its summary under the test name, even if the test fails.
+    """
+    def decorator(test):
+        @functools.wraps(test)
+        async def wrapper(dut):
+            trace_path = None
+            if os.getenv("TRACE", "0") == "1":
+                trace_path = LATENCY_DIR / "traces" / f"{toplevel}-{config_key(config).replace(',', '-')}-{test.__name__}.trace"
+            monitor = make_monitor(dut, trace_path)
+            monitor.start()
+            try:
+                await test(dut)
+            finally:
+                monitor.stop()
+                summary = monitor.summary()
+                if summary:
+                    export_latency(toplevel, config, test.__name__, summary)
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Decoder and readers for the performance counters of the wrappers (PERF_COUNTERS = true).
+The counter order matches the PERF_* constants in src/common/aes_pkg.vhd.
+"""
+from cocotb.triggers import FallingEdge, ReadOnly, RisingEdge
+from common.wrapper_utils import receive_handshake_words
+
+COUNTER_NAMES = [
+    "blocks",           # Blocks processed
+    "key_expansions",   # Keys expanded
+    "idle",             # Cycles in each control FSM state
+    "initial_setup",
+    "cached_setup",
+    "do_crypt",
+    "wait_for_in_data",
+    "bus_wait",         # Stall cycles on the start/ready or output handshake
+]
+STATE_COUNTERS = COUNTER_NAMES[2:7]
+COUNTER_WIDTH  = 32
+
+def decode_counters(words) -> dict:
+    """
+    Returns the counter words (in PERF_* order) as a dict keyed by counter name.
+    """
+    words = list(words)
+    if len(words) != len(COUNTER_NAMES):
+        raise ValueError(f"Expected {len(COUNTER_NAMES)} counter words, got {len(words)}")
+    return {name : int(word) & (2**COUNTER_WIDTH - 1) for name, word in zip(COUNTER_NAMES, words)}
+
+def counter_deltas(before:dict, after:dict) -> dict:
+    """
+    Returns after - before for every counter, allowing for one wrap of the 32-bit counters.
+    """
+    return {name : (after[name] - before[name]) % 2**COUNTER_WIDTH for name in COUNTER_NAMES}
+
+def format_counters(counters:dict) -> str:
+    """
+    Formats counters as a table, with each state as a share of the cycles in all states.
+    """
+    total = sum(counters[name] for name in STATE_COUNTERS)
+    lines = []
+    for name in COUNTER_NAMES:
+        line = f"{name:<18}{counters[name]:>12}"
+        if name in STATE_COUNTERS and total:
+            line += f"{100*counters[name]/total:>8.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+async def read_simple_counters(dut, direction) -> dict:
+    """
+    Reads the counters of the "enc" or "dec" interface of aes_128_top_wrapper_simple
+    through perf_select_*/perf_count_*, one counter per cycle. The counters keep running
+    while they are read. Returns in a writable phase.
+    """
+    select = getattr(dut, f"perf_select_{direction}")
+    count  = getattr(dut, f"perf_count_{direction}")
+    words  = []
+    for i in range(len(COUNTER_NAMES)):
+        await FallingEdge(dut.clk)
+        select.value = i
+        await ReadOnly()
+        words.append(int(count.value))
+    await FallingEdge(dut.clk)
+    return decode_counters(words)
+
+async def read_bus_counters(bus) -> dict:
+    """
+    Reads the counters of aes_128_top_wrapper with the reserved read sequence, using a
+    BusTransactor. The wrapper must be waiting for the first word of the initial vector
+    or of a block.
+    """
+    # The sequence starts on a rising edge of send_auth, so make sure it is seen low first
+    await FallingEdge(bus.dut.clk)
+    bus.dut.start.value     = 0
+    bus.dut.send_auth.value = 0
+    await RisingEdge(bus.dut.clk)
+
+    if bus.stream:
+        words = await bus.receive_words(len(COUNTER_NAMES))
+    else:
+        words = await receive_handshake_words(bus.dut, len(COUNTER_NAMES))
+    return decode_counters(words)
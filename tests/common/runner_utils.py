@@ -0,0 +1,203 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+proj_path = Path(__file__).resolve().parent.parent.parent
+
+# Machine-readable results (benchmarks, reports) are written here
+RESULTS_DIR = Path(os.getenv("RESULTS_DIR", proj_path / "tests" / "results"))
+
+COMMON_SOURCES = [
+    proj_path/"src"/"common"/"aes_pkg.vhd",
+    proj_path/"src"/"common"/"mult_inv.vhd",
+    proj_path/"src"/"common"/"key_expansion.vhd",
+    proj_path/"src"/"common"/"round_key_gen.vhd",
+    proj_path/"src"/"common"/"control_fsm.vhd",
+    proj_path/"src"/"common"/"stream_control.vhd",
+    proj_path/"src"/"common"/"key_cache.vhd",
+    proj_path/"src"/"common"/"perf_counters.vhd",
+    proj_path/"src"/"common"/"block_fifo.vhd",
+]
+
+ENC_SOURCES = [
+    proj_path/"src"/"enc"/"mix_columns.vhd",
+    proj_path/"src"/"enc"/"s_box.vhd",
+    proj_path/"src"/"enc"/"shift_rows.vhd",
+    proj_path/"src"/"enc"/"t_table.vhd",
+    proj_path/"src"/"enc"/"enc_round.vhd",
+    proj_path/"src"/"enc"/"aes_128_top_enc.vhd",
+]
+
+DEC_SOURCES = [
+    proj_path/"src"/"dec"/"inv_mix_columns.vhd",
+    proj_path/"src"/"dec"/"inv_s_box.vhd",
+    proj_path/"src"/"dec"/"inv_shift_rows.vhd",
+    proj_path/"src"/"dec"/"inv_t_table.vhd",
+    proj_path/"src"/"dec"/"dec_round.vhd",
+    proj_path/"src"/"dec"/"aes_128_top_dec.vhd",
+]
+
+CTR_SOURCES = [
+    proj_path/"src"/"ctr"/"aes_128_top_ctr.vhd",
+    proj_path/"src"/"wrappers"/"ctr_wrapper.vhd",
+]
+
+# Sources for each top level, in compilation order
+SOURCES = {
+    "aes_128_top_wrapper_simple" : COMMON_SOURCES + ENC_SOURCES + [proj_path/"src"/"wrappers"/"enc_wrapper.vhd"]
+                                 + DEC_SOURCES + [proj_path/"src"/"wrappers"/"dec_wrapper.vhd"]
+                                 + CTR_SOURCES + [proj_path/"src"/"aes_128_top_wrapper_simple.vhd"],
+    "aes_128_top_wrapper_multi"  : COMMON_SOURCES + ENC_SOURCES + [proj_path/"src"/"enc"/"aes_128_top_enc_multi.vhd"]
+                                 + [proj_path/"src"/"aes_128_top_wrapper_multi.vhd"],
+    "aes_128_top_wrapper"        : COMMON_SOURCES + ENC_SOURCES + DEC_SOURCES
+                                 + [proj_path/"src"/"aes_128_top_wrapper.vhd"],
+}
+# Simulation-only harnesses with stimulus and response files (src/sim)
+SOURCES["aes_128_top_wrapper_simple_harness"] = (SOURCES["aes_128_top_wrapper_simple"]
+                                                 + [proj_path/"src"/"sim"/"aes_128_top_wrapper_simple_harness.vhd"])
+SOURCES["aes_128_top_wrapper_harness"]        = (SOURCES["aes_128_top_wrapper"]
+                                                 + [proj_path/"src"/"sim"/"aes_128_top_wrapper_harness.vhd"])
+
+MODES              = ["ENC", "DEC", "ENC_DEC", "CTR"]
+SBOX_ARCHITECTURES = ["LOOKUP", "COMB", "TTABLE"]
+LOOP_SBOX_ARCHITECTURES = ["LOOKUP", "COMB"] # With stages for the round loop pipelines to fill
+# The masked tables swap banks between blocks, so only the iterative cores have them
+ITERATIVE_SBOX_ARCHITECTURES = SBOX_ARCHITECTURES + ["MASKED"]
+BUS_MODES          = ["HANDSHAKE", "STREAM"]
+KEY_SLOTS          = [0, 4]
+ROUND_ARCHITECTURES = ["ITERATIVE", "PIPELINED", "UNROLLED"]
+CONTEXTS           = [1, 4, 8]
+WORDS_PER_CYCLE    = [1, 4]
+KEY_SCHEDULES      = ["STORED", "ON_THE_FLY"]
+
+# Runner settings. PROFILE selects a profile (default "debug") and SIM overrides its simulator,
+# e.g. PROFILE=fast SIM=nvc.
+PROFILES = {
+    "debug" : {"sim" : "questa", "waves" : True,  "visibility" : True},  # Interactive use: waveforms, every signal kept
+    "fast"  : {"sim" : "ghdl",   "waves" : False, "visibility" : False}, # Regressions: free simulator, fully optimised
+}
+SIM_BUILD_ARGS      = {"ghdl" : ["--std=08"], "nvc" : ["--std=2008"]}
+SIM_TEST_ARGS       = {"ghdl" : ["--std=08"]} # ghdl -r elaborates from the library of the same standard
+SIM_VISIBILITY_ARGS = {"questa" : ["-no_autoacc", "-voptargs=+acc=rnb"]} # Don't optimize away signals
+
+WALL_CLOCK_FILE = RESULTS_DIR / "wall_clock.json"
+
+BUILD_MANIFEST = "build_manifest.json"
+HDL_TOPLEVEL_LANG = "vhdl" # runner.test() needs it when cached_build() skipped the build
+
+def get_profile(name:str|None = None) -> dict:
+    """
+    Returns the settings of a runner profile: name, sim, waves, build_args and test_args.
+    """
+    name = name or os.getenv("PROFILE", "debug")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile {name}, expected one of {list(PROFILES)}")
+    profile = dict(PROFILES[name], name=name)
+    profile["sim"] = os.getenv("SIM", profile["sim"])
+    profile["build_args"] = list(SIM_BUILD_ARGS.get(profile["sim"], []))
+    profile["test_args"]  = list(SIM_TEST_ARGS.get(profile["sim"], []))
+    if profile["visibility"]:
+        profile["test_args"] += SIM_VISIBILITY_ARGS.get(profile["sim"], [])
+    return profile
+
+class WallClock():
+    """
+    Times the phases (build, test, ...) of one runner invocation and merges them into
+    WALL_CLOCK_FILE, keyed by profile and top level.
+    """
+    def __init__(self, profile:dict, toplevel:str, path=WALL_CLOCK_FILE):
+        self.profile  = profile
+        self.toplevel = toplevel
+        self.path     = Path(path)
+        self.seconds  = defaultdict(float)
+        self.runs     = defaultdict(int)
+
+    @contextmanager
+    def phase(self, name:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.runs[name]    += 1
+
+    def record(self) -> dict:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        results = json.loads(self.path.read_text()) if self.path.exists() else {}
+        entry = {
+            "sim"       : self.profile["sim"],
+            "seconds"   : {name : round(seconds, 2) for name, seconds in self.seconds.items()},
+            "runs"      : dict(self.runs),
+            "total"     : round(sum(self.seconds.values()), 2),
+            "timestamp" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        results.setdefault(self.profile["name"], {})[self.toplevel] = entry
+        self.path.write_text(json.dumps(results, indent=4, sort_keys=True))
+        print(wall_clock_report(results))
+        return entry
+
+def wall_clock_report(results:dict) -> str:
+    """
+    Formats the wall-clock file as one line per profile and top level, with the total
+    per profile, so profiles can be compared side by side.
+    """
+    lines = []
+    for profile, toplevels in sorted(results.items()):
+        for toplevel, entry in sorted(toplevels.items()):
+            phases = ", ".join(f"{name} {seconds:.1f} s" for name, seconds in sorted(entry["seconds"].items()))
+            lines.append(f"{profile:<8} {entry['sim']:<8} {toplevel:<28} {entry['total']:>9.1f} s ({phases})")
+        lines.append(f"{profile:<8} {'':<8} {'total':<28} {sum(entry['total'] for entry in toplevels.values()):>9.1f} s")
+    return "\n".join(lines)
+
+def fingerprint(path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def cached_build(runner, sources, hdl_toplevel, build_dir="sim_build", parameters=None, build_args=None, **kwargs):
+    """
+    Calls runner.build() only when needed. The sha256 of every source file, the simulator,
+    top level, parameters and build arguments are stored in build_dir. If only source
+    files changed, the first changed file and everything analysed after it are rebuilt
+    into the existing library; any other change rebuilds everything. Set BUILD_CACHE=0
+    to always rebuild. Returns the list of sources that were (re)built.
+
+    runner.test() reads settings that only runner.build() stores (Nvc elaborates with the
+    build arguments), so on a cache hit they are set through the runner's public attributes.
+    Without a build the runner can't infer the top level language, so pass
+    hdl_toplevel_lang=HDL_TOPLEVEL_LANG to runner.test().
+    """
+    parameters = parameters or {}
+    build_args = build_args or []
+    build_dir = Path(build_dir)
+    manifest_path = build_dir / BUILD_MANIFEST
+    manifest = {
+        "config"  : hashlib.sha256(json.dumps([type(runner).__name__, hdl_toplevel, sorted(parameters.items()),
+                                               [str(arg) for arg in build_args]], default=str).encode()).hexdigest(),
+        "sources" : [[str(source), fingerprint(source)] for source in sources],
+    }
+
+    rebuild = list(sources)
+    if os.getenv("BUILD_CACHE", "1") != "0" and manifest_path.exists():
+        previous = json.loads(manifest_path.read_text())
+        if previous["config"] == manifest["config"] and len(previous["sources"]) == len(manifest["sources"]):
+            changed = [i for i, (old, new) in enumerate(zip(previous["sources"], manifest["sources"])) if old != new]
+            rebuild = list(sources[changed[0]:]) if changed else []
+
+    if rebuild:
+        # Drop the manifest first so an interrupted build is never mistaken for a valid one
+        manifest_path.unlink(missing_ok=True)
+        runner.build(sources=rebuild, hdl_toplevel=hdl_toplevel, build_dir=build_dir, parameters=parameters,
+                     build_args=build_args, always=True, **kwargs)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=4))
+    else:
+        runner.build_dir    = build_dir.resolve()
+        runner.hdl_toplevel = hdl_toplevel
+        runner.parameters   = dict(parameters)
+        runner.build_args   = list(build_args)
+        runner.verbose      = kwargs.get("verbose", False)
+    return rebuild
@@ -0,0 +1,129 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import cocotb
+from cocotb.queue import Queue
+from cocotb.triggers import FallingEdge, ReadOnly, RisingEdge
+from common.common import *
+from common.wrapper_simple_utils import Scoreboard
+
+class ContextDriver():
+    """
+    Drives the queued blocks of several contexts onto aes_128_top_wrapper_multi. Every
+    cycle the next context in round-robin order that has a block waiting and no block in
+    flight is offered, so each CBC chain waits for its own previous cipherblock while the
+    other contexts fill the round loop.
+    """
+    def __init__(self, dut, num_contexts):
+        self.clk     = dut.clk
+        self.context = dut.context
+        self.data    = dut.plaintext
+        self.start   = dut.start
+        self.ready   = dut.ready
+        self.blocks    = [[] for _ in range(num_contexts)]
+        self.in_flight = [False]*num_contexts # Cleared by the monitor
+        self.next      = 0
+
+    def pick(self):
+        num_contexts = len(self.blocks)
+        for i in range(num_contexts):
+            context = (self.next + i) % num_contexts
+            if self.blocks[context] and not self.in_flight[context]:
+                return context
+        return None
+
+    async def run(self):
+        while any(self.blocks):
+            await FallingEdge(self.clk)
+            context = self.pick()
+            if context is None:
+                self.start.value = 0
+                continue
+            self.context.value = context
+            self.data.value    = self.blocks[context][0]
+            self.start.value   = 1
+            # ready depends on the context, so wait for it to settle
+            await ReadOnly()
+            if self.ready.value == 1:
+                self.blocks[context].pop(0)
+                self.in_flight[context] = True
+                self.next = (context + 1) % len(self.blocks)
+        await FallingEdge(self.clk)
+        self.start.value = 0
+
+class ContextMonitor():
+    """
+    Routes every output block to the queue of its context and releases that context
+    in the driver.
+    """
+    def __init__(self, dut, driver):
+        self.clk     = dut.clk
+        self.data    = dut.cipherblock
+        self.done    = dut.done
+        self.context = dut.done_context
+        self.driver  = driver
+        self.blocks  = [Queue() for _ in driver.blocks]
+
+    async def run(self):
+        while True:
+            await RisingEdge(self.clk)
+            await ReadOnly()
+            if self.done.value == 1:
+                context = int(self.context.value)
+                self.blocks[context].put_nowait(int(self.data.value))
+                self.driver.in_flight[context] = False
+
+class MultiTB():
+    def __init__(self, dut):
+        self.dut = dut
+
+    async def reset(self):
+        await RisingEdge(self.dut.clk)
+        self.dut.reset.value = 1
+        self.dut.start.value = 0
+        self.dut.setup.value = 0
+        await RisingEdge(self.dut.clk)
+        self.dut.reset.value = 0
+        await RisingEdge(self.dut.clk)
+
+    async def setup(self, context:int, init_vec:int, key:int):
+        """
+        Sets up the initial vector and key of one context. Returns once the setup has been
+        accepted; blocks of the context are held off until its round keys are ready.
+        """
+        dut = self.dut
+        await FallingEdge(dut.clk)
+        dut.setup_context.value = context
+        dut.init_vec.value      = init_vec
+        dut.key.value           = key
+        dut.setup.value         = 1
+        # setup_ready only changes on rising edges, so this is the value the next edge samples
+        while dut.setup_ready.value != 1:
+            await FallingEdge(dut.clk)
+        await FallingEdge(dut.clk)
+        dut.setup.value = 0
+
+    async def streams(self, init_vecs:list, keys:list, data:list, expected:list|None = None):
+        """
+        Sets up one context per stream and encrypts the streams (multiples of 16 bytes)
+        concurrently. Returns one scoreboard per stream.
+        """
+        num_contexts = len(data)
+        for context in range(num_contexts):
+            await self.setup(context, init_vecs[context], keys[context])
+
+        driver  = ContextDriver(self.dut, num_contexts)
+        monitor = ContextMonitor(self.dut, driver)
+        scoreboards = []
+        for context, stream in enumerate(data):
+            view = memoryview(stream)
+            driver.blocks[context] = [int_f_b(view[i:i+16]) for i in range(0, len(stream), 16)]
+            scoreboards.append(Scoreboard(monitor.blocks[context], None if expected is None else expected[context],
+                                          len(stream)//16))
+        tasks = [cocotb.start_soon(driver.run()), cocotb.start_soon(monitor.run())]
+
+        for scoreboard in scoreboards:
+            await scoreboard.run()
+        for task in tasks:
+            task.cancel()
+        # Return in a writable phase so the caller can drive the DUT again
+        await RisingEdge(self.dut.clk)
+        return scoreboards
@@ -1,14 +1,161 @@
 # © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import os
+import random
+
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
-from cocotb.triggers import RisingEdge
+import cocotb
+from cocotb.queue import Queue
+from cocotb.triggers import ClockCycles, Event, FallingEdge, ReadOnly, RisingEdge
 from cocotb.triggers import Timer
 from common.common import *
+
+MASKED = os.getenv("SBOX_ARCHITECTURE", "LOOKUP") == "MASKED"
+
+# Cycles from a reset until a masked S-box has built new tables and swapped to them: four cycles
+# of entropy for the masks, the start of the build, one write per table entry and the swap, plus
+# one cycle of margin
+MASK_BUILD_CYCLES = 263
+
+class BlockDriver():
+    """
+    Drives queued blocks onto one interface ("enc" or "dec") of aes_128_top_wrapper_simple.
+    A block is issued on the first cycle the interface can accept it, i.e. as soon as
+    the monitor has seen done_* assert for the previous block.
+    """
+    def __init__(self, dut, direction):
+        self.clk   = dut.clk
+        self.data  = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        self.start = getattr(dut, f"start_{direction}")
+        self.blocks = Queue()
+        self.ready  = Event() # Set by the monitor when done_* asserts
+        self.ready.set()      # idle and wait_for_in_data both accept start
+
+    async def run(self):
+        while True:
+            block = await self.blocks.get()
+            await self.ready.wait()
+            self.ready.clear()
+            # Drive mid-cycle so start is sampled on the next rising edge
+            await FallingEdge(self.clk)
+            self.data.value  = block
+            self.start.value = 1
+            await FallingEdge(self.clk)
+            self.start.value = 0
+
+class BlockMonitor():
+    """
+    Samples the output of one interface every time done_* rises, passes the block on
+    to the scoreboard queue and releases the driver for the next block.
+    """
+    def __init__(self, dut, direction, ready):
+        self.clk    = dut.clk
+        self.data   = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+        self.done   = getattr(dut, f"done_{direction}")
+        self.ready  = ready
+        self.blocks = Queue()
+
+    async def run(self):
+        prev_done = self.done.value == 1
+        while True:
+            await RisingEdge(self.clk)
+            await ReadOnly()
+            done = self.done.value == 1
+            if done and not prev_done:
+                self.blocks.put_nowait(int(self.data.value))
+                self.ready.set()
+            prev_done = done
+
+class StreamDriver():
+    """
+    Valid/ready driver for ROUND_ARCHITECTURE = "PIPELINED". Each block is held on the
+    interface with start_* high until ready_* accepts it, so a block can be accepted on
+    every clock cycle.
+    """
+    def __init__(self, dut, direction):
+        self.clk   = dut.clk
+        self.data  = dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec
+        self.start = getattr(dut, f"start_{direction}")
+        self.ready = getattr(dut, f"ready_{direction}")
+
+    async def run(self, blocks):
+        for block in blocks:
+            await FallingEdge(self.clk)
+            self.data.value  = block
+            self.start.value = 1
+            # ready_* only changes on rising edges, so this is the value the next edge samples
+            while self.ready.value != 1:
+                await FallingEdge(self.clk)
+        await FallingEdge(self.clk)
+        self.start.value = 0
+
+class PulseMonitor():
+    """
+    Samples the output on every rising edge where done_* is high. With a pipelined core
+    done_* pulses once per block and can stay high for back-to-back blocks.
+    """
+    def __init__(self, dut, direction):
+        self.clk    = dut.clk
+        self.data   = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+        self.done   = getattr(dut, f"done_{direction}")
+        self.blocks = Queue()
+
+    async def run(self):
+        while True:
+            await RisingEdge(self.clk)
+            await ReadOnly()
+            if self.done.value == 1:
+                self.blocks.put_nowait(int(self.data.value))
+
+class Scoreboard():
+    """
+    Collects output blocks into a preallocated bytearray and compares each one against
+    the expected bytes as it arrives. Pass expected=None to only collect num_blocks blocks.
+    """
+    def __init__(self, blocks, expected:bytes|None, num_blocks:int|None = None):
+        if num_blocks is None:
+            num_blocks = len(expected)//16
+        self.blocks   = blocks
+        self.expected = None if expected is None else memoryview(expected)
+        self.received = bytearray(16*num_blocks)
+        self.count    = 0
+        self.errors   = [] # Indices of mismatched blocks
+        self.complete = Event()
+
+    async def run(self):
+        view = memoryview(self.received)
+        while self.count*16 < len(self.received):
+            block = await self.blocks.get()
+            offset = self.count*16
+            view[offset:offset+16] = byte(block)
+            if self.expected is not None and view[offset:offset+16] != self.expected[offset:offset+16]:
+                self.errors.append(self.count)
+            self.count += 1
+        self.complete.set()
  
 
 class TB():
     def __init__(self, dut):
         self.dut = dut
+        if MASKED:
+            cocotb.start_soon(self.drive_entropy())
+
+    async def drive_entropy(self):
+        """Feeds both masked S-boxes 32 new random bits on every cycle, as a TRNG would."""
+        while True:
+            await FallingEdge(self.dut.clk)
+            self.dut.entropy_enc.value = random.getrandbits(32)
+            self.dut.entropy_dec.value = random.getrandbits(32)
+
+    async def wait_for_tables(self):
+        """
+        With SBOX_ARCHITECTURE = "MASKED", resets and waits for the masked S-boxes to build
+        their tables, so a test that counts cycles does not count the wait of the first block
+        after power on. Returns at once with the other S-boxes.
+        """
+        if MASKED:
+            await self.reset()
+            await ClockCycles(self.dut.clk, MASK_BUILD_CYCLES)
 
     async def reset(self):
         await RisingEdge(self.dut.clk)
@@ -44,15 +191,8 @@ class TB():
         elif not isinstance(plaintext, bytes):
             raise ValueError("Plaintext must be bytes or str")
 
-        await self.init_encryption(init_vec, key, int_f_b(plaintext[0:16]))
-        await self.start_encryption()
-        output = byte(await self.get_cipherblock())
-        data_blocks = round(len(plaintext)/16)
-        for i in range(1, data_blocks):
-            self.dut.plaintext_enc.value = int_f_b(plaintext[i*16:(i+1)*16])
-            await self.start_encryption()
-            output += byte(await self.get_cipherblock())
-        return plaintext, output
+        scoreboard = await self.stream("enc", init_vec, key, plaintext)
+        return plaintext, bytes(scoreboard.received)
 
     ### DECRYPTION ###
     async def init_decryption(self, init_vec, key, data):
@@ -79,12 +219,99 @@ class TB():
         elif not isinstance(cipherblock, bytes):
             raise ValueError("Cipherblock must be bytes or str")
 
-        await self.init_decryption(init_vec, key, int_f_b(cipherblock[0:16]))
-        await self.start_decryption()
-        output = byte(await self.get_plaintext())
-        data_blocks = round(len(cipherblock)/16)
-        for i in range(1, data_blocks):
-            self.dut.cipherblock_dec.value = int_f_b(cipherblock[i*16:(i+1)*16])
-            await self.start_decryption()
-            output += byte(await self.get_plaintext())
-        return cipherblock, output
\ No newline at end of file
+        scoreboard = await self.stream("dec", init_vec, key, cipherblock)
+        return cipherblock, bytes(scoreboard.received)
+
+    ### PIPELINED STREAMS ###
+    async def stream(self, direction, init_vec:int, key:int|None, data:bytes, expected:bytes|None = None):
+        """
+        Pipelines data (a multiple of 16 bytes) through the "enc" or "dec" interface and
+        returns the scoreboard holding the output. Enc and dec streams can run concurrently.
+        Pass key=None to leave the key input as it is.
+        """
+        getattr(self.dut, f"init_vec_{direction}").value = init_vec
+        if key is not None:
+            getattr(self.dut, f"key_{direction}").value = key
+
+        num_blocks = len(data)//16
+        driver     = BlockDriver(self.dut, direction)
+        monitor    = BlockMonitor(self.dut, direction, driver.ready)
+        scoreboard = Scoreboard(monitor.blocks, expected, num_blocks)
+        tasks = [cocotb.start_soon(driver.run()), cocotb.start_soon(monitor.run())]
+
+        data = memoryview(data)
+        for i in range(num_blocks):
+            driver.blocks.put_nowait(int_f_b(data[i*16:(i+1)*16]))
+
+        await scoreboard.run()
+        for task in tasks:
+            task.cancel()
+        # Return in a writable phase so the caller can drive the DUT again
+        await RisingEdge(self.dut.clk)
+        return scoreboard
+
+    async def stream_pipelined(self, direction, init_vec:int, key:int|None, data:bytes, expected:bytes|None = None):
+        """
+        Same as stream(), but keeps blocks in flight with the valid/ready handshake of
+        ROUND_ARCHITECTURE = "PIPELINED" instead of waiting for done_* after every block.
+        """
+        getattr(self.dut, f"init_vec_{direction}").value = init_vec
+        if key is not None:
+            getattr(self.dut, f"key_{direction}").value = key
+
+        num_blocks = len(data)//16
+        driver     = StreamDriver(self.dut, direction)
+        monitor    = PulseMonitor(self.dut, direction)
+        scoreboard = Scoreboard(monitor.blocks, expected, num_blocks)
+        data = memoryview(data)
+        blocks = [int_f_b(data[i*16:(i+1)*16]) for i in range(num_blocks)]
+        tasks = [cocotb.start_soon(driver.run(blocks)), cocotb.start_soon(monitor.run())]
+
+        await scoreboard.run()
+        for task in tasks:
+            task.cancel()
+        # Return in a writable phase so the caller can drive the DUT again
+        await RisingEdge(self.dut.clk)
+        return scoreboard
+
+    ### KEY CACHE ###
+    async def session(self, direction, slot:int, init_vec:int, data:bytes, key:int|None = None):
+        """
+        Starts a new CBC session on key slot `slot` (KEY_SLOTS > 0) and runs data through it.
+        If key is given it is expanded into the slot first, otherwise the cached round keys
+        are used. Returns the output bytes and the cycles from start to done of the first block.
+        """
+        dut = self.dut
+        getattr(dut, f"init_vec_{direction}").value    = init_vec
+        getattr(dut, f"key_slot_{direction}").value    = slot
+        getattr(dut, f"key_load_{direction}").value    = int(key is not None)
+        getattr(dut, f"new_session_{direction}").value = 1
+        if key is not None:
+            getattr(dut, f"key_{direction}").value = key
+        start  = getattr(dut, f"start_{direction}")
+        done   = getattr(dut, f"done_{direction}")
+        output = dut.cipherblock_enc if direction == "enc" else dut.plaintext_dec
+
+        # The session flags are sampled with start of the first block
+        await FallingEdge(dut.clk)
+        (dut.plaintext_enc if direction == "enc" else dut.cipherblock_dec).value = int_f_b(data[0:16])
+        start.value = 1
+        await FallingEdge(dut.clk)
+        start.value = 0
+        cycles = 0
+        while True:
+            await RisingEdge(dut.clk)
+            await ReadOnly()
+            cycles += 1
+            if done.value == 1:
+                break
+        first_block = byte(int(output.value))
+
+        await FallingEdge(dut.clk)
+        getattr(dut, f"key_load_{direction}").value    = 0
+        getattr(dut, f"new_session_{direction}").value = 0
+        if len(data) == 16:
+            return first_block, cycles
+        # The rest of the chain continues from the first block
+        scoreboard = await self.stream(direction, init_vec, None, data[16:])
+        return first_block + bytes(scoreboard.received), cycles
\ No newline at end of file
@@ -1,24 +1,40 @@
 # © 2025 Ilya Cable <ilya.cable1@gmail.com>
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import FallingEdge, ReadOnly, RisingEdge
 from common.common import *
 
-async def transmit_block(dut, block):
+# DUPLEX header word bits
+HEADER_DEC = 0x1 # Decrypt the block
+HEADER_IV  = 0x2 # An initial vector for the direction follows
+HEADER_KEY = 0x4 # A key for both directions follows
+
+async def transmit_handshake_words(dut, words):
     """
-    Transmits 16 bytes of data on the databus as per interface specifications.
+    Transmits 32-bit words on the databus with the start/done handshake. A word is taken on
+    the rising edge that sets done, so a word the wrapper holds off (FIFO_DEPTH, ingress
+    FIFO full) is driven until done follows it.
     """
-    for i in range(4):
-        input_bytes = (block & (0xFFFFFFFF << 32*(3-i))) >> 32*(3-i)
-        dut.data_bus.value = input_bytes
+    for word in words:
+        dut.data_bus.value = word
         dut.start.value = 1
-        await RisingEdge(dut.clk)
-        if dut.done.value != 1:
-            await RisingEdge(dut.done)
+        while True:
+            await RisingEdge(dut.clk)
+            await ReadOnly()
+            if dut.done.value == 1:
+                break
+        await FallingEdge(dut.clk) # Leave the read-only phase
 
     dut.start.value = 0
     return
 
+async def transmit_block(dut, block):
+    """
+    Transmits 16 bytes of data on the databus as per interface specifications.
+    """
+    await transmit_handshake_words(dut, [(block >> 32*(3-i)) & 0xFFFFFFFF for i in range(4)])
+    return
+
 def to_hex(value):
     return "0x" + hex(int(value)).upper()[2:].zfill(8)
     
@@ -30,22 +46,31 @@ async def reset(dut):
     await RisingEdge(dut.clk)
     return
 
-async def receive_block(dut):
+async def receive_handshake_words(dut, num_words) -> list:
     """
-    Receives 16 bytes of data on the databus as per interface specifications.
+    Receives 32-bit words from the databus with the send_auth/start handshake.
     """
-    block = 0
+    words = []
     dut.send_auth.value = 1
     await RisingEdge(dut.done)
-    for i in range(4):
+    for i in range(num_words):
         dut.start.value = 1
         await sync(dut, 1)
-        block += int(dut.data_bus.value) << 32*(3-i)
+        words.append(int(dut.data_bus.value))
         if dut.done.value != 1:
             await RisingEdge(dut.done)
 
     dut.start.value = 0
     dut.send_auth.value = 0
+    return words
+
+async def receive_block(dut):
+    """
+    Receives 16 bytes of data on the databus as per interface specifications.
+    """
+    block = 0
+    for i, word in enumerate(await receive_handshake_words(dut, 4)):
+        block += word << 32*(3-i)
     return block
 
 async def transmit_init_sequence(dut, init_vec, key, data):
@@ -94,3 +119,119 @@ async def dut_decode_bytes(dut, init_vec, key, data) -> bytes:
         await transmit_block(dut, int_f_b(data[i*16:(i+1)*16]))
         output += byte(await receive_block(dut))
     return unpad(output, AES.block_size)
+
+def to_words(data) -> list:
+    """
+    Splits bytes into 32-bit words in bus order.
+    """
+    return [int_f_b(data[i:i+4]) for i in range(0, len(data), 4)]
+
+def duplex_header(direction, init_vec=None, key=None) -> int:
+    """
+    Header word of a DUPLEX transaction. direction is "enc" or "dec"; an initial vector or
+    key that is not None is loaded by the transaction.
+    """
+    return ((HEADER_DEC if direction == "dec" else 0) | (HEADER_IV if init_vec is not None else 0) |
+            (HEADER_KEY if key is not None else 0))
+
+class BusTransactor():
+    """
+    Moves whole buffers over the 32-bit bus. With stream=True (BUS_MODE = "STREAM") each word
+    takes one clock: input words are accepted on every cycle start is high while the wrapper
+    waits for input (done follows each one), and output words are accepted on every cycle
+    done and send_auth are both high. With stream=False the word-by-word handshake
+    functions above are used.
+    """
+    def __init__(self, dut, stream:bool):
+        self.dut    = dut
+        self.stream = stream
+
+    async def transmit_words(self, words):
+        # Drive mid-cycle so each word is sampled on the next rising edge, and hold it while
+        # done stays low (FIFO_DEPTH, ingress FIFO full)
+        await FallingEdge(self.dut.clk)
+        i = 0
+        while i < len(words):
+            self.dut.data_bus.value = words[i]
+            self.dut.start.value = 1
+            await FallingEdge(self.dut.clk)
+            if self.dut.done.value == 1:
+                i += 1
+        self.dut.start.value = 0
+
+    async def receive_words(self, num_words) -> list:
+        words = []
+        await FallingEdge(self.dut.clk)
+        self.dut.send_auth.value = 1
+        while len(words) < num_words:
+            await FallingEdge(self.dut.clk)
+            if self.dut.done.value == 1:
+                # Accepted on the next rising edge, as send_auth is still high
+                words.append(int(self.dut.data_bus.value))
+        await FallingEdge(self.dut.clk)
+        self.dut.send_auth.value = 0
+        return words
+
+    async def transmit_block(self, block:int):
+        if self.stream:
+            await self.transmit_words(to_words(byte(block)))
+        else:
+            await transmit_block(self.dut, block)
+
+    async def receive_block(self) -> int:
+        if self.stream:
+            return int_f_b(b"".join(word.to_bytes(4, 'big') for word in await self.receive_words(4)))
+        return await receive_block(self.dut)
+
+    async def transmit_init_sequence(self, init_vec, key, data):
+        if self.stream:
+            # One 12-word burst
+            await self.transmit_words(to_words(byte(init_vec) + byte(key) + byte(data)))
+        else:
+            await transmit_init_sequence(self.dut, init_vec, key, data)
+
+    async def transmit_transaction(self, direction, data, init_vec=None, key=None):
+        """
+        DUPLEX: transmits the header, the initial vector and key if given, and the block.
+        The output block is read with receive_block().
+        """
+        words = [duplex_header(direction, init_vec, key)]
+        for value in (init_vec, key, data):
+            if value is not None:
+                words += to_words(byte(value))
+        if self.stream:
+            await self.transmit_words(words)
+        else:
+            await transmit_handshake_words(self.dut, words)
+
+    async def process_bytes(self, init_vec, key, data:bytes) -> bytes:
+        """
+        Runs a multiple of 16 bytes through the current mode (call switch_dec() first to
+        decrypt) and returns the output without removing any padding.
+        """
+        output = bytearray(len(data))
+        await self.transmit_init_sequence(init_vec, key, int_f_b(data[0:16]))
+        output[0:16] = byte(await self.receive_block())
+        for i in range(1, len(data)//16):
+            await self.transmit_block(int_f_b(data[i*16:(i+1)*16]))
+            output[i*16:(i+1)*16] = byte(await self.receive_block())
+        return bytes(output)
+
+    async def process_bytes_ahead(self, init_vec, key, data:bytes, in_flight:int) -> bytes:
+        """
+        FIFO_DEPTH: process_bytes() with up to in_flight blocks transmitted and not yet
+        received, so the bus moves blocks while the core works on an earlier one. The
+        wrapper holds 2*FIFO_DEPTH blocks; beyond that the host would wait on a transmit
+        that only a receive can free.
+        """
+        output = bytearray(len(data))
+        await self.transmit_init_sequence(init_vec, key, int_f_b(data[0:16]))
+        sent, received = 1, 0
+        while received < len(data)//16:
+            if sent < len(data)//16 and sent - received < in_flight:
+                await self.transmit_block(int_f_b(data[sent*16:(sent+1)*16]))
+                sent += 1
+            else:
+                output[received*16:(received+1)*16] = byte(await self.receive_block())
+                received += 1
+        return bytes(output)
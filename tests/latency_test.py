@@ -0,0 +1,90 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+from types import SimpleNamespace
+
+import pytest
+
+from common.latency import (BusLatencyMonitor, LatencyHistogram, SimpleLatencyMonitor, TraceWriter, export_latency,
+                            merge_latency, read_latency, read_trace)
+
+def run_edges(monitor, edges:int, high:dict):
+    """
+    Feeds the monitor `edges` rising edges. high maps a signal name to the edges it is sampled high on.
+    """
+    for cycle in range(1, edges + 1):
+        monitor.on_edge(cycle, {name : cycle in high.get(name, ()) for name in monitor.signals})
+
+def test_histogram():
+    """
+    Checks the nearest-rank percentiles and the summary.
+    """
+    histogram = LatencyHistogram()
+    for cycles in [10]*90 + [20]*9 + [50]:
+        histogram.add(cycles)
+    summary = histogram.summary()
+    assert (summary["p50"], summary["p90"], summary["p99"], summary["max"]) == (10, 10, 20, 50)
+    assert summary["count"] == 100 and summary["mean"] == 11.3
+    assert LatencyHistogram.from_summary(summary).counts == histogram.counts
+
+def test_simple_monitor():
+    """
+    Matches start/done pairs of one interface and pipelined valid/ready transfers of another.
+    """
+    dut = SimpleNamespace(clk=None, **{f"{name}_{direction}" : None for name in ("start", "ready", "done", "reset")
+                                       for direction in ("enc", "dec")})
+    monitor = SimpleLatencyMonitor(dut, ("enc", "dec"), pipelined=("dec",))
+    run_edges(monitor, 60, {
+        # enc: done registered 12 edges after start and held until the next start
+        "start_enc" : {3, 18}, "done_enc" : set(range(16, 19)) | set(range(31, 61)),
+        # dec: three blocks accepted back to back, outputs on consecutive cycles
+        "start_dec" : {5, 6, 7, 8}, "ready_dec" : {6, 7, 8}, "done_dec" : {40, 41, 42},
+    })
+    summary = monitor.summary()
+    assert summary["enc_latency"]["histogram"] == {"12" : 2}
+    assert summary["enc_interval"]["histogram"] == {"15" : 1}
+    assert summary["dec_latency"]["histogram"] == {"33" : 3}
+    assert summary["dec_interval"]["histogram"] == {"1" : 2}
+
+def test_bus_monitor():
+    """
+    Follows a 12-word input burst and a 4-word output burst in streaming mode.
+    """
+    dut = SimpleNamespace(clk=None, start=None, send_auth=None, done=None, reset=None)
+    monitor = BusLatencyMonitor(dut, stream=True)
+    run_edges(monitor, 40, {
+        "start" : set(range(1, 13)), "send_auth" : set(range(14, 35)),
+        "done"  : set(range(2, 14)) | set(range(30, 34)),
+    })
+    summary = monitor.summary()
+    assert summary["input_interval"]["histogram"] == {"1" : 11}
+    assert summary["block_latency"]["histogram"] == {"18" : 1}
+    assert summary["send_auth_turnaround"]["histogram"] == {"16" : 1}
+    assert summary["output_interval"]["histogram"] == {"1" : 3}
+
+def test_trace(tmp_path):
+    """
+    Writes a change-only trace and reads it back.
+    """
+    trace = TraceWriter(tmp_path / "test.trace", ["start", "done"], 8)
+    for cycle in range(1, 1001):
+        trace.sample(cycle, 1 if cycle == 5 else 2 if cycle >= 200 else 0)
+    trace.close()
+    header, changes = read_trace(tmp_path / "test.trace")
+    assert header["signals"] == ["start", "done"]
+    assert changes == [(1, {"start" : 0, "done" : 0}), (5, {"start" : 1, "done" : 0}),
+                       (6, {"start" : 0, "done" : 0}), (200, {"start" : 0, "done" : 1})]
+    with pytest.raises(ValueError):
+        TraceWriter(tmp_path / "wide.trace", [str(i) for i in range(9)], 8)
+
+def test_export_and_merge(tmp_path):
+    """
+    Exports two seeds of the same setting and checks that merging adds up the histograms.
+    """
+    for seed, cycles in [(0, 10), (1, 20)]:
+        histogram = LatencyHistogram()
+        histogram.add(cycles)
+        export_latency("top", {"MODE" : "ENC"}, "test_1", {"enc_latency" : histogram.summary()}, tmp_path / str(seed))
+    assert (tmp_path / "0" / "top.csv").read_text().splitlines()[1].startswith("MODE=ENC,test_1,enc_latency,1,10")
+
+    merged = merge_latency("top", [tmp_path / "0", tmp_path / "1", tmp_path / "missing"], tmp_path)
+    assert merged["MODE=ENC"]["test_1"]["enc_latency"]["histogram"] == {"10" : 1, "20" : 1}
+    assert read_latency("top", tmp_path) == merged
@@ -0,0 +1,30 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import pytest
+
+from common.perf_counters import COUNTER_NAMES, counter_deltas, decode_counters, format_counters
+
+def test_decode_counters():
+    """
+    Checks that counter words are named in PERF_* order and that deltas survive a wrap.
+    """
+    counters = decode_counters(range(len(COUNTER_NAMES)))
+    assert list(counters) == COUNTER_NAMES
+    assert counters["blocks"] == 0 and counters["bus_wait"] == 7
+
+    with pytest.raises(ValueError):
+        decode_counters([0]*4)
+
+    before = dict.fromkeys(COUNTER_NAMES, 2**32 - 2)
+    after  = dict.fromkeys(COUNTER_NAMES, 3)
+    assert counter_deltas(before, after) == dict.fromkeys(COUNTER_NAMES, 5)
+
+def test_format_counters():
+    """
+    Checks the state shares of the report.
+    """
+    counters = dict.fromkeys(COUNTER_NAMES, 0)
+    counters["do_crypt"] = 30
+    counters["wait_for_in_data"] = 10
+    report = format_counters(counters)
+    assert "75.0%" in report and "25.0%" in report
+    assert len(report.splitlines()) == len(COUNTER_NAMES)
@@ -0,0 +1,215 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+"""
+Runs every test module over its whole generic matrix and a set of random seeds.
+
+Each (top level, generics, seed) combination is an independent job with its own build
+directory and results file, so the jobs can run side by side in a process pool. The
+per-job results are merged into regression.json and regression.xml in RESULTS_DIR.
+The "fast" runner profile (GHDL, no waves, no debug visibility) is used unless
+--profile or PROFILE selects another one; the wall-clock time is added to the
+per-profile report in wall_clock.json. The latency histograms of the jobs are added up
+per generic setting and test into RESULTS_DIR/latency.
+
+    python3 regression.py [--seeds N] [--seed BASE] [--jobs N] [--toplevel NAME ...] [--profile NAME]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from xml.etree import ElementTree
+
+from cocotb_tools.runner import get_results, get_runner
+
+tests_path = Path(__file__).resolve().parent
+sys.path.append(str(tests_path))
+
+from common.runner_utils import (BUS_MODES, CONTEXTS, HDL_TOPLEVEL_LANG, ITERATIVE_SBOX_ARCHITECTURES, KEY_SCHEDULES,
+                                 KEY_SLOTS, LOOP_SBOX_ARCHITECTURES, MODES, PROFILES, RESULTS_DIR, ROUND_ARCHITECTURES, SBOX_ARCHITECTURES, SOURCES,
+                                 WORDS_PER_CYCLE, WallClock, cached_build, get_profile)
+from common.latency import merge_latency
+
+# Generic matrix of each top level. Every generic is also passed to the test module as
+# an environment variable of the same name, so tests can adapt to the configuration.
+MATRIX = {
+    "aes_128_top_wrapper_simple" : {"MODE" : MODES, "SBOX_ARCHITECTURE" : ITERATIVE_SBOX_ARCHITECTURES, "KEY_SLOTS" : KEY_SLOTS,
+                                    "ROUND_ARCHITECTURE" : ROUND_ARCHITECTURES, "WORDS_PER_CYCLE" : WORDS_PER_CYCLE,
+                                    "KEY_SCHEDULE" : KEY_SCHEDULES, "PERF_COUNTERS" : [True]},
+    "aes_128_top_wrapper"        : {"SBOX_ARCHITECTURE" : SBOX_ARCHITECTURES, "BUS_MODE" : BUS_MODES,
+                                    "WORDS_PER_CYCLE" : WORDS_PER_CYCLE, "PERF_COUNTERS" : [False, True]},
+    "aes_128_top_wrapper_multi"  : {"SBOX_ARCHITECTURE" : LOOP_SBOX_ARCHITECTURES, "CONTEXTS" : CONTEXTS,
+                                    "WORDS_PER_CYCLE" : WORDS_PER_CYCLE},
+}
+
+def supported(parameters) -> bool:
+    """
+    Returns False for generic combinations that the top level rejects: round keys generated
+    on the fly serve one block at a time and are not cached, and T-table rounds have no
+    stages for the round loop pipelines (PIPELINED decryption, the CTR round loop) and are
+    only built with the stored key schedule. The masked S-box is only in the iterative
+    encryption and decryption cores.
+    """
+    if parameters.get("SBOX_ARCHITECTURE") == "MASKED" and "MODE" in parameters:
+        if parameters["MODE"] == "CTR":
+            return False
+        if parameters["ROUND_ARCHITECTURE"] != "ITERATIVE" and parameters["MODE"] != "ENC":
+            return False
+    if parameters.get("SBOX_ARCHITECTURE") == "TTABLE" and "MODE" in parameters:
+        if parameters["KEY_SCHEDULE"] == "ON_THE_FLY":
+            return False
+        if parameters["MODE"] == "CTR":
+            return parameters["ROUND_ARCHITECTURE"] == "UNROLLED"
+        return parameters["ROUND_ARCHITECTURE"] != "PIPELINED" or parameters["MODE"] == "ENC"
+    if parameters.get("KEY_SCHEDULE", "STORED") == "ON_THE_FLY":
+        return (parameters["MODE"] != "CTR" and parameters["KEY_SLOTS"] == 0 and
+                (parameters["ROUND_ARCHITECTURE"] == "ITERATIVE" or parameters["MODE"] == "ENC"))
+    return True
+
+REGRESSION_DIR = RESULTS_DIR / "regression"
+
+def expand_jobs(toplevels, seeds):
+    """
+    Returns one job description per top level, generic combination and seed.
+    """
+    jobs = []
+    for toplevel in toplevels:
+        names = list(MATRIX[toplevel])
+        for values in itertools.product(*MATRIX[toplevel].values()):
+            parameters = dict(zip(names, values))
+            if not supported(parameters):
+                continue
+            for seed in seeds:
+                name = "-".join([toplevel] + [str(value) for value in values] + [str(seed)])
+                jobs.append({"name" : name, "toplevel" : toplevel, "parameters" : parameters, "seed" : seed})
+    return jobs
+
+def run_job(job, profile):
+    """
+    Builds and runs one job in its own directory with the given runner profile. Runs in
+    a worker process.
+    """
+    job_dir     = REGRESSION_DIR / job["name"]
+    results_xml = job_dir / "results.xml"
+    log_file    = job_dir / "sim.log"
+    job_dir.mkdir(parents=True, exist_ok=True)
+    extra_env = {name : str(value) for name, value in job["parameters"].items()}
+    extra_env["LATENCY_DIR"] = str(job_dir / "latency")
+    extra_env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(tests_path), os.getenv("PYTHONPATH")]))
+
+    start = time.perf_counter()
+    runner = get_runner(profile["sim"])
+    try:
+        cached_build(
+            runner,
+            sources=SOURCES[job["toplevel"]],
+            hdl_toplevel=job["toplevel"],
+            build_dir=job_dir / "sim_build",
+            build_args=profile["build_args"],
+            log_file=log_file,
+        )
+        runner.test(
+            hdl_toplevel=job["toplevel"],
+            hdl_toplevel_lang=HDL_TOPLEVEL_LANG,
+            test_module=f"{job['toplevel']}_test",
+            build_dir=job_dir / "sim_build",
+            test_dir=job_dir,
+            results_xml=str(results_xml),
+            seed=job["seed"],
+            parameters=job["parameters"],
+            extra_env=extra_env,
+            test_args=profile["test_args"],
+            waves=profile["waves"],
+            log_file=log_file,
+        )
+    except (Exception, SystemExit):
+        # The runner exits on failing tests; the results file still tells us which ones
+        pass
+    duration = time.perf_counter() - start
+
+    try:
+        num_tests, num_failed = get_results(results_xml)
+    except RuntimeError:
+        num_tests, num_failed = 0, None # Build or simulator error, no results
+    return {**job, "tests" : num_tests, "failed" : num_failed, "duration" : round(duration, 2),
+            "results_xml" : str(results_xml), "log" : str(log_file)}
+
+def merge_results(results, base_seed, profile=None, elapsed=None):
+    """
+    Writes the merged JSON report and a single JUnit XML file with one testsuite per job.
+    """
+    merged = ElementTree.Element("testsuites", name="regression")
+    for result in results:
+        if result["failed"] is None:
+            suite = ElementTree.SubElement(merged, "testsuite", name=result["name"], tests="1", errors="1")
+            case  = ElementTree.SubElement(suite, "testcase", name="simulation", classname=result["name"])
+            ElementTree.SubElement(case, "error", message=f"No results, see {result['log']}")
+            continue
+        for suite in ElementTree.parse(result["results_xml"]).getroot().iter("testsuite"):
+            suite.set("name", result["name"])
+            for case in suite.iter("testcase"):
+                case.set("classname", f"{result['name']}.{case.get('classname', '')}")
+            merged.append(suite)
+    ElementTree.ElementTree(merged).write(RESULTS_DIR / "regression.xml", encoding="utf-8", xml_declaration=True)
+
+    summary = {
+        "seed"   : base_seed,
+        "profile": None if profile is None else profile["name"],
+        "sim"    : None if profile is None else profile["sim"],
+        "elapsed": None if elapsed is None else round(elapsed, 2),
+        "jobs"   : len(results),
+        "tests"  : sum(result["tests"] for result in results),
+        "failed" : sum(1 if result["failed"] is None else result["failed"] for result in results),
+        "results": sorted(results, key=lambda result: result["name"]),
+    }
+    (RESULTS_DIR / "regression.json").write_text(json.dumps(summary, indent=4))
+    return summary
+
+def run_regression(toplevels=tuple(MATRIX), num_seeds=4, base_seed=None, max_workers=None, profile=None):
+    """
+    Runs the regression with the named runner profile and returns the merged summary.
+    The latency results of all jobs are merged into LATENCY_DIR per top level.
+    """
+    profile = get_profile(profile or os.getenv("PROFILE", "fast"))
+    wall_clock = WallClock(profile, "regression")
+    if base_seed is None:
+        base_seed = random.randrange(2**31 - num_seeds)
+    jobs = expand_jobs(toplevels, [base_seed + i for i in range(num_seeds)])
+    REGRESSION_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    with wall_clock.phase("regression"), ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_job, job, profile) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            status = "ERROR" if result["failed"] is None else "FAIL" if result["failed"] else "PASS"
+            print(f"[{len(results)+1}/{len(jobs)}] {status} {result['name']} ({result['duration']} s)")
+            results.append(result)
+    wall_clock.record()
+    for toplevel in toplevels:
+        merge_latency(toplevel, [REGRESSION_DIR / result["name"] / "latency" for result in results
+                                 if result["toplevel"] == toplevel])
+    return merge_results(results, base_seed, profile, wall_clock.seconds["regression"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the generic matrix regression in parallel.")
+    parser.add_argument("--seeds", type=int, default=int(os.getenv("REGRESSION_SEEDS", "4")), help="random seeds per configuration")
+    parser.add_argument("--seed", type=int, default=None, help="first seed, random if not given")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--toplevel", nargs="+", choices=list(MATRIX), default=list(MATRIX))
+    parser.add_argument("--profile", choices=list(PROFILES), default=None, help="runner profile, defaults to $PROFILE or fast")
+    args = parser.parse_args()
+
+    summary = run_regression(args.toplevel, args.seeds, args.seed, args.jobs, args.profile)
+    print(f"Seeds {summary['seed']}..{summary['seed'] + args.seeds - 1} [{summary['profile']}, {summary['sim']}, {summary['elapsed']} s]: "
+          f"{summary['jobs']} jobs, {summary['tests']} tests, {summary['failed']} failed")
+    for result in summary["results"]:
+        if result["failed"] != 0:
+            print(f"  {result['name']}: see {result['log']}")
+    sys.exit(1 if summary["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# © 2025 Ilya Cable <ilya.cable1@gmail.com>
+import json
+from pathlib import Path
+
+import pytest
+from cocotb_tools.runner import Nvc, Runner
+
+from common.runner_utils import HDL_TOPLEVEL_LANG, WallClock, cached_build, get_profile
+
+class RecordingRunner():
+    """
+    Records the sources of every build, like a cocotb runner's build().
+    """
+    def __init__(self):
+        self.builds = []
+
+    def build(self, sources, **kwargs):
+        self.builds.append([source.name for source in sources])
+
+class OfflineNvc(Nvc):
+    """
+    The cocotb Nvc runner with its commands recorded instead of run. A test command
+    writes an empty results file.
+    """
+    def __init__(self):
+        Runner.__init__(self) # Nvc.__init__ asks nvc for its version
+        self._preserve_case = []
+        self.commands = []
+
+    def _simulator_in_path(self):
+        pass
+
+    def _execute(self, cmds, cwd):
+        self.commands.append(cmds)
+        if "COCOTB_RESULTS_FILE" in self.env:
+            Path(self.env["COCOTB_RESULTS_FILE"]).write_text("<testsuites><testsuite tests=\"1\"/></testsuites>")
+
+def test_cached_build(tmp_path, monkeypatch):
+    """
+    Checks that unchanged sources skip the build, and that a changed source only rebuilds
+    itself and the files analysed after it.
+    """
+    monkeypatch.delenv("BUILD_CACHE", raising=False)
+    sources = [tmp_path / f"unit_{i}.vhd" for i in range(4)]
+    for source in sources:
+        source.write_text(f"-- {source.name}")
+    runner = RecordingRunner()
+    build_dir = tmp_path / "sim_build"
+
+    assert len(cached_build(runner, sources, "top", build_dir)) == 4
+    assert cached_build(runner, sources, "top", build_dir) == []
+
+    sources[2].write_text("-- changed")
+    assert cached_build(runner, sources, "top", build_dir) == sources[2:]
+    assert runner.builds[-1] == ["unit_2.vhd", "unit_3.vhd"]
+
+    # Any change to the build configuration rebuilds everything
+    assert len(cached_build(runner, sources, "top", build_dir, build_args=["-2008"])) == 4
+    assert len(cached_build(runner, sources, "top", build_dir, build_args=["-2008"], parameters={"MODE" : "ENC"})) == 4
+
+    monkeypatch.setenv("BUILD_CACHE", "0")
+    assert len(cached_build(runner, sources, "top", build_dir, build_args=["-2008"], parameters={"MODE" : "ENC"})) == 4
+    assert len(runner.builds) == 5, "A cache hit should not build."
+
+def test_cached_build_then_test(tmp_path, monkeypatch):
+    """
+    Checks that runner.test() works on a fresh runner after a cache hit, with the build
+    settings it would have had after a real build.
+    """
+    monkeypatch.delenv("BUILD_CACHE", raising=False)
+    sources = [tmp_path / f"unit_{i}.vhd" for i in range(2)]
+    for source in sources:
+        source.write_text(f"-- {source.name}")
+    build_dir = tmp_path / "sim_build"
+    assert len(cached_build(OfflineNvc(), sources, "top", build_dir, build_args=["--std=2008"])) == 2
+
+    runner = OfflineNvc()
+    assert cached_build(runner, sources, "top", build_dir, build_args=["--std=2008"]) == []
+    assert runner.commands == [], "A cache hit should not build."
+    runner.test(hdl_toplevel="top", hdl_toplevel_lang=HDL_TOPLEVEL_LANG, test_module="top_test",
+                results_xml=str(tmp_path / "results.xml"))
+    [[test_command]] = runner.commands
+    assert "--std=2008" in test_command and "-e" in test_command
+    assert str(build_dir.resolve()) in test_command, "The test should run on the cached build."
+
+def test_profiles(monkeypatch):
+    """
+    Checks that the fast profile drops waves and debug visibility, and that SIM overrides
+    the simulator of a profile.
+    """
+    monkeypatch.delenv("SIM", raising=False)
+    monkeypatch.delenv("PROFILE", raising=False)
+    debug = get_profile()
+    assert debug["name"] == "debug" and debug["sim"] == "questa" and debug["waves"]
+    assert "-voptargs=+acc=rnb" in debug["test_args"]
+
+    fast = get_profile("fast")
+    assert fast["sim"] == "ghdl" and not fast["waves"]
+    # ghdl -r only gets test_args and has to find the design in the VHDL-2008 library
+    assert fast["build_args"] == ["--std=08"] and fast["test_args"] == ["--std=08"]
+
+    monkeypatch.setenv("SIM", "questa")
+    assert get_profile("fast")["test_args"] == [], "The fast profile should not keep signals visible."
+    monkeypatch.setenv("SIM", "nvc")
+    monkeypatch.setenv("PROFILE", "fast")
+    assert get_profile()["build_args"] == ["--std=2008"]
+
+    with pytest.raises(ValueError):
+        get_profile("slow")
+
+def test_wall_clock(tmp_path, monkeypatch):
+    """
+    Checks that phase times accumulate and that each profile keeps its own entry.
+    """
+    monkeypatch.delenv("SIM", raising=False)
+    path = tmp_path / "wall_clock.json"
+    for name in ["debug", "fast"]:
+        wall_clock = WallClock(get_profile(name), "top", path)
+        for _ in range(2):
+            with wall_clock.phase("test"):
+                pass
+        with wall_clock.phase("build"):
+            pass
+        entry = wall_clock.record()
+        assert entry["runs"] == {"test" : 2, "build" : 1}
+
+    results = json.loads(path.read_text())
+    assert set(results) == {"debug", "fast"}
+    assert results["fast"]["top"]["sim"] == "ghdl"
+